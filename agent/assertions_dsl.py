@@ -17,14 +17,32 @@ And combinators:
 - WITHIN(seconds, Expr)
 - EVENTUALLY(Expr)
 - STABLE(seconds, Expr)
+
+Assertion strings are compiled once into a small AST (``compile_assertion``,
+cached per string) and then interpreted.  In snapshot mode (``snapshot=True``,
+``AssertionDSL.snapshot()`` or ``evaluate_many``) page queries and env lookups
+are memoized and a ``JsonStateEnvAPI`` state file is parsed once, so a whole
+criteria/checkpoint list sees one consistent view of the page and state;
+temporal combinators take a fresh view on every re-check.
+
+WITHIN/EVENTUALLY/STABLE are change-driven: between re-checks they block
+until a source the expression reads from changes (DOM mutation or navigation
+via a MutationObserver on the page, the state file signature for
+``JsonStateEnvAPI``, ``PRAGMA data_version`` for a ``memory_source``), the
+timeout expires or the condition holds.  Sources that cannot be observed fall
+back to the old 0.5 s polling.
 """
 
 import re
 import json
 import time
 import os
-from typing import Any, Dict, Callable, Optional
-from playwright.sync_api import Page
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Callable, FrozenSet, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
 
 
 def _should_log_assertion_debug() -> bool:
@@ -36,24 +54,253 @@ def _should_log_assertion_debug() -> bool:
     return value in {"1", "true", "yes", "on"}
 
 
+def _watch_interval_sec() -> float:
+    """How often file/DB change tokens are re-read while a temporal assertion waits."""
+    try:
+        return max(0.01, float(os.environ.get("WEBAGENT_ASSERT_WATCH_INTERVAL_SEC", "0.1")))
+    except ValueError:
+        return 0.1
+
+
+# Cadence for sources without change notifications (the pre-event-driven poll).
+_FALLBACK_POLL_SEC = 0.5
+
+# Counts DOM mutations in the page; a navigation replaces ``window`` and so
+# drops the counter, which the wait predicate also treats as a change.
+_PAGE_WATCH_INSTALL_JS = """() => {
+  if (!window.__dslWatch) {
+    const watch = window.__dslWatch = {n: 0};
+    new MutationObserver(() => { watch.n += 1; }).observe(document, {
+      subtree: true, childList: true, attributes: true, characterData: true,
+    });
+  }
+  return [window.__dslWatch.n, location.href];
+}"""
+_PAGE_WATCH_CHANGED_JS = "([n, href]) => !window.__dslWatch || window.__dslWatch.n !== n || location.href !== href"
+
+
+class Node(NamedTuple):
+    """Compiled assertion: ``kind`` selects the interpreter, ``args`` are its operands."""
+
+    kind: str
+    source: str
+    args: Tuple[Any, ...]
+
+
+# Atom patterns, tried in this order; the first match decides the atom kind.
+_ATOM_PATTERNS = (
+    ("exists", re.compile(r'exists\(([\'"])(.+?)\1\)$')),
+    ("text_cmp", re.compile(r'text\(([\'"])(.+?)\1\)\s*(==|!=|includes)\s*([\'"])(.*?)\4$')),
+    ("text_mem", re.compile(r'text\("(.+?)"\)\s*==\s*mem\(\'(.+?)\'\)')),
+    ("attr", re.compile(r'attr\(([\'"])(.+?)\1,\s*([\'"])(.+?)\3\)\s*(==|!=)\s*([\'"])(.+?)\6$')),
+    ("count", re.compile(r'count\([\'"](.+?)[\'"]\)\s*(>=|<=|==|>|<)\s*(\d+)')),
+    ("url_includes", re.compile(r"url\(\)\.includes\(['\"](.+?)['\"]\)")),
+    ("mem_cmp", re.compile(r'mem\([\'"](.+?)[\'"]\)\s*(==|!=|>=|<=|>|<|includes)\s*[\'"]?(.+?)[\'"]?$')),
+    ("mem_nonempty", re.compile(r'mem\([\'"](.+?)[\'"]\)\s*!=\s*[\'"][\'"]')),
+    ("mem_includes", re.compile(r'mem\([\'"](.+?)[\'"]\)\.includes\([\'"](.+?)[\'"]\)')),
+    ("json_cmp", re.compile(r'json\([\'"](.+?)[\'"]\s*,\s*[\'"](.+?)[\'"]\)\s*(==|!=|>=|<=|>|<|includes)\s*[\'"]?(.+?)[\'"]?$')),
+)
+_WITHIN_RE = re.compile(r'WITHIN\((\d+),\s*(.+)\)', re.DOTALL)
+_STABLE_RE = re.compile(r'STABLE\((\d+),\s*(.+)\)', re.DOTALL)
+
+
+def _split_assertions(content: str) -> list:
+    """Split comma-separated assertions, respecting nested brackets"""
+    assertions = []
+    current = ""
+    depth = 0
+
+    for char in content:
+        if char in ['[', '(']:
+            depth += 1
+        elif char in [']', ')']:
+            depth -= 1
+        elif char == ',' and depth == 0:
+            if current.strip():
+                assertions.append(current.strip())
+            current = ""
+            continue
+
+        current += char
+
+    if current.strip():
+        assertions.append(current.strip())
+
+    return assertions
+
+
+def _invalid(source: str, message: str) -> Node:
+    # Malformed parts only raise when evaluated, exactly as the interpreter
+    # did before compilation (e.g. ALL[...] short-circuits past them).
+    return Node("invalid", source, (message,))
+
+
+def _compile_atom(assertion: str) -> Node:
+    for kind, pattern in _ATOM_PATTERNS:
+        match = pattern.match(assertion)
+        if not match:
+            continue
+        if kind == "exists":
+            return Node(kind, assertion, (match.group(2),))
+        if kind == "text_cmp":
+            return Node(kind, assertion, (match.group(2), match.group(3), match.group(5)))
+        if kind == "attr":
+            return Node(kind, assertion, (match.group(2), match.group(4), match.group(5), match.group(7)))
+        if kind == "count":
+            selector, op, threshold = match.groups()
+            return Node(kind, assertion, (selector, op, int(threshold)))
+        if kind == "json_cmp":
+            channel, path, op, expected = match.groups()
+            # Try to parse expected as JSON
+            try:
+                expected_val = json.loads(expected.replace("'", '"'))
+            except Exception:
+                expected_val = expected
+            return Node(kind, assertion, (channel, path, op, expected, expected_val))
+        return Node(kind, assertion, match.groups())
+    return _invalid(assertion, f"Unknown assertion format: {assertion}")
+
+
+_PAGE_ATOMS = frozenset({"exists", "text_cmp", "text_mem", "attr", "count", "url_includes"})
+_MEMORY_ATOMS = frozenset({"text_mem", "mem_cmp", "mem_nonempty", "mem_includes"})
+
+
+def node_sources(node: Node) -> FrozenSet[str]:
+    """Which of ``page``/``memory``/``env`` an expression reads from."""
+    kind = node.kind
+    if kind in ("all", "any"):
+        return frozenset().union(*(node_sources(child) for child in node.args))
+    if kind == "not":
+        return node_sources(node.args[0])
+    if kind in ("within", "stable"):
+        return node_sources(node.args[1])
+    sources = set()
+    if kind in _PAGE_ATOMS:
+        sources.add("page")
+    if kind in _MEMORY_ATOMS:
+        sources.add("memory")
+    if kind == "json_cmp":
+        sources.add("env")
+    return frozenset(sources)
+
+
+def _compile_timed(kind: str, pattern: "re.Pattern[str]", assertion: str) -> Node:
+    match = pattern.match(assertion)
+    if not match:
+        return _invalid(assertion, f"Invalid {kind.upper()} syntax: {assertion}")
+    return Node(kind, assertion, (int(match.group(1)), compile_assertion(match.group(2).strip())))
+
+
+@lru_cache(maxsize=4096)
+def compile_assertion(assertion: str) -> Node:
+    """Parse an assertion string into a ``Node`` tree (memoized per string)."""
+    assertion = assertion.strip()
+
+    # Combinators
+    if assertion.startswith('ALL[') or assertion.startswith('ANY['):
+        content = assertion[4:-1].strip()
+        children = tuple(compile_assertion(sub) for sub in _split_assertions(content))
+        return Node(assertion[:3].lower(), assertion, children)
+    if assertion.startswith('NOT['):
+        return Node("not", assertion, (compile_assertion(assertion[4:-1].strip()),))
+    if assertion.startswith('WITHIN('):
+        return _compile_timed("within", _WITHIN_RE, assertion)
+    if assertion.startswith('EVENTUALLY('):
+        # EVENTUALLY(Expr) - must eventually be true (max 30s)
+        content = assertion[11:-1].strip()  # Remove "EVENTUALLY(" and ")"
+        return _compile_timed("within", _WITHIN_RE, f"WITHIN(30, {content})")
+    if assertion.startswith('STABLE('):
+        return _compile_timed("stable", _STABLE_RE, assertion)
+
+    # Atoms
+    return _compile_atom(assertion)
+
+
+class JsonStateEnvAPI:
+    """``env_api_fn`` that resolves dotted paths in a JSON state file.
+
+    Called directly it re-reads the file on every lookup; ``AssertionDSL`` in
+    snapshot mode instead calls ``load_state`` once and resolves paths with
+    ``lookup``.
+    """
+
+    def __init__(self, path_fn: Callable[[], Any]):
+        self.path_fn = path_fn
+
+    def change_token(self) -> Any:
+        """File signature; changes whenever the server rewrites the state file."""
+        try:
+            st = os.stat(self.path_fn())
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def load_state(self) -> Any:
+        path_obj = self.path_fn()
+        if not path_obj.exists():
+            return None
+        try:
+            return json.loads(path_obj.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+
+    @staticmethod
+    def lookup(state: Any, channel: str, path: str) -> Any:
+        if state is None:
+            return None
+        current = state
+        for part in path.split("."):
+            if isinstance(current, dict):
+                current = current.get(part)
+            elif isinstance(current, list):
+                try:
+                    current = current[int(part)]
+                except Exception:
+                    return None
+            else:
+                return None
+            if current is None:
+                return None
+        return current
+
+    def __call__(self, channel: str, path: str) -> Any:
+        return self.lookup(self.load_state(), channel, path)
+
+
 class AssertionDSL:
     """Interpreter for Assertions DSL"""
 
     def __init__(
         self,
-        page: Page,
+        page: "Page",
         memory: Dict[str, Any],
-        env_api_fn: Callable[[str, str], Any]
+        env_api_fn: Callable[[str, str], Any],
+        snapshot: bool = False,
+        memory_source: Any = None,
+        env_change_token: Optional[Callable[[], Any]] = None,
     ):
         """
         Args:
             page: Playwright Page object
             memory: Memory KV store dictionary
             env_api_fn: Function to query env API: (channel, path) -> value
+            snapshot: Evaluate everything on this instance against one view
+                of the page/state (for single-use, per-verification evaluators)
+            memory_source: Optional ``memory_kv.MemoryKVCache`` backing
+                ``memory``; temporal assertions wake on its writes and merge
+                its (incrementally refreshed) contents into ``memory``
+            env_change_token: Cheap fingerprint of what ``env_api_fn`` reads;
+                defaults to ``env_api_fn.change_token`` when present
         """
         self.page = page
         self.memory = memory
         self.env_api_fn = env_api_fn
+        self.memory_source = memory_source
+        self.env_change_token = env_change_token or getattr(env_api_fn, "change_token", None)
+        self._snapshot_depth = 1 if snapshot else 0
+        self._snapshot_cache: Dict[Tuple[Any, ...], Any] = {}
+        self._memory_token: Any = None
+        self._memory_keys: set = set()
 
     def evaluate(self, assertion: str) -> bool:
         """
@@ -65,52 +312,102 @@ class AssertionDSL:
         Returns:
             True if assertion holds, False otherwise
         """
-        assertion = assertion.strip()
-
-        # Combinators
-        if assertion.startswith('ALL['):
-            return self._eval_all(assertion)
-        elif assertion.startswith('ANY['):
-            return self._eval_any(assertion)
-        elif assertion.startswith('NOT['):
-            return self._eval_not(assertion)
-        elif assertion.startswith('WITHIN('):
-            return self._eval_within(assertion)
-        elif assertion.startswith('EVENTUALLY('):
-            return self._eval_eventually(assertion)
-        elif assertion.startswith('STABLE('):
-            return self._eval_stable(assertion)
-
-        # Atoms
-        res = self._eval_atom(assertion)
-        # print(f"DEBUG: DSL eval '{assertion}' -> {res}")
-        return res
-
-    def _eval_atom(self, assertion: str) -> bool:
+        return self._eval_node(compile_assertion(assertion))
+
+    def evaluate_many(self, assertions: List[str]) -> List[bool]:
+        """Evaluate a list against one snapshot; an assertion that raises counts as False."""
+        results = []
+        with self.snapshot():
+            for assertion in assertions:
+                try:
+                    results.append(bool(self.evaluate(assertion)))
+                except Exception:
+                    results.append(False)
+        return results
+
+    @contextmanager
+    def snapshot(self):
+        """Memoize page queries and env lookups until the outermost block exits."""
+        if self._snapshot_depth == 0:
+            self._snapshot_cache.clear()
+        self._snapshot_depth += 1
+        try:
+            yield self
+        finally:
+            self._snapshot_depth -= 1
+            if self._snapshot_depth == 0:
+                self._snapshot_cache.clear()
+
+    def _cached(self, key: Tuple[Any, ...], fetch: Callable[[], Any]) -> Any:
+        if not self._snapshot_depth:
+            return fetch()
+        if key in self._snapshot_cache:
+            return self._snapshot_cache[key]
+        value = fetch()
+        self._snapshot_cache[key] = value
+        return value
+
+    def _selector_count(self, selector: str) -> int:
+        return self._cached(("count", selector), lambda: self.page.locator(selector).count())
+
+    def _inner_text(self, selector: str) -> str:
+        return self._cached(("text", selector), lambda: self.page.locator(selector).inner_text())
+
+    def _attribute(self, selector: str, name: str) -> Optional[str]:
+        return self._cached(("attr", selector, name), lambda: self.page.locator(selector).get_attribute(name))
+
+    def _env_value(self, channel: str, path: str) -> Any:
+        load_state = getattr(self.env_api_fn, "load_state", None)
+        if self._snapshot_depth and load_state is not None:
+            return self.env_api_fn.lookup(self._cached(("state",), load_state), channel, path)
+        return self._cached(("env", channel, path), lambda: self.env_api_fn(channel, path))
+
+    def _eval_node(self, node: Node) -> bool:
+        kind = node.kind
+        if kind == "all":
+            for child in node.args:
+                if not self._eval_node(child):
+                    if _should_log_assertion_debug():
+                        print(f"DEBUG: ALL check failed on: {child.source}")
+                    return False
+            return True
+        if kind == "any":
+            for child in node.args:
+                if self._eval_node(child):
+                    return True
+            return False
+        if kind == "not":
+            return not self._eval_node(node.args[0])
+        if kind == "within":
+            return self._eval_within(*node.args)
+        if kind == "stable":
+            return self._eval_stable(*node.args)
+        if kind == "invalid":
+            raise ValueError(node.args[0])
+        return self._eval_atom(node)
+
+    def _eval_atom(self, node: Node) -> bool:
         """Evaluate atomic assertion"""
         if _should_log_assertion_debug():
-            print(f"DEBUG: Eval Atom: '{assertion}'")
+            print(f"DEBUG: Eval Atom: '{node.source}'")
+        kind = node.kind
 
         # exists("<selector>")
-        match = re.match(r'exists\(([\'"])(.+?)\1\)$', assertion)
-        if match:
-            selector = match.group(2)
+        if kind == "exists":
+            selector = node.args[0]
             try:
                 if selector.strip().startswith("//"):
                     # Playwright requires explicit xpath= prefix for XPath selectors.
                     selector = f"xpath={selector}"
-                return self.page.locator(selector).count() > 0
+                return self._selector_count(selector) > 0
             except Exception:
                 return False
 
         # text("<selector>") == "<str>" or text("<selector>") != ""
-        match = re.match(r'text\(([\'"])(.+?)\1\)\s*(==|!=|includes)\s*([\'"])(.*?)\4$', assertion)
-        if match:
-            selector = match.group(2)
-            op = match.group(3)
-            expected = match.group(5)
+        if kind == "text_cmp":
+            selector, op, expected = node.args
             try:
-                actual = self.page.locator(selector).inner_text()
+                actual = self._inner_text(selector)
                 if op == '==':
                     if actual != expected:
                         if _should_log_assertion_debug():
@@ -124,25 +421,20 @@ class AssertionDSL:
                 return False
 
         # text("<selector>") == mem("<key>")
-        match = re.match(r'text\("(.+?)"\)\s*==\s*mem\(\'(.+?)\'\)', assertion)
-        if match:
-            selector, mem_key = match.groups()
+        if kind == "text_mem":
+            selector, mem_key = node.args
             try:
-                actual = self.page.locator(selector).inner_text()
+                actual = self._inner_text(selector)
                 expected = self._get_memory(mem_key)
                 return str(actual) == str(expected)
             except:
                 return False
 
         # attr("<selector>", "<name>") == "<value>"
-        match = re.match(r'attr\(([\'"])(.+?)\1,\s*([\'"])(.+?)\3\)\s*(==|!=)\s*([\'"])(.+?)\6$', assertion)
-        if match:
-            selector = match.group(2)
-            attr_name = match.group(4)
-            op = match.group(5)
-            expected = match.group(7)
+        if kind == "attr":
+            selector, attr_name, op, expected = node.args
             try:
-                actual = self.page.locator(selector).get_attribute(attr_name)
+                actual = self._attribute(selector, attr_name)
                 if op == '==':
                     return actual == expected
                 elif op == '!=':
@@ -151,11 +443,9 @@ class AssertionDSL:
                 return False
 
         # count("<selector>") >= N
-        match = re.match(r'count\([\'"](.+?)[\'"]\)\s*(>=|<=|==|>|<)\s*(\d+)', assertion)
-        if match:
-            selector, op, threshold = match.groups()
-            threshold = int(threshold)
-            actual_count = self.page.locator(selector).count()
+        if kind == "count":
+            selector, op, threshold = node.args
+            actual_count = self._selector_count(selector)
 
             if op == '>=':
                 return actual_count >= threshold
@@ -169,27 +459,24 @@ class AssertionDSL:
                 return actual_count < threshold
 
         # url().includes("<path>")
-        match = re.match(r"url\(\)\.includes\(['\"](.+?)['\"]\)", assertion)
-        if match:
-            path = match.group(1)
+        if kind == "url_includes":
+            path = node.args[0]
             return path in self.page.url
 
         # mem("<key>") == "<expected>"
-        match = re.match(r'mem\([\'"](.+?)[\'"]\)\s*(==|!=|>=|<=|>|<|includes)\s*[\'"]?(.+?)[\'"]?$', assertion)
-        if match:
-            key, op, expected = match.groups()
+        if kind == "mem_cmp":
+            key, op, expected = node.args
             actual = self._get_memory(key)
             if _should_log_assertion_debug():
                 print(f"DEBUG: DSL mem check: key='{key}', op='{op}', expected='{expected}', actual='{actual}' (type: {type(actual)})")
             # Missing memory keys should not satisfy assertions, including "!=" checks.
             if actual is None:
                 return False
-            # ...
             # Convert expected string to boolean if applicable
             if isinstance(actual, bool) and isinstance(expected, str):
                 if expected.lower() == 'true': expected = True
                 elif expected.lower() == 'false': expected = False
-            
+
             if op == '==':
                 # Try loose equality for numbers
                 try:
@@ -212,34 +499,26 @@ class AssertionDSL:
                 return float(actual) < float(expected)
 
         # mem("<key>") != ""
-        match = re.match(r'mem\([\'"](.+?)[\'"]\)\s*!=\s*[\'"][\'"]', assertion)
-        if match:
-            key = match.group(1)
+        if kind == "mem_nonempty":
+            key = node.args[0]
             actual = self._get_memory(key)
             return actual is not None and str(actual) != ""
 
         # mem("<key>").includes("<value>")
-        match = re.match(r'mem\([\'"](.+?)[\'"]\)\.includes\([\'"](.+?)[\'"]\)', assertion)
-        if match:
-            key, expected = match.groups()
+        if kind == "mem_includes":
+            key, expected = node.args
             actual = self._get_memory(key)
             if _should_log_assertion_debug():
                 print(f"DEBUG: AssertionDSL mem includes check: key='{key}', expected='{expected}', actual='{actual}'")
             return expected in str(actual)
 
         # json("<channel>", "<path>") == <value>
-        match = re.match(r'json\([\'"](.+?)[\'"]\s*,\s*[\'"](.+?)[\'"]\)\s*(==|!=|>=|<=|>|<|includes)\s*[\'"]?(.+?)[\'"]?$', assertion)
-        if match:
-            channel, path, op, expected = match.groups()
+        if kind == "json_cmp":
+            channel, path, op, expected, expected_val = node.args
             try:
-                actual = self.env_api_fn(channel, path)
+                actual = self._env_value(channel, path)
                 if _should_log_assertion_debug():
                     print(f"DEBUG: AssertionDSL json check: channel='{channel}', path='{path}', op='{op}', expected='{expected}', actual='{actual}'")
-                # Try to parse expected as JSON
-                try:
-                    expected_val = json.loads(expected.replace("'", '"'))
-                except:
-                    expected_val = expected
 
                 # Missing env values should not accidentally satisfy assertions
                 # such as `json('env', 'foo') != ''`. Preserve explicit null checks.
@@ -272,105 +551,123 @@ class AssertionDSL:
             except:
                 return False
 
-        raise ValueError(f"Unknown assertion format: {assertion}")
-
-    def _eval_all(self, assertion: str) -> bool:
-        """Evaluate ALL[...] combinator"""
-        # Extract content between ALL[ and ]
-        content = assertion[4:-1].strip()
-        sub_assertions = self._split_assertions(content)
-
-        for sub in sub_assertions:
-            if not self.evaluate(sub):
-                if _should_log_assertion_debug():
-                    print(f"DEBUG: ALL check failed on: {sub}")
-                return False
+        raise ValueError(f"Unknown assertion format: {node.source}")
+
+    def _refresh_snapshot(self) -> None:
+        # Temporal combinators must observe the page/state as it changes.
+        self._snapshot_cache.clear()
+
+    def _source_tokens(self, sources: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """Change tokens for the non-page sources; None if one cannot be observed."""
+        tokens: Dict[str, Any] = {}
+        if "env" in sources:
+            if self.env_change_token is None:
+                return None
+            tokens["env"] = self.env_change_token()
+        if "memory" in sources and self.memory_source is not None:
+            tokens["memory"] = self.memory_source.change_token()
+        return tokens
+
+    def _page_mark(self) -> Optional[Any]:
+        try:
+            return self.page.evaluate(_PAGE_WATCH_INSTALL_JS)
+        except Exception:
+            return None
+
+    def _page_changed(self, mark: Any, timeout_sec: float) -> bool:
+        try:
+            self.page.wait_for_function(_PAGE_WATCH_CHANGED_JS, arg=mark, timeout=max(1.0, timeout_sec * 1000.0))
+            return True
+        except Exception as exc:
+            # Timeouts mean "nothing happened"; anything else (e.g. the
+            # execution context was destroyed by a navigation) is a change.
+            return type(exc).__name__ != "TimeoutError"
+
+    def _merge_memory(self) -> bool:
+        """Bring ``memory`` up to date with ``memory_source``; True if it had changed since the last merge."""
+        token = self.memory_source.change_token()
+        if token is not None and token == self._memory_token:
+            return False
+        snapshot = self.memory_source.snapshot()
+        # Keys the source held at the last merge but no longer does were deleted.
+        for key in self._memory_keys - snapshot.keys():
+            self.memory.pop(key, None)
+        self.memory.update(snapshot)
+        self._memory_token = token
+        self._memory_keys = set(snapshot)
         return True
 
-    def _eval_any(self, assertion: str) -> bool:
-        """Evaluate ANY[...] combinator"""
-        content = assertion[4:-1].strip()
-        sub_assertions = self._split_assertions(content)
-
-        for sub in sub_assertions:
-            if self.evaluate(sub):
+    def _wait_for_change(self, sources: FrozenSet[str], deadline: float) -> bool:
+        """Block until a source in ``sources`` changes (True) or ``deadline`` passes (False)."""
+        merge_memory = "memory" in sources and self.memory_source is not None
+        if merge_memory and self._merge_memory():
+            # Written after ``memory`` was last merged: re-check right away.
+            return True
+        watch_page = "page" in sources and self.page is not None
+        mark = self._page_mark() if watch_page else None
+        tokens = self._source_tokens(sources)
+        if tokens is None or (watch_page and mark is None):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(_FALLBACK_POLL_SEC, remaining))
+            if merge_memory:
+                self._merge_memory()
+            return True
+        if not watch_page and not tokens:
+            # Nothing the expression reads can change while we wait.
+            return False
+
+        interval = _watch_interval_sec()
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            step = min(remaining, interval) if tokens else remaining
+            if watch_page:
+                changed = self._page_changed(mark, step)
+            else:
+                time.sleep(step)
+                changed = False
+            changed = changed or self._source_tokens(sources) != tokens
+            if changed:
+                # Whichever source woke us, memory may have moved too.
+                if merge_memory:
+                    self._merge_memory()
                 return True
-        return False
 
-    def _eval_not(self, assertion: str) -> bool:
-        """Evaluate NOT[...] combinator"""
-        content = assertion[4:-1].strip()
-        return not self.evaluate(content)
-
-    def _eval_within(self, assertion: str) -> bool:
+    def _eval_within(self, seconds: int, expr: Node) -> bool:
         """Evaluate WITHIN(seconds, Expr) - must satisfy within time limit"""
-        match = re.match(r'WITHIN\((\d+),\s*(.+)\)', assertion, re.DOTALL)
-        if not match:
-            raise ValueError(f"Invalid WITHIN syntax: {assertion}")
-
-        seconds = int(match.group(1))
-        expr = match.group(2).strip()
-
-        start_time = time.time()
-        while time.time() - start_time < seconds:
+        deadline = time.time() + seconds
+        sources = node_sources(expr)
+        while time.time() < deadline:
+            self._refresh_snapshot()
             try:
-                if self.evaluate(expr):
+                if self._eval_node(expr):
                     return True
             except:
                 pass
-            time.sleep(0.5)
+            if not self._wait_for_change(sources, deadline):
+                break
 
         return False
 
-    def _eval_eventually(self, assertion: str) -> bool:
-        """Evaluate EVENTUALLY(Expr) - must eventually be true (max 30s)"""
-        content = assertion[11:-1].strip()  # Remove "EVENTUALLY(" and ")"
-        return self._eval_within(f"WITHIN(30, {content})")
-
-    def _eval_stable(self, assertion: str) -> bool:
+    def _eval_stable(self, seconds: int, expr: Node) -> bool:
         """Evaluate STABLE(seconds, Expr) - must remain true for N seconds"""
-        match = re.match(r'STABLE\((\d+),\s*(.+)\)', assertion, re.DOTALL)
-        if not match:
-            raise ValueError(f"Invalid STABLE syntax: {assertion}")
-
-        seconds = int(match.group(1))
-        expr = match.group(2).strip()
-
-        start_time = time.time()
-        while time.time() - start_time < seconds:
+        deadline = time.time() + seconds
+        sources = node_sources(expr)
+        while time.time() < deadline:
+            self._refresh_snapshot()
             try:
-                if not self.evaluate(expr):
+                if not self._eval_node(expr):
                     return False
             except:
                 return False
-            time.sleep(0.5)
+            if not self._wait_for_change(sources, deadline):
+                break
 
         return True
 
-    def _split_assertions(self, content: str) -> list:
-        """Split comma-separated assertions, respecting nested brackets"""
-        assertions = []
-        current = ""
-        depth = 0
-
-        for char in content:
-            if char in ['[', '(']:
-                depth += 1
-            elif char in [']', ')']:
-                depth -= 1
-            elif char == ',' and depth == 0:
-                if current.strip():
-                    assertions.append(current.strip())
-                current = ""
-                continue
-
-            current += char
-
-        if current.strip():
-            assertions.append(current.strip())
-
-        return assertions
-
     def _get_memory(self, key: str) -> Any:
         """Get value from memory with dot notation support"""
         # Direct match
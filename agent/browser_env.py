@@ -1,4 +1,5 @@
 from playwright.sync_api import sync_playwright
+import atexit
 import time
 import re
 import threading
@@ -7,13 +8,159 @@ import json
 import tempfile
 from urllib.parse import urlsplit, urlunsplit
 from pathlib import Path
-from runtime_paths import server_base_url
+from runtime_paths import server_base_url, thread_is_quiet
+
+from agent.observation import ObservationEngine
 
 
 _PLAYWRIGHT_LAUNCH_LOCK = threading.Lock()
+_BROWSER_MANAGERS = threading.local()
+_ALL_BROWSER_MANAGERS = []
+_ALL_BROWSER_MANAGERS_LOCK = threading.Lock()
+
+
+def reuse_browser_enabled():
+    return os.environ.get("WEBAGENT_REUSE_BROWSER", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _browser_max_contexts_default():
+    try:
+        return max(1, int(os.environ.get("WEBAGENT_BROWSER_MAX_CONTEXTS", "50")))
+    except ValueError:
+        return 50
+
+
+class BrowserManager:
+    """One Chromium per (thread, launch options) handing out fresh BrowserContexts.
+
+    Playwright's sync API binds its objects to the thread that started it, so
+    managers are thread-local; ``browser_manager()`` returns the calling
+    thread's instance.  The browser is relaunched once ``max_contexts``
+    contexts have been handed out and none of them is still open, which
+    bounds the memory a long-lived Chromium accumulates.
+    """
+
+    def __init__(self, headless=True, max_contexts=None, launch_options=None):
+        self.headless = bool(headless)
+        self.launch_options = dict(launch_options or {})
+        self.max_contexts = max_contexts or _browser_max_contexts_default()
+        self.playwright = None
+        self.browser = None
+        self.live_contexts = 0
+        self.contexts_since_launch = 0
+        self.stats = {"launches": 0, "recycles": 0, "contexts": 0, "launch_sec_total": 0.0}
+
+    def _launch(self):
+        started = time.perf_counter()
+        # Playwright sync startup races when multiple browser processes are
+        # spawned concurrently in the same worker process. Serialize launch.
+        with _PLAYWRIGHT_LAUNCH_LOCK:
+            if self.playwright is None:
+                self.playwright = _thread_playwright()
+            self.browser = self.playwright.chromium.launch(
+                headless=self.headless,
+                timeout=60000,
+                **self.launch_options,
+            )
+        self.contexts_since_launch = 0
+        self.stats["launches"] += 1
+        self.stats["launch_sec_total"] += time.perf_counter() - started
+
+    def _close_browser(self):
+        try:
+            if self.browser is not None:
+                self.browser.close()
+        except Exception:
+            pass
+        self.browser = None
+
+    def new_context(self, **kwargs):
+        if self.browser is not None and (
+            not self.browser.is_connected()
+            or (self.live_contexts == 0 and self.contexts_since_launch >= self.max_contexts)
+        ):
+            self.stats["recycles"] += 1
+            self._close_browser()
+        if self.browser is None:
+            self._launch()
+        context = self.browser.new_context(**kwargs)
+        self.live_contexts += 1
+        self.contexts_since_launch += 1
+        self.stats["contexts"] += 1
+        return context
+
+    def release(self, context):
+        try:
+            context.close()
+        except Exception:
+            pass
+        self.live_contexts = max(0, self.live_contexts - 1)
+
+    def shutdown(self):
+        with _PLAYWRIGHT_LAUNCH_LOCK:
+            self._close_browser()
+        self.playwright = None
+        self.live_contexts = 0
+
+
+def _thread_playwright():
+    # A thread can only run one sync Playwright driver, so every manager on
+    # the thread shares it.
+    playwright = getattr(_BROWSER_MANAGERS, "playwright", None)
+    if playwright is None:
+        playwright = _BROWSER_MANAGERS.playwright = sync_playwright().start()
+    return playwright
+
+
+def browser_manager(headless=True, **launch_options):
+    """The calling thread's shared BrowserManager for these launch options."""
+    managers = getattr(_BROWSER_MANAGERS, "by_mode", None)
+    if managers is None:
+        managers = _BROWSER_MANAGERS.by_mode = {}
+    key = (bool(headless), json.dumps(launch_options, sort_keys=True, default=str))
+    manager = managers.get(key)
+    if manager is None:
+        manager = managers[key] = BrowserManager(headless=headless, launch_options=launch_options)
+        with _ALL_BROWSER_MANAGERS_LOCK:
+            _ALL_BROWSER_MANAGERS.append(manager)
+    return manager
+
+
+def shutdown_thread_browsers():
+    """Close the browsers shared on the calling thread; call before the thread exits."""
+    managers = getattr(_BROWSER_MANAGERS, "by_mode", None) or {}
+    for manager in managers.values():
+        manager.shutdown()
+        with _ALL_BROWSER_MANAGERS_LOCK:
+            if manager in _ALL_BROWSER_MANAGERS:
+                _ALL_BROWSER_MANAGERS.remove(manager)
+    managers.clear()
+    playwright = getattr(_BROWSER_MANAGERS, "playwright", None)
+    _BROWSER_MANAGERS.playwright = None
+    if playwright is not None:
+        with _PLAYWRIGHT_LAUNCH_LOCK:
+            try:
+                playwright.stop()
+            except Exception:
+                pass
+
+
+def browser_manager_stats():
+    with _ALL_BROWSER_MANAGERS_LOCK:
+        managers = list(_ALL_BROWSER_MANAGERS)
+    totals = {"managers": len(managers), "launches": 0, "recycles": 0, "contexts": 0, "launch_sec_total": 0.0}
+    for manager in managers:
+        for key, value in manager.stats.items():
+            totals[key] += value
+    return totals
+
+
+atexit.register(shutdown_thread_browsers)
 
 
 def _should_log_actions() -> bool:
+    if thread_is_quiet():
+        return False
     return os.environ.get("WEBAGENT_SUPPRESS_ACTION_LOGS", "").strip().lower() not in {"1", "true", "yes", "on"}
 
 
@@ -144,11 +291,34 @@ def _bounded_edit_distance(a, b, max_distance=2):
     return prev[-1]
 
 class BrowserEnv:
-    def __init__(self, headless=True, base_url=None, task_id=None, binding_task_id=None, allowed_domains=None, task_inputs=None):
+    def __init__(self, headless=True, base_url=None, task_id=None, binding_task_id=None, allowed_domains=None, task_inputs=None, storage_state=None, reuse_browser=None):
         self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
+        self.contexts_opened = 0
+        self.observer = ObservationEngine.from_env()
+        # With reuse (WEBAGENT_REUSE_BROWSER, on by default) the Chromium process
+        # belongs to the thread's BrowserManager and outlives this env.
+        if reuse_browser is None:
+            reuse_browser = reuse_browser_enabled()
+        self._manager = browser_manager(headless) if reuse_browser else None
+        self._configure_task(base_url, task_id, binding_task_id, allowed_domains, task_inputs)
+        try:
+            if self._manager is not None:
+                self._open_context(storage_state=storage_state)
+            else:
+                # Playwright sync startup races when multiple browser processes are
+                # spawned concurrently in the same worker process. Serialize launch.
+                with _PLAYWRIGHT_LAUNCH_LOCK:
+                    self.playwright = sync_playwright().start()
+                    self.browser = self.playwright.chromium.launch(headless=headless, timeout=60000)
+                    self._open_context(storage_state=storage_state)
+        except Exception:
+            self.close()
+            raise
+
+    def _configure_task(self, base_url, task_id, binding_task_id, allowed_domains, task_inputs):
         self.task_id = str(task_id or "").strip()
         self.binding_task_id = str(binding_task_id or task_id or "").strip()
         self.task_inputs = dict(task_inputs or {})
@@ -158,35 +328,76 @@ class BrowserEnv:
             normalized = str(domain or "").strip().lower()
             if normalized and normalized not in self.allowed_domains:
                 self.allowed_domains.append(normalized)
+
+    def _open_context(self, storage_state=None):
+        context_kwargs = {
+            "viewport": {'width': 1280, 'height': 720},
+            "base_url": self.base_url,
+            "storage_state": storage_state,
+        }
+        if self._manager is not None:
+            self.context = self._manager.new_context(**context_kwargs)
+            self.browser = self._manager.browser
+            self.playwright = self._manager.playwright
+        else:
+            self.context = self.browser.new_context(**context_kwargs)
+        init_chunks = []
+        if self.task_id:
+            init_chunks.append(
+                f"window.__WEBAGENT_TASK_ID__ = {json.dumps(self.task_id)};"
+            )
+        if self.binding_task_id:
+            init_chunks.append(
+                f"window.__WEBAGENT_BINDING_TASK_ID__ = {json.dumps(self.binding_task_id)};"
+            )
+        if self.task_inputs:
+            init_chunks.append(
+                f"window.__WEBAGENT_TASK_INPUTS__ = {json.dumps(self.task_inputs)};"
+            )
+        if init_chunks:
+            self.context.add_init_script(script="".join(init_chunks))
+        self.observer.install(self.context)
+        self.page = self.context.new_page()
+        self.contexts_opened += 1
+
+    def new_context(self, base_url=None, task_id=None, binding_task_id=None, allowed_domains=None, task_inputs=None, storage_state=None):
+        """Swap in a fresh BrowserContext on the already running browser.
+
+        Cookies, storage and pages of the previous context are discarded, so
+        this is equivalent to a new BrowserEnv without the Chromium cold start.
+        ``storage_state`` (as returned by ``storage_state()``) seeds the new
+        context's cookies and localStorage.  Must be called from the thread
+        that created this BrowserEnv.
+        """
+        self._configure_task(base_url, task_id, binding_task_id, allowed_domains, task_inputs)
+        self._close_context()
+        self._open_context(storage_state=storage_state)
+
+    def storage_state(self):
+        """Cookies and localStorage of the current context, or None."""
+        if self.context is None:
+            return None
         try:
-            # Playwright sync startup races when multiple browser processes are
-            # spawned concurrently in the same worker process. Serialize launch.
-            with _PLAYWRIGHT_LAUNCH_LOCK:
-                self.playwright = sync_playwright().start()
-                self.browser = self.playwright.chromium.launch(headless=headless, timeout=60000)
-                self.context = self.browser.new_context(
-                    viewport={'width': 1280, 'height': 720},
-                    base_url=self.base_url
-                )
-                init_chunks = []
-                if self.task_id:
-                    init_chunks.append(
-                        f"window.__WEBAGENT_TASK_ID__ = {json.dumps(self.task_id)};"
-                    )
-                if self.binding_task_id:
-                    init_chunks.append(
-                        f"window.__WEBAGENT_BINDING_TASK_ID__ = {json.dumps(self.binding_task_id)};"
-                    )
-                if self.task_inputs:
-                    init_chunks.append(
-                        f"window.__WEBAGENT_TASK_INPUTS__ = {json.dumps(self.task_inputs)};"
-                    )
-                if init_chunks:
-                    self.context.add_init_script(script="".join(init_chunks))
-                self.page = self.context.new_page()
+            return self.context.storage_state()
         except Exception:
-            self.close()
-            raise
+            return None
+
+    def _close_context(self):
+        try:
+            if self.page is not None:
+                self.page.close()
+        except Exception:
+            pass
+        if self._manager is not None and self.context is not None:
+            self._manager.release(self.context)
+        else:
+            try:
+                if self.context is not None:
+                    self.context.close()
+            except Exception:
+                pass
+        self.page = None
+        self.context = None
 
     def _resolve_upload_filepath(self, raw_path):
         candidate = str(raw_path or "").strip()
@@ -329,7 +540,7 @@ class BrowserEnv:
             self.page.wait_for_load_state('networkidle', timeout=10000)
         except Exception:
             pass
-        self.page.wait_for_timeout(250)
+        self.observer.settle(self.page)
 
     def _resolve_navigation_url(self, raw_url):
         url = (raw_url or "").strip()
@@ -392,89 +603,22 @@ class BrowserEnv:
         self._wait_until_stable()
         return self.get_observation()
 
-    def get_observation(self):
+    def get_observation(self, compact=None):
         """
         Returns a simplified text representation of the current page.
         Ideally, this would be an Accessibility Tree, but a simplified HTML dump 
         is easier to implement robustly without accessibility API flakiness.
-        """
-        # Inject script to get simplified DOM
-        # We identify interactable elements and give them IDs/hints
-        
-        script = r"""
-        (() => {
-            function getSimplifiedDOM(node) {
-                if (node.nodeType === Node.TEXT_NODE) {
-                    var text = node.textContent.trim();
-                    return text ? text : null;
-                }
-                
-                if (node.nodeType !== Node.ELEMENT_NODE) return null;
-                
-                var tag = node.tagName.toLowerCase();
-                if (['script', 'style', 'noscript', 'meta', 'link', 'svg', 'path'].indexOf(tag) !== -1) return null;
-                
-                var style = window.getComputedStyle(node);
-                if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') return null;
-
-                var attrs = [];
-                if (node.id) attrs.push('#' + node.id);
-                if (node.getAttribute('data-original-id')) attrs.push('data-original-id="' + node.getAttribute('data-original-id') + '"');
-                if (node.className) attrs.push('.' + node.className.split(' ').join('.'));
-                if (node.getAttribute('name')) attrs.push('name="' + node.getAttribute('name') + '"');
-                if (node.getAttribute('type')) attrs.push('type="' + node.getAttribute('type') + '"');
-                if (node.getAttribute('placeholder')) attrs.push('placeholder="' + node.getAttribute('placeholder') + '"');
-                if (node.getAttribute('role')) attrs.push('role="' + node.getAttribute('role') + '"');
-                if (node.getAttribute('title')) attrs.push('title="' + node.getAttribute('title') + '"');
-                if (node.getAttribute('aria-label')) attrs.push('aria-label="' + node.getAttribute('aria-label') + '"');
-                if (node.getAttribute('onclick')) {
-                    var onclick = node.getAttribute('onclick') || '';
-                    var fnMatch = onclick.match(/^\s*([A-Za-z0-9_$.]+)/);
-                    var onclickHint = fnMatch ? fnMatch[1] : onclick.slice(0, 64);
-                    if (onclickHint) attrs.push('onclick="' + onclickHint + '"');
-                }
-                if (tag === 'a' && node.getAttribute('href')) attrs.push('href="' + node.getAttribute('href') + '"');
-                if ((tag === 'input' || tag === 'textarea') && node.value) attrs.push('value="' + node.value + '"');
-                if (tag === 'input' && (node.type === 'checkbox' || node.type === 'radio')) attrs.push(node.checked ? 'checked' : 'unchecked');
-                if (tag === 'select') {
-                    var options = Array.from(node.options || []).map(function(opt) {
-                        var label = (opt.textContent || '').trim();
-                        var value = (opt.value || '').trim();
-                        return value === label || !label ? value : (value + ':' + label);
-                    }).filter(Boolean);
-                    if (options.length) attrs.push('options="' + options.join(' | ') + '"');
-                }
-                
-                var childrenStr = '';
-                node.childNodes.forEach(function(child) {
-                    var res = getSimplifiedDOM(child);
-                    if (res) childrenStr += (res + ' ');
-                });
-                
-                var isInteractive = ['a', 'button', 'input', 'select', 'textarea'].indexOf(tag) !== -1 || node.getAttribute('role') === 'button';
-                var hasContent = childrenStr.trim().length > 0;
-                
-                if (isInteractive || hasContent) {
-                    var attrStr = attrs.length > 0 ? ' ' + attrs.join(' ') : '';
-                    return '<' + tag + attrStr + '>' + childrenStr.trim() + '</' + tag + '>';
-                }
-                
-                return childrenStr.trim();
-            }
-            
-            return getSimplifiedDOM(document.body);
-        })()
+
+        Serialization is incremental (see agent/observation.py): unchanged
+        pages are answered from cache and only mutated subtrees are re-walked.
+        ``compact`` (default WEBAGENT_OBS_COMPACT) keeps the best-ranked
+        interactive elements when the content has to be truncated.
         """
         last_error = None
         for _ in range(3):
             try:
                 self._wait_until_stable()
-                content = self.page.evaluate(script)
-                content = re.sub(r'\s+', ' ', content).strip()
-                if len(content) > 10000:
-                    content = content[:10000] + "...(truncated)"
-                url = self.page.url
-                return f"URL: {url}\nCONTENT:\n{content}"
+                return self.observer.observe(self.page, compact=compact)
             except Exception as e:
                 last_error = e
                 self.page.wait_for_timeout(300)
@@ -818,17 +962,12 @@ class BrowserEnv:
         return True, "Error: Unknown Command"
 
     def close(self):
+        if self._manager is not None:
+            # The shared browser stays up for the next env on this thread.
+            self._close_context()
+            return
         with _PLAYWRIGHT_LAUNCH_LOCK:
-            try:
-                if self.page is not None:
-                    self.page.close()
-            except Exception:
-                pass
-            try:
-                if self.context is not None:
-                    self.context.close()
-            except Exception:
-                pass
+            self._close_context()
             try:
                 if self.browser is not None:
                     self.browser.close()
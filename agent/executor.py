@@ -17,9 +17,11 @@ from typing import Dict, Any, Optional, List, Tuple
 from urllib.parse import urlsplit, urlunsplit
 from playwright.sync_api import sync_playwright, Page, Browser, BrowserContext
 from runtime_paths import state_path as runtime_state_path
+from memory_kv import load_memory_snapshot, memory_cache
 
 # Import our custom modules
 from .assertions_dsl import AssertionDSL
+from .browser_env import browser_manager, reuse_browser_enabled
 from .error_handlers import (
     TimeoutHandler, NetworkErrorHandler, ElementNotFoundHandler,
     AssertionFailureHandler, check_preconditions, ErrorReport
@@ -101,6 +103,7 @@ class TaskExecutor:
         # State
         self.memory = {}  # In-memory KV store
         self.browser: Optional[Browser] = None
+        self._browser_manager = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
         self._fallback_input_cursor = 0
@@ -218,35 +221,19 @@ class TaskExecutor:
             print(f"⚠️  Database not found: {self.database_path}")
             return
 
-        for attempt in range(5):
-            try:
-                conn = sqlite3.connect(self.database_path, timeout=10)
-                cursor = conn.cursor()
-                cursor.execute("SELECT key, value FROM memory_kv")
-
-                for row in cursor.fetchall():
-                    key, value = row
-                    if 'courses.DL101.state' in key:
-                        if _should_log_debug():
-                            print(f"DEBUG: Loaded key {key} = {value}")
-                    try:
-                        self.memory[key] = json.loads(value)
-                    except:
-                        self.memory[key] = value
-
-                conn.close()
-                print(f"✅ Loaded {len(self.memory)} memory entries from database")
-                return
-            except sqlite3.OperationalError as e:
-                if "locked" in str(e):
-                    print(f"⚠️  Database locked loading memory, retrying ({attempt+1}/5)...")
-                    time.sleep(1)
-                else:
-                    print(f"⚠️  Error loading memory: {e}")
-                    return
-            except Exception as e:
-                print(f"⚠️  Error loading memory: {e}")
-                return
+        try:
+            # Only rows changed since the last load are fetched and decoded;
+            # the cache retries on "database is locked" itself.
+            snapshot = load_memory_snapshot(self.database_path)
+        except Exception as e:
+            print(f"⚠️  Error loading memory: {e}")
+            return
+        if _should_log_debug():
+            for key, value in snapshot.items():
+                if 'courses.DL101.state' in key:
+                    print(f"DEBUG: Loaded key {key} = {value}")
+        self.memory.update(snapshot)
+        print(f"✅ Loaded {len(self.memory)} memory entries from database")
 
     def _save_memory(self, key: str, value: Any, source: str, confidence: float = 1.0):
         """Save memory entry to database with retry logic"""
@@ -283,6 +270,15 @@ class TaskExecutor:
                 print(f"⚠️  Error saving memory: {e}")
                 return
 
+    def _env_change_token(self) -> Any:
+        """Fingerprint of what ``_env_api`` reads: the state file and the database."""
+        try:
+            st = os.stat(runtime_state_path())
+            state_sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+        except OSError:
+            state_sig = None
+        return (state_sig, memory_cache(self.database_path).change_token())
+
     def _env_api(self, channel: str, path: str) -> Any:
         """Query environment API"""
         # TODO: Implement HTTP call to env API
@@ -550,14 +546,31 @@ class TaskExecutor:
 
     def _start_browser(self, task_spec: Dict[str, Any]):
         """Start Playwright browser"""
-        self.playwright = sync_playwright().start()
         launch_kwargs = {
             "headless": self.headless,
             "slow_mo": self.slow_mo,
             "args": ['--no-proxy-server'],
         }
+        context_kwargs = {
+            "viewport": {'width': 1280, 'height': 720},
+            "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        }
+
+        def _open(kwargs):
+            if reuse_browser_enabled():
+                # Reuse this thread's Chromium across tasks; only the context is new.
+                self._browser_manager = browser_manager(**kwargs)
+                self.context = self._browser_manager.new_context(**context_kwargs)
+                self.browser = self._browser_manager.browser
+                self.playwright = self._browser_manager.playwright
+                return
+            if getattr(self, "playwright", None) is None:
+                self.playwright = sync_playwright().start()
+            self.browser = self.playwright.chromium.launch(**kwargs)
+            self.context = self.browser.new_context(**context_kwargs)
+
         try:
-            self.browser = self.playwright.chromium.launch(**launch_kwargs)
+            _open(launch_kwargs)
         except Exception as e:
             # Some macOS installs resolve to a missing x64 headless-shell path.
             # Retry with an explicitly discovered local Chromium executable.
@@ -568,12 +581,7 @@ class TaskExecutor:
                 raise
             print(f"⚠️  Browser executable missing, retrying with fallback: {fallback}")
             launch_kwargs["executable_path"] = fallback
-            self.browser = self.playwright.chromium.launch(**launch_kwargs)
-
-        self.context = self.browser.new_context(
-            viewport={'width': 1280, 'height': 720},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        )
+            _open(launch_kwargs)
         task_id = str(task_spec.get("task_id") or "").strip()
         binding_task_id = str(
             task_spec.get("binding_task_id")
@@ -628,6 +636,13 @@ class TaskExecutor:
         """Stop browser"""
         if self.page:
             self.page.close()
+        if self._browser_manager is not None:
+            # The shared browser stays up for the next task on this thread.
+            if self.context:
+                self._browser_manager.release(self.context)
+            self.context = None
+            self.browser = None
+            return
         if self.context:
             self.context.close()
         if self.browser:
@@ -1224,7 +1239,14 @@ class TaskExecutor:
         self._load_memory()
 
         # Create DSL evaluator
-        self.dsl = AssertionDSL(self.page, self.memory, self._env_api)
+        self.dsl = AssertionDSL(
+            self.page,
+            self.memory,
+            self._env_api,
+            snapshot=True,
+            memory_source=memory_cache(self.database_path),
+            env_change_token=self._env_change_token,
+        )
 
         criteria_ok = True
         criteria_failed: List[str] = []
@@ -0,0 +1,184 @@
+"""Prompt-prefix KV reuse and request batching for the local HF backend.
+
+``PrefixKVCache`` keeps the KV states of the last few prompts a model
+prefilled.  A new prompt reuses the entry sharing the longest token prefix
+with it (system prompt, goal and the history turns already seen in this
+episode), so only the new suffix is prefilled.  The cache objects are
+transformers ``DynamicCache``s, but nothing here imports torch: entries only
+need ``crop(length)``.
+
+``GenerationQueue`` collects requests that arrive from several threads
+(best-of-N candidates, value prompts, parallel episodes) within a short
+window and hands compatible ones to one batched ``generate`` call.
+"""
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, NamedTuple, Optional, Sequence
+
+
+def common_prefix_len(a: Sequence[int], b: Sequence[int]) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class PrefixKVCache:
+    """Most recently used prompt KV states, matched by longest common token prefix."""
+
+    def __init__(self, max_entries: int = 4, min_tokens: int = 16):
+        self.max_entries = max(1, int(max_entries))
+        self.min_tokens = max(1, int(min_tokens))
+        self._entries: "OrderedDict[int, tuple[tuple[int, ...], Any]]" = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "reused_tokens": 0, "stored": 0}
+
+    def lookup(self, ids: Sequence[int]) -> tuple[int, Optional[Any]]:
+        """``(n, cache)``: a private copy of cached KV for ``ids[:n]``, or ``(0, None)``.
+
+        At least one token of ``ids`` is always left for the caller to feed.
+        """
+        with self._lock:
+            self.stats["lookups"] += 1
+            best_key, best_len = None, 0
+            for key, (prefix, _) in self._entries.items():
+                length = common_prefix_len(prefix, ids)
+                if length > best_len:
+                    best_key, best_len = key, length
+            best_len = min(best_len, len(ids) - 1)
+            if best_key is None or best_len < self.min_tokens:
+                return 0, None
+            self._entries.move_to_end(best_key)
+            prefix, cache = self._entries[best_key]
+            self.stats["hits"] += 1
+            self.stats["reused_tokens"] += best_len
+        cache = copy.deepcopy(cache)
+        if best_len < len(prefix):
+            cache.crop(best_len)
+        return best_len, cache
+
+    def store(self, ids: Sequence[int], cache: Any) -> None:
+        """Keep ``cache`` (covering exactly ``ids``); entries it extends are dropped."""
+        ids = tuple(ids)
+        if len(ids) < self.min_tokens:
+            return
+        with self._lock:
+            for key, (prefix, _) in list(self._entries.items()):
+                if len(prefix) <= len(ids) and ids[: len(prefix)] == prefix:
+                    del self._entries[key]
+            self._entries[self._next_key] = (ids, cache)
+            self._next_key += 1
+            self.stats["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FirstTokenTimer:
+    """Logits processor that only notes when the first token's logits arrive (end of prefill)."""
+
+    def __init__(self):
+        self.first_at: Optional[float] = None
+
+    def __call__(self, input_ids: Any, scores: Any) -> Any:
+        if self.first_at is None:
+            self.first_at = time.perf_counter()
+        return scores
+
+
+class GenRequest(NamedTuple):
+    ids: list[int]
+    num_samples: int
+    do_sample: bool
+    temperature: float
+    max_new_tokens: int
+
+    @property
+    def batch_key(self) -> tuple:
+        # Requests can share one generate() call only with identical decoding settings.
+        return (self.do_sample, self.temperature, self.max_new_tokens)
+
+
+class _Pending:
+    __slots__ = ("request", "done", "result", "error")
+
+    def __init__(self, request: GenRequest):
+        self.request = request
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class GenerationQueue:
+    """Run ``run_batch(requests) -> results`` on one worker thread, batching concurrent submits."""
+
+    def __init__(self, run_batch: Callable[[list[GenRequest]], list[Any]], max_batch: int = 8, wait_sec: float = 0.005):
+        self.run_batch = run_batch
+        self.max_batch = max(1, int(max_batch))
+        self.wait_sec = max(0.0, float(wait_sec))
+        self._queue: "deque[_Pending]" = deque()
+        self._cv = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self.stats = {"requests": 0, "batches": 0, "max_batch_seen": 0}
+
+    def submit(self, request: GenRequest) -> Any:
+        pending = _Pending(request)
+        with self._cv:
+            self._queue.append(pending)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._loop, name="hf-generation", daemon=True)
+                self._worker.start()
+            self._cv.notify_all()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _take_batch(self) -> list[_Pending]:
+        with self._cv:
+            while not self._queue:
+                self._cv.wait()
+            deadline = time.monotonic() + self.wait_sec
+            # A lone request runs at once; the window only gathers more
+            # when callers are already arriving together.
+            while 1 < len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cv.wait(remaining)
+            key = self._queue[0].request.batch_key
+            batch: list[_Pending] = []
+            rest: "deque[_Pending]" = deque()
+            while self._queue:
+                pending = self._queue.popleft()
+                if len(batch) < self.max_batch and pending.request.batch_key == key:
+                    batch.append(pending)
+                else:
+                    rest.append(pending)
+            self._queue = rest
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._take_batch()
+            try:
+                results = self.run_batch([pending.request for pending in batch])
+                for pending, result in zip(batch, results):
+                    pending.result = result
+            except BaseException as exc:
+                for pending in batch:
+                    pending.error = exc
+            finally:
+                for pending in batch:
+                    pending.done.set()
@@ -0,0 +1,181 @@
+"""Content-addressed on-disk cache for deterministic LLM calls.
+
+Enabled with ``AGENT_LLM_CACHE=/path/to/cache.sqlite``. Only calls whose
+effective temperature is 0 are cached; the key is a SHA-256 over the client
+identity (backend, model, adapter, prompt-affecting flags), the messages,
+temperature, max_tokens and the number of samples.
+
+``AGENT_LLM_CACHE_MODE``:
+
+- ``readwrite`` (default): serve hits, store misses.
+- ``readonly``: serve hits, never write.
+- ``replay``: serve hits only; a miss, or any sampled (temperature > 0)
+  call, raises ``LLMCacheMiss`` so offline reruns fail loudly instead of
+  silently calling a model (which replay clients never set up).
+
+The file is bounded by ``AGENT_LLM_CACHE_MAX_MB`` (default 512); the least
+recently used entries are evicted once it is exceeded.  The running byte
+total lives in a ``meta`` row updated in the same transaction as each write,
+so processes sharing the file agree on it without summing the table.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+CACHE_MODES = ("readwrite", "readonly", "replay")
+
+
+class LLMCacheMiss(RuntimeError):
+    pass
+
+
+class LLMResponseCache:
+    def __init__(self, path: str | Path, mode: str = "readwrite", max_bytes: int = 512 * 1024 * 1024):
+        mode = (mode or "readwrite").strip().lower()
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unsupported LLM cache mode: {mode}. Expected one of {CACHE_MODES}.")
+        self.path = Path(path)
+        self.mode = mode
+        self.max_bytes = max(0, int(max_bytes))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Several benchmark worker processes may share one cache file.
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, outputs TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # Files written before the meta row existed are summed once here.
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta(name, value) "
+            "SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM responses"
+        )
+        self._conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> "LLMResponseCache | None":
+        path = (os.environ.get("AGENT_LLM_CACHE") or "").strip()
+        if not path:
+            return None
+        try:
+            max_mb = float(os.environ.get("AGENT_LLM_CACHE_MAX_MB", "512"))
+        except ValueError:
+            max_mb = 512.0
+        return cls(path, mode=os.environ.get("AGENT_LLM_CACHE_MODE", "readwrite"), max_bytes=int(max_mb * 1024 * 1024))
+
+    @property
+    def replay_only(self) -> bool:
+        return self.mode == "replay"
+
+    @staticmethod
+    def make_key(identity: dict[str, Any], messages: list[dict[str, str]], temperature: float, max_tokens: int, num_samples: int) -> str:
+        material = json.dumps(
+            {
+                "identity": identity,
+                "messages": messages,
+                "temperature": float(temperature),
+                "max_tokens": int(max_tokens),
+                "n": int(num_samples),
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> list[str] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT outputs FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["hits"] += 1
+                if self.mode == "readwrite":
+                    self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+        if row is None:
+            if self.replay_only:
+                raise LLMCacheMiss(f"LLM cache miss in replay mode (key {key[:12]}…, cache {self.path})")
+            return None
+        return list(json.loads(row[0]))
+
+    def put(self, key: str, outputs: list[str]) -> None:
+        if self.mode != "readwrite":
+            return
+        payload = json.dumps(list(outputs), ensure_ascii=False)
+        size = len(payload.encode("utf-8")) + len(key)
+        now = time.time()
+        with self._lock:
+            # Updating the total first takes the write lock, so the size of a
+            # replaced entry cannot change underneath it.
+            self._conn.execute(
+                "UPDATE meta SET value = value + ? - COALESCE((SELECT size FROM responses WHERE key = ?), 0) "
+                "WHERE name = 'total_bytes'",
+                (size, key),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses(key, outputs, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now),
+            )
+            self.stats["writes"] += 1
+            self._evict_locked()
+            self._conn.commit()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE name = 'total_bytes'").fetchone()[0]
+
+    def _evict_locked(self) -> None:
+        if not self.max_bytes:
+            return
+        total = self._conn.execute("SELECT value FROM meta WHERE name = 'total_bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so eviction does not run on every subsequent insert.
+        excess = total - int(self.max_bytes * 0.9)
+        victims = []
+        freed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._conn.execute("UPDATE meta SET value = value - ? WHERE name = 'total_bytes'", (freed,))
+        self.stats["evictions"] += len(victims)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def cached_sample(cache: LLMResponseCache | None, identity: dict[str, Any], messages, num_samples, temperature, max_tokens, sample_fn):
+    """Serve ``sample_fn()`` through ``cache`` when the call is deterministic."""
+    if cache is None:
+        return sample_fn()
+    if float(temperature) > 0:
+        if cache.replay_only:
+            cache.stats["misses"] += 1
+            raise LLMCacheMiss(f"LLM cache cannot replay a sampled call (temperature {float(temperature)}, cache {cache.path})")
+        return sample_fn()
+    key = LLMResponseCache.make_key(identity, messages, temperature, max_tokens, max(1, int(num_samples or 1)))
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    outputs = sample_fn()
+    if outputs and not any(str(text).startswith("ERROR(") for text in outputs):
+        cache.put(key, outputs)
+    return outputs
@@ -1,11 +1,20 @@
+import copy
+import inspect
 import json
 import os
 import random
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from agent.hf_generation import FirstTokenTimer, GenerationQueue, GenRequest, PrefixKVCache
+from agent.llm_cache import LLMCacheMiss, LLMResponseCache, cached_sample  # noqa: F401
 
 
 DEFAULT_SYSTEM_PROMPT = """You are an autonomous web agent. Your goal is to complete tasks on a simulated city website.
@@ -100,6 +109,106 @@ def _strip_thinking_block(text: str) -> str:
     return text.strip()
 
 
+class TokenBucket:
+    """Thread-safe token bucket shared by every client that talks to one endpoint."""
+
+    def __init__(self, rate_per_sec: float, burst: int = 1):
+        self.rate_per_sec = max(0.0, float(rate_per_sec))
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request may be sent; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.rate_per_sec > 0:
+                    self._tokens = min(
+                        float(self.capacity),
+                        self._tokens + (now - self._updated) * self.rate_per_sec,
+                    )
+                self._updated = now
+                delay = self._paused_until - now
+                if delay <= 0:
+                    if self.rate_per_sec <= 0:
+                        return waited
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return waited
+                    delay = (1.0 - self._tokens) / self.rate_per_sec
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller, e.g. after the server answered 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, float(seconds)))
+
+
+_RATE_LIMITERS: Dict[str, TokenBucket] = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def shared_rate_limiter(key: str, rate_per_sec: float, burst: int = 1) -> TokenBucket:
+    with _RATE_LIMITERS_LOCK:
+        limiter = _RATE_LIMITERS.get(key)
+        if limiter is None:
+            limiter = TokenBucket(rate_per_sec, burst)
+            _RATE_LIMITERS[key] = limiter
+        return limiter
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Stats that describe a window or rate rather than a running total.
+_NON_ADDITIVE_STATS = ("_max", "_p50", "_p95", "_per_sec", "_seen")
+
+
+def stats_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """The counters of ``after`` minus ``before``, for attributing a shared client's work to one task.
+
+    Per-call lists and non-additive figures (maxima, percentiles, rates) are
+    dropped; flags and other non-numeric values are taken from ``after``.
+    """
+    delta: Dict[str, Any] = {}
+    for key, value in after.items():
+        if isinstance(value, dict):
+            delta[key] = stats_delta(before.get(key) or {}, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            if key.endswith(_NON_ADDITIVE_STATS):
+                continue
+            previous = before.get(key, 0)
+            diff = value - (previous if isinstance(previous, (int, float)) else 0)
+            delta[key] = round(diff, 4) if isinstance(diff, float) else diff
+        elif not isinstance(value, list):
+            delta[key] = value
+    return delta
+
+
+def _retry_after_sec(response) -> Optional[float]:
+    raw = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return max(0.0, float(raw)) if raw is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
 class OpenAICompatibleClient:
     backend_name = "openai_compatible"
 
@@ -108,7 +217,9 @@ class OpenAICompatibleClient:
             os.environ.get("AGENT_API_KEY")
             or os.environ.get("ANTHROPIC_AUTH_TOKEN")
         )
-        if not self.api_key:
+        self.response_cache = LLMResponseCache.from_env()
+        # Cache replays never reach the API, so they can run without credentials.
+        if not self.api_key and not (self.response_cache and self.response_cache.replay_only):
             raise RuntimeError("Set AGENT_API_KEY or ANTHROPIC_AUTH_TOKEN before using the OpenAI-compatible client.")
         self.base_url = (
             os.environ.get("AGENT_BASE_URL")
@@ -134,7 +245,39 @@ class OpenAICompatibleClient:
                 self.max_tokens = 80
         self.temperature = float(os.environ.get("AGENT_TEMPERATURE", "0.0"))
         self.min_request_interval_sec = float(os.environ.get("AGENT_MIN_REQUEST_INTERVAL_SEC", "0.0"))
-        self._last_request_ts = 0.0
+        # AGENT_RATE_LIMIT_RPS supersedes the old per-instance minimum interval;
+        # the bucket is shared by every client/thread that hits the same endpoint.
+        default_rps = 1.0 / self.min_request_interval_sec if self.min_request_interval_sec > 0 else 0.0
+        self.rate_limiter = shared_rate_limiter(
+            self._chat_completions_url(),
+            _env_float("AGENT_RATE_LIMIT_RPS", default_rps),
+            _env_int("AGENT_RATE_LIMIT_BURST", 1),
+        )
+        self.max_concurrency = max(1, _env_int("AGENT_MAX_CONCURRENCY", 4))
+        self.request_timeout_sec = _env_float("AGENT_REQUEST_TIMEOUT_SEC", 45.0)
+        # "auto" asks for n choices in one request and stops doing so as soon as
+        # the backend answers with fewer choices than requested.
+        raw_server_n = (os.environ.get("AGENT_SERVER_SIDE_N") or "auto").strip().lower()
+        self.server_side_n = None if raw_server_n == "auto" else raw_server_n == "true"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "server_side_n_requests": 0,
+            "latency_sec_total": 0.0,
+            "latency_sec_max": 0.0,
+            "rate_limit_wait_sec_total": 0.0,
+        }
+        self._recent_calls = deque(maxlen=256)
         raw_disable_thinking = os.environ.get("AGENT_DISABLE_THINKING")
         if raw_disable_thinking is None:
             self.disable_thinking = "glm-4.7" in self.model.lower()
@@ -162,7 +305,25 @@ class OpenAICompatibleClient:
         messages = build_messages(goal, page_content, history, self.system_prompt)
         return self.sample_messages(messages, num_samples=num_samples, temperature=temperature)
 
+    def _cache_identity(self):
+        return {
+            "backend": self.backend_name,
+            "model": self.model,
+            "disable_thinking": self.disable_thinking,
+        }
+
     def sample_messages(self, messages, num_samples=1, temperature=None, max_tokens=None):
+        return cached_sample(
+            self.response_cache,
+            self._cache_identity(),
+            messages,
+            num_samples,
+            self.temperature if temperature is None else float(temperature),
+            self.max_tokens if max_tokens is None else int(max_tokens),
+            lambda: self._sample_messages_uncached(messages, num_samples, temperature, max_tokens),
+        )
+
+    def _sample_messages_uncached(self, messages, num_samples=1, temperature=None, max_tokens=None):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -178,53 +339,151 @@ class OpenAICompatibleClient:
         if self.disable_thinking:
             payload["thinking"] = {"type": "disabled"}
 
-        outputs = []
         target = max(1, int(num_samples or 1))
-        for _ in range(target):
-            outputs.append(self._single_completion(payload, headers))
+        outputs = []
+        if target > 1 and self.server_side_n is not False:
+            outputs = self._server_side_samples(payload, headers, target)
+        missing = target - len(outputs)
+        if missing == 1 or self.max_concurrency == 1:
+            outputs.extend(self._single_completion(payload, headers) for _ in range(missing))
+        elif missing > 1:
+            executor = self._fanout_executor()
+            futures = [executor.submit(self._single_completion, payload, headers) for _ in range(missing)]
+            outputs.extend(future.result() for future in futures)
         return outputs
 
+    def _fanout_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix="llm-sample",
+                )
+            return self._executor
+
+    def _server_side_samples(self, payload, headers, target):
+        local_payload = dict(payload, n=target)
+        with self._stats_lock:
+            self._stats["calls"] += 1
+            self._stats["server_side_n_requests"] += 1
+        result = self._post_completion(local_payload, headers, max_attempts=1)
+        choices = (result or {}).get("choices") or []
+        if self.server_side_n is None and result is not None:
+            # Backends that reject or ignore ``n`` are only probed once; a
+            # failed request (429, network) says nothing, so the next call probes again.
+            self.server_side_n = len(choices) >= target
+            if not self.server_side_n:
+                print(f"ℹ️ Backend returned {len(choices)}/{target} choices for n={target}; sampling client-side.")
+        contents = [((choice.get("message") or {}).get("content") or "").strip() for choice in choices]
+        # Empty (e.g. reasoning-only) choices are resampled through the single path.
+        return [content for content in contents if content][:target]
+
+    def _post_completion(self, payload, headers, max_attempts=3):
+        """POST one chat completion with shared rate limiting and retries.
+
+        Returns the decoded response, or ``None`` once every attempt failed.
+        """
+        started = time.perf_counter()
+        attempts = 0
+        waited = 0.0
+        status = "error"
+        result = None
+        try:
+            for attempt in range(max_attempts):
+                attempts += 1
+                waited += self.rate_limiter.acquire()
+                try:
+                    response = self.session.post(
+                        self._chat_completions_url(),
+                        headers=headers,
+                        json=payload,
+                        timeout=self.request_timeout_sec,
+                    )
+                    if response.status_code == 429:
+                        wait_time = _retry_after_sec(response)
+                        if wait_time is None:
+                            wait_time = (attempt + 1) * 15 + random.random() * 5
+                        print(f"⚠️ 429 Rate Limit. Backing off for {wait_time:.2f}s...")
+                        status = "rate_limited"
+                        with self._stats_lock:
+                            self._stats["rate_limited"] += 1
+                        # Other threads back off too instead of piling more 429s on.
+                        self.rate_limiter.pause(wait_time)
+                        continue
+                    response.raise_for_status()
+                    result = response.json()
+                    status = "ok"
+                    return result
+                except Exception as e:
+                    status = "error"
+                    print(f"  ❌ API Attempt {attempt + 1} failed: {e}")
+                    if attempt < max_attempts - 1:
+                        self.rate_limiter.pause(5)
+            return None
+        finally:
+            self._record_call(time.perf_counter() - started, attempts, waited, status)
+
+    def _record_call(self, latency_sec, attempts, waited_sec, status):
+        with self._stats_lock:
+            stats = self._stats
+            stats["requests"] += attempts
+            stats["retries"] += max(0, attempts - 1)
+            if status != "ok":
+                stats["failures"] += 1
+            stats["latency_sec_total"] += latency_sec
+            stats["latency_sec_max"] = max(stats["latency_sec_max"], latency_sec)
+            stats["rate_limit_wait_sec_total"] += waited_sec
+            self._recent_calls.append(
+                {
+                    "latency_sec": round(latency_sec, 4),
+                    "attempts": attempts,
+                    "rate_limit_wait_sec": round(waited_sec, 4),
+                    "status": status,
+                }
+            )
+
+    def stats(self):
+        """Cumulative request stats plus the most recent per-call records."""
+        with self._stats_lock:
+            summary = dict(self._stats)
+            recent = list(self._recent_calls)
+        latencies = sorted(call["latency_sec"] for call in recent)
+        if latencies:
+            summary["recent_latency_sec_p50"] = latencies[len(latencies) // 2]
+            summary["recent_latency_sec_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        summary["server_side_n"] = self.server_side_n
+        if self.response_cache is not None:
+            summary["response_cache"] = dict(self.response_cache.stats)
+        summary["recent_calls"] = recent
+        return summary
+
     def _single_completion(self, payload, headers):
         local_payload = dict(payload)
-        for attempt in range(3):
+        with self._stats_lock:
+            self._stats["calls"] += 1
+        for _ in range(3):
+            result = self._post_completion(local_payload, headers)
+            if result is None:
+                break
             try:
-                if self.min_request_interval_sec > 0:
-                    elapsed = time.time() - self._last_request_ts
-                    if elapsed < self.min_request_interval_sec:
-                        time.sleep(self.min_request_interval_sec - elapsed)
-                response = requests.post(
-                    self._chat_completions_url(),
-                    headers=headers,
-                    json=local_payload,
-                    timeout=45,
-                )
-                self._last_request_ts = time.time()
-                if response.status_code == 429:
-                    wait_time = (attempt + 1) * 15 + random.random() * 5
-                    print(f"⚠️ 429 Rate Limit. Backing off for {wait_time:.2f}s...")
-                    time.sleep(wait_time)
-                    continue
-                response.raise_for_status()
-                result = response.json()
                 choice = result["choices"][0]
-                message = choice.get("message", {}) or {}
-                content = (message.get("content") or "").strip()
-                reasoning = (message.get("reasoning_content") or "").strip()
-                finish_reason = str(choice.get("finish_reason", "") or "").strip().lower()
-                if content:
-                    return content
-                if reasoning and finish_reason == "length" and local_payload["max_tokens"] < 1024:
-                    local_payload["max_tokens"] = max(int(local_payload["max_tokens"]) * 2, 768)
-                    print(
-                        f"⚠️ Empty content with reasoning-only response. "
-                        f"Retrying with max_tokens={local_payload['max_tokens']}..."
-                    )
-                    continue
+            except (KeyError, IndexError, TypeError) as e:
+                print(f"  ❌ Malformed API response: {e}")
+                break
+            message = choice.get("message", {}) or {}
+            content = (message.get("content") or "").strip()
+            reasoning = (message.get("reasoning_content") or "").strip()
+            finish_reason = str(choice.get("finish_reason", "") or "").strip().lower()
+            if content:
                 return content
-            except Exception as e:
-                print(f"  ❌ API Attempt {attempt + 1} failed: {e}")
-                if attempt < 2:
-                    time.sleep(5)
+            if reasoning and finish_reason == "length" and local_payload["max_tokens"] < 1024:
+                local_payload["max_tokens"] = max(int(local_payload["max_tokens"]) * 2, 768)
+                print(
+                    f"⚠️ Empty content with reasoning-only response. "
+                    f"Retrying with max_tokens={local_payload['max_tokens']}..."
+                )
+                continue
+            return content
 
         return "ERROR(TimeoutOrLimit)"
 
@@ -254,13 +513,42 @@ class LocalHFClient:
         else:
             self.disable_thinking = raw_disable_thinking.strip().lower() == "true"
         self.system_prompt = _build_system_prompt()
-        self._load_model()
+        # Branch workers call into one shared model from several threads;
+        # generate() is not re-entrant, so calls are serialized here, or
+        # batched on one worker thread when AGENT_HF_MAX_BATCH > 1.  Prefix
+        # KV reuse and batching are opt-in (tests/test_hf_generation.py checks
+        # both against plain generate() on a tiny CPU model).
+        self._generate_lock = threading.Lock()
+        self.prefix_cache_entries = max(0, _env_int("AGENT_HF_PREFIX_CACHE", 0))
+        self.max_batch = max(1, _env_int("AGENT_HF_MAX_BATCH", 1))
+        self.batch_wait_sec = max(0.0, _env_float("AGENT_HF_BATCH_WAIT_MS", 5.0) / 1000.0)
+        self._prefix_cache = None
+        self._generation_queue = None
+        self._gen_stats_lock = threading.Lock()
+        self._gen_stats = {
+            "requests": 0,
+            "generate_calls": 0,
+            "prompt_tokens": 0,
+            "prefix_reused_tokens": 0,
+            "generated_tokens": 0,
+            "prefill_sec": 0.0,
+            "decode_sec": 0.0,
+        }
+        self.response_cache = LLMResponseCache.from_env()
+        if self.response_cache is not None and self.response_cache.replay_only:
+            # Offline replay answers every call from the cache; skip the weights.
+            self.tokenizer = None
+            self.model_obj = None
+        else:
+            self._load_model()
         print(
             f"🚀 Client initialized | backend: {self.backend_name} | "
             f"model: {self.model} | adapter: {self.adapter or '<none>'} | "
             f"max_tokens: {self.max_new_tokens} | "
             f"use_chat_template: {self.use_chat_template} | "
-            f"disable_thinking: {self.disable_thinking}"
+            f"disable_thinking: {self.disable_thinking} | "
+            f"prefix_cache: {self.prefix_cache_entries} | "
+            f"max_batch: {self.max_batch}"
         )
 
     def _load_model(self):
@@ -306,16 +594,47 @@ class LocalHFClient:
             self.model_obj = PeftModel.from_pretrained(self.model_obj, self.adapter)
         if self.tokenizer.pad_token_id is None:
             self.tokenizer.pad_token_id = self.tokenizer.eos_token_id
+        # Batched prompts are left-padded so every row ends where generation starts.
+        self.tokenizer.padding_side = "left"
 
-    def _prepare_inputs(self, prompt: str):
-        encoded = self.tokenizer(prompt, return_tensors="pt")
+        from transformers import LogitsProcessorList
+
+        self._LogitsProcessorList = LogitsProcessorList
+        if self.prefix_cache_entries:
+            try:
+                from transformers import DynamicCache
+            except ImportError:
+                DynamicCache = None
+            if DynamicCache is not None and hasattr(DynamicCache, "crop"):
+                self._DynamicCache = DynamicCache
+                self._prefill_kwargs = self._last_logits_only_kwargs()
+                self._prefix_cache = PrefixKVCache(
+                    self.prefix_cache_entries,
+                    min_tokens=_env_int("AGENT_HF_PREFIX_MIN_TOKENS", 16),
+                )
+        if self.max_batch > 1:
+            self._generation_queue = GenerationQueue(self._run_generation_batch, self.max_batch, self.batch_wait_sec)
+
+    def _last_logits_only_kwargs(self):
+        # Prefilling a prefix only needs the KV states; skip the full-vocabulary logits when the model allows it.
+        base = self.model_obj.get_base_model() if hasattr(self.model_obj, "get_base_model") else self.model_obj
+        try:
+            params = inspect.signature(base.forward).parameters
+        except (TypeError, ValueError):
+            return {}
+        for name in ("logits_to_keep", "num_logits_to_keep"):
+            if name in params:
+                return {name: 1}
+        return {}
+
+    def _to_model_device(self, tensor):
         target_device = getattr(self.model_obj, "device", None)
         if target_device is not None:
             try:
-                encoded = {k: v.to(target_device) for k, v in encoded.items()}
+                return tensor.to(target_device)
             except Exception:
                 pass
-        return encoded
+        return tensor
 
     def _render_prompt(self, messages: List[Dict[str, str]]) -> str:
         if self.use_chat_template and hasattr(self.tokenizer, "apply_chat_template"):
@@ -344,7 +663,46 @@ class LocalHFClient:
         messages = build_messages(goal, page_content, history, self.system_prompt)
         return self.sample_messages(messages, num_samples=num_samples, temperature=temperature)
 
+    def _cache_identity(self):
+        return {
+            "backend": self.backend_name,
+            "model": self.model,
+            "adapter": self.adapter,
+            "use_chat_template": self.use_chat_template,
+            "disable_thinking": self.disable_thinking,
+        }
+
+    def stats(self):
+        summary = {}
+        if self.response_cache is not None:
+            summary["response_cache"] = dict(self.response_cache.stats)
+        with self._gen_stats_lock:
+            generation = dict(self._gen_stats)
+        if generation["generate_calls"]:
+            prefilled = generation["prompt_tokens"] - generation["prefix_reused_tokens"]
+            if generation["prefill_sec"] > 0:
+                generation["prefill_tokens_per_sec"] = round(prefilled / generation["prefill_sec"], 1)
+            if generation["decode_sec"] > 0:
+                generation["decode_tokens_per_sec"] = round(generation["generated_tokens"] / generation["decode_sec"], 1)
+            if self._prefix_cache is not None:
+                generation["prefix_cache"] = dict(self._prefix_cache.stats)
+            if self._generation_queue is not None:
+                generation["queue"] = dict(self._generation_queue.stats)
+            summary["generation"] = generation
+        return summary
+
     def sample_messages(self, messages, num_samples=1, temperature=None, max_tokens=None):
+        return cached_sample(
+            self.response_cache,
+            self._cache_identity(),
+            messages,
+            num_samples,
+            self.temperature if temperature is None else float(temperature),
+            self.max_new_tokens if max_tokens is None else max(1, int(max_tokens)),
+            lambda: self._sample_messages_uncached(messages, num_samples, temperature, max_tokens),
+        )
+
+    def _sample_messages_uncached(self, messages, num_samples=1, temperature=None, max_tokens=None):
         prompt = self._render_prompt(messages)
         return self._sample_from_prompt(
             prompt,
@@ -354,51 +712,124 @@ class LocalHFClient:
             max_tokens=max_tokens,
         )
 
-    def _sample_from_prompt(self, prompt, messages, num_samples=1, temperature=None, max_tokens=None):
-        sample_temperature = self.temperature if temperature is None else float(temperature)
-        inputs = self._prepare_inputs(prompt)
-        input_len = inputs["input_ids"].shape[1]
-        do_sample = sample_temperature > 0
-        effective_max_tokens = self.max_new_tokens if max_tokens is None else max(1, int(max_tokens))
+    def _record_generation(self, requests, prompt_tokens, reused_tokens, generated_tokens, prefill_sec, decode_sec):
+        with self._gen_stats_lock:
+            stats = self._gen_stats
+            stats["requests"] += requests
+            stats["generate_calls"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["prefix_reused_tokens"] += reused_tokens
+            stats["generated_tokens"] += generated_tokens
+            stats["prefill_sec"] += prefill_sec
+            stats["decode_sec"] += decode_sec
+
+    def _generate(self, input_ids, attention_mask, request, past_key_values=None):
+        """One ``generate`` call; returns (new token rows, seconds to first token, seconds after it)."""
+        timer = FirstTokenTimer()
+        kwargs = {}
+        if past_key_values is not None:
+            kwargs["past_key_values"] = past_key_values
+        started = time.perf_counter()
         with self.torch.no_grad():
             outputs = self.model_obj.generate(
-                **inputs,
-                max_new_tokens=effective_max_tokens,
-                do_sample=do_sample,
-                temperature=max(sample_temperature, 1e-5) if do_sample else None,
-                num_return_sequences=max(1, int(num_samples or 1)) if do_sample else 1,
+                input_ids=self._to_model_device(input_ids),
+                attention_mask=self._to_model_device(attention_mask),
+                max_new_tokens=request.max_new_tokens,
+                do_sample=request.do_sample,
+                temperature=request.temperature if request.do_sample else None,
+                num_return_sequences=1,
                 pad_token_id=self.tokenizer.pad_token_id,
                 eos_token_id=self.tokenizer.eos_token_id,
+                logits_processor=self._LogitsProcessorList([timer]),
+                **kwargs,
             )
-        texts = []
-        for row in outputs:
-            generated = row[input_len:]
-            text = self.tokenizer.decode(generated, skip_special_tokens=True).strip()
-            if self.disable_thinking:
-                text = _strip_thinking_block(text)
-            texts.append(text)
+        finished = time.perf_counter()
+        first = timer.first_at if timer.first_at is not None else finished
+        return outputs[:, input_ids.shape[1]:], first - started, finished - first
+
+    def _decode_rows(self, rows):
+        generated_tokens = int((rows != self.tokenizer.pad_token_id).sum())
+        texts = [self.tokenizer.decode(row, skip_special_tokens=True).strip() for row in rows]
+        return texts, generated_tokens
+
+    def _generate_with_prefix(self, request):
+        """Single request: reuse the cached KV of the longest shared prompt prefix."""
+        torch = self.torch
+        ids = request.ids
+        started = time.perf_counter()
+        reused, cache = self._prefix_cache.lookup(ids)
+        if cache is None:
+            cache = self._DynamicCache()
+        if len(ids) - 1 > reused:
+            with torch.no_grad():
+                self.model_obj(
+                    input_ids=self._to_model_device(torch.tensor([ids[reused:-1]])),
+                    past_key_values=cache,
+                    use_cache=True,
+                    **self._prefill_kwargs,
+                )
+            self._prefix_cache.store(ids[:-1], copy.deepcopy(cache))
+        prefill_sec = time.perf_counter() - started
+        if request.num_samples > 1:
+            cache.batch_repeat_interleave(request.num_samples)
+        input_ids = torch.tensor([ids] * request.num_samples)
+        rows, first_sec, decode_sec = self._generate(input_ids, torch.ones_like(input_ids), request, past_key_values=cache)
+        texts, generated_tokens = self._decode_rows(rows)
+        self._record_generation(1, len(ids), reused, generated_tokens, prefill_sec + first_sec, decode_sec)
+        return texts
+
+    def _generate_padded(self, requests):
+        """Several requests (or one without prefix reuse) as one left-padded batch."""
+        torch = self.torch
+        rows = [request.ids for request in requests for _ in range(request.num_samples)]
+        width = max(len(row) for row in rows)
+        pad_id = self.tokenizer.pad_token_id
+        input_ids = torch.tensor([[pad_id] * (width - len(row)) + row for row in rows])
+        attention_mask = torch.tensor([[0] * (width - len(row)) + [1] * len(row) for row in rows])
+        generated, first_sec, decode_sec = self._generate(input_ids, attention_mask, requests[0])
+        texts, generated_tokens = self._decode_rows(generated)
+        self._record_generation(len(requests), sum(len(request.ids) for request in requests), 0, generated_tokens, first_sec, decode_sec)
+        results, offset = [], 0
+        for request in requests:
+            results.append(texts[offset : offset + request.num_samples])
+            offset += request.num_samples
+        return results
+
+    def _run_generation_batch(self, requests):
+        if len(requests) == 1 and self._prefix_cache is not None:
+            request = requests[0]
+            if request.num_samples == 1 or hasattr(self._DynamicCache, "batch_repeat_interleave"):
+                try:
+                    return [self._generate_with_prefix(request)]
+                except Exception as exc:
+                    print(f"⚠️ Prefix KV reuse failed ({type(exc).__name__}: {exc}); generating without it from now on.")
+                    self._prefix_cache = None
+        return self._generate_padded(requests)
+
+    def _generate_texts(self, prompt, num_samples, sample_temperature, max_new_tokens):
+        do_sample = sample_temperature > 0
+        request = GenRequest(
+            ids=list(self.tokenizer(prompt)["input_ids"]),
+            num_samples=max(1, int(num_samples or 1)) if do_sample else 1,
+            do_sample=do_sample,
+            temperature=max(sample_temperature, 1e-5) if do_sample else 0.0,
+            max_new_tokens=max_new_tokens,
+        )
+        if self._generation_queue is not None:
+            texts = self._generation_queue.submit(request)
+        else:
+            with self._generate_lock:
+                texts = self._run_generation_batch([request])[0]
+        if self.disable_thinking:
+            texts = [_strip_thinking_block(text) for text in texts]
+        return texts
 
+    def _sample_from_prompt(self, prompt, messages, num_samples=1, temperature=None, max_tokens=None):
+        sample_temperature = self.temperature if temperature is None else float(temperature)
+        effective_max_tokens = self.max_new_tokens if max_tokens is None else max(1, int(max_tokens))
+        texts = self._generate_texts(prompt, num_samples, sample_temperature, effective_max_tokens)
         if self.use_chat_template and any(text in {"()", "[]", ""} for text in texts):
-            fallback_prompt = _render_plain_prompt(messages)
-            fallback_inputs = self._prepare_inputs(fallback_prompt)
-            fallback_input_len = fallback_inputs["input_ids"].shape[1]
-            with self.torch.no_grad():
-                outputs = self.model_obj.generate(
-                    **fallback_inputs,
-                    max_new_tokens=effective_max_tokens,
-                    do_sample=do_sample,
-                    temperature=max(sample_temperature, 1e-5) if do_sample else None,
-                    num_return_sequences=max(1, int(num_samples or 1)) if do_sample else 1,
-                    pad_token_id=self.tokenizer.pad_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id,
-                )
-            texts = []
-            for row in outputs:
-                generated = row[fallback_input_len:]
-                text = self.tokenizer.decode(generated, skip_special_tokens=True).strip()
-                if self.disable_thinking:
-                    text = _strip_thinking_block(text)
-                texts.append(text)
+            texts = self._generate_texts(_render_plain_prompt(messages), num_samples, sample_temperature, effective_max_tokens)
         if not texts:
             return [""]
         return texts
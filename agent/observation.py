@@ -0,0 +1,422 @@
+"""Incremental page observations for ``BrowserEnv.get_observation``.
+
+``OBSERVER_JS`` is installed as a context init script.  It keeps a
+``MutationObserver`` on the document and caches the simplified-DOM string
+of every element, so an observation only re-serializes the subtrees that
+changed since the previous one (and nothing at all when the DOM did not
+change).  Element output is the same walker as the original one-shot
+script; subtrees are invalidated conservatively:
+
+- attribute and child-list mutations rebuild the target's whole subtree
+  (class or structure changes can restyle descendants);
+- form-control values and ``checked`` states, which change without
+  mutations, are compared against the last serialized values;
+- hover and focus changes rebuild the parent of the hovered element;
+- any change under ``<head>`` or to a stylesheet rebuilds everything.
+
+The script also tracks in-flight fetch/XHR requests and the last DOM or
+input activity, so ``settle`` can return as soon as the page has been
+quiet for a short window instead of always sleeping.
+
+``ObservationEngine`` is the Python side: it caches the formatted
+observation by URL and DOM version and, in compact mode, keeps the
+highest-ranked interactive elements when the content is truncated.
+"""
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, Optional, Sequence
+
+OBSERVER_JS = r"""
+(() => {
+    if (window.__webagentObs || window.top !== window) return;
+    var SKIP = ['script', 'style', 'noscript', 'meta', 'link', 'svg', 'path'];
+    var INTERACTIVE = ['a', 'button', 'input', 'select', 'textarea'];
+    var TAG_RANK = {input: 4, select: 4, textarea: 4, button: 3, a: 1};
+    var state = {
+        doc: Math.random().toString(36).slice(2),
+        version: 0,
+        inflight: 0,
+        lastActivity: performance.now(),
+    };
+    var cache = new WeakMap();
+    var controls = new WeakMap();
+    var dirty = new Set();
+    var deep = new Set();
+    var reset = true;
+    var lastKey = null;
+    var lastContent = null;
+
+    function touch() { state.lastActivity = performance.now(); }
+    function bump() { state.version += 1; touch(); }
+
+    function markDirty(el) {
+        for (var n = el; n && n.nodeType === Node.ELEMENT_NODE && !dirty.has(n); n = n.parentElement) dirty.add(n);
+        bump();
+    }
+    function markDeep(el) {
+        if (!el || el.nodeType !== Node.ELEMENT_NODE) return;
+        deep.add(el);
+        markDirty(el);
+    }
+    function markReset() { reset = true; bump(); }
+
+    function isStyleNode(node) {
+        if (!node || node.nodeType !== Node.ELEMENT_NODE) return false;
+        var tag = node.tagName.toLowerCase();
+        return tag === 'style' || (tag === 'link' && /stylesheet/i.test(node.getAttribute('rel') || ''));
+    }
+
+    function onMutations(records) {
+        if (reset) { touch(); return; }
+        var head = document.head;
+        for (var i = 0; i < records.length; i++) {
+            var m = records[i];
+            var t = m.target;
+            if (t === document || t === document.documentElement || (head && head.contains(t))) { markReset(); return; }
+            var parent = t.nodeType === Node.ELEMENT_NODE ? t : t.parentElement;
+            if (isStyleNode(parent)) { markReset(); return; }
+            if (m.type === 'childList') {
+                var changed = Array.prototype.slice.call(m.addedNodes).concat(Array.prototype.slice.call(m.removedNodes));
+                if (changed.some(isStyleNode)) { markReset(); return; }
+                markDeep(t);
+            } else if (m.type === 'attributes') {
+                markDeep(t);
+            } else if (parent) {
+                markDirty(parent);
+            }
+        }
+    }
+
+    function onPointerOrFocus(event) {
+        var t = event.target;
+        if (t && t.nodeType === Node.ELEMENT_NODE) markDeep(t.parentElement || t);
+    }
+
+    function controlSignature(el) {
+        return String(el.value) + '\u0000' + (el.checked ? '1' : '0') + '\u0000' + (el.selectedIndex === undefined ? '' : el.selectedIndex);
+    }
+
+    function scanControls() {
+        var els = document.querySelectorAll('input, textarea, select');
+        for (var i = 0; i < els.length; i++) {
+            var el = els[i];
+            if (controls.has(el) && controls.get(el) !== controlSignature(el)) {
+                // :checked / value-dependent styles can reach siblings, so rebuild the parent.
+                markDeep(el.parentElement || el);
+            }
+        }
+    }
+
+    function getSimplifiedDOM(node, force) {
+        if (node.nodeType === Node.TEXT_NODE) {
+            var text = node.textContent.trim();
+            return text ? text : null;
+        }
+
+        if (node.nodeType !== Node.ELEMENT_NODE) return null;
+        if (!force && !dirty.has(node) && !deep.has(node)) {
+            var cached = cache.get(node);
+            if (cached !== undefined) return cached;
+        }
+        force = force || deep.has(node);
+
+        var tag = node.tagName.toLowerCase();
+        var result = null;
+        if (SKIP.indexOf(tag) !== -1) {
+            cache.set(node, result);
+            return result;
+        }
+        if (tag === 'input' || tag === 'textarea' || tag === 'select') controls.set(node, controlSignature(node));
+
+        var style = window.getComputedStyle(node);
+        if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') {
+            cache.set(node, result);
+            return result;
+        }
+
+        var attrs = [];
+        if (node.id) attrs.push('#' + node.id);
+        if (node.getAttribute('data-original-id')) attrs.push('data-original-id="' + node.getAttribute('data-original-id') + '"');
+        if (node.className) attrs.push('.' + node.className.split(' ').join('.'));
+        if (node.getAttribute('name')) attrs.push('name="' + node.getAttribute('name') + '"');
+        if (node.getAttribute('type')) attrs.push('type="' + node.getAttribute('type') + '"');
+        if (node.getAttribute('placeholder')) attrs.push('placeholder="' + node.getAttribute('placeholder') + '"');
+        if (node.getAttribute('role')) attrs.push('role="' + node.getAttribute('role') + '"');
+        if (node.getAttribute('title')) attrs.push('title="' + node.getAttribute('title') + '"');
+        if (node.getAttribute('aria-label')) attrs.push('aria-label="' + node.getAttribute('aria-label') + '"');
+        if (node.getAttribute('onclick')) {
+            var onclick = node.getAttribute('onclick') || '';
+            var fnMatch = onclick.match(/^\s*([A-Za-z0-9_$.]+)/);
+            var onclickHint = fnMatch ? fnMatch[1] : onclick.slice(0, 64);
+            if (onclickHint) attrs.push('onclick="' + onclickHint + '"');
+        }
+        if (tag === 'a' && node.getAttribute('href')) attrs.push('href="' + node.getAttribute('href') + '"');
+        if ((tag === 'input' || tag === 'textarea') && node.value) attrs.push('value="' + node.value + '"');
+        if (tag === 'input' && (node.type === 'checkbox' || node.type === 'radio')) attrs.push(node.checked ? 'checked' : 'unchecked');
+        if (tag === 'select') {
+            var options = Array.from(node.options || []).map(function(opt) {
+                var label = (opt.textContent || '').trim();
+                var value = (opt.value || '').trim();
+                return value === label || !label ? value : (value + ':' + label);
+            }).filter(Boolean);
+            if (options.length) attrs.push('options="' + options.join(' | ') + '"');
+        }
+
+        var childrenStr = '';
+        node.childNodes.forEach(function(child) {
+            var res = getSimplifiedDOM(child, force);
+            if (res) childrenStr += (res + ' ');
+        });
+
+        var isInteractive = INTERACTIVE.indexOf(tag) !== -1 || node.getAttribute('role') === 'button';
+        var hasContent = childrenStr.trim().length > 0;
+
+        if (isInteractive || hasContent) {
+            var attrStr = attrs.length > 0 ? ' ' + attrs.join(' ') : '';
+            result = '<' + tag + attrStr + '>' + childrenStr.trim() + '</' + tag + '>';
+        } else {
+            result = childrenStr.trim();
+        }
+        cache.set(node, result);
+        return result;
+    }
+
+    function interactiveElements() {
+        // Walks only what the last serialization reached: hidden subtrees are cached as null.
+        var out = [];
+        var viewportHeight = window.innerHeight || 0;
+        (function walk(node) {
+            var entry = cache.get(node);
+            if (!entry) return;
+            var tag = node.tagName.toLowerCase();
+            if (INTERACTIVE.indexOf(tag) !== -1 || node.getAttribute('role') === 'button') {
+                var rank = TAG_RANK[tag] || 2;
+                if (node.id) rank += 1;
+                var rect = node.getBoundingClientRect();
+                if (rect.bottom >= 0 && rect.top <= viewportHeight) rank += 1;
+                if (node.disabled) rank -= 2;
+                out.push([entry, rank]);
+            }
+            for (var child = node.firstElementChild; child; child = child.nextElementSibling) walk(child);
+        })(document.body);
+        return out;
+    }
+
+    function observe(args) {
+        args = args || {};
+        if (args.full) markReset();
+        if (!reset) scanControls();
+        var key = state.doc + ':' + state.version;
+        var clean = !reset && dirty.size === 0 && deep.size === 0;
+        if (clean && key === lastKey && lastContent !== null) {
+            var unchanged = {key: key, content: args.since === key ? null : lastContent, serialized: false};
+            if (args.compact && unchanged.content !== null) unchanged.interactive = interactiveElements();
+            return unchanged;
+        }
+        if (reset) cache = new WeakMap();
+        var content = document.body ? getSimplifiedDOM(document.body, reset) : null;
+        reset = false;
+        dirty.clear();
+        deep.clear();
+        lastKey = key;
+        lastContent = content === null ? '' : content;
+        var result = {key: key, content: lastContent, serialized: true};
+        if (args.compact) result.interactive = interactiveElements();
+        return result;
+    }
+
+    function settle(quietMs, maxMs) {
+        var start = performance.now();
+        return new Promise(function(resolve) {
+            (function check() {
+                var now = performance.now();
+                if ((state.inflight === 0 && now - state.lastActivity >= quietMs) || now - start >= maxMs) {
+                    resolve(now - start);
+                    return;
+                }
+                setTimeout(check, Math.max(5, Math.min(25, quietMs / 4)));
+            })();
+        });
+    }
+
+    function begin() { state.inflight += 1; touch(); }
+    function end() { state.inflight = Math.max(0, state.inflight - 1); touch(); }
+    if (window.fetch) {
+        var origFetch = window.fetch;
+        window.fetch = function() {
+            begin();
+            var p;
+            try {
+                p = origFetch.apply(this, arguments);
+            } catch (e) {
+                end();
+                throw e;
+            }
+            p.then(end, end);
+            return p;
+        };
+    }
+    if (window.XMLHttpRequest) {
+        var origSend = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function() {
+            begin();
+            this.addEventListener('loadend', end, {once: true});
+            return origSend.apply(this, arguments);
+        };
+    }
+
+    new MutationObserver(onMutations).observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true,
+    });
+    ['mouseover', 'mouseout', 'focusin', 'focusout'].forEach(function(type) {
+        document.addEventListener(type, onPointerOrFocus, true);
+    });
+    ['pointerdown', 'click', 'keydown', 'input', 'change', 'submit'].forEach(function(type) {
+        document.addEventListener(type, touch, true);
+    });
+    window.__webagentObs = {state: state, observe: observe, settle: settle};
+})();
+"""
+
+_OBSERVE_JS = "(args) => {" + OBSERVER_JS + " return window.__webagentObs ? window.__webagentObs.observe(args) : null; }"
+_SETTLE_JS = "([quietMs, maxMs]) => window.__webagentObs ? window.__webagentObs.settle(quietMs, maxMs) : null"
+
+_TRUNCATED = "...(truncated)"
+_INTERACTIVE_MARK = " INTERACTIVE: "
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _squash(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def format_observation(
+    url: str,
+    content: Optional[str],
+    max_chars: int = 10000,
+    interactive: Optional[Sequence[Sequence[Any]]] = None,
+) -> str:
+    """The ``URL: ...\\nCONTENT:\\n...`` observation text.
+
+    Without ``interactive`` the content is cut at ``max_chars``.  With it
+    (compact mode), a third of the budget is reserved for the interactive
+    elements (``[html, rank]`` in document order) the cut would drop; the
+    best-ranked ones are appended in document order.
+    """
+    content = _squash(content or "")
+    if len(content) > max_chars:
+        if interactive:
+            content = _compact(content, max_chars, interactive)
+        else:
+            content = content[:max_chars] + _TRUNCATED
+    return f"URL: {url}\nCONTENT:\n{content}"
+
+
+def _compact(content: str, max_chars: int, interactive: Sequence[Sequence[Any]]) -> str:
+    budget = max_chars // 3
+    head = content[: max_chars - budget]
+    dropped: list[tuple[int, int, str]] = []
+    pos = 0
+    for order, (html, rank) in enumerate(interactive):
+        html = _squash(str(html or ""))
+        if not html:
+            continue
+        found = content.find(html, pos)
+        if found == -1:
+            found = pos
+        else:
+            pos = found + 1
+        if found + len(html) > len(head):
+            dropped.append((int(rank), order, html))
+    kept: list[tuple[int, str]] = []
+    used = 0
+    for rank, order, html in sorted(dropped, key=lambda entry: (-entry[0], entry[1])):
+        if used + len(html) + 1 > budget:
+            continue
+        kept.append((order, html))
+        used += len(html) + 1
+    if not kept:
+        return content[:max_chars] + _TRUNCATED
+    return head + _TRUNCATED + _INTERACTIVE_MARK + " ".join(html for _, html in sorted(kept))
+
+
+class ObservationEngine:
+    """Per-``BrowserEnv`` observation cache, keyed by URL and DOM version."""
+
+    def __init__(self, enabled: bool = True, compact: bool = False, max_chars: int = 10000, quiet_ms: int = 100, settle_ms: int = 250):
+        self.enabled = enabled
+        self.compact = compact
+        self.max_chars = max(1, int(max_chars))
+        self.quiet_ms = max(0, int(quiet_ms))
+        self.settle_ms = max(0, int(settle_ms))
+        self._cache_key: Optional[tuple] = None
+        self._cache_text: Optional[str] = None
+        self.stats = {"observations": 0, "cache_hits": 0, "serializations": 0}
+
+    @classmethod
+    def from_env(cls) -> "ObservationEngine":
+        return cls(
+            enabled=_env_flag("WEBAGENT_OBS_ENGINE", True),
+            compact=_env_flag("WEBAGENT_OBS_COMPACT", False),
+            max_chars=_env_int("WEBAGENT_OBS_MAX_CHARS", 10000),
+            quiet_ms=_env_int("WEBAGENT_OBS_QUIET_MS", 100),
+            settle_ms=_env_int("WEBAGENT_OBS_SETTLE_MS", 250),
+        )
+
+    def install(self, context) -> None:
+        self.clear()
+        context.add_init_script(script=OBSERVER_JS)
+
+    def clear(self) -> None:
+        self._cache_key = None
+        self._cache_text = None
+
+    def settle(self, page) -> None:
+        """Wait until no request is in flight and the DOM has been quiet for ``quiet_ms``.
+
+        Never longer than ``settle_ms``; a plain ``settle_ms`` sleep when the
+        engine is disabled or not installed on the page.
+        """
+        if self.enabled:
+            try:
+                if page.evaluate(_SETTLE_JS, [self.quiet_ms, self.settle_ms]) is not None:
+                    return
+            except Exception:
+                pass
+        page.wait_for_timeout(self.settle_ms)
+
+    def observe(self, page, compact: Optional[bool] = None) -> str:
+        compact = self.compact if compact is None else bool(compact)
+        url = page.url
+        self.stats["observations"] += 1
+        cached = self._cache_key is not None and self._cache_key[:2] == (url, compact)
+        result = page.evaluate(
+            _OBSERVE_JS,
+            {"since": self._cache_key[2] if cached else None, "compact": compact, "full": not self.enabled},
+        )
+        if result is None:
+            raise RuntimeError("observation script unavailable on this page")
+        if result.get("content") is None and cached:
+            self.stats["cache_hits"] += 1
+            return self._cache_text
+        if result.get("serialized"):
+            self.stats["serializations"] += 1
+        text = format_observation(url, result.get("content"), self.max_chars, result.get("interactive") if compact else None)
+        self._cache_key = (url, compact, result.get("key"))
+        self._cache_text = text
+        return text
@@ -0,0 +1,273 @@
+"""Asyncio server core for server.py (``WEBAGENT_SERVER_CORE=asyncio`` or ``--async``).
+
+Serves the same routes as the threaded core by running server.py's
+``Handler`` against in-memory request and response buffers:
+
+- connections are coroutines on one event loop (uvloop when installed) with
+  HTTP/1.1 keep-alive, instead of one OS thread per connection;
+- POST requests, which carry every state mutation, run one at a time on a
+  single writer thread in arrival order; GET/HEAD run on a small reader pool;
+- pages and assets held by the static cache are answered on the loop without
+  a thread hop, and other static files are sent with ``loop.sendfile``.
+"""
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import http.client
+import io
+import os
+import socket
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple, Optional
+
+try:
+    import uvloop
+except Exception:
+    uvloop = None
+
+MAX_HEAD_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+def async_readers_from_env() -> int:
+    raw = os.environ.get("WEBAGENT_ASYNC_READERS", "4").strip()
+    try:
+        return max(1, int(raw))
+    except Exception:
+        return 4
+
+
+def async_keepalive_from_env() -> float:
+    raw = os.environ.get("WEBAGENT_ASYNC_KEEPALIVE_SEC", "15").strip()
+    try:
+        return max(0.1, float(raw))
+    except Exception:
+        return 15.0
+
+
+class Request(NamedTuple):
+    command: str
+    path: str
+    version: str
+    requestline: str
+    headers: http.client.HTTPMessage
+    body: bytes
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = (self.headers.get("Connection") or "").lower()
+        if self.version == "HTTP/1.1":
+            return "close" not in connection
+        return "keep-alive" in connection
+
+
+def parse_head(head: bytes) -> Optional[tuple[str, str, str, str, http.client.HTTPMessage]]:
+    """``(command, path, version, requestline, headers)`` from a request head, or None if malformed."""
+    line, _, rest = head.partition(b"\r\n")
+    requestline = line.decode("iso-8859-1")
+    parts = requestline.split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+        return None
+    try:
+        headers = http.client.parse_headers(io.BytesIO(rest))
+    except http.client.HTTPException:
+        return None
+    return parts[0], parts[1], parts[2], requestline, headers
+
+
+def simple_response(status: int, message: str) -> bytes:
+    body = message.encode("utf-8")
+    return (
+        f"HTTP/1.1 {status} {http.client.responses.get(status, '')}\r\n"
+        f"Content-Type: text/plain; charset=utf-8\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+def finish_response(raw: bytes, keep_alive: bool) -> tuple[bytes, bool]:
+    """Turn what a handler wrote (HTTP/1.0, often without a length) into a keep-alive HTTP/1.1 response."""
+    head, sep, body = raw.partition(b"\r\n\r\n")
+    if not sep:
+        return simple_response(500, "handler wrote no response"), False
+    lines = head.split(b"\r\n")
+    _, _, status_rest = lines[0].partition(b" ")
+    status = int(status_rest[:3] or b"500")
+    headers = []
+    for line in lines[1:]:
+        name = line.split(b":", 1)[0].strip().lower()
+        if name == b"connection":
+            keep_alive = keep_alive and b"close" not in line.lower()
+            continue
+        headers.append(line)
+    has_length = any(line.split(b":", 1)[0].strip().lower() == b"content-length" for line in headers)
+    if not has_length and status >= 200 and status not in (204, 304):
+        headers.append(b"Content-Length: %d" % len(body))
+    headers.append(b"Connection: keep-alive" if keep_alive else b"Connection: close")
+    return b"\r\n".join([b"HTTP/1.1 " + status_rest] + headers) + b"\r\n\r\n" + body, keep_alive
+
+
+class _ServerInfo(NamedTuple):
+    server_address: tuple
+
+
+class AsyncServer:
+    def __init__(self, handler_cls: Any, port: int, host: str = "", readers: int = 4, keepalive: float = 15.0):
+        self.handler_cls = handler_cls
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.info = _ServerInfo((host, port))
+        self.writer_pool = ThreadPoolExecutor(1, thread_name_prefix="mutations")
+        self.reader_pool = ThreadPoolExecutor(readers, thread_name_prefix="reads")
+        self.stats = {"connections": 0, "requests": 0, "inline": 0, "sendfile": 0, "mutations": 0}
+
+    def make_handler(self, request: Request, peer: tuple) -> Any:
+        handler = self.handler_cls.__new__(self.handler_cls)
+        handler.request = None
+        handler.server = self.info
+        handler.client_address = peer
+        handler.directory = os.getcwd()
+        handler.rfile = io.BytesIO(request.body)
+        handler.wfile = io.BytesIO()
+        handler.raw_requestline = request.requestline.encode("iso-8859-1") + b"\r\n"
+        handler.requestline = request.requestline
+        handler.command = request.command
+        handler.path = request.path
+        handler.request_version = request.version
+        handler.headers = request.headers
+        handler.close_connection = False
+        return handler
+
+    @staticmethod
+    def run_handler(handler: Any) -> bytes:
+        method = getattr(handler, f"do_{handler.command}", None)
+        try:
+            if method is None:
+                handler.send_error(501, f"Unsupported method ({handler.command!r})")
+            else:
+                method()
+        except Exception:
+            traceback.print_exc()
+            return simple_response(500, "internal server error")
+        return handler.wfile.getvalue()
+
+    def sendfile_target(self, handler: Any) -> Optional[str]:
+        """The file a static GET resolves to, when it is served as-is from disk."""
+        if handler.command != "GET" or handler.normalized_api_path():
+            return None
+        full_path = handler.translate_path(handler.path)
+        if full_path.endswith(".html") or not os.path.isfile(full_path):
+            return None
+        return full_path
+
+    async def send_file(self, writer: asyncio.StreamWriter, handler: Any, path: str, keep_alive: bool) -> None:
+        loop = asyncio.get_running_loop()
+        with open(path, "rb") as fh:
+            st = os.fstat(fh.fileno())
+            head = (
+                "HTTP/1.1 200 OK\r\n"
+                f"Content-Type: {handler.guess_type(path)}\r\n"
+                f"Content-Length: {st.st_size}\r\n"
+                f"Last-Modified: {email.utils.formatdate(st.st_mtime, usegmt=True)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            )
+            writer.write(head.encode("latin-1"))
+            await writer.drain()
+            if st.st_size:
+                await loop.sendfile(writer.transport, fh, 0, st.st_size)
+        self.stats["sendfile"] += 1
+
+    async def respond(self, writer: asyncio.StreamWriter, request: Request, peer: tuple) -> bool:
+        """Write the response to ``request``; returns whether to keep the connection open."""
+        keep_alive = request.keep_alive
+        handler = self.make_handler(request, peer)
+        if request.command == "GET" and not handler.normalized_api_path():
+            asset = handler.cached_static_asset(handler.translate_path(handler.path))
+            if asset is not None:
+                # Memory-only work: no thread hop.
+                handler.send_static(asset)
+                raw, keep_alive = finish_response(handler.wfile.getvalue(), keep_alive)
+                writer.write(raw)
+                self.stats["inline"] += 1
+                return keep_alive
+            path = self.sendfile_target(handler)
+            if path is not None:
+                await self.send_file(writer, handler, path, keep_alive)
+                return keep_alive
+        if request.command == "POST":
+            pool = self.writer_pool
+            self.stats["mutations"] += 1
+        else:
+            pool = self.reader_pool
+        raw = await asyncio.get_running_loop().run_in_executor(pool, self.run_handler, handler)
+        raw, keep_alive = finish_response(raw, keep_alive)
+        writer.write(raw)
+        return keep_alive
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        peer = writer.get_extra_info("peername") or ("", 0)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(simple_response(431, "request head too large"))
+                    break
+                parsed = parse_head(head)
+                if parsed is None:
+                    writer.write(simple_response(400, "malformed request"))
+                    break
+                command, path, version, requestline, headers = parsed
+                if "chunked" in (headers.get("Transfer-Encoding") or "").lower():
+                    writer.write(simple_response(411, "chunked request bodies are not supported"))
+                    break
+                try:
+                    length = int(headers.get("Content-Length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    writer.write(simple_response(400, "bad Content-Length"))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                self.stats["requests"] += 1
+                keep_alive = await self.respond(writer, Request(command, path, version, requestline, headers, body), peer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def run(self) -> None:
+        # Bind like socketserver does, so "Address already in use" reads the same in runner logs.
+        sock = socket.create_server((self.host, self.port))
+        server = await asyncio.start_server(self.handle_connection, sock=sock, limit=MAX_HEAD_BYTES)
+        print(f"Serving at port {self.port} (asyncio core{', uvloop' if uvloop is not None else ''})")
+        sys.stdout.flush()
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        # Let an in-flight mutation finish before the caller flushes world state.
+        self.writer_pool.shutdown(wait=True)
+        self.reader_pool.shutdown(wait=False)
+
+
+def serve(handler_cls: Any, port: int, host: str = "") -> None:
+    """Run the asyncio core until interrupted."""
+    server = AsyncServer(handler_cls, port, host=host, readers=async_readers_from_env(), keepalive=async_keepalive_from_env())
+    runner = uvloop.run if uvloop is not None and hasattr(uvloop, "run") else asyncio.run
+    try:
+        runner(server.run())
+    finally:
+        server.close()
@@ -3,7 +3,6 @@ import argparse
 import json
 import os
 import re
-import sqlite3
 import subprocess
 import sys
 import time
@@ -13,6 +12,7 @@ from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
 import requests
 
 from agent.assertions_dsl import AssertionDSL
+from memory_kv import load_memory_snapshot
 
 
 THEMES = ["newcomer", "daily", "career", "leisure", "crisis"]
@@ -457,16 +457,7 @@ def _deep_merge(base: dict, patch: dict) -> dict:
 def _build_runtime_dsl() -> AssertionDSL:
     memory: Dict[str, object] = {}
     try:
-        conn = sqlite3.connect("data.db")
-        conn.row_factory = sqlite3.Row
-        cur = conn.execute("SELECT key, value FROM memory_kv")
-        for row in cur.fetchall():
-            raw = row["value"]
-            try:
-                memory[row["key"]] = json.loads(raw)
-            except Exception:
-                memory[row["key"]] = raw
-        conn.close()
+        memory = load_memory_snapshot("data.db")
     except Exception:
         pass
 
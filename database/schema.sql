@@ -47,6 +47,7 @@ CREATE TABLE IF NOT EXISTS orders (
 
 CREATE INDEX idx_orders_user_id ON orders(user_id);
 CREATE INDEX idx_orders_state ON orders(state);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at_key ON orders(COALESCE(created_at, ''), id);
 
 CREATE TABLE IF NOT EXISTS order_items (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -245,6 +246,33 @@ CREATE TABLE IF NOT EXISTS memory_kv (
 
 CREATE INDEX idx_memory_kv_source ON memory_kv(source);
 
+-- Change feed for incremental readers (memory_kv.MemoryKVCache): every write
+-- appends the touched key; ``token`` detects re-initialized/restored databases.
+CREATE TABLE IF NOT EXISTS memory_kv_changes (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  key TEXT NOT NULL,
+  token BLOB NOT NULL DEFAULT (randomblob(8))
+);
+CREATE TRIGGER IF NOT EXISTS memory_kv_changes_insert AFTER INSERT ON memory_kv
+BEGIN
+  INSERT INTO memory_kv_changes(key) VALUES (NEW.key);
+END;
+CREATE TRIGGER IF NOT EXISTS memory_kv_changes_update AFTER UPDATE ON memory_kv
+BEGIN
+  INSERT INTO memory_kv_changes(key) VALUES (NEW.key);
+  INSERT INTO memory_kv_changes(key) SELECT OLD.key WHERE OLD.key IS NOT NEW.key;
+END;
+CREATE TRIGGER IF NOT EXISTS memory_kv_changes_delete AFTER DELETE ON memory_kv
+BEGIN
+  INSERT INTO memory_kv_changes(key) VALUES (OLD.key);
+END;
+-- Keep only the last 4096 changes (memory_kv.CHANGELOG_KEEP); readers that
+-- fall further behind notice the missing seq and reload fully.
+CREATE TRIGGER IF NOT EXISTS memory_kv_changes_prune AFTER INSERT ON memory_kv_changes
+BEGIN
+  DELETE FROM memory_kv_changes WHERE seq <= NEW.seq - 4096;
+END;
+
 -- ============================================================================
 -- Task Execution Logs
 -- ============================================================================
@@ -312,3 +340,64 @@ AFTER UPDATE ON settlements
 BEGIN
   UPDATE settlements SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
 END;
+
+-- ============================================================================
+-- Table versions (db_reader.SQLiteReader.version_tag, API ETags)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS table_versions (
+  name TEXT PRIMARY KEY,
+  version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO table_versions(name, version) VALUES ('products', 0);
+CREATE TRIGGER IF NOT EXISTS products_version_insert AFTER INSERT ON products
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+END;
+CREATE TRIGGER IF NOT EXISTS products_version_update AFTER UPDATE ON products
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+END;
+CREATE TRIGGER IF NOT EXISTS products_version_delete AFTER DELETE ON products
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'products';
+END;
+INSERT OR IGNORE INTO table_versions(name, version) VALUES ('orders', 0);
+CREATE TRIGGER IF NOT EXISTS orders_version_insert AFTER INSERT ON orders
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'orders';
+END;
+CREATE TRIGGER IF NOT EXISTS orders_version_update AFTER UPDATE ON orders
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'orders';
+END;
+CREATE TRIGGER IF NOT EXISTS orders_version_delete AFTER DELETE ON orders
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'orders';
+END;
+INSERT OR IGNORE INTO table_versions(name, version) VALUES ('order_items', 0);
+CREATE TRIGGER IF NOT EXISTS order_items_version_insert AFTER INSERT ON order_items
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'order_items';
+END;
+CREATE TRIGGER IF NOT EXISTS order_items_version_update AFTER UPDATE ON order_items
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'order_items';
+END;
+CREATE TRIGGER IF NOT EXISTS order_items_version_delete AFTER DELETE ON order_items
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'order_items';
+END;
+INSERT OR IGNORE INTO table_versions(name, version) VALUES ('accounts', 0);
+CREATE TRIGGER IF NOT EXISTS accounts_version_insert AFTER INSERT ON accounts
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'accounts';
+END;
+CREATE TRIGGER IF NOT EXISTS accounts_version_update AFTER UPDATE ON accounts
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'accounts';
+END;
+CREATE TRIGGER IF NOT EXISTS accounts_version_delete AFTER DELETE ON accounts
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = 'accounts';
+END;
@@ -0,0 +1,147 @@
+"""Pooled reads and table version counters for the runtime SQLite database.
+
+``SQLiteReader`` lends connections from a small pool instead of opening one
+per query, and like ``SQLiteWriter`` follows the file when init_db or a
+branch restore replaces it (or, via ``reopen``, restores it in place).
+
+Triggers bump a per-table counter in ``table_versions`` on every write to
+the tables in ``VERSIONED_TABLES``.  ``SQLiteReader.version_tag`` combines
+those counters with a per-process token and a generation that changes
+whenever the file is replaced or reopened, so API handlers can derive ETags that change
+exactly when the tables they read do.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+VERSIONED_TABLES = ("products", "orders", "order_items", "accounts")
+
+_VERSIONS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS table_versions (
+  name TEXT PRIMARY KEY,
+  version INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def _table_version_ddl(table: str) -> str:
+    triggers = "".join(
+        f"""
+CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}
+BEGIN
+  UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+END;
+"""
+        for event in ("INSERT", "UPDATE", "DELETE")
+    )
+    return f"INSERT OR IGNORE INTO table_versions(name, version) VALUES ('{table}', 0);\n" + triggers
+
+
+def ensure_table_versions(conn: sqlite3.Connection, tables: Sequence[str] = VERSIONED_TABLES) -> None:
+    """Install the version table and triggers for the ``tables`` that exist (idempotent)."""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    script = _VERSIONS_TABLE_DDL + "".join(_table_version_ddl(table) for table in tables if table in existing)
+    if "orders" in existing:
+        # Keyset pages order by COALESCE(created_at, ''); the plain-column index it replaces is unused.
+        script += "DROP INDEX IF EXISTS idx_orders_created_at;\n"
+        script += "CREATE INDEX IF NOT EXISTS idx_orders_created_at_key ON orders(COALESCE(created_at, ''), id);\n"
+    conn.executescript(script)
+
+
+class SQLiteReader:
+    def __init__(self, db_path: str | Path, timeout: float = 30.0, pool_size: int = 4):
+        self.db_path = Path(db_path)
+        self.timeout = timeout
+        self.pool_size = max(1, int(pool_size))
+        self.token = os.urandom(4).hex()
+        self.generation = 0
+        self._ino: int | None = None
+        self._idle: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.stats = {"connections_opened": 0, "queries": 0}
+
+    def _check_file_locked(self) -> None:
+        try:
+            ino: int | None = os.stat(self.db_path).st_ino
+        except FileNotFoundError:
+            ino = None
+        if ino != self._ino:
+            # The file was replaced; pooled connections still point at the old one.
+            self._close_idle_locked()
+            self._ino = ino
+            self.generation += 1
+
+    def _close_idle_locked(self) -> None:
+        for conn in self._idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._idle.clear()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow an autocommit connection with ``sqlite3.Row`` rows."""
+        with self._lock:
+            self._check_file_locked()
+            generation = self.generation
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self.stats["connections_opened"] += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                if generation == self.generation and len(self._idle) < self.pool_size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    @contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        """A connection inside one read transaction, for multi-query responses."""
+        with self.connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+
+    def query(self, sql: str, args: Sequence[Any] = ()) -> list[sqlite3.Row]:
+        with self.connection() as conn:
+            self.stats["queries"] += 1
+            return conn.execute(sql, tuple(args)).fetchall()
+
+    def version_tag(self, conn: sqlite3.Connection, tables: Sequence[str]) -> Optional[str]:
+        """Identifies the current contents of ``tables``; None if the database has no version counters."""
+        marks = ",".join("?" * len(tables))
+        try:
+            rows = dict(conn.execute(f"SELECT name, version FROM table_versions WHERE name IN ({marks})", tuple(tables)).fetchall())
+        except sqlite3.Error:
+            return None
+        if len(rows) != len(tables):
+            return None
+        return f"{self.token}.{self.generation}." + ".".join(str(rows[table]) for table in tables)
+
+    def reopen(self) -> None:
+        """Drop pooled connections and start a new generation, e.g. after an in-place restore."""
+        with self._lock:
+            self._close_idle_locked()
+            # Borrowed connections are closed on return; ETags stop matching
+            # counters that a restore may have rolled back.
+            self.generation += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_idle_locked()
@@ -0,0 +1,175 @@
+"""Request-scoped, batched writes to the runtime SQLite database.
+
+The server keeps one ``SQLiteWriter`` with a single persistent connection.
+Outside a unit of work ``execute()`` behaves like the old ``execute_db``: one
+statement, one commit, errors raised.  Inside ``unit_of_work()`` (one per
+``/api/mutate`` or ``/api/debug/time_travel`` request) statements are queued
+and committed together when the block exits: adjacent statements with the
+same SQL go through one ``executemany`` and the whole request costs a single
+commit (one fsync) instead of one per statement.
+
+Each batch runs under its own savepoint, so a failing statement (e.g. an
+``UPDATE`` on a table an older database lacks) only drops its batch; the
+failure is recorded on the unit and logged instead of being swallowed.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+
+class UnitOfWork:
+    """Statements queued by one request; see ``SQLiteWriter.unit_of_work``."""
+
+    def __init__(self) -> None:
+        self.statements: list[tuple[str, tuple[Any, ...]]] = []
+        self.errors: list[dict[str, Any]] = []
+
+    def add(self, sql: str, args: Sequence[Any] = ()) -> None:
+        self.statements.append((sql, tuple(args)))
+
+    def batches(self) -> list[tuple[str, list[tuple[Any, ...]]]]:
+        """Group adjacent statements with identical SQL, preserving order."""
+        grouped: list[tuple[str, list[tuple[Any, ...]]]] = []
+        for sql, args in self.statements:
+            if grouped and grouped[-1][0] == sql:
+                grouped[-1][1].append(args)
+            else:
+                grouped.append((sql, [args]))
+        return grouped
+
+
+class SQLiteWriter:
+    def __init__(self, db_path: str | Path, timeout: float = 60.0):
+        self.db_path = Path(db_path)
+        self.timeout = timeout
+        self._conn: sqlite3.Connection | None = None
+        self._conn_ino: int | None = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"connections_opened": 0, "transactions": 0, "statements": 0, "batches": 0, "errors": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        try:
+            ino: int | None = os.stat(self.db_path).st_ino
+        except FileNotFoundError:
+            ino = None
+        if self._conn is not None and ino != self._conn_ino:
+            # init_db / branch restores replace the file; follow the new one.
+            self.close_locked()
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._conn = conn
+            self._conn_ino = os.stat(self.db_path).st_ino
+            self.stats["connections_opened"] += 1
+        return self._conn
+
+    def close_locked(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._conn_ino = None
+
+    def close(self) -> None:
+        with self._lock:
+            self.close_locked()
+
+    def reopen(self) -> None:
+        """Drop the connection so the next write opens the file afresh.
+
+        The inode check only catches a replaced file; a restore that copies
+        into the same file needs this (the server calls it on /api/state/reload).
+        """
+        self.close()
+
+    @property
+    def current(self) -> UnitOfWork | None:
+        return getattr(self._local, "unit", None)
+
+    def execute(self, sql: str, args: Sequence[Any] = ()) -> None:
+        """Queue ``sql`` on this thread's unit of work, or run it in its own transaction."""
+        unit = self.current
+        if unit is not None:
+            unit.add(sql, args)
+            return
+        with self._lock:
+            conn = self._connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(sql, tuple(args))
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                self.stats["errors"] += 1
+                raise
+            self.stats["transactions"] += 1
+            self.stats["statements"] += 1
+            self.stats["batches"] += 1
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator[UnitOfWork]:
+        """Collect this thread's writes and commit them at once on exit.
+
+        Nested blocks join the outermost unit.  If the block raises, the
+        queued statements are discarded.
+        """
+        outer = self.current
+        if outer is not None:
+            yield outer
+            return
+        unit = UnitOfWork()
+        self._local.unit = unit
+        try:
+            yield unit
+        finally:
+            self._local.unit = None
+        self.commit(unit)
+
+    def commit(self, unit: UnitOfWork) -> list[dict[str, Any]]:
+        """Write ``unit`` in one transaction; returns (and records) per-batch failures."""
+        if not unit.statements:
+            return unit.errors
+        batches = unit.batches()
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.Error as exc:
+                self._record(unit, "BEGIN", len(unit.statements), exc)
+                return unit.errors
+            try:
+                for index, (sql, rows) in enumerate(batches):
+                    conn.execute(f"SAVEPOINT uow_{index}")
+                    try:
+                        conn.executemany(sql, rows)
+                    except sqlite3.Error as exc:
+                        conn.execute(f"ROLLBACK TO uow_{index}")
+                        self._record(unit, sql, len(rows), exc)
+                    conn.execute(f"RELEASE uow_{index}")
+                conn.execute("COMMIT")
+            except BaseException as exc:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if not isinstance(exc, sqlite3.Error):
+                    raise
+                self._record(unit, "COMMIT", len(unit.statements), exc)
+                return unit.errors
+            self.stats["transactions"] += 1
+            self.stats["statements"] += len(unit.statements)
+            self.stats["batches"] += len(batches)
+        return unit.errors
+
+    def _record(self, unit: UnitOfWork, sql: str, rows: int, exc: Exception) -> None:
+        self.stats["errors"] += 1
+        error = {"sql": " ".join(sql.split())[:120], "rows": rows, "error": str(exc)}
+        unit.errors.append(error)
+        print(f"ERROR: database write failed ({rows} row(s)): {error['sql']}: {exc}")
@@ -4,18 +4,19 @@ import json
 import os
 import sys
 import time
-import sqlite3
 import re
 import math
 import heapq
 import threading
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlsplit, urlunsplit
-from agent.llm_client import build_client
-from agent.browser_env import BrowserEnv
-from agent.assertions_dsl import AssertionDSL
+from agent.llm_client import build_client, stats_delta
+from agent.browser_env import BrowserEnv, browser_manager_stats
+from agent.assertions_dsl import AssertionDSL, JsonStateEnvAPI
 from pathlib import Path
 from runtime_paths import state_path as runtime_state_path, db_path as runtime_db_path
+from memory_kv import load_memory_snapshot, memory_cache
 
 try:
     from rl_memory.test_time_methods.common import (
@@ -23,10 +24,14 @@ try:
         TemporaryBranchRuntime,
         sample_candidate_actions,
         score_action_heuristics,
+        shared_branch_pool,
+        shared_branch_pool_stats,
     )
 except Exception:
     TaskRuntimeSnapshot = None
     TemporaryBranchRuntime = None
+    shared_branch_pool = None
+    shared_branch_pool_stats = None
     sample_candidate_actions = None
     score_action_heuristics = None
 
@@ -1365,62 +1370,17 @@ def _parse_verifier_response(text: str) -> Dict[str, Any]:
 
 
 def _load_runtime_memory_snapshot() -> Dict[str, Any]:
-    last_error: Optional[Exception] = None
-    for _ in range(5):
-        memory: Dict[str, Any] = {}
-        conn = None
-        try:
-            conn = sqlite3.connect(str(runtime_db_path()), timeout=5)
-            conn.row_factory = sqlite3.Row
-            cur = conn.execute("SELECT key, value FROM memory_kv")
-            for row in cur.fetchall():
-                raw = row["value"]
-                try:
-                    memory[row["key"]] = json.loads(raw)
-                except Exception:
-                    memory[row["key"]] = raw
-            return memory
-        except sqlite3.OperationalError as exc:
-            last_error = exc
-            time.sleep(0.2)
-        finally:
-            if conn is not None:
-                conn.close()
-    if last_error is not None:
-        raise last_error
-    return {}
+    # Incremental: only memory_kv rows changed since the previous call are read.
+    return load_memory_snapshot(runtime_db_path())
 
 
 def _build_env_api():
-    def env_api(channel, path):
-        path_obj = runtime_state_path()
-        if not path_obj.exists():
-            return None
-        try:
-            current = json.loads(path_obj.read_text(encoding="utf-8"))
-        except Exception:
-            return None
-
-        for part in path.split("."):
-            if isinstance(current, dict):
-                current = current.get(part)
-            elif isinstance(current, list):
-                try:
-                    current = current[int(part)]
-                except Exception:
-                    return None
-            else:
-                return None
-            if current is None:
-                return None
-        return current
-
-    return env_api
+    return JsonStateEnvAPI(runtime_state_path)
 
 
 def _evaluate_task_progress(spec: Dict[str, Any], env: BrowserEnv) -> Dict[str, Any]:
     memory = _load_runtime_memory_snapshot()
-    dsl = AssertionDSL(env.page, memory, _build_env_api())
+    dsl = AssertionDSL(env.page, memory, _build_env_api(), snapshot=True, memory_source=memory_cache(runtime_db_path()))
     criteria = spec.get("success_criteria", [])
     criteria_total = len(criteria)
     criteria_passed = 0
@@ -1589,20 +1549,58 @@ def _replay_actions(
     committed_history: List[Tuple[str, str]],
     branch_actions: List[str],
     spec: Optional[Dict[str, Any]] = None,
+    resume: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
-    obs = env.reset(start_url)
-    prompt_history: List[Tuple[str, str]] = []
+    """Bring ``env`` to the current decision point, then run ``branch_actions``.
+
+    Without ``resume`` the whole ``committed_history`` is replayed from
+    ``start_url``.  With ``resume`` (``url``, ``history_len`` and optionally
+    ``expected_observation`` of a decision checkpoint whose server and storage
+    state are already loaded) the page is opened at the checkpoint URL and
+    only the actions committed after it are replayed, reusing the committed
+    observations for the prompt history.  A checkpoint page that does not
+    render like the committed observation yields
+    ``error_stage == "checkpoint_restore"`` so the caller can fall back to a
+    full replay.
+    """
     status = ""
     keep_going = True
     before_progress: Optional[Dict[str, Any]] = None
+    if resume is None:
+        obs = env.reset(start_url)
+        prompt_history: List[Tuple[str, str]] = []
+        pending_history = list(committed_history)
+        before_url = start_url
+    else:
+        obs = env.reset(str(resume["url"]))
+        resume_len = int(resume["history_len"])
+        expected_observation = str(resume.get("expected_observation") or "")
+        if expected_observation and obs.strip() != expected_observation.strip():
+            return {
+                "observation": obs,
+                "history": [],
+                "status": "Error: checkpoint_observation_mismatch",
+                "keep_going": False,
+                "error_stage": "checkpoint_restore",
+                "before_progress": None,
+                "after_progress": None,
+                "before_observation": obs,
+                "before_url": str(resume["url"]),
+            }
+        prompt_history = list(committed_history[:resume_len])
+        pending_history = list(committed_history[resume_len:])
+        before_url = str(resume["url"])
     before_observation = obs
-    before_url = start_url
 
-    for _, action in committed_history:
+    for index, (committed_obs, action) in enumerate(pending_history):
         keep_going, status = env.step(action)
-        obs = env.get_observation()
+        failed = isinstance(status, str) and status.startswith("Error:")
+        if resume is None or failed or not keep_going or index == len(pending_history) - 1:
+            obs = env.get_observation()
+        else:
+            obs = committed_obs
         prompt_history.append((obs, action))
-        if isinstance(status, str) and status.startswith("Error:"):
+        if failed:
             return {
                 "observation": obs,
                 "history": prompt_history,
@@ -1710,6 +1708,243 @@ def _tree_search_prune_action(
     return False, heuristic_score, heuristic_notes
 
 
+def _score_branch_in_runtime(
+    active_client: Any,
+    sim_env: BrowserEnv,
+    runtime_base_url: str,
+    spec: Dict[str, Any],
+    goal: str,
+    start_url: str,
+    base_url: str,
+    committed_history: List[Tuple[str, str]],
+    branch_actions: List[str],
+    value_samples: int,
+    value_temperature: float,
+    value_max_tokens: int,
+    skill_context: Optional[Dict[str, Any]] = None,
+    checkpoint: Any = None,
+    rewind: Optional[Callable[[], BrowserEnv]] = None,
+) -> Dict[str, Any]:
+    branch_start_url = _remap_runtime_url(
+        start_url,
+        source_base_url=base_url,
+        target_base_url=runtime_base_url,
+    )
+    rewritten_history = [
+        (
+            old_obs,
+            _rewrite_action_for_runtime(
+                old_action,
+                source_base_url=base_url,
+                target_base_url=runtime_base_url,
+            ),
+        )
+        for old_obs, old_action in committed_history
+    ]
+    rewritten_branch_actions = [
+        _rewrite_action_for_runtime(
+            action,
+            source_base_url=base_url,
+            target_base_url=runtime_base_url,
+        )
+        for action in branch_actions
+    ]
+    resume = None
+    if checkpoint is not None:
+        resume = {
+            "url": _remap_runtime_url(checkpoint.url, source_base_url=base_url, target_base_url=runtime_base_url),
+            "history_len": checkpoint.history_len,
+            "expected_observation": str(committed_history[checkpoint.history_len - 1][0]).replace(
+                base_url, runtime_base_url
+            ),
+        }
+    replay = _replay_actions(
+        env=sim_env,
+        start_url=branch_start_url,
+        committed_history=rewritten_history,
+        branch_actions=rewritten_branch_actions,
+        spec=spec,
+        resume=resume,
+    )
+    branch_start = "replay"
+    if resume is not None:
+        branch_start = "checkpoint"
+        if replay.get("error_stage") == "checkpoint_restore" and rewind is not None:
+            branch_start = "checkpoint_fallback"
+            sim_env = rewind()
+            replay = _replay_actions(
+                env=sim_env,
+                start_url=branch_start_url,
+                committed_history=rewritten_history,
+                branch_actions=rewritten_branch_actions,
+                spec=spec,
+            )
+    current_obs = replay.get("observation", "")
+    prompt_history = replay.get("history", list(rewritten_history))
+    current_url = _observation_url(current_obs, sim_env.page.url if sim_env.page else branch_start_url)
+    status = str(replay.get("status", "") or "")
+    keep_going = bool(replay.get("keep_going", False))
+    before_progress = replay.get("before_progress") or {}
+    after_progress = replay.get("after_progress") or {}
+    before_observation = str(replay.get("before_observation", ""))
+    before_url = str(replay.get("before_url", branch_start_url))
+    last_committed_action = committed_history[-1][1] if committed_history else None
+    if len(branch_actions) >= 2:
+        last_committed_action = branch_actions[-2]
+    branch_heuristic_score = 0.0
+    branch_heuristic_notes: List[str] = []
+    if branch_actions and score_action_heuristics is not None:
+        branch_heuristic_score, branch_heuristic_notes = score_action_heuristics(
+            action=branch_actions[-1],
+            observation=before_observation,
+            last_action=last_committed_action,
+            current_url=before_url,
+            base_url=base_url,
+            skill_context=skill_context,
+        )
+
+    model_value = _evaluate_tree_search_value(
+        client=active_client,
+        goal=goal,
+        current_url=current_url,
+        current_observation=current_obs,
+        history=prompt_history,
+        num_samples=value_samples,
+        temperature=value_temperature,
+        max_tokens=value_max_tokens,
+    )
+    progress_delta = _score_progress_delta(before_progress, after_progress) if before_progress or after_progress else 0.0
+    progress_component = max(-1.5, min(2.5, progress_delta / 3.0))
+    heuristic_component = max(-1.5, min(1.5, branch_heuristic_score / 3.0))
+    status_lower = status.strip().lower()
+    branch_changed_state = status_lower in {"typed", "selected", "clicked", "navigated"}
+    status_component = 0.4 if branch_changed_state else 0.0
+    no_change_penalty = 0.0
+    if before_url == current_url and before_observation.strip() == current_obs.strip() and progress_delta <= 0:
+        no_change_penalty -= 0.25 if branch_changed_state else 1.5
+    if branch_actions and last_committed_action and branch_actions[-1] == last_committed_action:
+        no_change_penalty -= 1.5
+    if len(branch_actions) >= 2 and branch_actions[-1] == branch_actions[-2]:
+        no_change_penalty -= 1.0
+
+    value_score = model_value + progress_component + heuristic_component + status_component + no_change_penalty
+    if status.startswith("Error:"):
+        value_score = min(value_score, -2.0)
+
+    return {
+        "value_score": float(value_score),
+        "model_value": float(model_value),
+        "progress_delta": float(progress_delta),
+        "heuristic_score": float(branch_heuristic_score),
+        "heuristic_notes": list(branch_heuristic_notes),
+        "status": status,
+        "keep_going": keep_going,
+        "observation": current_obs,
+        "history": prompt_history,
+        "current_url": current_url,
+        "branch_start": branch_start,
+    }
+
+
+def _branch_env_kwargs(spec: Dict[str, Any], runtime_base_url: str) -> Dict[str, Any]:
+    return {
+        "base_url": runtime_base_url,
+        "task_id": str(spec.get("task_id") or ""),
+        "binding_task_id": str(
+            spec.get("binding_task_id")
+            or spec.get("backing_task_id")
+            or spec.get("source_task_id")
+            or spec.get("task_id")
+            or ""
+        ),
+        "allowed_domains": spec.get("allowed_domains") or [],
+        "task_inputs": spec.get("inputs") or {},
+    }
+
+
+def _branch_workers() -> int:
+    return _parse_int_env("WEBAGENT_BRANCH_WORKERS", 1)
+
+
+def _branch_runtime_pool():
+    if shared_branch_pool is None or not _parse_bool_env("WEBAGENT_BRANCH_POOL", True):
+        return None
+    return shared_branch_pool(max(_parse_int_env("WEBAGENT_BRANCH_POOL_SIZE", 1), _branch_workers()))
+
+
+def _parallel_map(fn, items: List[Any], workers: int) -> List[Any]:
+    """Map ``fn`` over ``items`` on up to ``workers`` threads, keeping input order.
+
+    Callers merge results in input (node id) order, so the outcome does not
+    depend on which branch finished first.
+    """
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix="branch-eval") as executor:
+        return list(executor.map(fn, items))
+
+
+def _is_checkpoint_step(action: str, url_before: str, url_after: str) -> bool:
+    """True when the step left a freshly loaded page, which is what a checkpoint restores."""
+    if url_before.split("#", 1)[0] != url_after.split("#", 1)[0]:
+        return True
+    return str(action or "").strip().upper().startswith("GOTO(")
+
+
+def _usable_checkpoint(task_start_snapshot: Any, committed_history: List[Tuple[str, str]]) -> Any:
+    """Return the newest decision checkpoint a branch can resume from, if any."""
+    if not _parse_bool_env("WEBAGENT_BRANCH_CHECKPOINTS", True):
+        return None
+    checkpoint = getattr(task_start_snapshot, "latest_checkpoint", None)
+    if checkpoint is None or not checkpoint.url:
+        return None
+    if not 0 < checkpoint.history_len <= len(committed_history):
+        return None
+    return checkpoint
+
+
+def _remap_storage_state(
+    storage_state: Optional[Dict[str, Any]],
+    source_base_url: str,
+    target_base_url: str,
+) -> Optional[Dict[str, Any]]:
+    """Point localStorage origins captured on the main server at a branch server."""
+    if not storage_state:
+        return None
+    origins = []
+    for entry in storage_state.get("origins") or []:
+        entry = dict(entry)
+        entry["origin"] = _remap_runtime_url(
+            str(entry.get("origin") or ""),
+            source_base_url=source_base_url,
+            target_base_url=target_base_url,
+        ).rstrip("/")
+        origins.append(entry)
+    # Cookies are scoped by host, not port, so they carry over unchanged.
+    return {"cookies": list(storage_state.get("cookies") or []), "origins": origins}
+
+
+def _record_branch_start(task_start_snapshot: Any, result: Dict[str, Any]) -> Dict[str, Any]:
+    branch_start = result.get("branch_start")
+    if branch_start == "checkpoint":
+        task_start_snapshot.record_checkpoint_event("resumed")
+    elif branch_start == "checkpoint_fallback":
+        task_start_snapshot.record_checkpoint_event("fallback_replays")
+    return result
+
+
+def _branch_unavailable_result(status: str, committed_history: List[Tuple[str, str]], start_url: str) -> Dict[str, Any]:
+    return {
+        "value_score": 0.0,
+        "status": status,
+        "keep_going": False,
+        "observation": "",
+        "history": list(committed_history),
+        "current_url": start_url,
+    }
+
+
 def _evaluate_branch_sequence(
     active_client: Any,
     task_start_snapshot: Any,
@@ -1726,135 +1961,98 @@ def _evaluate_branch_sequence(
     skill_context: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     if TemporaryBranchRuntime is None or TaskRuntimeSnapshot is None or task_start_snapshot is None:
-        return {
-            "value_score": 0.0,
-            "status": "Error: branch_runtime_unavailable",
-            "keep_going": False,
-            "observation": "",
-            "history": list(committed_history),
-            "current_url": start_url,
-        }
+        return _branch_unavailable_result("Error: branch_runtime_unavailable", committed_history, start_url)
+
+    score_kwargs = {
+        "active_client": active_client,
+        "spec": spec,
+        "goal": goal,
+        "start_url": start_url,
+        "base_url": base_url,
+        "committed_history": committed_history,
+        "branch_actions": branch_actions,
+        "value_samples": value_samples,
+        "value_temperature": value_temperature,
+        "value_max_tokens": value_max_tokens,
+        "skill_context": skill_context,
+    }
+
+    checkpoint = _usable_checkpoint(task_start_snapshot, committed_history)
+    start_snapshot = checkpoint or task_start_snapshot
+
+    def _storage_state(runtime_base_url: str) -> Optional[Dict[str, Any]]:
+        if checkpoint is None:
+            return None
+        return _remap_storage_state(checkpoint.storage_state, base_url, runtime_base_url)
+
+    pool = _branch_runtime_pool()
+    if pool is not None:
+        def _pooled_job(worker: Any) -> Dict[str, Any]:
+            with worker.runtime.activate_thread():
+                env_kwargs = _branch_env_kwargs(spec, worker.runtime.base_url)
+                storage_state = _storage_state(worker.runtime.base_url)
+                if worker.browser_env is None:
+                    # The worker already keeps its own browser across leases.
+                    worker.browser_env = BrowserEnv(
+                        headless=headless,
+                        storage_state=storage_state,
+                        reuse_browser=False,
+                        **env_kwargs,
+                    )
+                else:
+                    worker.browser_env.new_context(storage_state=storage_state, **env_kwargs)
+
+                def _rewind() -> BrowserEnv:
+                    worker.reset_to(task_start_snapshot)
+                    worker.browser_env.new_context(**env_kwargs)
+                    return worker.browser_env
+
+                return _score_branch_in_runtime(
+                    sim_env=worker.browser_env,
+                    runtime_base_url=worker.runtime.base_url,
+                    checkpoint=checkpoint,
+                    rewind=_rewind,
+                    **score_kwargs,
+                )
+
+        try:
+            with pool.lease(start_snapshot) as worker:
+                return _record_branch_start(task_start_snapshot, worker.call(_pooled_job))
+        except BaseException as exc:  # noqa: BLE001
+            return _branch_unavailable_result(f"Error: branch_eval_exception:{exc}", committed_history, start_url)
+
     result_holder: Dict[str, Any] = {}
     error_holder: Dict[str, BaseException] = {}
 
     def _worker() -> None:
         branch_runtime = None
         sim_env = None
-        previous_env = None
         try:
-            branch_runtime = TemporaryBranchRuntime.from_snapshot(task_start_snapshot)
-            previous_env = branch_runtime.activate_env()
-            sim_env = BrowserEnv(
-                headless=headless,
-                base_url=branch_runtime.base_url,
-                task_id=str(spec.get("task_id") or ""),
-                binding_task_id=str(
-                    spec.get("binding_task_id")
-                    or spec.get("backing_task_id")
-                    or spec.get("source_task_id")
-                    or spec.get("task_id")
-                    or ""
-                ),
-                allowed_domains=spec.get("allowed_domains") or [],
-                task_inputs=spec.get("inputs") or {},
-            )
-            branch_start_url = _remap_runtime_url(
-                start_url,
-                source_base_url=base_url,
-                target_base_url=branch_runtime.base_url,
-            )
-            rewritten_history = [
-                (
-                    old_obs,
-                    _rewrite_action_for_runtime(
-                        old_action,
-                        source_base_url=base_url,
-                        target_base_url=branch_runtime.base_url,
-                    ),
-                )
-                for old_obs, old_action in committed_history
-            ]
-            rewritten_branch_actions = [
-                _rewrite_action_for_runtime(
-                    action,
-                    source_base_url=base_url,
-                    target_base_url=branch_runtime.base_url,
-                )
-                for action in branch_actions
-            ]
-            replay = _replay_actions(
-                env=sim_env,
-                start_url=branch_start_url,
-                committed_history=rewritten_history,
-                branch_actions=rewritten_branch_actions,
-                spec=spec,
-            )
-            current_obs = replay.get("observation", "")
-            prompt_history = replay.get("history", list(rewritten_history))
-            current_url = _observation_url(current_obs, sim_env.page.url if sim_env.page else branch_start_url)
-            status = str(replay.get("status", "") or "")
-            keep_going = bool(replay.get("keep_going", False))
-            before_progress = replay.get("before_progress") or {}
-            after_progress = replay.get("after_progress") or {}
-            before_observation = str(replay.get("before_observation", ""))
-            before_url = str(replay.get("before_url", branch_start_url))
-            last_committed_action = committed_history[-1][1] if committed_history else None
-            if len(branch_actions) >= 2:
-                last_committed_action = branch_actions[-2]
-            branch_heuristic_score = 0.0
-            branch_heuristic_notes: List[str] = []
-            if branch_actions and score_action_heuristics is not None:
-                branch_heuristic_score, branch_heuristic_notes = score_action_heuristics(
-                    action=branch_actions[-1],
-                    observation=before_observation,
-                    last_action=last_committed_action,
-                    current_url=before_url,
-                    base_url=base_url,
-                    skill_context=skill_context,
+            branch_runtime = TemporaryBranchRuntime.from_snapshot(start_snapshot)
+            with branch_runtime.activate_thread():
+                env_kwargs = _branch_env_kwargs(spec, branch_runtime.base_url)
+                # One-shot thread: a shared browser would outlive it.
+                sim_env = BrowserEnv(
+                    headless=headless,
+                    storage_state=_storage_state(branch_runtime.base_url),
+                    reuse_browser=False,
+                    **env_kwargs,
                 )
 
-            model_value = _evaluate_tree_search_value(
-                client=active_client,
-                goal=goal,
-                current_url=current_url,
-                current_observation=current_obs,
-                history=prompt_history,
-                num_samples=value_samples,
-                temperature=value_temperature,
-                max_tokens=value_max_tokens,
-            )
-            progress_delta = _score_progress_delta(before_progress, after_progress) if before_progress or after_progress else 0.0
-            progress_component = max(-1.5, min(2.5, progress_delta / 3.0))
-            heuristic_component = max(-1.5, min(1.5, branch_heuristic_score / 3.0))
-            status_lower = status.strip().lower()
-            branch_changed_state = status_lower in {"typed", "selected", "clicked", "navigated"}
-            status_component = 0.4 if branch_changed_state else 0.0
-            no_change_penalty = 0.0
-            if before_url == current_url and before_observation.strip() == current_obs.strip() and progress_delta <= 0:
-                no_change_penalty -= 0.25 if branch_changed_state else 1.5
-            if branch_actions and last_committed_action and branch_actions[-1] == last_committed_action:
-                no_change_penalty -= 1.5
-            if len(branch_actions) >= 2 and branch_actions[-1] == branch_actions[-2]:
-                no_change_penalty -= 1.0
-
-            value_score = model_value + progress_component + heuristic_component + status_component + no_change_penalty
-            if status.startswith("Error:"):
-                value_score = min(value_score, -2.0)
-
-            result_holder.update(
-                {
-                    "value_score": float(value_score),
-                    "model_value": float(model_value),
-                    "progress_delta": float(progress_delta),
-                    "heuristic_score": float(branch_heuristic_score),
-                    "heuristic_notes": list(branch_heuristic_notes),
-                    "status": status,
-                    "keep_going": keep_going,
-                    "observation": current_obs,
-                    "history": prompt_history,
-                    "current_url": current_url,
-                }
-            )
+                def _rewind() -> BrowserEnv:
+                    branch_runtime.restore(task_start_snapshot)
+                    sim_env.new_context(**env_kwargs)
+                    return sim_env
+
+                result_holder.update(
+                    _score_branch_in_runtime(
+                        sim_env=sim_env,
+                        runtime_base_url=branch_runtime.base_url,
+                        checkpoint=checkpoint,
+                        rewind=_rewind,
+                        **score_kwargs,
+                    )
+                )
         except BaseException as exc:  # noqa: BLE001
             error_holder["exc"] = exc
         finally:
@@ -1863,8 +2061,6 @@ def _evaluate_branch_sequence(
                     sim_env.close()
             except Exception:
                 pass
-            if previous_env is not None:
-                TemporaryBranchRuntime.restore_env(previous_env)
             if branch_runtime is not None:
                 branch_runtime.close()
 
@@ -1872,22 +2068,10 @@ def _evaluate_branch_sequence(
     worker.start()
     worker.join()
     if "exc" in error_holder:
-        return {
-            "value_score": 0.0,
-            "status": f"Error: branch_eval_exception:{error_holder['exc']}",
-            "keep_going": False,
-            "observation": "",
-            "history": list(committed_history),
-            "current_url": start_url,
-        }
-    return result_holder or {
-        "value_score": 0.0,
-        "status": "Error: branch_eval_no_result",
-        "keep_going": False,
-        "observation": "",
-        "history": list(committed_history),
-        "current_url": start_url,
-    }
+        return _branch_unavailable_result(f"Error: branch_eval_exception:{error_holder['exc']}", committed_history, start_url)
+    if not result_holder:
+        return _branch_unavailable_result("Error: branch_eval_no_result", committed_history, start_url)
+    return _record_branch_start(task_start_snapshot, result_holder)
 
 
 def _sample_branch_actions(
@@ -1994,68 +2178,79 @@ def _run_tree_search(
     search_counter = 0
     search_log: List[str] = []
 
-    while frontier and search_counter < cfg["search_budget"]:
-        neg_priority, depth, _, action_seq = heapq.heappop(frontier)
-        result = _evaluate_branch_sequence(
-            active_client=active_client,
-            task_start_snapshot=task_start_snapshot,
-            spec=spec,
-            goal=goal,
-            start_url=start_url,
-            base_url=base_url,
-            committed_history=history,
-            branch_actions=action_seq,
-            headless=headless,
-            value_samples=cfg["value_samples"],
-            value_temperature=cfg["value_temperature"],
-            value_max_tokens=cfg["value_max_tokens"],
-            skill_context=skill_context,
+    workers = _branch_workers()
+    terminated = False
+    while frontier and search_counter < cfg["search_budget"] and not terminated:
+        # Expand the top-k frontier nodes together; the heap key ends with the
+        # node id, so the batch (and its merge order) is deterministic.
+        batch_size = min(workers, cfg["search_budget"] - search_counter, len(frontier))
+        batch = [heapq.heappop(frontier) for _ in range(batch_size)]
+        results = _parallel_map(
+            lambda node: _evaluate_branch_sequence(
+                active_client=active_client,
+                task_start_snapshot=task_start_snapshot,
+                spec=spec,
+                goal=goal,
+                start_url=start_url,
+                base_url=base_url,
+                committed_history=history,
+                branch_actions=node[3],
+                headless=headless,
+                value_samples=cfg["value_samples"],
+                value_temperature=cfg["value_temperature"],
+                value_max_tokens=cfg["value_max_tokens"],
+                skill_context=skill_context,
+            ),
+            batch,
+            workers,
         )
-        value = float(result.get("value_score", 0.0))
-        search_counter += 1
-        search_log.append(
-            "  - depth={depth} seq={seq} | value={value:.2f} | model={model:.2f} | progress={progress:.2f} "
-            "| heuristic={heuristic:.2f} | notes={notes} | status={status}".format(
-                depth=depth,
-                seq=action_seq,
-                value=value,
-                model=float(result.get("model_value", 0.0)),
-                progress=float(result.get("progress_delta", 0.0)),
-                heuristic=float(result.get("heuristic_score", 0.0)),
-                notes=",".join(result.get("heuristic_notes", [])),
-                status=result.get("status", ""),
+        for (neg_priority, depth, _, action_seq), result in zip(batch, results):
+            value = float(result.get("value_score", 0.0))
+            search_counter += 1
+            search_log.append(
+                "  - depth={depth} seq={seq} | value={value:.2f} | model={model:.2f} | progress={progress:.2f} "
+                "| heuristic={heuristic:.2f} | notes={notes} | status={status}".format(
+                    depth=depth,
+                    seq=action_seq,
+                    value=value,
+                    model=float(result.get("model_value", 0.0)),
+                    progress=float(result.get("progress_delta", 0.0)),
+                    heuristic=float(result.get("heuristic_score", 0.0)),
+                    notes=",".join(result.get("heuristic_notes", [])),
+                    status=result.get("status", ""),
+                )
             )
-        )
 
-        if value > best_value:
-            best_value = value
-            best_actions = list(action_seq)
+            if value > best_value:
+                best_value = value
+                best_actions = list(action_seq)
 
-        if value >= cfg["termination_threshold"]:
-            break
+            if value >= cfg["termination_threshold"]:
+                terminated = True
+                break
 
-        if depth + 1 >= cfg["max_depth"]:
-            continue
-        if str(result.get("status", "")).startswith("Error:") or not result.get("keep_going", False):
-            continue
+            if depth + 1 >= cfg["max_depth"]:
+                continue
+            if str(result.get("status", "")).startswith("Error:") or not result.get("keep_going", False):
+                continue
 
-        next_actions = _sample_branch_actions(
-            active_client=active_client,
-            goal=goal,
-            observation=str(result.get("observation", "")),
-            history=list(result.get("history", history)),
-            num_samples=cfg["branching_factor"],
-            temperature=cfg["proposal_temperature"],
-            current_url=str(result.get("current_url", current_url)),
-            base_url=base_url,
-            candidate_pool=cfg["candidate_pool"],
-            max_sampling_rounds=cfg["max_sampling_rounds"],
-            min_action_score=cfg["min_action_score"],
-            skill_context=skill_context,
-        )
-        for next_action in next_actions:
-            heapq.heappush(frontier, (-value, depth + 1, counter, action_seq + [next_action]))
-            counter += 1
+            next_actions = _sample_branch_actions(
+                active_client=active_client,
+                goal=goal,
+                observation=str(result.get("observation", "")),
+                history=list(result.get("history", history)),
+                num_samples=cfg["branching_factor"],
+                temperature=cfg["proposal_temperature"],
+                current_url=str(result.get("current_url", current_url)),
+                base_url=base_url,
+                candidate_pool=cfg["candidate_pool"],
+                max_sampling_rounds=cfg["max_sampling_rounds"],
+                min_action_score=cfg["min_action_score"],
+                skill_context=skill_context,
+            )
+            for next_action in next_actions:
+                heapq.heappush(frontier, (-value, depth + 1, counter, action_seq + [next_action]))
+                counter += 1
 
     log("🔎 TreeSearch expansions:")
     for line in search_log[: min(len(search_log), 12)]:
@@ -2287,8 +2482,7 @@ def _run_best_of_n(
         for _, candidate in pre_rank[: max(1, min(cfg["branch_top_k"], len(pre_rank)))]
     }
 
-    results: List[Dict[str, Any]] = []
-    for candidate in candidates:
+    def _score_candidate(candidate: str) -> Dict[str, Any]:
         normalized_candidate = normalize_action(candidate)
         heuristic_score, heuristic_notes = heuristic_cache.get(normalized_candidate, (0.0, []))
         branch_status = ""
@@ -2355,21 +2549,24 @@ def _run_best_of_n(
         if branch_status.startswith("Error:"):
             score -= 3.0
 
-        results.append(
-            {
-                "action": normalized_candidate,
-                "score": float(score),
-                "model_value": float(model_value),
-                "progress_delta": float(branch_progress),
-                "heuristic_score": float(heuristic_score),
-                "heuristic_notes": list(heuristic_notes),
-                "status": branch_status or "(not executed)",
-                "valid": bool(is_valid),
-                "on_track": bool(is_on_track),
-                "hard_invalid": bool(hard_invalid),
-            }
-        )
+        return {
+            "action": normalized_candidate,
+            "score": float(score),
+            "model_value": float(model_value),
+            "progress_delta": float(branch_progress),
+            "heuristic_score": float(heuristic_score),
+            "heuristic_notes": list(heuristic_notes),
+            "status": branch_status or "(not executed)",
+            "valid": bool(is_valid),
+            "on_track": bool(is_on_track),
+            "hard_invalid": bool(hard_invalid),
+        }
 
+    # Branch rollouts and verifier prompts for all candidates run on the
+    # branch worker pool; results come back in candidate order.
+    results: List[Dict[str, Any]] = _parallel_map(_score_candidate, candidates, _branch_workers())
+
+    # list.sort is stable (also with reverse=True), so ties keep candidate order.
     results.sort(
         key=lambda item: (
             item["score"],
@@ -3087,6 +3284,9 @@ def execute_agent_task(
     log(f"🚀 Starting Agent: {task_id}")
     env = None
     active_client = client or build_client()
+    client_stats = getattr(active_client, "stats", None)
+    # The client may be shared across tasks; results carry this task's share.
+    client_stats_before = client_stats() if callable(client_stats) else None
 
     last_action = None
     repeat_count = 0
@@ -3181,6 +3381,7 @@ def execute_agent_task(
                 log(f"🛑 Agent stuck in UI loop (same action x{repeat_count}). Aborting.")
                 break
 
+            url_before_step = env.page.url
             keep_going, status = env.step(action)
             last_step_status = status or ""
             if last_step_status:
@@ -3207,6 +3408,20 @@ def execute_agent_task(
             if not keep_going:
                 task_end_reason = "agent_done"
                 break
+            if task_start_snapshot is not None and _is_checkpoint_step(action, url_before_step, env.page.url):
+                # Branches resume from the last freshly loaded page instead of
+                # replaying the whole episode; actions taken on the page since
+                # then are replayed on top of the checkpoint.
+                try:
+                    task_start_snapshot.set_checkpoint(
+                        TaskRuntimeSnapshot.capture(
+                            url=env.page.url,
+                            storage_state=env.storage_state(),
+                            history_len=len(history),
+                        )
+                    )
+                except Exception as exc:
+                    log(f"⚠️ Failed to capture decision checkpoint: {exc}")
 
         log("\n✅ Execution finished. Verifying...")
         time.sleep(2)
@@ -3240,32 +3455,11 @@ def execute_agent_task(
             verify_error = f"memory_snapshot_error: {exc}"
             memory = {}
 
-        def env_api(channel, path):
-            state_path = runtime_state_path()
-            if not state_path.exists():
-                return None
-            try:
-                current = json.loads(state_path.read_text(encoding="utf-8"))
-            except Exception:
-                return None
-
-            for part in path.split("."):
-                if isinstance(current, dict):
-                    current = current.get(part)
-                elif isinstance(current, list):
-                    try:
-                        current = current[int(part)]
-                    except Exception:
-                        return None
-                else:
-                    return None
-                if current is None:
-                    return None
-            return current
+        env_api = _build_env_api()
 
         if env is None:
             raise RuntimeError("browser_env_not_initialized")
-        dsl = AssertionDSL(env.page, memory, env_api)
+        dsl = AssertionDSL(env.page, memory, env_api, snapshot=True, memory_source=memory_cache(runtime_db_path()))
         criteria = spec.get("success_criteria", [])
         criteria_total = len(criteria)
         criteria_all_passed = True
@@ -3491,6 +3685,16 @@ def execute_agent_task(
             "verify_error": verify_error,
             "raw_output": "".join(logs),
         }
+        branch_pool_stats = shared_branch_pool_stats() if shared_branch_pool_stats is not None else {}
+        if branch_pool_stats:
+            result_payload["branch_pool"] = branch_pool_stats
+        if task_start_snapshot is not None:
+            result_payload["decision_checkpoints"] = dict(task_start_snapshot.checkpoint_stats)
+        browser_stats = browser_manager_stats()
+        if browser_stats["managers"]:
+            result_payload["browser_manager"] = browser_stats
+        if client_stats_before is not None:
+            result_payload["llm_client_stats"] = stats_delta(client_stats_before, client_stats())
         if reflection_write_store is not None:
             try:
                 reflection_write_store.append(
@@ -0,0 +1,219 @@
+"""Incremental reads of the ``memory_kv`` table.
+
+Triggers on ``memory_kv`` append every touched key to ``memory_kv_changes``,
+whose ``seq`` only grows.  ``MemoryKVCache`` keeps a decoded copy of the table
+and, on refresh, fetches only the keys logged after the last ``seq`` it saw
+instead of re-reading and re-decoding every row.
+
+The log keeps only the last ``CHANGELOG_KEEP`` changes: a trigger deletes
+older rows as new ones arrive, so long runs (and the SQLite backups taken
+of them) do not grow with every write.
+
+Each change row also carries a random ``token``.  If the row at the cached
+``seq`` is gone or has a different token, the database was re-initialized,
+restored from a snapshot or pruned past the cache, and the cache falls back
+to a full load.
+Databases without the changelog are always fully loaded.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+CHANGELOG_KEEP = 4096
+
+CHANGELOG_DDL = f"""
+CREATE TABLE IF NOT EXISTS memory_kv_changes (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  key TEXT NOT NULL,
+  token BLOB NOT NULL DEFAULT (randomblob(8))
+);
+CREATE TRIGGER IF NOT EXISTS memory_kv_changes_insert AFTER INSERT ON memory_kv
+BEGIN
+  INSERT INTO memory_kv_changes(key) VALUES (NEW.key);
+END;
+CREATE TRIGGER IF NOT EXISTS memory_kv_changes_update AFTER UPDATE ON memory_kv
+BEGIN
+  INSERT INTO memory_kv_changes(key) VALUES (NEW.key);
+  INSERT INTO memory_kv_changes(key) SELECT OLD.key WHERE OLD.key IS NOT NEW.key;
+END;
+CREATE TRIGGER IF NOT EXISTS memory_kv_changes_delete AFTER DELETE ON memory_kv
+BEGIN
+  INSERT INTO memory_kv_changes(key) VALUES (OLD.key);
+END;
+CREATE TRIGGER IF NOT EXISTS memory_kv_changes_prune AFTER INSERT ON memory_kv_changes
+BEGIN
+  DELETE FROM memory_kv_changes WHERE seq <= NEW.seq - {CHANGELOG_KEEP};
+END;
+"""
+
+_FETCH_CHUNK = 500
+_MAX_CACHES = 16
+
+
+def ensure_memory_changelog(conn: sqlite3.Connection) -> None:
+    """Install the changelog table and triggers (idempotent) and trim an overgrown log."""
+    conn.executescript(CHANGELOG_DDL)
+    conn.execute(
+        "DELETE FROM memory_kv_changes WHERE seq <= (SELECT MAX(seq) FROM memory_kv_changes) - ?",
+        (CHANGELOG_KEEP,),
+    )
+    conn.commit()
+
+
+def decode_memory_value(raw: Any) -> Any:
+    try:
+        return json.loads(raw)
+    except Exception:
+        return raw
+
+
+class MemoryKVCache:
+    def __init__(self, db_path: str | Path, timeout: float = 5.0):
+        self.db_path = Path(db_path)
+        self.timeout = timeout
+        self.memory: dict[str, Any] = {}
+        self._conn: sqlite3.Connection | None = None
+        self._conn_ino: int | None = None
+        self._seq: int | None = None
+        self._token: bytes | None = None
+        self._lock = threading.Lock()
+        self.stats = {"full_loads": 0, "delta_loads": 0, "rows_fetched": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        ino = os.stat(self.db_path).st_ino
+        if self._conn is not None and ino != self._conn_ino:
+            # The file was replaced (e.g. init_db removed and recreated it).
+            self._close()
+        if self._conn is None:
+            self._conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            self._conn_ino = ino
+        return self._conn
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._seq = None
+        self._token = None
+
+    def refresh(self) -> dict[str, Any]:
+        """Bring ``memory`` up to date; returns the entries (re)loaded by this call.
+
+        Deleted keys are dropped from ``memory``; they are not part of the
+        returned dict.
+        """
+        last_error: Exception | None = None
+        for _ in range(5):
+            with self._lock:
+                try:
+                    return self._refresh_locked()
+                except sqlite3.OperationalError as exc:
+                    last_error = exc
+                    self._close()
+            time.sleep(0.2)
+        assert last_error is not None
+        raise last_error
+
+    def snapshot(self) -> dict[str, Any]:
+        """Refreshed copy of the whole table, decoded like the old full reads."""
+        self.refresh()
+        with self._lock:
+            return dict(self.memory)
+
+    def change_token(self) -> Any:
+        """Cheap fingerprint that moves whenever another connection commits to the database."""
+        with self._lock:
+            try:
+                conn = self._connection()
+                return (self._conn_ino, id(conn), conn.execute("PRAGMA data_version").fetchone()[0])
+            except (OSError, sqlite3.Error):
+                self._close()
+                return None
+
+    def _refresh_locked(self) -> dict[str, Any]:
+        conn = self._connection()
+        # One read transaction: the seq and the values belong to the same version.
+        conn.execute("BEGIN")
+        try:
+            head = self._changelog_head(conn)
+            if head is None or self._seq is None or not self._continues(conn):
+                changed = self._full_load(conn)
+            else:
+                changed = self._delta_load(conn)
+            self._seq, self._token = head if head is not None else (None, None)
+            return changed
+        finally:
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _changelog_head(conn: sqlite3.Connection) -> tuple[int, bytes] | None:
+        try:
+            row = conn.execute("SELECT seq, token FROM memory_kv_changes ORDER BY seq DESC LIMIT 1").fetchone()
+        except sqlite3.OperationalError as exc:
+            if "no such table" in str(exc):
+                return None
+            raise
+        return (int(row[0]), bytes(row[1])) if row is not None else (0, b"")
+
+    def _continues(self, conn: sqlite3.Connection) -> bool:
+        if self._seq == 0:
+            # Nothing logged yet: only the row count can reveal a re-seeded table.
+            return conn.execute("SELECT COUNT(*) FROM memory_kv").fetchone()[0] == len(self.memory)
+        row = conn.execute("SELECT token FROM memory_kv_changes WHERE seq = ?", (self._seq,)).fetchone()
+        return row is not None and bytes(row[0]) == self._token
+
+    def _full_load(self, conn: sqlite3.Connection) -> dict[str, Any]:
+        memory = {key: decode_memory_value(raw) for key, raw in conn.execute("SELECT key, value FROM memory_kv")}
+        self.memory = memory
+        self.stats["full_loads"] += 1
+        self.stats["rows_fetched"] += len(memory)
+        return dict(memory)
+
+    def _delta_load(self, conn: sqlite3.Connection) -> dict[str, Any]:
+        keys = [row[0] for row in conn.execute("SELECT DISTINCT key FROM memory_kv_changes WHERE seq > ?", (self._seq,))]
+        changed: dict[str, Any] = {}
+        for start in range(0, len(keys), _FETCH_CHUNK):
+            chunk = keys[start:start + _FETCH_CHUNK]
+            placeholders = ",".join("?" for _ in chunk)
+            for key, raw in conn.execute(f"SELECT key, value FROM memory_kv WHERE key IN ({placeholders})", chunk):
+                changed[key] = decode_memory_value(raw)
+        for key in keys:
+            if key not in changed:
+                self.memory.pop(key, None)
+        self.memory.update(changed)
+        self.stats["delta_loads"] += 1
+        self.stats["rows_fetched"] += len(changed)
+        return changed
+
+
+_CACHES: "OrderedDict[str, MemoryKVCache]" = OrderedDict()
+_CACHES_LOCK = threading.Lock()
+
+
+def memory_cache(db_path: str | Path) -> MemoryKVCache:
+    """Process-wide cache for ``db_path`` (branch runtimes each get their own)."""
+    key = os.path.abspath(str(db_path))
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = _CACHES[key] = MemoryKVCache(key)
+        _CACHES.move_to_end(key)
+        while len(_CACHES) > _MAX_CACHES:
+            _, evicted = _CACHES.popitem(last=False)
+            with evicted._lock:
+                evicted._close()
+        return cache
+
+
+def load_memory_snapshot(db_path: str | Path) -> dict[str, Any]:
+    return memory_cache(db_path).snapshot()
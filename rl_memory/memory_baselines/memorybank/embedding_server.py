@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Serve text embeddings to several worker processes over a Unix socket.
+
+Start once per machine (or GPU) and point workers at it::
+
+    python -m rl_memory.memory_baselines.memorybank.embedding_server \\
+        --socket /tmp/memorybank-embed.sock --device cuda:0
+
+    export AGENT_MEMORYBANK_EMBED_SOCKET=/tmp/memorybank-embed.sock
+
+Each request is one JSON line ``{"model": ..., "texts": [...]}``; the reply
+is ``{"vectors": [<base64 float32>, ...]}`` or ``{"error": ...}``.  Models
+are loaded on first use and shared by all connections; requests for the
+same model are encoded one at a time, through the same LRU and on-disk
+cache (``AGENT_MEMORYBANK_EMBED_CACHE``) an in-process embedder would use.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from rl_memory.memory_baselines.memorybank.embeddings import CachedEmbedder, EmbeddingCache, HFTextEmbedder, pack_vector
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str | Path, load_backend: Callable[[str], Any], max_entries: int = 4096):
+        self.socket_path = str(socket_path)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._load_backend = load_backend
+        self._max_entries = max_entries
+        self._disk = EmbeddingCache.from_env()
+        self._embedders: dict[str, tuple[CachedEmbedder, threading.Lock]] = {}
+        self._embedders_lock = threading.Lock()
+        super().__init__(self.socket_path, _EmbeddingHandler)
+
+    def embedder(self, model_name: str) -> tuple[CachedEmbedder, threading.Lock]:
+        with self._embedders_lock:
+            entry = self._embedders.get(model_name)
+            if entry is None:
+                embedder = CachedEmbedder(self._load_backend(model_name), disk=self._disk, max_entries=self._max_entries)
+                entry = self._embedders[model_name] = (embedder, threading.Lock())
+            return entry
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+class _EmbeddingHandler(socketserver.StreamRequestHandler):
+    server: EmbeddingServer
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                embedder, lock = self.server.embedder(str(request["model"]))
+                with lock:
+                    vectors = embedder.encode_many(request.get("texts") or [])
+                reply = {"vectors": [base64.b64encode(pack_vector(vec)).decode("ascii") for vec in vectors]}
+            except Exception as exc:
+                reply = {"error": f"{type(exc).__name__}: {exc}"}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=os.environ.get("AGENT_MEMORYBANK_EMBED_SOCKET", ""))
+    parser.add_argument("--device", default=os.environ.get("AGENT_MEMORYBANK_EMBED_DEVICE", "cpu"))
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get("AGENT_MEMORYBANK_EMBED_BATCH_SIZE", "32")))
+    parser.add_argument("--no-trust-remote-code", action="store_true")
+    parser.add_argument("--lru-size", type=int, default=int(os.environ.get("AGENT_MEMORYBANK_EMBED_LRU_SIZE", "65536")))
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("--socket (or AGENT_MEMORYBANK_EMBED_SOCKET) is required")
+
+    def load_backend(model_name: str) -> HFTextEmbedder:
+        print(f"[embedding_server] loading {model_name} on {args.device}", flush=True)
+        return HFTextEmbedder(
+            model_name,
+            device=args.device,
+            trust_remote_code=not args.no_trust_remote_code,
+            batch_size=args.batch_size,
+        )
+
+    with EmbeddingServer(args.socket, load_backend, max_entries=args.lru_size) as server:
+        print(f"[embedding_server] listening on {args.socket}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
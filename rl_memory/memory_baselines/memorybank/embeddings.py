@@ -1,11 +1,29 @@
 #!/usr/bin/env python3
-"""Optional dense embedding backend for MemoryBank retrieval."""
+"""Optional dense embedding backend for MemoryBank retrieval.
+
+``get_embedder`` returns one ``CachedEmbedder`` per model and process: an
+in-memory LRU in front of an optional on-disk cache
+(``AGENT_MEMORYBANK_EMBED_CACHE=/path/to/embeddings.sqlite``, keyed by
+model and text hash and shared by every process pointing at it), in front
+of the model.  The model is either loaded in-process (``HFTextEmbedder``)
+or, with ``AGENT_MEMORYBANK_EMBED_SOCKET=/path/to/socket``, served by one
+``embedding_server`` process that all workers share.
+"""
 
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
 import os
+import socket
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Iterable
+from pathlib import Path
+from typing import Any, Iterable
 
 
 def _normalize(vec: list[float]) -> list[float]:
@@ -15,6 +33,16 @@ def _normalize(vec: list[float]) -> list[float]:
     return [v / norm for v in vec]
 
 
+def pack_vector(vec: list[float]) -> bytes:
+    return array("f", vec).tobytes()
+
+
+def unpack_vector(blob: bytes) -> list[float]:
+    vec = array("f")
+    vec.frombytes(blob)
+    return vec.tolist()
+
+
 class HFTextEmbedder:
     def __init__(self, model_name: str, device: str = "cpu", trust_remote_code: bool = True, batch_size: int = 8):
         import torch
@@ -45,11 +73,14 @@ class HFTextEmbedder:
         texts = [str(t or "") for t in texts]
         if not texts:
             return []
-        all_vecs: list[list[float]] = []
-        for start in range(0, len(texts), self.batch_size):
-            batch = texts[start : start + self.batch_size]
+        # Batch texts of similar length together so each batch pads to
+        # roughly its own length instead of the longest text in the call.
+        order = sorted(range(len(texts)), key=lambda idx: len(texts[idx]))
+        all_vecs: list[list[float]] = [[] for _ in texts]
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start : start + self.batch_size]
             encoded = self.tokenizer(
-                batch,
+                [texts[idx] for idx in rows],
                 return_tensors="pt",
                 padding=True,
                 truncation=True,
@@ -60,7 +91,8 @@ class HFTextEmbedder:
                 outputs = self.model(**encoded)
                 pooled = self._mean_pool(outputs, encoded["attention_mask"])
                 pooled = self.torch.nn.functional.normalize(pooled, p=2, dim=1)
-            all_vecs.extend([row.detach().cpu().tolist() for row in pooled])
+            for idx, row in zip(rows, pooled.detach().cpu().tolist()):
+                all_vecs[idx] = row
         return all_vecs
 
     def encode(self, text: str) -> list[float]:
@@ -68,6 +100,180 @@ class HFTextEmbedder:
         return out[0] if out else []
 
 
+class EmbeddingCache:
+    """Vectors on disk keyed by SHA-256 of (model, text); safe to share between processes."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingCache | None":
+        path = (os.environ.get("AGENT_MEMORYBANK_EMBED_CACHE") or "").strip()
+        return cls(path) if path else None
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, blob in self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk):
+                    found[key] = unpack_vector(blob)
+        return found
+
+    def put_many(self, vectors: dict[str, list[float]]) -> None:
+        if not vectors:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings(key, vector) VALUES (?, ?)",
+                [(key, pack_vector(vec)) for key, vec in vectors.items()],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedder:
+    """``encode``/``encode_many`` through an LRU and an optional ``EmbeddingCache``.
+
+    Only texts missing from both reach ``backend.encode_many``, deduplicated
+    and in one call, so the backend can batch them.
+    """
+
+    def __init__(self, backend: Any, disk: EmbeddingCache | None = None, max_entries: int = 4096):
+        self.backend = backend
+        self.model_name = getattr(backend, "model_name", "")
+        self.disk = disk
+        self.max_entries = max(1, int(max_entries))
+        self._lru: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _remember(self, vectors: dict[str, list[float]]) -> None:
+        with self._lock:
+            for key, vec in vectors.items():
+                self._lru[key] = vec
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def encode_many(self, texts: Iterable[str]) -> list[list[float]]:
+        texts = [str(t or "") for t in texts]
+        keys = [EmbeddingCache.make_key(self.model_name, text) for text in texts]
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            for key in keys:
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vec
+        self.stats["hits"] += sum(1 for key in keys if key in found)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing and self.disk is not None:
+            from_disk = self.disk.get_many(list(missing))
+            self.stats["disk_hits"] += len(from_disk)
+            self._remember(from_disk)
+            found.update(from_disk)
+            missing = {key: text for key, text in missing.items() if key not in from_disk}
+        if missing:
+            self.stats["misses"] += len(missing)
+            computed = {
+                key: [float(v) for v in vec]
+                for key, vec in zip(missing, self.backend.encode_many(list(missing.values())))
+                if vec
+            }
+            self._remember(computed)
+            if self.disk is not None:
+                self.disk.put_many(computed)
+            found.update(computed)
+        return [list(found.get(key, [])) for key in keys]
+
+    def encode(self, text: str) -> list[float]:
+        out = self.encode_many([text])
+        return out[0] if out else []
+
+
+class SocketEmbedder:
+    """Client for ``embedding_server``: one JSON line per request and per reply."""
+
+    def __init__(self, socket_path: str | Path, model_name: str, timeout: float = 120.0):
+        self.socket_path = str(socket_path)
+        self.model_name = model_name
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        return conn
+
+    def _close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def encode_many(self, texts: Iterable[str]) -> list[list[float]]:
+        texts = [str(t or "") for t in texts]
+        if not texts:
+            return []
+        request = (json.dumps({"model": self.model_name, "texts": texts}, ensure_ascii=False) + "\n").encode("utf-8")
+        for attempt in range(2):
+            try:
+                sock, reader = self._connection()
+                sock.sendall(request)
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError("embedding server closed the connection")
+                break
+            except OSError as exc:
+                self._close()
+                if attempt:
+                    raise ConnectionError(f"embedding server at {self.socket_path} unavailable: {exc}") from exc
+        reply = json.loads(line)
+        if "error" in reply:
+            raise RuntimeError(f"embedding server: {reply['error']}")
+        return [unpack_vector(base64.b64decode(blob)) for blob in reply["vectors"]]
+
+    def encode(self, text: str) -> list[float]:
+        out = self.encode_many([text])
+        return out[0] if out else []
+
+
+@lru_cache(maxsize=8)
+def get_embedder(model_name: str, device: str = "cpu", trust_remote_code: bool = True, batch_size: int = 8) -> CachedEmbedder:
+    """The process-wide embedder for ``model_name`` (one model copy, one cache)."""
+    socket_path = (os.environ.get("AGENT_MEMORYBANK_EMBED_SOCKET") or "").strip()
+    if socket_path:
+        backend: Any = SocketEmbedder(socket_path, model_name)
+    else:
+        backend = HFTextEmbedder(model_name, device=device, trust_remote_code=trust_remote_code, batch_size=batch_size)
+    max_entries = int(os.environ.get("AGENT_MEMORYBANK_EMBED_LRU_SIZE", "4096"))
+    return CachedEmbedder(backend, disk=EmbeddingCache.from_env(), max_entries=max_entries)
+
+
 @lru_cache(maxsize=4)
 def get_embedder_from_env():
     model_name = (os.environ.get("AGENT_MEMORYBANK_EMBED_MODEL") or "").strip()
@@ -76,7 +282,7 @@ def get_embedder_from_env():
     device = (os.environ.get("AGENT_MEMORYBANK_EMBED_DEVICE") or "cpu").strip() or "cpu"
     trust_remote_code = (os.environ.get("AGENT_MEMORYBANK_EMBED_TRUST_REMOTE_CODE", "true").strip().lower() == "true")
     batch_size = int(os.environ.get("AGENT_MEMORYBANK_EMBED_BATCH_SIZE", "8"))
-    return HFTextEmbedder(model_name, device=device, trust_remote_code=trust_remote_code, batch_size=batch_size)
+    return get_embedder(model_name, device=device, trust_remote_code=trust_remote_code, batch_size=batch_size)
 
 
 def cosine_similarity(a: list[float] | None, b: list[float] | None) -> float:
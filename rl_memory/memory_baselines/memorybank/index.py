@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""On-disk retrieval index and access log for a MemoryBank JSON file.
+
+``<bank>.json.index/`` holds what retrieval would otherwise recompute from
+the items on every query:
+
+- ``meta.json``: the bank file signature it was built for, an inverted index
+  over each item's tokenized ``embedding_text`` (term -> [row, tf] postings
+  plus row norms, for lexical cosine), the same for tags (Jaccard overlap)
+  and per-row timestamps;
+- ``dense.f32``: a contiguous row-major float32 matrix of item embeddings,
+  memory-mapped with NumPy when it is installed.
+
+The index structures themselves are the shared ones in
+``rl_memory.memory_baselines.retrieval``.
+
+``<bank>.json.access.log`` is an append-only log of retrieval hits.  Its
+first line records the bank signature the counts apply to; the store folds
+it into ``access_count`` / ``last_accessed_at`` in memory and into the JSON
+file only when it rewrites the bank anyway.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from rl_memory.memory_baselines.retrieval import DenseMatrix, SparseIndex, write_atomic
+
+INDEX_FORMAT = 1
+
+
+class AccessLog:
+    """Append-only retrieval hits: a header line, then one JSON record per retrieve."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def _header(self, fh) -> tuple[list[int] | None, int]:
+        first = fh.readline()
+        if not first.endswith(b"\n"):
+            return None, 0
+        try:
+            return json.loads(first).get("bank"), len(first)
+        except Exception:
+            return None, 0
+
+    def read(self, signature: list[int] | None, offset: int) -> tuple[list[dict[str, Any]], int]:
+        """Records after ``offset`` that apply to ``signature``; returns (records, new offset)."""
+        try:
+            fh = self.path.open("rb")
+        except FileNotFoundError:
+            return [], 0
+        with fh:
+            bank, header_len = self._header(fh)
+            if bank != signature:
+                # Counts logged against another version of the bank were
+                # either folded into it already or lost with a rewrite.
+                return [], 0
+            fh.seek(max(offset, header_len))
+            chunk = fh.read()
+        end = chunk.rfind(b"\n") + 1
+        records = []
+        for line in chunk[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except Exception:
+                continue
+        return records, max(offset, header_len) + end
+
+    def reset(self, signature: list[int] | None) -> None:
+        write_atomic(self.path, (json.dumps({"bank": signature}) + "\n").encode("utf-8"))
+
+    def append(self, signature: list[int] | None, record: dict[str, Any]) -> None:
+        try:
+            with self.path.open("rb") as fh:
+                bank, _ = self._header(fh)
+        except FileNotFoundError:
+            bank = None
+        if bank != signature:
+            self.reset(signature)
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        # One O_APPEND write per record keeps concurrent writers from interleaving.
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def index_dir(bank_path: Path) -> Path:
+    return bank_path.with_name(bank_path.name + ".index")
+
+
+def access_log_path(bank_path: Path) -> Path:
+    return bank_path.with_name(bank_path.name + ".access.log")
+
+
+def load_index(bank_path: Path, signature: list[int], model: str, rows: int) -> dict[str, Any] | None:
+    """Persisted index for exactly this bank version and embedding model, if any."""
+    root = index_dir(bank_path)
+    try:
+        meta = json.loads((root / "meta.json").read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if (
+        meta.get("format") != INDEX_FORMAT
+        or meta.get("signature") != signature
+        or meta.get("model") != model
+        or meta.get("rows") != rows
+    ):
+        return None
+    try:
+        dense = DenseMatrix.open(root / "dense.f32", int(meta["dense_dim"]), list(meta["dense_valid"]))
+    except Exception:
+        return None
+    return {
+        "lexical": SparseIndex.from_json(meta["lexical"]),
+        "tags": SparseIndex.from_json(meta["tags"]),
+        "ts": meta["ts"],
+        "dense": dense,
+    }
+
+
+def save_index(
+    bank_path: Path,
+    signature: list[int],
+    model: str,
+    lexical: SparseIndex,
+    tags: SparseIndex,
+    ts: list[float],
+    dense: DenseMatrix,
+) -> None:
+    root = index_dir(bank_path)
+    dense.save(root / "dense.f32")
+    meta = {
+        "format": INDEX_FORMAT,
+        "signature": signature,
+        "model": model,
+        "rows": len(ts),
+        "lexical": lexical.to_json(),
+        "tags": tags.to_json(),
+        "ts": ts,
+        "dense_dim": dense.dim,
+        "dense_valid": dense.valid,
+    }
+    # meta.json goes last: it is what marks the directory as usable.
+    write_atomic(root / "meta.json", json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
@@ -7,29 +7,15 @@ import json
 import math
 import os
 import re
-from collections import Counter
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
-from rl_memory.memory_baselines.memorybank.embeddings import cosine_similarity, get_embedder_from_env
+from rl_memory.memory_baselines.memorybank.embeddings import get_embedder_from_env
+from rl_memory.memory_baselines.memorybank.index import AccessLog, access_log_path, load_index, save_index
 from rl_memory.memory_baselines.memorybank.summarizer import get_memory_summarizer
-
-
-def _tokenize(text: str) -> list[str]:
-    return [tok for tok in re.split(r"[^a-zA-Z0-9_]+", text.lower()) if tok]
-
-
-def _cosine(a: Counter, b: Counter) -> float:
-    if not a or not b:
-        return 0.0
-    common = set(a) & set(b)
-    num = sum(a[k] * b[k] for k in common)
-    den_a = math.sqrt(sum(v * v for v in a.values()))
-    den_b = math.sqrt(sum(v * v for v in b.values()))
-    if den_a == 0.0 or den_b == 0.0:
-        return 0.0
-    return num / (den_a * den_b)
+from rl_memory.memory_baselines.retrieval import DenseMatrix, SparseIndex, file_signature, np, tokenize as _tokenize, write_atomic
 
 
 def _iso_now() -> str:
@@ -211,6 +197,20 @@ def _merge_item(existing: dict[str, Any], new_item: dict[str, Any]) -> dict[str,
     return merged
 
 
+_TYPE_BONUS = {
+    "family_summary": 0.24,
+    "family_pitfall_summary": 0.10,
+    "fact": 0.18,
+    "strategy": 0.20,
+    "episode": 0.10,
+    "pitfall": 0.06,
+    "global_summary": 0.08,
+}
+_PRUNE_KEEP_TYPES = {"fact", "strategy", "family_summary"}
+# Quota selection visits types in this order; it decides ties between types.
+_TYPE_ORDER = ("family_summary", "family_pitfall_summary", "strategy", "fact", "episode", "pitfall", "global_summary")
+
+
 def _effective_strength(item: dict[str, Any], now: datetime | None = None) -> float:
     now = now or datetime.now(timezone.utc)
     strength = float(item.get("strength", 0.5))
@@ -348,7 +348,177 @@ def build_task_memory_entries(
     return entries
 
 
+class _LoadedBank:
+    """One version of a bank file with its retrieval index, shared per process.
+
+    Per-row inputs of ``_effective_strength`` are kept as flat arrays so a
+    query scores every row without touching the item dicts; only rows that
+    share a term or tag with the query are visited for the sparse parts.
+    """
+
+    def __init__(self, path: Path, signature: list[int] | None, embedder: Any):
+        self.path = path
+        self.signature = signature
+        self.model = getattr(embedder, "model_name", "") if embedder is not None else ""
+        self.items: list[dict[str, Any]] = json.loads(path.read_text(encoding="utf-8")) if signature else []
+        self.row_of = {_entry_identity(item): row for row, item in enumerate(self.items)}
+        self.log = AccessLog(access_log_path(path))
+        self.log_offset = 0
+
+        index = load_index(path, signature, self.model, len(self.items)) if signature else None
+        if index is None:
+            index = self._build_index(embedder)
+        self.lexical: SparseIndex = index["lexical"]
+        self.tags: SparseIndex = index["tags"]
+        self.dense: DenseMatrix = index["dense"]
+        ts = index["ts"]
+
+        self.entry_types = [str(item.get("entry_type", "")) for item in self.items]
+        self.task_ids = [str(item.get("task_id", "")) for item in self.items]
+        self.families = [str(item.get("task_family", "")).lower() for item in self.items]
+        base = [0.55 * float(item.get("strength", 0.5)) + 0.45 * float(item.get("importance", 0.5)) for item in self.items]
+        reinforcement = [min(0.20, 0.03 * (max(1, int(item.get("reinforcement_count", 1) or 1)) - 1)) for item in self.items]
+        success = [0.06 if bool(item.get("success", False)) else 0.0 for item in self.items]
+        floors = [0.30 if entry_type in {"fact", "strategy", "family_summary"} else 0.0 for entry_type in self.entry_types]
+        type_bonus = [_TYPE_BONUS.get(entry_type, 0.0) for entry_type in self.entry_types]
+        access = [max(0, int(item.get("access_count", 0) or 0)) for item in self.items]
+        if np is not None:
+            self.ts, self.base, self.floors = np.asarray(ts, dtype=float), np.asarray(base), np.asarray(floors)
+            self.reinforcement, self.success = np.asarray(reinforcement), np.asarray(success)
+            self.type_bonus, self.access = np.asarray(type_bonus), np.asarray(access)
+        else:
+            self.ts, self.base, self.floors = ts, base, floors
+            self.reinforcement, self.success = reinforcement, success
+            self.type_bonus, self.access = type_bonus, access
+        self.catch_up()
+
+    def _build_index(self, embedder: Any) -> dict[str, Any]:
+        texts = [item.get("embedding_text") or _entry_text_for_embedding(item) for item in self.items]
+        vectors: list[list[float] | None] = [None] * len(self.items)
+        if embedder is not None:
+            pending: list[int] = []
+            for row, (item, text) in enumerate(zip(self.items, texts)):
+                if item.get("embedding") and item.get("embedding_text") == text and item.get("embedding_model") == self.model:
+                    vectors[row] = item["embedding"]
+                else:
+                    pending.append(row)
+            if pending:
+                for row, vec in zip(pending, embedder.encode_many([texts[row] for row in pending])):
+                    vectors[row] = [float(v) for v in vec]
+        lexical = SparseIndex.build(_tokenize(text) for text in texts)
+        tags = SparseIndex.build(set(item.get("tags", []) or []) for item in self.items)
+        ts = [
+            _parse_ts(str(item.get("ts_updated", item.get("ts_created", "")))).timestamp()
+            for item in self.items
+        ]
+        dense = DenseMatrix.build(vectors)
+        if self.signature:
+            try:
+                save_index(self.path, self.signature, self.model, lexical, tags, ts, dense)
+            except OSError as exc:
+                print(f"[memorybank] index not persisted for {self.path}: {exc}")
+        return {"lexical": lexical, "tags": tags, "ts": ts, "dense": dense}
+
+    def catch_up(self) -> None:
+        """Fold access-log records written since the last call (by any process)."""
+        records, self.log_offset = self.log.read(self.signature, self.log_offset)
+        for record in records:
+            ts = str(record.get("ts", ""))
+            for ident in record.get("ids", []):
+                row = self.row_of.get(tuple(ident))
+                if row is None:
+                    continue
+                item = self.items[row]
+                item["access_count"] = int(item.get("access_count", 0) or 0) + 1
+                item["last_accessed_at"] = max(str(item.get("last_accessed_at", "")), ts)
+                self.access[row] = max(0, item["access_count"])
+
+    def record_access(self, rows: list[int]) -> None:
+        ids = [list(_entry_identity(self.items[row])) for row in rows]
+        self.log.append(self.signature, {"ts": _iso_now(), "ids": ids})
+        self.catch_up()
+
+    def scores(self, query: str, query_embedding: list[float] | None, now: datetime) -> tuple[Any, Any]:
+        """Retrieval score and effective strength of every row, as in the per-item formula."""
+        qtokens = _tokenize(query)
+        qtags = set(qtokens)
+        n = len(self.items)
+        lexical = self.lexical.cosine(qtokens)
+        tag_overlap = self.tags.jaccard(qtags)
+        dense = self.dense.scores(query_embedding) if query_embedding else None
+        task_bonus = {task_id: 0.18 if task_id and task_id in query else 0.0 for task_id in set(self.task_ids)}
+        family_bonus = {family: 0.08 if family in qtags else 0.0 for family in set(self.families)}
+        decay_days = max(1.0, _float_env("AGENT_MEMORYBANK_DECAY_DAYS", 28.0))
+        now_ts = now.timestamp()
+        if np is not None:
+            lex = np.zeros(n)
+            if lexical:
+                lex[list(lexical)] = list(lexical.values())
+            tag = np.zeros(n)
+            if tag_overlap:
+                tag[list(tag_overlap)] = list(tag_overlap.values())
+            dense_arr = dense if dense is not None else np.zeros(n)
+            age_days = np.maximum(0.0, (now_ts - self.ts) / 86400.0)
+            access_bonus = np.minimum(0.10, 0.01 * self.access)
+            strength = np.minimum(
+                1.0,
+                np.maximum(
+                    self.floors,
+                    self.base * np.exp(-age_days / decay_days) + self.reinforcement + access_bonus + self.success,
+                ),
+            )
+            task_arr = np.fromiter((task_bonus[t] for t in self.task_ids), dtype=float, count=n)
+            family_arr = np.fromiter((family_bonus[f] for f in self.families), dtype=float, count=n)
+            score = 0.70 * lex + 0.85 * dense_arr + 0.30 * tag + 0.25 * strength + task_arr + family_arr + self.type_bonus
+            return score, strength
+        scores: list[float] = []
+        strengths: list[float] = []
+        for row in range(n):
+            age_days = max(0.0, (now_ts - self.ts[row]) / 86400.0)
+            strength = min(1.0, max(
+                self.floors[row],
+                self.base[row] * math.exp(-age_days / decay_days)
+                + self.reinforcement[row]
+                + min(0.10, 0.01 * self.access[row])
+                + self.success[row],
+            ))
+            strengths.append(strength)
+            scores.append(
+                0.70 * lexical.get(row, 0.0)
+                + 0.85 * (dense[row] if dense is not None else 0.0)
+                + 0.30 * tag_overlap.get(row, 0.0)
+                + 0.25 * strength
+                + task_bonus[self.task_ids[row]]
+                + family_bonus[self.families[row]]
+                + self.type_bonus[row]
+            )
+        return scores, strengths
+
+
+_BANKS: dict[str, _LoadedBank] = {}
+_BANKS_LOCK = threading.Lock()
+
+
+def _top_rows(rows: list[int], scores: Any, k: int) -> list[int]:
+    """Highest-scoring ``k`` of ``rows``; ties keep row order (like a stable sort)."""
+    if k <= 0 or not rows:
+        return []
+    if np is not None:
+        idx = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(-scores[idx], kind="stable")[:k]
+        return [int(row) for row in idx[order]]
+    return sorted(rows, key=lambda row: scores[row], reverse=True)[:k]
+
+
 class MemoryBankStore:
+    """MemoryBank items in a JSON file, retrieved through a persistent index.
+
+    ``retrieve`` scores against a per-process ``_LoadedBank`` (reloaded only
+    when the file changes) and records hits in the append-only access log
+    instead of rewriting the bank; ``append_many`` and ``compact`` fold the
+    log back into the file.
+    """
+
     def __init__(self, path: str | Path):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
@@ -356,10 +526,29 @@ class MemoryBankStore:
             self.path.write_text("[]", encoding="utf-8")
 
     def load(self) -> list[dict[str, Any]]:
-        return json.loads(self.path.read_text(encoding="utf-8"))
+        """Items as stored, with access counts still in the log folded in."""
+        signature = file_signature(self.path)
+        items = json.loads(self.path.read_text(encoding="utf-8"))
+        records, _ = AccessLog(access_log_path(self.path)).read(signature, 0)
+        if records:
+            by_identity = {_entry_identity(item): item for item in items}
+            for record in records:
+                ts = str(record.get("ts", ""))
+                for ident in record.get("ids", []):
+                    item = by_identity.get(tuple(ident))
+                    if item is not None:
+                        item["access_count"] = int(item.get("access_count", 0) or 0) + 1
+                        item["last_accessed_at"] = max(str(item.get("last_accessed_at", "")), ts)
+        return items
 
     def save(self, items: list[dict[str, Any]]) -> None:
-        self.path.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+        """Write ``items`` (which must already include logged accesses) and start a new log."""
+        write_atomic(self.path, json.dumps(items, ensure_ascii=False, indent=2).encode("utf-8"))
+        AccessLog(access_log_path(self.path)).reset(file_signature(self.path))
+
+    def compact(self) -> None:
+        """Fold the access log into the bank file (e.g. before copying it elsewhere)."""
+        self.save(self.load())
 
     def _refresh_embeddings(self, items: list[dict[str, Any]]) -> None:
         embedder = get_embedder_from_env()
@@ -494,7 +683,7 @@ class MemoryBankStore:
         now = datetime.now(timezone.utc)
         max_items = max(80, _int_env("AGENT_MEMORYBANK_MAX_ITEMS", 600))
         min_strength = max(0.0, min(1.0, _float_env("AGENT_MEMORYBANK_MIN_EFFECTIVE_IMPORTANCE", 0.14)))
-        keep_types = {"fact", "strategy", "family_summary"}
+        keep_types = _PRUNE_KEEP_TYPES
         decorated: list[tuple[float, str, dict[str, Any]]] = []
         for item in items:
             eff = _effective_strength(item, now=now)
@@ -526,95 +715,59 @@ class MemoryBankStore:
         self._refresh_embeddings(merged_items)
         self.save(self._prune(merged_items))
 
+    def _bank(self) -> _LoadedBank:
+        key = str(self.path.resolve())
+        embedder = get_embedder_from_env()
+        model = getattr(embedder, "model_name", "") if embedder is not None else ""
+        with _BANKS_LOCK:
+            bank = _BANKS.get(key)
+            signature = file_signature(self.path)
+            if bank is None or bank.signature != signature or bank.model != model:
+                bank = _LoadedBank(self.path, signature, embedder)
+                _BANKS[key] = bank
+            else:
+                bank.catch_up()
+            return bank
+
     def retrieve(self, query: str, top_k: int = 6) -> list[dict[str, Any]]:
-        items = self.load()
-        if not items:
+        bank = self._bank()
+        if not bank.items:
             return []
         allowed_types = _allowed_types_env()
-        if allowed_types:
-            items = [item for item in items if str(item.get("entry_type", "")) in allowed_types]
-        if not items:
-            return []
-        self._refresh_embeddings(items)
-        qvec = Counter(_tokenize(query))
-        qtags = set(_tokenize(query))
         embedder = get_embedder_from_env()
         query_embedding = embedder.encode(query) if embedder is not None else None
         now = datetime.now(timezone.utc)
-        per_type: dict[str, list[tuple[float, dict[str, Any]]]] = {
-            "family_summary": [],
-            "family_pitfall_summary": [],
-            "strategy": [],
-            "fact": [],
-            "episode": [],
-            "pitfall": [],
-            "global_summary": [],
-        }
-        scored_all: list[tuple[float, dict[str, Any]]] = []
-        for item in items:
-            tags = set(item.get("tags", []) or [])
-            text = item.get("embedding_text") or _entry_text_for_embedding(item)
-            lexical = _cosine(qvec, Counter(_tokenize(text)))
-            dense = cosine_similarity(query_embedding, item.get("embedding")) if query_embedding else 0.0
-            tag_overlap = len(qtags & tags) / max(1, len(qtags | tags))
-            task_exact_bonus = 0.18 if str(item.get("task_id", "")) and str(item.get("task_id", "")) in query else 0.0
-            family_bonus = 0.08 if str(item.get("task_family", "")).lower() in qtags else 0.0
-            type_bonus = {
-                "family_summary": 0.24,
-                "family_pitfall_summary": 0.10,
-                "fact": 0.18,
-                "strategy": 0.20,
-                "episode": 0.10,
-                "pitfall": 0.06,
-                "global_summary": 0.08,
-            }.get(str(item.get("entry_type", "")), 0.0)
-            strength = _effective_strength(item, now=now)
-            score = 0.70 * lexical + 0.85 * dense + 0.30 * tag_overlap + 0.25 * strength + task_exact_bonus + family_bonus + type_bonus
-            if score <= 0.15:
-                continue
-            per_type.setdefault(str(item.get("entry_type", "")), []).append((score, item))
-            scored_all.append((score, item))
+        scores, strengths = bank.scores(query, query_embedding, now)
+        min_strength = max(0.0, min(1.0, _float_env("AGENT_MEMORYBANK_MIN_EFFECTIVE_IMPORTANCE", 0.14)))
+        candidates = [
+            row
+            for row, entry_type in enumerate(bank.entry_types)
+            if scores[row] > 0.15
+            and (not allowed_types or entry_type in allowed_types)
+            # Rows the write path's prune would drop are no longer served.
+            and (strengths[row] >= min_strength or entry_type in _PRUNE_KEEP_TYPES)
+        ]
+        if not candidates:
+            return []
 
         if allowed_types:
-            scored_all.sort(key=lambda x: x[0], reverse=True)
-            picked = [item for _, item in scored_all[:top_k]]
-            if picked:
-                items_by_identity = {_entry_identity(item): item for item in items}
-                ts = _iso_now()
-                for item in picked:
-                    ident = _entry_identity(item)
-                    stored = items_by_identity.get(ident)
-                    if stored is None:
-                        continue
-                    stored["access_count"] = int(stored.get("access_count", 0) or 0) + 1
-                    stored["last_accessed_at"] = ts
-                self.save(self._prune(list(items_by_identity.values())))
-            return picked
-
-        quotas = {
-            "family_summary": min(2, top_k),
-            "strategy": min(2, top_k),
-            "fact": min(3, top_k),
-            "episode": 1 if top_k >= 4 else 0,
-            "family_pitfall_summary": 1 if top_k >= 4 else 0,
-            "pitfall": 1 if top_k >= 5 else 0,
-            "global_summary": 1 if top_k >= 6 else 0,
-        }
-        selected: list[tuple[float, dict[str, Any]]] = []
-        for entry_type, scored in per_type.items():
-            scored.sort(key=lambda x: x[0], reverse=True)
-            selected.extend(scored[: quotas.get(entry_type, 0)])
-        selected.sort(key=lambda x: x[0], reverse=True)
-        picked = [item for _, item in selected[:top_k]]
+            picked = _top_rows(candidates, scores, top_k)
+        else:
+            quotas = {
+                "family_summary": min(2, top_k),
+                "strategy": min(2, top_k),
+                "fact": min(3, top_k),
+                "episode": 1 if top_k >= 4 else 0,
+                "family_pitfall_summary": 1 if top_k >= 4 else 0,
+                "pitfall": 1 if top_k >= 5 else 0,
+                "global_summary": 1 if top_k >= 6 else 0,
+            }
+            selected: list[int] = []
+            for entry_type in _TYPE_ORDER:
+                rows = [row for row in candidates if bank.entry_types[row] == entry_type]
+                selected.extend(_top_rows(rows, scores, quotas[entry_type]))
+            selected.sort(key=lambda row: scores[row], reverse=True)
+            picked = selected[:top_k]
         if picked:
-            items_by_identity = {_entry_identity(item): item for item in items}
-            ts = _iso_now()
-            for item in picked:
-                ident = _entry_identity(item)
-                stored = items_by_identity.get(ident)
-                if stored is None:
-                    continue
-                stored["access_count"] = int(stored.get("access_count", 0) or 0) + 1
-                stored["last_accessed_at"] = ts
-            self.save(self._prune(list(items_by_identity.values())))
-        return picked
+            bank.record_access(picked)
+        return [dict(bank.items[row]) for row in picked]
@@ -7,26 +7,13 @@ import json
 import math
 import os
 import re
-from collections import Counter
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
+from rl_memory.memory_baselines.retrieval import Corpus, CorpusCache, tokenize, top_rows
 
-def _tokenize(text: str) -> list[str]:
-    return [tok for tok in re.split(r"[^a-zA-Z0-9_]+", text.lower()) if tok]
-
-
-def _cosine(a: Counter, b: Counter) -> float:
-    if not a or not b:
-        return 0.0
-    common = set(a) & set(b)
-    num = sum(a[k] * b[k] for k in common)
-    den_a = math.sqrt(sum(v * v for v in a.values()))
-    den_b = math.sqrt(sum(v * v for v in b.values()))
-    if den_a == 0.0 or den_b == 0.0:
-        return 0.0
-    return num / (den_a * den_b)
+_CORPORA = CorpusCache()
 
 
 def _iso_now() -> str:
@@ -128,21 +115,50 @@ def _merge_item(existing: dict[str, Any], new_item: dict[str, Any]) -> dict[str,
     return merged
 
 
-def _effective_importance(item: dict[str, Any], now: datetime | None = None) -> float:
-    now = now or datetime.now(timezone.utc)
-    base = float(item.get("importance", 0.5))
-    ts = _parse_ts(str(item.get("ts", "")))
-    age_days = max(0.0, (now - ts).total_seconds() / 86400.0)
-    decay_days = max(1.0, _float_env("AGENT_MEMORYBANK_DECAY_DAYS", 21.0))
-    decay = math.exp(-age_days / decay_days)
+def _retrieval_text(item: dict[str, Any]) -> str:
+    return " ".join(
+        [
+            str(item.get("task_id", "")),
+            str(item.get("task_family", "")),
+            str(item.get("key", "")),
+            str(item.get("summary", "")),
+            _compact_value(item.get("value", ""), limit=120),
+        ]
+    )
 
+
+class _ImportanceTerms(NamedTuple):
+    base: float
+    ts: datetime
+    reinforcement_bonus: float
+    success_bonus: float
+    floor: float
+
+
+def _importance_terms(item: dict[str, Any]) -> _ImportanceTerms:
+    """The parts of ``_effective_importance`` that do not depend on the clock."""
     reinforcement_count = max(1, int(item.get("reinforcement_count", 1) or 1))
-    reinforcement_bonus = min(0.20, 0.03 * (reinforcement_count - 1))
+    return _ImportanceTerms(
+        base=float(item.get("importance", 0.5)),
+        ts=_parse_ts(str(item.get("ts", ""))),
+        reinforcement_bonus=min(0.20, 0.03 * (reinforcement_count - 1)),
+        success_bonus=0.05 if bool(item.get("success", False)) else 0.0,
+        floor=0.25 if str(item.get("entry_type", "")) == "kv" else 0.0,
+    )
 
-    success_bonus = 0.05 if bool(item.get("success", False)) else 0.0
-    kv_floor = 0.25 if str(item.get("entry_type", "")) == "kv" else 0.0
-    effective = max(kv_floor, base * decay + reinforcement_bonus + success_bonus)
-    return min(1.0, effective)
+
+def _decayed_importance(terms: _ImportanceTerms, now: datetime, decay_days: float) -> float:
+    age_days = max(0.0, (now - terms.ts).total_seconds() / 86400.0)
+    decay = math.exp(-age_days / decay_days)
+    return min(1.0, max(terms.floor, terms.base * decay + terms.reinforcement_bonus + terms.success_bonus))
+
+
+def _decay_days() -> float:
+    return max(1.0, _float_env("AGENT_MEMORYBANK_DECAY_DAYS", 21.0))
+
+
+def _effective_importance(item: dict[str, Any], now: datetime | None = None) -> float:
+    return _decayed_importance(_importance_terms(item), now or datetime.now(timezone.utc), _decay_days())
 
 
 def build_task_memory_entries(
@@ -275,27 +291,14 @@ class MemoryBankLiteStore:
         return kept
 
     def retrieve(self, query: str, top_k: int = 5) -> list[dict[str, Any]]:
-        items = self.load()
-        qvec = Counter(_tokenize(query))
-        scored: list[tuple[float, dict[str, Any]]] = []
-        total = len(items)
+        corpus = _CORPORA.get(self.path, lambda items: Corpus(items, [_retrieval_text(item) for item in items]))
+        total = len(corpus)
         now = datetime.now(timezone.utc)
-        for idx, item in enumerate(items):
-            text = " ".join(
-                [
-                    str(item.get("task_id", "")),
-                    str(item.get("task_family", "")),
-                    str(item.get("key", "")),
-                    str(item.get("summary", "")),
-                    _compact_value(item.get("value", ""), limit=120),
-                ]
-            )
-            lexical = _cosine(qvec, Counter(_tokenize(text)))
-            if lexical <= 0.0:
-                continue
-            importance = _effective_importance(item, now=now)
-            recency = (idx + 1) / max(total, 1)
-            score = lexical + 0.25 * importance + 0.10 * recency
-            scored.append((score, item))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [item for _, item in scored[:top_k]]
+        decay_days = _decay_days()
+        terms = corpus.column("importance_terms", _importance_terms)
+        scores: dict[int, float] = {}
+        for row, lexical in corpus.lexical.cosine(tokenize(query)).items():
+            importance = _decayed_importance(terms[row], now, decay_days)
+            recency = (row + 1) / max(total, 1)
+            scores[row] = lexical + 0.25 * importance + 0.10 * recency
+        return [dict(corpus.items[row]) for row in top_rows(scores, top_k)]
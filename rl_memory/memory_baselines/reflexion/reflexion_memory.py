@@ -4,27 +4,27 @@
 from __future__ import annotations
 
 import json
-import math
-import re
-from collections import Counter
 from pathlib import Path
 from typing import Any
 
+from rl_memory.memory_baselines.retrieval import Corpus, CorpusCache, tokenize, top_rows
 
-def _tokenize(text: str) -> list[str]:
-    return [tok for tok in re.split(r"[^a-zA-Z0-9_]+", text.lower()) if tok]
+_CORPORA = CorpusCache()
 
 
-def _cosine(a: Counter, b: Counter) -> float:
-    if not a or not b:
-        return 0.0
-    common = set(a) & set(b)
-    num = sum(a[k] * b[k] for k in common)
-    den_a = math.sqrt(sum(v * v for v in a.values()))
-    den_b = math.sqrt(sum(v * v for v in b.values()))
-    if den_a == 0.0 or den_b == 0.0:
-        return 0.0
-    return num / (den_a * den_b)
+def _reflection_text(item: dict[str, Any]) -> str:
+    return " ".join(
+        [
+            str(item.get("task_id", "")),
+            str(item.get("theme", "")),
+            str(item.get("failure_category", "")),
+            str(item.get("reflection", "")),
+        ]
+    )
+
+
+def _task_keys(item: dict[str, Any]) -> list[Any]:
+    return [item.get("task_id")]
 
 
 class ReflexionMemoryStore:
@@ -46,22 +46,9 @@ class ReflexionMemoryStore:
         self.save(items)
 
     def retrieve(self, query: str, top_k: int = 3, task_id: str | None = None) -> list[dict[str, Any]]:
-        items = self.load()
-        qvec = Counter(_tokenize(query))
-        scored = []
-        for item in items:
-            if task_id and item.get("task_id") not in {task_id, "*"}:
-                continue
-            text = " ".join(
-                [
-                    str(item.get("task_id", "")),
-                    str(item.get("theme", "")),
-                    str(item.get("failure_category", "")),
-                    str(item.get("reflection", "")),
-                ]
-            )
-            score = _cosine(qvec, Counter(_tokenize(text)))
-            if score > 0.0:
-                scored.append((score, item))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [item for _, item in scored[:top_k]]
+        corpus = _CORPORA.get(self.path, lambda items: Corpus(items, [_reflection_text(item) for item in items]))
+        scores = corpus.lexical.cosine(tokenize(query))
+        if task_id:
+            allowed = corpus.rows("task_id", _task_keys, task_id, "*")
+            scores = {row: score for row, score in scores.items() if row in allowed}
+        return [dict(corpus.items[row]) for row in top_rows(scores, top_k)]
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Retrieval primitives shared by the memory baselines.
+
+Every store ranks its items with the same pieces: a token-count cosine
+between the query and an item's retrieval text, optionally the dot product
+of normalized embeddings, and bonuses derived from item fields, weighted per
+store.  ``CorpusCache`` keeps one ``Corpus`` per version of a store file in
+the process, so a query only tokenizes itself, walks the postings of its
+own terms and reads precomputed per-row ``column``s and filter ``groups``
+instead of re-reading the file and re-tokenizing every item.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from array import array
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterable
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python scoring without it
+    np = None
+
+_TOKEN_RE = re.compile(r"[^a-zA-Z0-9_]+")
+
+
+@lru_cache(maxsize=4096)
+def _tokenize_cached(text: str) -> tuple[str, ...]:
+    return tuple(tok for tok in _TOKEN_RE.split(text.lower()) if tok)
+
+
+def tokenize(text: Any) -> tuple[str, ...]:
+    """Lower-cased alphanumeric tokens; repeated texts (queries) hit a cache."""
+    return _tokenize_cached(str(text or ""))
+
+
+def file_signature(path: Path) -> list[int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+class SparseIndex:
+    """Inverted index over per-row term counts."""
+
+    def __init__(self, postings: dict[str, list[list[int]]], norms: list[float], sizes: list[int]):
+        self.postings = postings
+        self.norms = norms
+        self.sizes = sizes
+
+    @classmethod
+    def build(cls, rows: Iterable[Iterable[str]]) -> "SparseIndex":
+        postings: dict[str, list[list[int]]] = {}
+        norms: list[float] = []
+        sizes: list[int] = []
+        for row, tokens in enumerate(rows):
+            counts = Counter(tokens)
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append([row, tf])
+            norms.append(math.sqrt(sum(v * v for v in counts.values())))
+            sizes.append(len(counts))
+        return cls(postings, norms, sizes)
+
+    def to_json(self) -> dict[str, Any]:
+        return {"postings": self.postings, "norms": self.norms, "sizes": self.sizes}
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "SparseIndex":
+        return cls(data["postings"], data["norms"], data["sizes"])
+
+    def cosine(self, query_tokens: Iterable[str]) -> dict[int, float]:
+        """Cosine between the query's term counts and every row sharing a term."""
+        query = Counter(query_tokens)
+        qnorm = math.sqrt(sum(v * v for v in query.values()))
+        if qnorm == 0.0:
+            return {}
+        dots: dict[int, float] = {}
+        for term, qtf in query.items():
+            for row, tf in self.postings.get(term, ()):
+                dots[row] = dots.get(row, 0) + qtf * tf
+        return {row: dot / (qnorm * self.norms[row]) for row, dot in dots.items() if self.norms[row]}
+
+    def jaccard(self, query_terms: set[str]) -> dict[int, float]:
+        """|q & row| / |q | row| for every row sharing a term (rows index term sets)."""
+        inter: dict[int, int] = {}
+        for term in query_terms:
+            for row, _ in self.postings.get(term, ()):
+                inter[row] = inter.get(row, 0) + 1
+        nq = len(query_terms)
+        return {row: n / max(1, nq + self.sizes[row] - n) for row, n in inter.items()}
+
+
+class DenseMatrix:
+    """Row-major float32 embeddings; rows without a usable vector score 0."""
+
+    def __init__(self, data: Any, dim: int, valid: list[bool]):
+        if np is not None and isinstance(data, array) and dim:
+            data = np.frombuffer(data, dtype=np.float32).reshape(len(valid), dim)
+        self.data = data
+        self.dim = dim
+        self.valid = valid
+        self._valid_mask = np.asarray(valid, dtype=bool) if np is not None else None
+
+    @classmethod
+    def build(cls, vectors: list[list[float] | None]) -> "DenseMatrix":
+        dims = Counter(len(vec) for vec in vectors if vec)
+        dim = dims.most_common(1)[0][0] if dims else 0
+        valid = [bool(vec) and len(vec) == dim for vec in vectors]
+        flat = array("f")
+        for vec, ok in zip(vectors, valid):
+            flat.extend(vec if ok else [0.0] * dim)
+        return cls(flat, dim, valid)
+
+    def save(self, path: Path) -> None:
+        if isinstance(self.data, array):
+            write_atomic(path, self.data.tobytes())
+        else:
+            write_atomic(path, np.ascontiguousarray(self.data, dtype=np.float32).tobytes())
+
+    @classmethod
+    def open(cls, path: Path, dim: int, valid: list[bool]) -> "DenseMatrix":
+        rows = len(valid)
+        if dim == 0 or rows == 0:
+            return cls(array("f"), dim, valid)
+        if np is not None:
+            data = np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim))
+        else:
+            data = array("f")
+            with path.open("rb") as fh:
+                data.fromfile(fh, rows * dim)
+        return cls(data, dim, valid)
+
+    def scores(self, query: list[float] | None) -> Any:
+        """Dot products with ``query`` (vectors are L2-normalized, so cosine)."""
+        rows = len(self.valid)
+        if not query or len(query) != self.dim or self.dim == 0:
+            return np.zeros(rows) if np is not None else [0.0] * rows
+        if np is not None:
+            out = self.data @ np.asarray(query, dtype=np.float32)
+            return np.where(self._valid_mask, out, 0.0).astype(np.float64)
+        q = [float(v) for v in query]
+        out = [0.0] * rows
+        dim = self.dim
+        for row, ok in enumerate(self.valid):
+            if ok:
+                base = row * dim
+                out[row] = sum(self.data[base + i] * q[i] for i in range(dim))
+        return out
+
+
+class Corpus:
+    """One version of a store's items with their lexical (and dense) index.
+
+    ``column`` and ``groups`` derive per-row values from the items once per
+    corpus and cache them under a name chosen by the store, so static score
+    terms and filter masks cost a lookup per query.
+    """
+
+    def __init__(self, items: list[dict[str, Any]], texts: Iterable[str], vectors: list[list[float] | None] | None = None):
+        self.items = items
+        self.lexical = SparseIndex.build(tokenize(text) for text in texts)
+        self.dense = DenseMatrix.build(vectors) if vectors is not None else None
+        self._columns: dict[str, list[Any]] = {}
+        self._groups: dict[str, dict[Hashable, list[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def column(self, name: str, fn: Callable[[dict[str, Any]], Any]) -> list[Any]:
+        values = self._columns.get(name)
+        if values is None:
+            values = self._columns[name] = [fn(item) for item in self.items]
+        return values
+
+    def groups(self, name: str, keys: Callable[[dict[str, Any]], Iterable[Hashable]]) -> dict[Hashable, list[int]]:
+        """Rows (ascending) per key; ``keys`` returns every key a row belongs to."""
+        index = self._groups.get(name)
+        if index is None:
+            index = {}
+            for row, item in enumerate(self.items):
+                for key in set(keys(item)):
+                    index.setdefault(key, []).append(row)
+            self._groups[name] = index
+        return index
+
+    def rows(self, name: str, keys: Callable[[dict[str, Any]], Iterable[Hashable]], *wanted: Hashable) -> set[int]:
+        index = self.groups(name, keys)
+        out: set[int] = set()
+        for key in wanted:
+            out.update(index.get(key, ()))
+        return out
+
+    def dense_scores(self, query_embedding: list[float] | None) -> Any:
+        if self.dense is None or query_embedding is None:
+            return None
+        return self.dense.scores(query_embedding)
+
+
+def top_rows(scores: dict[int, float], k: int) -> list[int]:
+    """Rows with the ``k`` highest scores; ties keep row order, like a stable sort."""
+    if k <= 0:
+        return []
+    return heapq.nsmallest(k, scores, key=lambda row: (-scores[row], row))
+
+
+class CorpusCache:
+    """Per-process ``Corpus`` for each store file, rebuilt when the file changes.
+
+    ``variant`` distinguishes corpora built differently from the same file
+    (e.g. with another embedding model).
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[str, str], tuple[list[int] | None, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, build: Callable[[list[dict[str, Any]]], Any], variant: str = "") -> Any:
+        key = (str(Path(path).resolve()), variant)
+        with self._lock:
+            signature = file_signature(Path(path))
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            items: Any = []
+            if signature is not None:
+                try:
+                    items = json.loads(Path(path).read_text(encoding="utf-8"))
+                except Exception:
+                    items = []
+            if not isinstance(items, list):
+                items = []
+            corpus = build(items)
+            self._entries[key] = (signature, corpus)
+            return corpus
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
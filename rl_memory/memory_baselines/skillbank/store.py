@@ -4,37 +4,22 @@
 from __future__ import annotations
 
 import json
-import math
 import os
 import re
-from collections import Counter
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+from rl_memory.memory_baselines.retrieval import Corpus, CorpusCache, tokenize as _tokenize, top_rows
+
 REPO_ROOT = Path(__file__).resolve().parents[3]
+_CORPORA = CorpusCache()
 
 
 def _iso_now() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
-def _tokenize(text: str) -> list[str]:
-    return [tok for tok in re.split(r"[^a-zA-Z0-9_]+", str(text or "").lower()) if tok]
-
-
-def _cosine(a: Counter, b: Counter) -> float:
-    if not a or not b:
-        return 0.0
-    common = set(a) & set(b)
-    num = sum(a[k] * b[k] for k in common)
-    den_a = math.sqrt(sum(v * v for v in a.values()))
-    den_b = math.sqrt(sum(v * v for v in b.values()))
-    if den_a == 0.0 or den_b == 0.0:
-        return 0.0
-    return num / (den_a * den_b)
-
-
 def _task_family(task_id: str) -> str:
     task_id = str(task_id or "").strip()
     return task_id[:1].upper() if task_id else ""
@@ -291,6 +276,33 @@ def bootstrap_skill_bank(tasks_root: str | Path | None = None) -> list[dict[str,
     return skills
 
 
+def _skill_text(item: dict[str, Any]) -> str:
+    return " ".join(
+        [
+            str(item.get("skill_id", "")),
+            str(item.get("name", "")),
+            str(item.get("description", "")),
+            str(item.get("termination_hint", "")),
+            " ".join(item.get("tags", []) or []),
+            " ".join(item.get("task_ids", [])[:6]),
+            " ".join(item.get("example_goals", [])[:3]),
+        ]
+    )
+
+
+def _skill_corpus(items: list[dict[str, Any]]) -> Corpus:
+    return Corpus(items, [_skill_text(item) for item in items])
+
+
+def _family_keys(item: dict[str, Any]) -> set[str]:
+    return {str(family).lower() for family in item.get("task_families", [])}
+
+
+def _updated_at_utc(item: dict[str, Any]) -> datetime | None:
+    updated_at = _parse_iso_z(str(item.get("updated_at", "")))
+    return updated_at.astimezone(timezone.utc) if updated_at is not None else None
+
+
 class SkillBankStore:
     def __init__(self, path: str | Path):
         self.path = Path(path)
@@ -315,53 +327,55 @@ class SkillBankStore:
     def save(self, items: list[dict[str, Any]]) -> None:
         self.path.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
 
+    def _corpus(self) -> Corpus:
+        corpus = _CORPORA.get(self.path, _skill_corpus)
+        if not len(corpus):
+            self._ensure_bootstrap()
+            corpus = _CORPORA.get(self.path, _skill_corpus)
+        return corpus
+
     def retrieve(self, query: str, top_k: int = 3, task_id: str = "") -> list[dict[str, Any]]:
-        items = self.load()
-        qvec = Counter(_tokenize(query))
+        corpus = self._corpus()
+        items = corpus.items
+        lexical = corpus.lexical.cosine(_tokenize(query))
         task_family = _task_family(task_id).lower()
+        family_rows = corpus.rows("task_families", _family_keys, task_family) if task_family else set()
+        success_rates = corpus.column("success_rate", lambda item: float(item.get("success_rate", 0.5) or 0.5))
+        support_bonus = corpus.column("support_bonus", lambda item: min(0.18, 0.03 * int(item.get("bootstrap_count", 1) or 1)))
+        online_bonus = corpus.column("online_bonus", lambda item: min(0.25, 0.05 * int(item.get("online_count", 0) or 0)))
+        updated_at = corpus.column("updated_at", _updated_at_utc)
         now = datetime.now(timezone.utc)
-        scored: list[tuple[float, dict[str, Any]]] = []
-        for item in items:
-            text = " ".join(
-                [
-                    str(item.get("skill_id", "")),
-                    str(item.get("name", "")),
-                    str(item.get("description", "")),
-                    str(item.get("termination_hint", "")),
-                    " ".join(item.get("tags", []) or []),
-                    " ".join(item.get("task_ids", [])[:6]),
-                    " ".join(item.get("example_goals", [])[:3]),
-                ]
-            )
-            lexical = _cosine(qvec, Counter(_tokenize(text)))
-            family_bonus = 0.15 if task_family and task_family in {f.lower() for f in item.get("task_families", [])} else 0.0
-            success_rate = float(item.get("success_rate", 0.5) or 0.5)
-            support_bonus = min(0.18, 0.03 * int(item.get("bootstrap_count", 1) or 1))
-            online_bonus = min(0.25, 0.05 * int(item.get("online_count", 0) or 0))
+        scores: dict[int, float] = {}
+        for row in range(len(items)):
+            family_bonus = 0.15 if row in family_rows else 0.0
             recency_bonus = 0.0
-            updated_at = _parse_iso_z(str(item.get("updated_at", "")))
-            if updated_at is not None:
-                age_hours = max(0.0, (now - updated_at.astimezone(timezone.utc)).total_seconds() / 3600.0)
+            if updated_at[row] is not None:
+                age_hours = max(0.0, (now - updated_at[row]).total_seconds() / 3600.0)
                 recency_bonus = max(0.0, 0.08 - min(0.08, age_hours / 240.0))
-            score = lexical + family_bonus + 0.20 * success_rate + support_bonus + online_bonus + recency_bonus
-            if score <= 0.0:
+            score = (
+                lexical.get(row, 0.0)
+                + family_bonus
+                + 0.20 * success_rates[row]
+                + support_bonus[row]
+                + online_bonus[row]
+                + recency_bonus
+            )
+            if score > 0.0:
+                scores[row] = score
+        selected: list[dict[str, Any]] = []
+        used_skill_ids: set[str] = set()
+        for row in top_rows(scores, len(scores)):
+            item = items[row]
+            skill_id = str(item.get("skill_id", "")).strip()
+            if skill_id and skill_id in used_skill_ids:
                 continue
-            scored.append((score, item))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        if scored:
-            selected: list[dict[str, Any]] = []
-            used_skill_ids: set[str] = set()
-            for _score, item in scored:
-                skill_id = str(item.get("skill_id", "")).strip()
-                if skill_id and skill_id in used_skill_ids:
-                    continue
-                selected.append(item)
-                if skill_id:
-                    used_skill_ids.add(skill_id)
-                if len(selected) >= top_k:
-                    break
-            if selected:
-                return selected
+            selected.append(dict(item))
+            if skill_id:
+                used_skill_ids.add(skill_id)
+            if len(selected) >= top_k:
+                break
+        if selected:
+            return selected
         fallback = sorted(
             items,
             key=lambda item: (
@@ -370,7 +384,7 @@ class SkillBankStore:
             ),
             reverse=True,
         )
-        return fallback[:top_k]
+        return [dict(item) for item in fallback[:top_k]]
 
     def record_run(
         self,
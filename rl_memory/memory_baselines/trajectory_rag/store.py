@@ -4,33 +4,18 @@
 from __future__ import annotations
 
 import json
-import math
 import os
 import re
-from collections import Counter
 from pathlib import Path
 from typing import Any
 from urllib.parse import parse_qsl, urlparse
 
-from rl_memory.memory_baselines.memorybank.embeddings import HFTextEmbedder, cosine_similarity
+from rl_memory.memory_baselines.memorybank.embeddings import get_embedder
+from rl_memory.memory_baselines.retrieval import Corpus, CorpusCache, file_signature, tokenize, top_rows
 
-_TOKEN_RE = re.compile(r"[^a-zA-Z0-9_]+")
-
-
-def _tokenize(text: str) -> list[str]:
-    return [tok for tok in _TOKEN_RE.split((text or "").lower()) if tok]
-
-
-def _counter_cosine(a: Counter[str], b: Counter[str]) -> float:
-    if not a or not b:
-        return 0.0
-    common = set(a) & set(b)
-    num = sum(a[k] * b[k] for k in common)
-    den_a = math.sqrt(sum(v * v for v in a.values()))
-    den_b = math.sqrt(sum(v * v for v in b.values()))
-    if den_a == 0.0 or den_b == 0.0:
-        return 0.0
-    return num / den_a / den_b
+_CORPORA = CorpusCache()
+# Task specs do not change during a run; keyed by path, checked by file signature.
+_TASK_SPECS: dict[Path, tuple[list[int] | None, dict[str, Any]]] = {}
 
 
 def _read_json(path: Path, default: Any) -> Any:
@@ -108,8 +93,14 @@ def _action_history_sketch(actions: list[str], max_steps: int = 6) -> str:
 
 
 def _task_spec_for_slug(task_slug: str) -> dict[str, Any]:
+    """Parsed ``task_spec.json`` (shared, do not mutate), re-read only when the file changes."""
     spec_path = _tasks_root() / task_slug / "task_spec.json"
-    return _read_json(spec_path, {})
+    signature = file_signature(spec_path)
+    cached = _TASK_SPECS.get(spec_path)
+    if cached is None or cached[0] != signature:
+        cached = (signature, _read_json(spec_path, {}) if signature is not None else {})
+        _TASK_SPECS[spec_path] = cached
+    return cached[1]
 
 
 def _trace_for_slug(task_slug: str) -> dict[str, Any]:
@@ -162,6 +153,18 @@ def build_corpus(tasks_root: Path | None = None) -> list[dict[str, Any]]:
     return items
 
 
+def _task_keys(item: dict[str, Any]) -> list[str]:
+    return [str(item.get("task_id", ""))]
+
+
+def _family_keys(item: dict[str, Any]) -> list[str]:
+    return [str(item.get("family", ""))]
+
+
+def _domain_keys(item: dict[str, Any]) -> list[str]:
+    return list(item.get("allowed_domains", []) or [])
+
+
 class TrajectoryRAGStore:
     def __init__(self, path: str | Path | None = None):
         self.path = Path(path) if path else _corpus_path()
@@ -191,26 +194,37 @@ class TrajectoryRAGStore:
         trust_remote_code = (os.environ.get("AGENT_TRAJECTORY_RAG_EMBED_TRUST_REMOTE_CODE", "true").strip().lower() == "true")
         batch_size = int(os.environ.get("AGENT_TRAJECTORY_RAG_EMBED_BATCH_SIZE", "8"))
         if self._embedder is None or self._embed_model_name != model_name:
-            self._embedder = HFTextEmbedder(model_name, device=device, trust_remote_code=trust_remote_code, batch_size=batch_size)
+            self._embedder = get_embedder(model_name, device=device, trust_remote_code=trust_remote_code, batch_size=batch_size)
             self._embed_model_name = model_name
         return self._embedder
 
-    def _refresh_embeddings(self, items: list[dict[str, Any]]) -> None:
+    def _corpus(self) -> Corpus:
         embedder = self._get_embedder()
-        if embedder is None:
-            return
-        missing = [item for item in items if item.get("embedding_model") != self._embed_model_name or not item.get("embedding")]
-        if not missing:
-            return
-        vectors = embedder.encode_many([str(item.get("retrieval_text", "")) for item in missing])
-        for item, vec in zip(missing, vectors):
-            item["embedding"] = vec
-            item["embedding_model"] = self._embed_model_name
-        self.path.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+        model_name = self._embed_model_name if embedder is not None else ""
+
+        def build(items: list[dict[str, Any]]) -> Corpus:
+            texts = [str(item.get("retrieval_text", "")) for item in items]
+            if embedder is None:
+                return Corpus(items, texts)
+            vectors: list[list[float] | None] = [
+                item.get("embedding") if item.get("embedding_model") == model_name and item.get("embedding") else None
+                for item in items
+            ]
+            missing = [row for row, vec in enumerate(vectors) if vec is None]
+            if missing:
+                for row, vec in zip(missing, embedder.encode_many([texts[row] for row in missing])):
+                    vectors[row] = vec
+            return Corpus(items, texts, vectors)
+
+        corpus = _CORPORA.get(self.path, build, variant=model_name)
+        if not len(corpus):
+            self._ensure_corpus()
+            corpus = _CORPORA.get(self.path, build, variant=model_name)
+        return corpus
 
     def retrieve(self, *, query: str, top_k: int = 2, task_id: str = "") -> list[dict[str, Any]]:
-        items = self.load()
-        if not items:
+        corpus = self._corpus()
+        if not len(corpus):
             return []
         current_spec = _task_spec_for_slug(task_id)
         current_family = _family_for_task(task_id, current_spec) if task_id else ""
@@ -218,18 +232,15 @@ class TrajectoryRAGStore:
         allow_same_task = (os.environ.get("AGENT_TRAJECTORY_RAG_ALLOW_SAME_TASK", "0").strip() == "1")
         allow_same_family = (os.environ.get("AGENT_TRAJECTORY_RAG_ALLOW_SAME_FAMILY", "1").strip() == "1")
 
-        filtered = []
-        for item in items:
-            if not allow_same_task and task_id and str(item.get("task_id", "")) == task_id:
-                continue
-            if not allow_same_family and current_family and str(item.get("family", "")) == current_family:
-                continue
-            filtered.append(item)
-        if not filtered:
+        family_rows = corpus.rows("family", _family_keys, current_family) if current_family else set()
+        excluded: set[int] = set()
+        if not allow_same_task and task_id:
+            excluded |= corpus.rows("task_id", _task_keys, task_id)
+        if not allow_same_family:
+            excluded |= family_rows
+        if len(excluded) == len(corpus):
             return []
 
-        self._refresh_embeddings(filtered)
-        query_counter = Counter(_tokenize(query))
         query_embed = None
         embedder = self._get_embedder()
         if embedder is not None:
@@ -237,24 +248,28 @@ class TrajectoryRAGStore:
                 query_embed = embedder.encode(query)
             except Exception:
                 query_embed = None
+        lexical = corpus.lexical.cosine(tokenize(query))
+        dense = corpus.dense_scores(query_embed)
+        domain_overlap: dict[int, int] = {}
+        domain_groups = corpus.groups("allowed_domains", _domain_keys)
+        for domain in current_domains:
+            for row in domain_groups.get(domain, ()):
+                domain_overlap[row] = domain_overlap.get(row, 0) + 1
+
+        candidates = set(lexical) | family_rows | set(domain_overlap)
+        if dense is not None:
+            candidates.update(row for row, value in enumerate(dense) if value > 0.0)
+        scores: dict[int, float] = {}
+        for row in candidates - excluded:
+            embed = float(dense[row]) if dense is not None else 0.0
+            family_bonus = 0.08 if row in family_rows else 0.0
+            domain_bonus = min(0.12, 0.06 * domain_overlap.get(row, 0))
+            scores[row] = 0.62 * lexical.get(row, 0.0) + 0.22 * embed + family_bonus + domain_bonus
 
-        scored: list[tuple[float, dict[str, Any]]] = []
-        for item in filtered:
-            lexical = _counter_cosine(query_counter, Counter(_tokenize(str(item.get("retrieval_text", "")))))
-            embed = cosine_similarity(query_embed, item.get("embedding")) if query_embed is not None else 0.0
-            family_bonus = 0.08 if current_family and str(item.get("family", "")) == current_family else 0.0
-            domain_overlap = len(current_domains & set(item.get("allowed_domains", []) or []))
-            domain_bonus = min(0.12, 0.06 * domain_overlap)
-            score = 0.62 * lexical + 0.22 * embed + family_bonus + domain_bonus
-            if lexical <= 0.0 and embed <= 0.0 and family_bonus <= 0.0 and domain_bonus <= 0.0:
-                continue
-            scored.append((score, item))
-
-        scored.sort(key=lambda pair: pair[0], reverse=True)
         results = []
-        for score, item in scored[: max(1, int(top_k))]:
-            payload = dict(item)
-            payload["score"] = round(float(score), 4)
+        for row in top_rows(scores, max(1, int(top_k))):
+            payload = dict(corpus.items[row])
+            payload["score"] = round(float(scores[row]), 4)
             results.append(payload)
         return results
 
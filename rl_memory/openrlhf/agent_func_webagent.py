@@ -7,7 +7,6 @@ from concurrent.futures import ThreadPoolExecutor
 import json
 import os
 import re
-import sqlite3
 import subprocess
 import sys
 from functools import lru_cache
@@ -46,10 +45,11 @@ REPO_ROOT = Path(__file__).resolve().parents[2]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from agent.assertions_dsl import AssertionDSL
-from agent.browser_env import BrowserEnv
+from agent.assertions_dsl import AssertionDSL, JsonStateEnvAPI
+from agent.browser_env import BrowserEnv, shutdown_thread_browsers
 from chain_runner_dynamic import inject_state, patch_spec, patch_trace
 from llm_runner import _parse_scoring_checkpoints, normalize_action, validate_action_format
+from memory_kv import load_memory_snapshot, memory_cache
 from rl_memory.memory_baselines.reflexion.reflexion_memory import ReflexionMemoryStore
 from rl_memory.memory_baselines.reflexion.prompt_builder import augment_instruction
 from rl_memory.openrlhf.runtime_manager import RuntimeSandbox
@@ -212,43 +212,14 @@ def _build_reflection_text(task_id: str, goal: str, success: bool, failure_note:
     )
 
 
-def _read_memory(conn: sqlite3.Connection) -> dict[str, Any]:
-    memory: dict[str, Any] = {}
+def _read_memory(path: Path) -> dict[str, Any]:
     try:
-        cur = conn.execute("SELECT key, value FROM memory_kv")
-        for row in cur.fetchall():
-            raw = row["value"]
-            try:
-                memory[row["key"]] = json.loads(raw)
-            except Exception:
-                memory[row["key"]] = raw
+        return load_memory_snapshot(path)
     except Exception:
-        pass
-    return memory
+        return {}
 
 
-def _env_api(_: str, path: str):
-    env_state_path = state_path()
-    if not env_state_path.exists():
-        return None
-    try:
-        current = json.loads(env_state_path.read_text(encoding="utf-8"))
-    except Exception:
-        return None
-
-    for part in path.split("."):
-        if isinstance(current, dict):
-            current = current.get(part)
-        elif isinstance(current, list):
-            try:
-                current = current[int(part)]
-            except Exception:
-                return None
-        else:
-            return None
-        if current is None:
-            return None
-    return current
+_env_api = JsonStateEnvAPI(state_path)
 
 
 def _evaluate_current_task(task_id: str, env: BrowserEnv) -> dict[str, Any]:
@@ -256,108 +227,103 @@ def _evaluate_current_task(task_id: str, env: BrowserEnv) -> dict[str, Any]:
     spec = json.loads(spec_path.read_text())
     criteria = spec.get("success_criteria", [])
 
-    conn = sqlite3.connect(db_path())
-    conn.row_factory = sqlite3.Row
-    try:
-        memory = _read_memory(conn)
-        dsl = AssertionDSL(env.page, memory, _env_api)
-        criteria_total = len(criteria)
-        criteria_passed = 0
-        criteria_failed = []
-        criteria_all_passed = True
-
-        for crit in criteria:
-            try:
-                res = bool(dsl.evaluate(crit))
-            except Exception:
-                res = False
-            if res:
-                criteria_passed += 1
-            else:
-                criteria_all_passed = False
-                criteria_failed.append(crit)
-
-        checkpoints, checkpoint_mode = _parse_scoring_checkpoints(spec, criteria)
-        activation_map: Dict[str, bool] = {}
-        final_pass_map: Dict[str, bool] = {}
-        checkpoint_results = []
-        checkpoint_required_failed = []
-        checkpoint_required_passed = 0
-
-        active_checkpoints: List[Dict[str, Any]] = []
-        for cp in checkpoints:
-            cp_id = cp["id"]
-            when_expr = str(cp.get("when", "")).strip()
-            if not when_expr:
-                activation_map[cp_id] = True
-                active_checkpoints.append(cp)
-                continue
-            try:
-                is_active = bool(dsl.evaluate(when_expr))
-            except Exception:
-                is_active = False
-            activation_map[cp_id] = is_active
-            if is_active:
-                active_checkpoints.append(cp)
-
-        active_weight_sum = sum(max(float(cp.get("weight", 0.0)), 0.0) for cp in active_checkpoints)
-        if active_checkpoints:
-            if active_weight_sum <= 0:
-                for cp in active_checkpoints:
-                    cp["weight_norm_active"] = 1.0 / len(active_checkpoints)
-            else:
-                for cp in active_checkpoints:
-                    cp["weight_norm_active"] = max(float(cp.get("weight", 0.0)), 0.0) / active_weight_sum
-
-        checkpoint_weight_earned = 0.0
-        for cp in active_checkpoints:
-            cp_id = cp["id"]
-            assertion = cp["assertion"]
-            depends_on = cp.get("depends_on", [])
-            deps_ok = all(final_pass_map.get(dep_id, False) for dep_id in depends_on)
-            try:
-                raw_pass = bool(dsl.evaluate(assertion))
-            except Exception:
-                raw_pass = False
-            cp_pass = raw_pass and deps_ok
-            final_pass_map[cp_id] = cp_pass
-            earned = float(cp.get("weight_norm_active", 0.0)) if cp_pass else 0.0
-            checkpoint_weight_earned += earned
-            if cp.get("required", True):
-                if cp_pass:
-                    checkpoint_required_passed += 1
-                else:
-                    checkpoint_required_failed.append(cp_id)
-            checkpoint_results.append(
-                {
-                    "id": cp_id,
-                    "pass": cp_pass,
-                    "required": bool(cp.get("required", True)),
-                    "score": earned * 100.0,
-                }
-            )
+    memory = _read_memory(db_path())
+    dsl = AssertionDSL(env.page, memory, _env_api, snapshot=True, memory_source=memory_cache(db_path()))
+    criteria_total = len(criteria)
+    criteria_passed = 0
+    criteria_failed = []
+    criteria_all_passed = True
 
-        checkpoint_score_percent = checkpoint_weight_earned * 100.0 if active_checkpoints else None
-        checkpoint_required_ok = not checkpoint_required_failed
-        if active_checkpoints:
-            passed = checkpoint_required_ok and (criteria_all_passed if criteria_total else True)
+    for crit in criteria:
+        try:
+            res = bool(dsl.evaluate(crit))
+        except Exception:
+            res = False
+        if res:
+            criteria_passed += 1
+        else:
+            criteria_all_passed = False
+            criteria_failed.append(crit)
+
+    checkpoints, checkpoint_mode = _parse_scoring_checkpoints(spec, criteria)
+    activation_map: Dict[str, bool] = {}
+    final_pass_map: Dict[str, bool] = {}
+    checkpoint_results = []
+    checkpoint_required_failed = []
+    checkpoint_required_passed = 0
+
+    active_checkpoints: List[Dict[str, Any]] = []
+    for cp in checkpoints:
+        cp_id = cp["id"]
+        when_expr = str(cp.get("when", "")).strip()
+        if not when_expr:
+            activation_map[cp_id] = True
+            active_checkpoints.append(cp)
+            continue
+        try:
+            is_active = bool(dsl.evaluate(when_expr))
+        except Exception:
+            is_active = False
+        activation_map[cp_id] = is_active
+        if is_active:
+            active_checkpoints.append(cp)
+
+    active_weight_sum = sum(max(float(cp.get("weight", 0.0)), 0.0) for cp in active_checkpoints)
+    if active_checkpoints:
+        if active_weight_sum <= 0:
+            for cp in active_checkpoints:
+                cp["weight_norm_active"] = 1.0 / len(active_checkpoints)
         else:
-            passed = criteria_all_passed if criteria_total else True
+            for cp in active_checkpoints:
+                cp["weight_norm_active"] = max(float(cp.get("weight", 0.0)), 0.0) / active_weight_sum
+
+    checkpoint_weight_earned = 0.0
+    for cp in active_checkpoints:
+        cp_id = cp["id"]
+        assertion = cp["assertion"]
+        depends_on = cp.get("depends_on", [])
+        deps_ok = all(final_pass_map.get(dep_id, False) for dep_id in depends_on)
+        try:
+            raw_pass = bool(dsl.evaluate(assertion))
+        except Exception:
+            raw_pass = False
+        cp_pass = raw_pass and deps_ok
+        final_pass_map[cp_id] = cp_pass
+        earned = float(cp.get("weight_norm_active", 0.0)) if cp_pass else 0.0
+        checkpoint_weight_earned += earned
+        if cp.get("required", True):
+            if cp_pass:
+                checkpoint_required_passed += 1
+            else:
+                checkpoint_required_failed.append(cp_id)
+        checkpoint_results.append(
+            {
+                "id": cp_id,
+                "pass": cp_pass,
+                "required": bool(cp.get("required", True)),
+                "score": earned * 100.0,
+            }
+        )
 
-        return {
-            "success": bool(passed),
-            "criteria_total": criteria_total,
-            "criteria_passed": criteria_passed,
-            "criteria_failed": criteria_failed,
-            "checkpoint_mode": checkpoint_mode,
-            "checkpoint_total": len(active_checkpoints),
-            "checkpoint_required_passed": checkpoint_required_passed,
-            "checkpoint_required_failed": checkpoint_required_failed,
-            "checkpoint_score_percent": checkpoint_score_percent,
-            "checkpoint_results": checkpoint_results,
-        }
-    finally:
-        conn.close()
+    checkpoint_score_percent = checkpoint_weight_earned * 100.0 if active_checkpoints else None
+    checkpoint_required_ok = not checkpoint_required_failed
+    if active_checkpoints:
+        passed = checkpoint_required_ok and (criteria_all_passed if criteria_total else True)
+    else:
+        passed = criteria_all_passed if criteria_total else True
+
+    return {
+        "success": bool(passed),
+        "criteria_total": criteria_total,
+        "criteria_passed": criteria_passed,
+        "criteria_failed": criteria_failed,
+        "checkpoint_mode": checkpoint_mode,
+        "checkpoint_total": len(active_checkpoints),
+        "checkpoint_required_passed": checkpoint_required_passed,
+        "checkpoint_required_failed": checkpoint_required_failed,
+        "checkpoint_score_percent": checkpoint_score_percent,
+        "checkpoint_results": checkpoint_results,
+    }
 
 
 class AgentInstance(AgentInstanceBase):
@@ -386,12 +352,27 @@ class AgentInstance(AgentInstanceBase):
         self._sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="openrlhf-browser")
 
     async def _run_sync(self, fn, *args, **kwargs):
+        if self._sync_executor is None:
+            self._sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="openrlhf-browser")
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(
             self._sync_executor,
             lambda: fn(*args, **kwargs),
         )
 
+    def _release_browser(self) -> None:
+        # Runs on the executor thread: BrowserEnv.close() keeps the thread's
+        # shared Chromium and Playwright driver up, so stop them here.
+        if self.env is not None:
+            self.env.close()
+            self.env = None
+        shutdown_thread_browsers()
+
+    def _shutdown_executor(self) -> None:
+        executor, self._sync_executor = self._sync_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
     def _ensure_runtime(self) -> None:
         if not self.use_isolated_runtime:
             return
@@ -436,13 +417,15 @@ class AgentInstance(AgentInstanceBase):
             observation = self._prepare_current_task()
             return {"observation": observation}
         except Exception:
-            if self.env is not None:
-                self.env.close()
-                self.env = None
+            self._release_browser()
             raise
 
     async def reset(self, states: dict, **kwargs):
-        return await self._run_sync(self._reset_impl, states, **kwargs)
+        try:
+            return await self._run_sync(self._reset_impl, states, **kwargs)
+        except Exception:
+            self._shutdown_executor()
+            raise
 
     def _prepare_current_task(self) -> str:
         assert self.episode is not None
@@ -646,9 +629,7 @@ class AgentInstance(AgentInstanceBase):
                 reward_value += flow_success_bonus_value
             if reward_mode == "wfg_r1_module":
                 reward_value = _clip_reward(reward_value)
-            if self.env is not None:
-                self.env.close()
-                self.env = None
+            self._release_browser()
             return {
                 "rewards": torch.tensor(reward_value, dtype=torch.float32),
                 "scores": torch.tensor(reward_value, dtype=torch.float32),
@@ -682,7 +663,11 @@ class AgentInstance(AgentInstanceBase):
         }
 
     async def step(self, states: dict, **kwargs) -> Dict[str, Any]:
-        return await self._run_sync(self._step_impl, states, **kwargs)
+        result = await self._run_sync(self._step_impl, states, **kwargs)
+        if result.get("done"):
+            # The browser thread is idle until a new reset, which starts another.
+            self._shutdown_executor()
+        return result
 
 
 class AgentExecutor(MultiTurnAgentExecutor):
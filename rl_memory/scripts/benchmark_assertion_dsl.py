@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for AssertionDSL compilation and snapshot evaluation.
+
+Evaluates every task's success criteria and scoring checkpoints against a
+mock page (with a configurable per-query latency standing in for the
+Playwright round trip) and a JSON state file, in two modes:
+
+- ``legacy``: re-parse each assertion and re-read the state file for every
+  ``json(...)`` atom, as the interpreter did before compilation;
+- ``compiled``: cached AST plus one snapshot per task (one state parse,
+  deduplicated page queries).
+
+Both modes must agree on every result; the script exits non-zero otherwise.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from agent.assertions_dsl import AssertionDSL, JsonStateEnvAPI, compile_assertion  # noqa: E402
+from runtime_paths import state_path  # noqa: E402
+
+_TEMPORAL = ("WITHIN(", "EVENTUALLY(", "STABLE(")
+
+
+class _MockLocator:
+    def __init__(self, page: "_MockPage", selector: str):
+        self.page = page
+        self.selector = selector
+
+    def _hash(self) -> int:
+        self.page.queries += 1
+        if self.page.latency_sec:
+            time.sleep(self.page.latency_sec)
+        return zlib.crc32(self.selector.encode("utf-8"))
+
+    def count(self) -> int:
+        return self._hash() % 3
+
+    def inner_text(self) -> str:
+        return ["", "confirmed", "O-10001", "Paid"][self._hash() % 4]
+
+    def get_attribute(self, name: str) -> str | None:
+        return ["true", None, name][self._hash() % 3]
+
+
+class _MockPage:
+    url = "http://localhost:8014/shop.local/order/confirmation/O-10001"
+
+    def __init__(self, latency_sec: float):
+        self.latency_sec = latency_sec
+        self.queries = 0
+
+    def locator(self, selector: str) -> _MockLocator:
+        return _MockLocator(self, selector)
+
+
+def _task_assertions(tasks_root: Path) -> list[list[str]]:
+    suites = []
+    for spec_path in sorted(tasks_root.glob("*/task_spec.json")):
+        try:
+            spec = json.loads(spec_path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        items = [str(x) for x in spec.get("success_criteria", []) or []]
+        for cp in spec.get("scoring_checkpoints", []) or []:
+            if isinstance(cp, str):
+                items.append(cp)
+            elif isinstance(cp, dict):
+                items.extend(str(cp[key]) for key in ("when", "assertion", "criterion") if cp.get(key))
+        items = [item for item in items if item.strip() and not any(tok in item for tok in _TEMPORAL)]
+        if items:
+            suites.append(items)
+    return suites
+
+
+class _LegacyDSL(AssertionDSL):
+    """Pre-compilation behaviour: parse on every call, no snapshot."""
+
+    def evaluate(self, assertion: str) -> bool:
+        return self._eval_node(compile_assertion.__wrapped__(assertion))
+
+
+def _run(dsl_cls: type, suites: list[list[str]], page: _MockPage, env_api: Any, snapshot: bool) -> tuple[float, list[list[bool]]]:
+    started = time.perf_counter()
+    results = []
+    for items in suites:
+        dsl = dsl_cls(page, {}, env_api, snapshot=snapshot)
+        row = []
+        for item in items:
+            try:
+                row.append(bool(dsl.evaluate(item)))
+            except Exception:
+                row.append(False)
+        results.append(row)
+    return time.perf_counter() - started, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks-root", type=Path, default=REPO_ROOT / "tasks")
+    parser.add_argument("--state", type=Path, default=None, help="JSON state file (default: runtime state.json or env/*_initial.json)")
+    parser.add_argument("--state-pad-kb", type=int, default=256, help="Pad the state to approximate a populated world.")
+    parser.add_argument("--page-latency-ms", type=float, default=0.5, help="Simulated cost of one page query.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    suites = _task_assertions(args.tasks_root)
+    source_state = args.state or (state_path() if state_path().exists() else REPO_ROOT / "env" / "Z-autopay_initial.json")
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_state = Path(tmp) / "state.json"
+        if args.state_pad_kb > 0:
+            state = json.loads(source_state.read_text(encoding="utf-8"))
+            state["_benchmark_padding"] = [{"id": idx, "note": "x" * 100} for idx in range(args.state_pad_kb * 8)]
+            bench_state.write_text(json.dumps(state), encoding="utf-8")
+        else:
+            shutil.copyfile(source_state, bench_state)
+        env_api = JsonStateEnvAPI(lambda: bench_state)
+        latency = max(0.0, args.page_latency_ms) / 1000.0
+
+        report: dict[str, Any] = {
+            "tasks": len(suites),
+            "assertions": sum(len(items) for items in suites),
+            "state_bytes": bench_state.stat().st_size,
+            "page_latency_ms": args.page_latency_ms,
+        }
+        best: dict[str, float] = {}
+        outcomes: dict[str, list[list[bool]]] = {}
+        for mode, dsl_cls, snapshot in (("legacy", _LegacyDSL, False), ("compiled", AssertionDSL, True)):
+            page = _MockPage(latency)
+            for _ in range(max(1, args.repeat)):
+                page.queries = 0
+                elapsed, outcomes[mode] = _run(dsl_cls, suites, page, env_api, snapshot)
+                best[mode] = min(best.get(mode, elapsed), elapsed)
+            report[f"{mode}_sec"] = round(best[mode], 4)
+            report[f"{mode}_page_queries"] = page.queries
+        report["speedup"] = round(best["legacy"] / best["compiled"], 2) if best["compiled"] else None
+        report["results_match"] = outcomes["legacy"] == outcomes["compiled"]
+
+    print(json.dumps(report, indent=2))
+    if not report["results_match"]:
+        raise SystemExit("compiled evaluation disagrees with the legacy interpreter")
+
+
+if __name__ == "__main__":
+    main()
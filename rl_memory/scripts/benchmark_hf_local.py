@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""CPU-friendly benchmark for the local transformers backend.
+
+Drives ``LocalHFClient`` (model from ``--model`` or ``AGENT_MODEL``; a small
+one such as ``Qwen/Qwen2.5-0.5B-Instruct`` is enough) through:
+
+- ``episode``: one episode's steps in sequence, the prompt growing by one
+  history turn per step, so each step shares a prefix with the previous one;
+- ``parallel``: ``--workers`` threads issuing step prompts at once, as
+  best-of-N candidates or parallel episodes do.
+
+Both features are off by default; run it with and without
+``--prefix-cache 4`` / ``--max-batch 8`` to compare.  It prints wall time
+plus the client's tokens/s and prefill/decode split.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+_GOAL = "Open the shop, add the cheapest wireless mouse to the cart and check out with the saved address."
+
+
+def _messages(step: int) -> list[dict]:
+    history = "\n".join(
+        f"Step {i}: clicked #product-{i} on /shop.local/catalog?page={i}; page now shows {i + 3} results." for i in range(step)
+    )
+    return [
+        {"role": "user", "content": f"Goal: {_GOAL}\n\nHistory:\n{history or '(none)'}\n\nNext action?"},
+    ]
+
+
+def _run_episode(client, steps: int, max_tokens: int) -> None:
+    for step in range(steps):
+        client.sample_messages(_messages(step), num_samples=1, temperature=0.0, max_tokens=max_tokens)
+
+
+def _run_parallel(client, workers: int, steps: int, max_tokens: int) -> None:
+    def worker(offset: int) -> None:
+        for step in range(steps):
+            client.sample_messages(_messages(step + offset), num_samples=1, temperature=0.0, max_tokens=max_tokens)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.environ.get("AGENT_MODEL", ""))
+    parser.add_argument("--mode", choices=["episode", "parallel"], default="episode")
+    parser.add_argument("--steps", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-tokens", type=int, default=32)
+    parser.add_argument("--prefix-cache", type=int, default=None, help="AGENT_HF_PREFIX_CACHE (prompts kept; 0 disables)")
+    parser.add_argument("--max-batch", type=int, default=None)
+    args = parser.parse_args()
+    if not args.model:
+        parser.error("--model (or AGENT_MODEL) is required")
+
+    os.environ["AGENT_BACKEND"] = "hf_local"
+    os.environ["AGENT_MODEL"] = args.model
+    os.environ.setdefault("AGENT_HF_DEVICE_MAP", "cpu")
+    os.environ.pop("AGENT_LLM_CACHE", None)
+    if args.prefix_cache is not None:
+        os.environ["AGENT_HF_PREFIX_CACHE"] = str(args.prefix_cache)
+    if args.max_batch is not None:
+        os.environ["AGENT_HF_MAX_BATCH"] = str(args.max_batch)
+
+    from agent.llm_client import build_client
+
+    client = build_client()
+    started = time.perf_counter()
+    if args.mode == "episode":
+        _run_episode(client, args.steps, args.max_tokens)
+    else:
+        _run_parallel(client, args.workers, args.steps, args.max_tokens)
+    wall = time.perf_counter() - started
+    print(json.dumps({"mode": args.mode, "wall_sec": round(wall, 3), **client.stats()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
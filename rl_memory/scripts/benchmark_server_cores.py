@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Load test comparing server.py's threaded and asyncio cores.
+
+Each core is started on a throwaway copy of the runtime (``env/``,
+``sites/``, ``database/`` and a freshly initialized ``data.db``) and driven
+by ``--clients`` keep-alive clients.  Each client sends ``--requests``
+requests cycling through pages, a static asset, read APIs and
+``create_order`` mutations.
+
+Per core the script reports throughput, latency percentiles per request
+kind, the server's peak thread count and RSS (read from ``/proc``, Linux
+only), and lost writes: orders acknowledged by ``/api/mutate`` but missing
+from the final state.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+MIX = (
+    ("page", "GET", "/shop.local/index.html"),
+    ("asset", "GET", "/static/common.js"),
+    ("env", "GET", "/api/env?paths=shop.orders.last,balance"),
+    ("orders", "GET", "/api/orders?limit=20"),
+    ("mutate", "POST", "/api/mutate"),
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_runtime(root: Path) -> None:
+    for name in ("env", "sites", "database"):
+        shutil.copytree(REPO_ROOT / name, root / name)
+    for stale in (root / "env" / "state.json",):
+        stale.unlink(missing_ok=True)
+    env = dict(os.environ, WEBAGENT_RUNTIME_ROOT=str(root))
+    subprocess.run([sys.executable, str(REPO_ROOT / "init_db.py")], cwd=str(root), env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def start_server(root: Path, core: str, port: int, log_path: Path) -> subprocess.Popen:
+    env = dict(os.environ, WEBAGENT_RUNTIME_ROOT=str(root), WEBAGENT_SERVER_CORE=core, BENCHMARK_CLEAN_MODE="true")
+    with open(log_path, "w", encoding="utf-8") as log_fh:
+        proc = subprocess.Popen(
+            [sys.executable, str(REPO_ROOT / "server.py"), str(port)],
+            # Handlers append to relative files such as trigger_debug.log; keep them in the scratch copy.
+            cwd=str(root), env=env, stdout=log_fh, stderr=subprocess.STDOUT,
+        )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{core} server exited early; see {log_path}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/env?paths=balance")
+            conn.getresponse().read()
+            conn.close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{core} server did not come up on port {port}")
+
+
+class ProcSampler(threading.Thread):
+    """Peak thread count and RSS of ``pid`` while running."""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.path = Path(f"/proc/{pid}/status")
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss_kb = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                for line in self.path.read_text().splitlines():
+                    if line.startswith("Threads:"):
+                        self.peak_threads = max(self.peak_threads, int(line.split()[1]))
+                    elif line.startswith("VmRSS:"):
+                        self.peak_rss_kb = max(self.peak_rss_kb, int(line.split()[1]))
+            except (OSError, ValueError):
+                return
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def run_client(port: int, client_id: int, requests: int, results: list[tuple[str, float, bool]], acked: list[str]) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    for i in range(requests):
+        kind, method, path = MIX[i % len(MIX)]
+        body = None
+        headers = {"Accept-Encoding": "gzip"}
+        order_id = ""
+        if kind == "mutate":
+            order_id = f"O-LT-{client_id}-{i}"
+            payload = {"task_id": "loadtest", "action": "create_order", "payload": {"order_id": order_id, "items": [], "total": 0}}
+            body = json.dumps(payload)
+            headers["Content-Type"] = "application/json"
+        started = time.perf_counter()
+        ok = False
+        for attempt in range(2):
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status < 400
+                break
+            except (OSError, http.client.HTTPException):
+                # The threaded core closes every connection; reconnect once.
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        results.append((kind, time.perf_counter() - started, ok))
+        if ok and order_id:
+            acked.append(order_id)
+    conn.close()
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def count_orders(port: int, prefix: str = "O-LT-") -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", "/api/env?paths=shop.orders")
+    orders = json.loads(conn.getresponse().read()).get("shop", {}).get("orders", {})
+    conn.close()
+    return sum(1 for key in orders if str(key).startswith(prefix))
+
+
+def bench_core(core: str, clients: int, requests: int, workdir: Path) -> dict[str, Any]:
+    root = workdir / core
+    root.mkdir()
+    prepare_runtime(root)
+    port = _free_port()
+    proc = start_server(root, core, port, workdir / f"{core}.log")
+    sampler = ProcSampler(proc.pid)
+    sampler.start()
+    results: list[tuple[str, float, bool]] = []
+    acked: list[str] = []
+    try:
+        threads = [threading.Thread(target=run_client, args=(port, c, requests, results, acked)) for c in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stored = count_orders(port)
+    finally:
+        sampler.stop()
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    latencies = [latency for _, latency, _ in results]
+    by_kind = {}
+    for kind, _, _ in MIX:
+        values = [latency for k, latency, _ in results if k == kind]
+        by_kind[kind] = {"p50_ms": round(_percentile(values, 0.5) * 1000, 2), "p95_ms": round(_percentile(values, 0.95) * 1000, 2)}
+    return {
+        "core": core,
+        "requests": len(results),
+        "errors": sum(1 for _, _, ok in results if not ok),
+        "seconds": round(elapsed, 3),
+        "req_per_sec": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "by_kind": by_kind,
+        "peak_threads": sampler.peak_threads,
+        "peak_rss_mb": round(sampler.peak_rss_kb / 1024, 1),
+        "acked_orders": len(acked),
+        "lost_writes": len(acked) - stored,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cores", default="threading,asyncio", help="comma-separated cores to compare")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--json", dest="json_path", default="", help="also write the results here")
+    parser.add_argument("--keep", action="store_true", help="keep the runtime copies and server logs")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="server_cores_"))
+    reports = []
+    try:
+        for core in [c.strip() for c in args.cores.split(",") if c.strip()]:
+            report = bench_core(core, args.clients, args.requests, workdir)
+            reports.append(report)
+            kinds = "  ".join(f"{kind} {v['p50_ms']}/{v['p95_ms']}" for kind, v in report["by_kind"].items())
+            print(
+                f"{core:>9}: {report['req_per_sec']:>8} req/s  p50 {report['p50_ms']} ms  p95 {report['p95_ms']} ms  "
+                f"p99 {report['p99_ms']} ms  errors {report['errors']}  threads {report['peak_threads']}  "
+                f"rss {report['peak_rss_mb']} MB  lost writes {report['lost_writes']}/{report['acked_orders']}"
+            )
+            print(f"{'':>9}  p50/p95 ms by kind: {kinds}")
+    finally:
+        if args.keep:
+            print(f"runtime copies and logs kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(reports, indent=2), encoding="utf-8")
+    return 1 if any(report["lost_writes"] or report["errors"] for report in reports) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
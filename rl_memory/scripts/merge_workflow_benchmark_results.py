@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""Results journal for ``run_workflow_benchmark.py`` and the merge step built on it.
+
+Every benchmark process appends one JSON line per finished goal to
+``{split}_results[.shardIofN].jsonl`` in its output root, preceded by a
+``run`` line describing the configuration.  The journal is the durable
+record of a run: ``--resume`` reads it to skip finished goals, and this
+script rebuilds the summary and markdown from one or more journals without
+importing the agent stack, e.g. after sharding a split across machines::
+
+    python3 rl_memory/scripts/merge_workflow_benchmark_results.py \\
+      --split train --output-dir runs/train_all runs/host_a runs/host_b
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+
+def journal_name(split: str, num_shards: int = 1, shard_index: int = 0) -> str:
+    if num_shards <= 1:
+        return f"{split}_results.jsonl"
+    return f"{split}_results.shard{shard_index}of{num_shards}.jsonl"
+
+
+def shard_goals(goal_refs: list[dict[str, Any]], num_shards: int, shard_index: int) -> list[dict[str, Any]]:
+    """Goals of shard ``shard_index``: every ``num_shards``-th goal, so shards stay balanced."""
+    if num_shards <= 1:
+        return list(goal_refs)
+    return goal_refs[shard_index::num_shards]
+
+
+class ResultsJournal:
+    """Append-only JSONL journal; each line is flushed and fsynced on write."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("a", encoding="utf-8")
+        if self._fh.tell() > 0:
+            with self.path.open("rb") as check_fh:
+                check_fh.seek(-1, os.SEEK_END)
+                if check_fh.read(1) != b"\n":
+                    # Terminate a line torn by a crash so the next entry parses.
+                    self._fh.write("\n")
+
+    def append(self, kind: str, payload: dict[str, Any]) -> None:
+        line = json.dumps({"kind": kind, **payload}, ensure_ascii=False, separators=(",", ":"))
+        self._fh.write(line + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def append_run(self, meta: dict[str, Any], *, fresh: bool = False) -> None:
+        """Journal a run header; a ``fresh`` one discards the goals journaled before it."""
+        self.append("run", {"meta": meta, "fresh": fresh})
+
+    def append_record(self, record: dict[str, Any]) -> None:
+        self.append("goal", {"goal_id": record["goal_id"], "record": record})
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def iter_journal(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield journal entries, skipping a torn last line left by a crash."""
+    with Path(path).open("r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict):
+                yield entry
+
+
+def find_journals(roots: Iterable[Path], split: str) -> list[Path]:
+    """Journals directly in each root or one level below (``shard*/``), or given as files."""
+    paths: list[Path] = []
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            paths.append(root)
+            continue
+        for pattern in (f"{split}_results*.jsonl", f"*/{split}_results*.jsonl"):
+            paths.extend(sorted(root.glob(pattern)))
+    seen: set[Path] = set()
+    unique = []
+    for path in paths:
+        resolved = path.resolve()
+        if resolved not in seen:
+            seen.add(resolved)
+            unique.append(path)
+    return unique
+
+
+def load_journals(paths: Iterable[Path]) -> tuple[dict[str, dict[str, Any]], dict[str, dict[str, Any]]]:
+    """Return (records by goal id, latest run meta by journal path).
+
+    A goal journaled twice (e.g. re-run after a resume) keeps its last record.
+    A ``fresh`` run header (a rerun without ``--resume``) drops the records
+    that journal held before it.
+    """
+    records: dict[str, dict[str, Any]] = {}
+    metas: dict[str, dict[str, Any]] = {}
+    for path in paths:
+        path_records: dict[str, dict[str, Any]] = {}
+        for entry in iter_journal(path):
+            if entry.get("kind") == "run" and isinstance(entry.get("meta"), dict):
+                metas[str(path)] = entry["meta"]
+                if entry.get("fresh"):
+                    path_records.clear()
+            elif entry.get("kind") == "goal" and isinstance(entry.get("record"), dict):
+                path_records[str(entry.get("goal_id"))] = entry["record"]
+        records.update(path_records)
+    return records, metas
+
+
+# Run-meta fields a resumed run must share with every journal it reuses.
+RESUME_META_KEYS = (
+    "batch_root",
+    "split",
+    "module_policy",
+    "atomic_policy",
+    "prompt_mode",
+    "runtime_isolation",
+    "num_shards",
+    "agent_backend",
+    "agent_model",
+)
+
+
+def resume_conflicts(journal_meta: dict[str, Any], current_meta: dict[str, Any]) -> list[str]:
+    """Keys of ``RESUME_META_KEYS`` on which a journal's run line and the current run disagree.
+
+    Keys missing on either side are not compared, nor is the agent identity
+    while either side reports backend ``none`` (a ``--workers`` parent only
+    learns it from the first finished goal).
+    """
+    identity_known = "none" not in (journal_meta.get("agent_backend", "none"), current_meta.get("agent_backend", "none"))
+    conflicts = []
+    for key in RESUME_META_KEYS:
+        if key not in journal_meta or key not in current_meta:
+            continue
+        if key in ("agent_backend", "agent_model") and not identity_known:
+            continue
+        if journal_meta[key] != current_meta[key]:
+            conflicts.append(key)
+    return conflicts
+
+
+def load_resumable_records(paths: Iterable[Path], current_meta: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """``load_journals`` records for ``--resume``; raises ValueError if a journal ran another configuration."""
+    records, metas = load_journals(paths)
+    for path, meta in metas.items():
+        conflicts = resume_conflicts(meta, current_meta)
+        if conflicts:
+            details = ", ".join(f"{key}={meta[key]!r} (now {current_meta[key]!r})" for key in conflicts)
+            raise ValueError(f"cannot resume from {path}: it was written by a different run ({details})")
+    return records
+
+
+def _write_text_atomic(path: Path, text: str) -> None:
+    # Summaries are rewritten while the run is in progress; a crash or a
+    # concurrent reader must never see a truncated file.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def dump_json_atomic(path: Path, payload: Any) -> None:
+    _write_text_atomic(path, json.dumps(payload, ensure_ascii=False, indent=2) + "\n")
+
+
+def summarize_records(
+    *,
+    meta: dict[str, Any],
+    records: list[dict[str, Any]],
+    planned_total_goals: int,
+    is_complete: bool,
+) -> dict[str, Any]:
+    success_type_counts = Counter(item["success_type"] for item in records)
+    per_theme_buckets: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    per_prompt_difficulty_buckets: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for item in records:
+        per_theme_buckets[item["theme"]].append(item)
+        per_prompt_difficulty_buckets[item.get("prompt_difficulty_tier", "easy")].append(item)
+
+    per_theme = {}
+    for theme, items in per_theme_buckets.items():
+        per_theme[theme] = {
+            "goal_count": len(items),
+            "success_count": sum(1 for item in items if item["success"]),
+            "strict_path_success_count": sum(1 for item in items if item.get("strict_path_success", item["success"])),
+            "average_composite_score": sum(item["composite_score"] for item in items) / len(items),
+        }
+
+    per_prompt_difficulty = {}
+    for tier, items in per_prompt_difficulty_buckets.items():
+        per_prompt_difficulty[tier] = {
+            "goal_count": len(items),
+            "success_count": sum(1 for item in items if item["success"]),
+            "strict_path_success_count": sum(1 for item in items if item.get("strict_path_success", item["success"])),
+            "average_composite_score": sum(item["composite_score"] for item in items) / len(items),
+        }
+
+    completed_goals = len(records)
+    success_count = sum(1 for item in records if item["success"])
+    strict_path_success_count = sum(1 for item in records if item.get("strict_path_success", item["success"]))
+    summary = {
+        "version": 1,
+        "batch_root": meta.get("batch_root", ""),
+        "split": meta.get("split", ""),
+        "module_policy": meta.get("module_policy", ""),
+        "atomic_policy": meta.get("atomic_policy", ""),
+        "prompt_mode": meta.get("prompt_mode", "active"),
+        "runtime_isolation": meta.get("runtime_isolation", ""),
+        "runtime_note": meta.get("runtime_note", ""),
+        "agent_backend": meta.get("agent_backend", "none"),
+        "agent_model": meta.get("agent_model", ""),
+        "total_goals": planned_total_goals if planned_total_goals else completed_goals,
+        "completed_goals": completed_goals,
+        "is_complete": is_complete,
+        "final_success_count": success_count,
+        "final_success_rate": (success_count / completed_goals) if completed_goals else 0.0,
+        "strict_path_success_count": strict_path_success_count,
+        "strict_path_success_rate": (strict_path_success_count / completed_goals) if completed_goals else 0.0,
+        "average_composite_score": (sum(item["composite_score"] for item in records) / completed_goals) if completed_goals else 0.0,
+        "success_type_counts": dict(sorted(success_type_counts.items())),
+        "per_theme": per_theme,
+        "per_prompt_difficulty": per_prompt_difficulty,
+        "records": records,
+    }
+    return summary
+
+
+def render_markdown(path: Path, summary: dict[str, Any]) -> None:
+    lines = [
+        "# Workflow Benchmark Run",
+        "",
+        f"- batch_root: `{summary['batch_root']}`",
+        f"- split: `{summary['split']}`",
+        f"- module_policy: `{summary['module_policy']}`",
+        f"- atomic_policy: `{summary['atomic_policy']}`",
+        f"- prompt_mode: `{summary.get('prompt_mode', 'active')}`",
+        f"- runtime_isolation: `{summary['runtime_isolation']}`",
+        f"- agent_backend: `{summary['agent_backend']}`",
+        f"- agent_model: `{summary['agent_model']}`",
+        f"- total_goals: {summary['total_goals']}",
+        f"- final_success_count: {summary['final_success_count']}",
+        f"- final_success_rate: {summary['final_success_rate']:.4f}",
+        f"- strict_path_success_count: {summary.get('strict_path_success_count', summary['final_success_count'])}",
+        f"- strict_path_success_rate: {summary.get('strict_path_success_rate', summary['final_success_rate']):.4f}",
+        f"- average_composite_score: {summary['average_composite_score']:.4f}",
+        f"- runtime_note: {summary['runtime_note']}",
+        "",
+        "## Success Types",
+    ]
+    for key, value in sorted(summary["success_type_counts"].items()):
+        lines.append(f"- `{key}`: {value}")
+    lines += ["", "## Per Theme"]
+    for theme, item in sorted(summary["per_theme"].items()):
+        lines.append(
+            f"- `{theme}`: {item['success_count']}/{item['goal_count']} semantic success, "
+            f"strict_path={item.get('strict_path_success_count', item['success_count'])}/{item['goal_count']}, "
+            f"avg_score={item['average_composite_score']:.4f}"
+        )
+    if summary.get("per_prompt_difficulty"):
+        lines += ["", "## Per Prompt Difficulty"]
+        for tier, item in sorted(summary["per_prompt_difficulty"].items()):
+            lines.append(
+                f"- `{tier}`: {item['success_count']}/{item['goal_count']} semantic success, "
+                f"strict_path={item.get('strict_path_success_count', item['success_count'])}/{item['goal_count']}, "
+                f"avg_score={item['average_composite_score']:.4f}"
+            )
+    if "completed_goals" in summary:
+        lines += [
+            "",
+            "## Progress",
+            f"- completed_goals: {summary['completed_goals']}",
+            f"- is_complete: {summary.get('is_complete', False)}",
+        ]
+    _write_text_atomic(path, "\n".join(lines) + "\n")
+
+
+def merge_journals(paths: list[Path]) -> dict[str, Any]:
+    records_by_goal, metas = load_journals(paths)
+    if not metas:
+        raise ValueError("no run metadata found in journals")
+    meta = dict(next(iter(metas.values())))
+    # Shard I of N ran goals I, I+N, I+2N, ... of the split; interleave the
+    # shards' goal lists back into that order.
+    planned_positions: dict[str, tuple[int, int]] = {}
+    for shard_meta in metas.values():
+        num_shards = max(1, int(shard_meta.get("num_shards", 1)))
+        shard_index = int(shard_meta.get("shard_index", 0))
+        for position, goal_id in enumerate(shard_meta.get("goal_ids", [])):
+            planned_positions.setdefault(goal_id, (position * num_shards + shard_index, len(planned_positions)))
+        if shard_meta.get("agent_backend", "none") != "none":
+            meta["agent_backend"] = shard_meta["agent_backend"]
+            meta["agent_model"] = shard_meta.get("agent_model", "")
+    planned_ids = sorted(planned_positions, key=planned_positions.__getitem__)
+    seen_ids = set(planned_ids)
+    # Journal order follows completion order; report in planned goal order.
+    records = [records_by_goal[goal_id] for goal_id in planned_ids if goal_id in records_by_goal]
+    records += [record for goal_id, record in sorted(records_by_goal.items()) if goal_id not in seen_ids]
+    summary = summarize_records(
+        meta=meta,
+        records=records,
+        planned_total_goals=len(planned_ids),
+        is_complete=bool(planned_ids) and all(goal_id in records_by_goal for goal_id in planned_ids),
+    )
+    summary["journals"] = [str(path) for path in paths]
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge workflow benchmark results journals into a summary.")
+    parser.add_argument("inputs", nargs="+", help="Output roots (or journal files) of one or more benchmark runs/shards.")
+    parser.add_argument("--split", choices=["train", "dev", "test"], default="dev")
+    parser.add_argument("--output-dir", default="", help="Where to write the summary. Defaults to the first input root.")
+    parser.add_argument("--name", default="", help="Summary file stem. Defaults to `{split}_summary`.")
+    args = parser.parse_args()
+
+    paths = find_journals([Path(item) for item in args.inputs], args.split)
+    if not paths:
+        raise SystemExit(f"No {args.split}_results*.jsonl journals found under: {', '.join(args.inputs)}")
+    summary = merge_journals(paths)
+
+    first = Path(args.inputs[0])
+    output_dir = Path(args.output_dir) if args.output_dir else (first.parent if first.is_file() else first)
+    stem = args.name or f"{args.split}_summary"
+    dump_json_atomic(output_dir / f"{stem}.json", summary)
+    render_markdown(output_dir / f"{stem}.md", summary)
+    print(
+        json.dumps(
+            {
+                "journals": len(paths),
+                "completed_goals": summary["completed_goals"],
+                "total_goals": summary["total_goals"],
+                "is_complete": summary["is_complete"],
+                "final_success_rate": summary["final_success_rate"],
+                "output": str(output_dir / f"{stem}.json"),
+            },
+            ensure_ascii=False,
+        ),
+        file=sys.stdout,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -110,6 +110,11 @@ def _merge_trajectory(snapshot: Path, delta: Path, out: Path) -> int:
 
 
 def _merge_memorybank(method: str, snapshot: Path, delta: Path, out: Path) -> int:
+    if method == "memorybank" and snapshot.exists():
+        from rl_memory.memory_baselines.memorybank.store import MemoryBankStore
+
+        # Retrieval logs access counts next to the snapshot; fold them in before copying.
+        MemoryBankStore(snapshot).compact()
     _copy_or_empty(snapshot, out)
     entries = list(_read_json(delta, []))
     if not entries:
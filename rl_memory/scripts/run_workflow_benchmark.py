@@ -5,6 +5,7 @@ import argparse
 import copy
 import importlib.util
 import json
+import multiprocessing
 import os
 import re
 import socket
@@ -14,12 +15,15 @@ import subprocess
 import sys
 import time
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Any, Optional
 from urllib.parse import urlsplit, urlunsplit
-from urllib.request import urlopen
+from urllib.request import Request, urlopen
 
 ROOT = Path(__file__).resolve().parents[2]
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -403,6 +407,33 @@ except ModuleNotFoundError:
     canonical_module_id = _workflow_eval.canonical_module_id
     evaluate_episode = _workflow_eval.evaluate_episode
 
+try:
+    from rl_memory.scripts.workflow_planning_index import planning_index  # noqa: E402
+except ModuleNotFoundError:
+    planning_index = _load_local_helper("_workflow_planning_index_local", "workflow_planning_index.py").planning_index
+
+try:
+    from rl_memory.scripts.merge_workflow_benchmark_results import (  # noqa: E402
+        ResultsJournal,
+        dump_json_atomic,
+        find_journals,
+        journal_name,
+        load_resumable_records,
+        render_markdown,
+        shard_goals,
+        summarize_records,
+    )
+except ModuleNotFoundError:
+    _results_journal = _load_local_helper("_workflow_results_local", "merge_workflow_benchmark_results.py")
+    ResultsJournal = _results_journal.ResultsJournal
+    dump_json_atomic = _results_journal.dump_json_atomic
+    find_journals = _results_journal.find_journals
+    journal_name = _results_journal.journal_name
+    load_resumable_records = _results_journal.load_resumable_records
+    render_markdown = _results_journal.render_markdown
+    shard_goals = _results_journal.shard_goals
+    summarize_records = _results_journal.summarize_records
+
 try:
     from rl_memory.scripts.run_workflow_episode import (  # noqa: E402
         apply_effects,
@@ -491,7 +522,39 @@ def parse_args() -> argparse.Namespace:
         default="per_goal",
         help="Runtime isolation mode. Use `per_goal` for official results; `shared` is debug-only.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Number of worker processes for per_goal isolation. Each worker owns a reusable runtime root and "
+            "server that is reset to the clean snapshot before every goal, and builds its own agent client."
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Skip goals already recorded in the results journal (or with a workflow_run_summary.json) "
+            "under --output-root and reuse those records."
+        ),
+    )
+    parser.add_argument("--num-shards", type=int, default=1, help="Split the selected goals into this many shards.")
+    parser.add_argument("--shard-index", type=int, default=0, help="0-based shard of --num-shards to run.")
+    parser.add_argument(
+        "--partial-summary-interval-sec",
+        type=float,
+        default=60.0,
+        help="Minimum seconds between partial summary rebuilds; the results journal is appended after every goal.",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if args.num_shards < 1 or not 0 <= args.shard_index < args.num_shards:
+        parser.error("--shard-index must be in [0, --num-shards)")
+    if args.workers > 1 and args.runtime_isolation == "shared":
+        parser.error("--workers > 1 requires --runtime-isolation per_goal")
+    return args
 
 
 def _alloc_port() -> int:
@@ -501,6 +564,22 @@ def _alloc_port() -> int:
         return int(sock.getsockname()[1])
 
 
+def _ignore_transient_files(_src: str, names: list[str]) -> set[str]:
+    ignored = set()
+    for name in names:
+        if (
+            name == ".DS_Store"
+            or name.startswith(".~")
+            or name.startswith(".nfs")
+            or name.endswith("~")
+            or name.endswith(".swp")
+            or name.endswith(".swo")
+            or name.endswith(".tmp")
+        ):
+            ignored.add(name)
+    return ignored
+
+
 def _prepare_goal_runtime(runtime_root: Path, snapshot_root: Path) -> None:
     if runtime_root.exists():
         shutil.rmtree(runtime_root)
@@ -508,21 +587,6 @@ def _prepare_goal_runtime(runtime_root: Path, snapshot_root: Path) -> None:
     (runtime_root / "tasks").mkdir(parents=True, exist_ok=True)
     (runtime_root / "output").mkdir(parents=True, exist_ok=True)
 
-    def _ignore_transient_files(_src: str, names: list[str]) -> set[str]:
-        ignored = set()
-        for name in names:
-            if (
-                name == ".DS_Store"
-                or name.startswith(".~")
-                or name.startswith(".nfs")
-                or name.endswith("~")
-                or name.endswith(".swp")
-                or name.endswith(".swo")
-                or name.endswith(".tmp")
-            ):
-                ignored.add(name)
-        return ignored
-
     shutil.copytree(ROOT / "env", runtime_root / "env", dirs_exist_ok=True, ignore=_ignore_transient_files)
     sites_dst = runtime_root / "sites"
     try:
@@ -954,30 +1018,15 @@ def compute_needed_predicates(
     depth: int,
     allowed_module_ids: set[str] | None = None,
 ) -> set[str]:
-    modules = modules_doc["modules"]
-    needed = set(remaining_targets)
-    frontier = set(remaining_targets)
-    for _ in range(max(0, depth)):
-        new_preds: set[str] = set()
-        for module in modules:
-            if module.get("module_id") in DEPRECATED_WORKFLOW_MODULE_IDS:
-                continue
-            if allowed_module_ids and module["module_id"] not in allowed_module_ids:
-                continue
-            adds = set(module.get("effects", {}).get("adds", []))
-            if not adds & frontier:
-                continue
-            requires = module.get("requires", {})
-            new_preds |= (set(requires.get("all_of", [])) - state)
-            any_of = set(requires.get("any_of", []))
-            if any_of and not (any_of & state):
-                new_preds |= any_of
-        new_preds -= needed
-        if not new_preds:
-            break
-        needed |= new_preds
-        frontier = new_preds
-    return needed
+    index = planning_index(modules_doc, DEPRECATED_WORKFLOW_MODULE_IDS)
+    return index.names(
+        index.needed_mask(
+            index.mask(state),
+            index.mask(remaining_targets),
+            depth,
+            index.allowed_mask(allowed_module_ids),
+        )
+    )
 
 
 def score_module_candidate(
@@ -1019,66 +1068,14 @@ def can_reach_targets_within(
     blocked_modules: set[str],
     allowed_module_ids: set[str] | None = None,
 ) -> bool:
-    if not remaining_targets or remaining_targets <= state:
-        return True
-    if depth <= 0:
-        return False
-
-    visited: set[tuple[frozenset[str], int]] = set()
-    frontier: list[tuple[set[str], int]] = [(set(state), depth)]
-
-    while frontier:
-        current_state, steps_left = frontier.pop(0)
-        if remaining_targets <= current_state:
-            return True
-        if steps_left <= 0:
-            continue
-
-        current_remaining = remaining_targets - current_state
-        needed_predicates = compute_needed_predicates(
-            modules_doc,
-            current_state,
-            current_remaining,
-            min(2, steps_left),
-            allowed_module_ids=allowed_module_ids,
-        )
-
-        ranked_next: list[tuple[int, int, str, set[str]]] = []
-        for module in modules_doc["modules"]:
-            module_id = module["module_id"]
-            if module_id in DEPRECATED_WORKFLOW_MODULE_IDS:
-                continue
-            if allowed_module_ids and module_id not in allowed_module_ids:
-                continue
-            if module_id in blocked_modules:
-                continue
-            if not preconditions_satisfied(module.get("requires", {}), current_state):
-                continue
-
-            adds = set(module.get("effects", {}).get("adds", []))
-            relevant_hits = adds & current_remaining
-            support_hits = adds & (needed_predicates - current_remaining)
-            if not relevant_hits and not support_hits:
-                continue
-
-            next_state = apply_effects(current_state, module)
-            if next_state == current_state:
-                continue
-
-            ranked_next.append(
-                (len(relevant_hits), len(support_hits), module_id, next_state)
-            )
-
-        ranked_next.sort(key=lambda item: (item[0], item[1], item[2]), reverse=True)
-
-        for _, _, _, next_state in ranked_next[:16]:
-            key = (frozenset(next_state), steps_left - 1)
-            if key in visited:
-                continue
-            visited.add(key)
-            frontier.append((next_state, steps_left - 1))
-
-    return False
+    index = planning_index(modules_doc, DEPRECATED_WORKFLOW_MODULE_IDS)
+    return index.can_reach(
+        index.mask(state),
+        index.mask(remaining_targets),
+        depth,
+        index.module_mask(blocked_modules),
+        index.allowed_mask(allowed_module_ids),
+    )
 
 
 def shortlist_candidates(
@@ -1097,25 +1094,23 @@ def shortlist_candidates(
     decoy_quota: int = 0,
     decoy_insert_rank: int = 3,
 ) -> list[dict[str, Any]]:
-    needed_predicates = compute_needed_predicates(
-        modules_doc,
-        state,
-        remaining_targets,
-        backward_depth,
-        allowed_module_ids=allowed_module_ids,
-    )
+    index = planning_index(modules_doc, DEPRECATED_WORKFLOW_MODULE_IDS)
+    state_mask = index.mask(state)
+    remaining_mask = index.mask(remaining_targets)
+    allowed_mask = index.allowed_mask(allowed_module_ids)
+    needed_mask = index.needed_mask(state_mask, remaining_mask, backward_depth, allowed_mask)
+    needed_predicates = index.names(needed_mask)
+    done_mask = index.module_mask(failed_modules) | index.module_mask(successful_modules)
     ranked_relevant: list[dict[str, Any]] = []
     ranked_fallback: list[dict[str, Any]] = []
-    for module in modules_doc["modules"]:
-        module_id = module["module_id"]
-        if module_id in DEPRECATED_WORKFLOW_MODULE_IDS:
-            continue
-        if allowed_module_ids and module_id not in allowed_module_ids:
-            continue
-        if module_id in failed_modules:
-            continue
-        if module_id in successful_modules:
+    for compiled in index.iter_modules(allowed_mask & ~done_mask):
+        # needed_predicates includes the targets, so this is "adds a target or
+        # a supporting predicate".
+        is_relevant = bool(compiled.adds & needed_mask)
+        if not is_relevant and not index.executable(compiled, state_mask):
             continue
+        module = compiled.module
+        module_id = compiled.module_id
         score, executable = score_module_candidate(
             module,
             state,
@@ -1125,21 +1120,16 @@ def shortlist_candidates(
             forbidden_modules=forbidden_modules,
             forbidden_predicates=forbidden_predicates,
         )
-        adds = set(module.get("effects", {}).get("adds", []))
-        is_relevant = bool(adds & remaining_targets) or bool(adds & (needed_predicates - remaining_targets))
-        if not executable and not is_relevant:
-            continue
         reachable = True
         if executable:
-            next_state = apply_effects(state, module)
-            next_remaining = remaining_targets - next_state
-            reachable = can_reach_targets_within(
-                modules_doc=modules_doc,
-                state=next_state,
-                remaining_targets=next_remaining,
-                depth=max(0, remaining_invocations - 1),
-                blocked_modules=set(failed_modules) | set(successful_modules) | {module_id},
-                allowed_module_ids=allowed_module_ids,
+            next_state = index.apply(compiled, state_mask)
+            next_remaining = remaining_mask & ~next_state
+            reachable = index.can_reach(
+                next_state,
+                next_remaining,
+                max(0, remaining_invocations - 1),
+                done_mask | index.module_mask((module_id,)),
+                allowed_mask,
             )
             if next_remaining and not reachable:
                 score -= 100.0
@@ -3318,15 +3308,50 @@ def snapshot_runtime(runtime_root: Path, snapshot_root: Path) -> None:
     _initialize_clean_snapshot_db(snapshot_root / "data.db")
 
 
+def _restore_sqlite_db(source: Path, destination: Path, retries: int = 20, sleep_sec: float = 0.1) -> None:
+    # Copy through SQLite rather than over the file: a reused worker server keeps
+    # connections open on ``destination``, and only a backup into the same file
+    # is seen by them (and leaves its -wal/-shm consistent).
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    last_exc: Exception | None = None
+    for _ in range(max(1, retries)):
+        src = None
+        dst = None
+        try:
+            src = sqlite3.connect(str(source), timeout=30)
+            dst = sqlite3.connect(str(destination), timeout=30)
+            dst.execute("PRAGMA busy_timeout=30000")
+            src.backup(dst)
+            dst.commit()
+            return
+        except sqlite3.OperationalError as exc:
+            last_exc = exc
+            if "locked" not in str(exc).lower():
+                raise
+            time.sleep(sleep_sec)
+        finally:
+            if src is not None:
+                src.close()
+            if dst is not None:
+                dst.close()
+    if last_exc is not None:
+        raise last_exc
+
+
 def restore_runtime(runtime_root: Path, snapshot_root: Path) -> None:
-    for rel in ("data.db", "data.db-shm", "data.db-wal", "env/state.json"):
-        src = snapshot_root / rel
-        dst = runtime_root / rel
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        if src.exists():
-            shutil.copy2(src, dst)
-        elif dst.exists():
-            dst.unlink()
+    db_snapshot = snapshot_root / "data.db"
+    if db_snapshot.exists():
+        _restore_sqlite_db(db_snapshot, runtime_root / "data.db")
+    else:
+        for rel in ("data.db", "data.db-shm", "data.db-wal"):
+            (runtime_root / rel).unlink(missing_ok=True)
+    src = snapshot_root / "env" / "state.json"
+    dst = runtime_root / "env" / "state.json"
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if src.exists():
+        shutil.copy2(src, dst)
+    elif dst.exists():
+        dst.unlink()
 
 
 def _runtime_initial_predicates(raw: Any) -> set[str]:
@@ -3928,53 +3953,18 @@ def run_single_goal(
     return record
 
 
-def render_markdown(path: Path, summary: dict[str, Any]) -> None:
-    lines = [
-        "# Workflow Benchmark Run",
-        "",
-        f"- batch_root: `{summary['batch_root']}`",
-        f"- split: `{summary['split']}`",
-        f"- module_policy: `{summary['module_policy']}`",
-        f"- atomic_policy: `{summary['atomic_policy']}`",
-        f"- prompt_mode: `{summary.get('prompt_mode', 'active')}`",
-        f"- runtime_isolation: `{summary['runtime_isolation']}`",
-        f"- agent_backend: `{summary['agent_backend']}`",
-        f"- agent_model: `{summary['agent_model']}`",
-        f"- total_goals: {summary['total_goals']}",
-        f"- final_success_count: {summary['final_success_count']}",
-        f"- final_success_rate: {summary['final_success_rate']:.4f}",
-        f"- strict_path_success_count: {summary.get('strict_path_success_count', summary['final_success_count'])}",
-        f"- strict_path_success_rate: {summary.get('strict_path_success_rate', summary['final_success_rate']):.4f}",
-        f"- average_composite_score: {summary['average_composite_score']:.4f}",
-        f"- runtime_note: {summary['runtime_note']}",
-        "",
-        "## Success Types",
-    ]
-    for key, value in sorted(summary["success_type_counts"].items()):
-        lines.append(f"- `{key}`: {value}")
-    lines += ["", "## Per Theme"]
-    for theme, item in sorted(summary["per_theme"].items()):
-        lines.append(
-            f"- `{theme}`: {item['success_count']}/{item['goal_count']} semantic success, "
-            f"strict_path={item.get('strict_path_success_count', item['success_count'])}/{item['goal_count']}, "
-            f"avg_score={item['average_composite_score']:.4f}"
-        )
-    if summary.get("per_prompt_difficulty"):
-        lines += ["", "## Per Prompt Difficulty"]
-        for tier, item in sorted(summary["per_prompt_difficulty"].items()):
-            lines.append(
-                f"- `{tier}`: {item['success_count']}/{item['goal_count']} semantic success, "
-                f"strict_path={item.get('strict_path_success_count', item['success_count'])}/{item['goal_count']}, "
-                f"avg_score={item['average_composite_score']:.4f}"
-            )
-    if "completed_goals" in summary:
-        lines += [
-            "",
-            "## Progress",
-            f"- completed_goals: {summary['completed_goals']}",
-            f"- is_complete: {summary.get('is_complete', False)}",
-        ]
-    path.write_text("\n".join(lines) + "\n")
+def run_meta(batch_root: Path, split: str, args: argparse.Namespace, client: Any) -> dict[str, Any]:
+    return {
+        "batch_root": str(batch_root),
+        "split": split,
+        "module_policy": args.module_policy,
+        "atomic_policy": args.atomic_policy,
+        "prompt_mode": args.prompt_mode,
+        "runtime_isolation": args.runtime_isolation,
+        "runtime_note": RUNTIME_ISOLATION_NOTES[args.runtime_isolation],
+        "agent_backend": getattr(client, "backend_name", "none") if client else "none",
+        "agent_model": getattr(client, "model", "") if client else "",
+    }
 
 
 def build_summary(
@@ -3987,59 +3977,212 @@ def build_summary(
     planned_total_goals: int,
     is_complete: bool,
 ) -> dict[str, Any]:
-    success_type_counts = Counter(item["success_type"] for item in records)
-    per_theme_buckets: dict[str, list[dict[str, Any]]] = defaultdict(list)
-    per_prompt_difficulty_buckets: dict[str, list[dict[str, Any]]] = defaultdict(list)
-    for item in records:
-        per_theme_buckets[item["theme"]].append(item)
-        per_prompt_difficulty_buckets[item.get("prompt_difficulty_tier", "easy")].append(item)
-
-    per_theme = {}
-    for theme, items in per_theme_buckets.items():
-        per_theme[theme] = {
-            "goal_count": len(items),
-            "success_count": sum(1 for item in items if item["success"]),
-            "strict_path_success_count": sum(1 for item in items if item.get("strict_path_success", item["success"])),
-            "average_composite_score": sum(item["composite_score"] for item in items) / len(items),
-        }
+    return summarize_records(
+        meta=run_meta(batch_root, split, args, client),
+        records=records,
+        planned_total_goals=planned_total_goals,
+        is_complete=is_complete,
+    )
 
-    per_prompt_difficulty = {}
-    for tier, items in per_prompt_difficulty_buckets.items():
-        per_prompt_difficulty[tier] = {
-            "goal_count": len(items),
-            "success_count": sum(1 for item in items if item["success"]),
-            "strict_path_success_count": sum(1 for item in items if item.get("strict_path_success", item["success"])),
-            "average_composite_score": sum(item["composite_score"] for item in items) / len(items),
-        }
 
-    completed_goals = len(records)
-    success_count = sum(1 for item in records if item["success"])
-    strict_path_success_count = sum(1 for item in records if item.get("strict_path_success", item["success"]))
-    summary = {
-        "version": 1,
-        "batch_root": str(batch_root),
-        "split": split,
-        "module_policy": args.module_policy,
-        "atomic_policy": args.atomic_policy,
-        "prompt_mode": args.prompt_mode,
-        "runtime_isolation": args.runtime_isolation,
-        "runtime_note": RUNTIME_ISOLATION_NOTES[args.runtime_isolation],
+_BENCHMARK_WORKER: dict[str, Any] = {}
+
+
+def _load_existing_records(
+    output_root: Path,
+    goal_output_root: Path,
+    split: str,
+    goal_refs: list[dict[str, Any]],
+    current_meta: dict[str, Any],
+) -> tuple[dict[str, dict[str, Any]], set[str]]:
+    """Records of goals that already finished under ``output_root`` (for ``--resume``).
+
+    The results journal is authoritative; per-goal ``workflow_run_summary.json``
+    files cover goals that finished before the journal line was written.
+    Returns the records and the ids that still need to be journaled.  Raises
+    ValueError if a journal was written with a configuration other than
+    ``current_meta``.
+    """
+    wanted = {goal_ref["goal_id"] for goal_ref in goal_refs}
+    journaled = load_resumable_records(find_journals([output_root], split), current_meta)
+    records = {goal_id: record for goal_id, record in journaled.items() if goal_id in wanted}
+    for goal_ref in goal_refs:
+        goal_id = goal_ref["goal_id"]
+        if goal_id in records:
+            continue
+        path = goal_output_root / goal_id / "workflow_run_summary.json"
+        if not path.exists():
+            continue
+        try:
+            record = load_json(path)
+        except (OSError, ValueError):
+            continue
+        if isinstance(record, dict) and record.get("goal_id") == goal_id:
+            records[goal_id] = record
+    return records, set(records) - set(journaled)
+
+
+def _reset_worker_runtime(runtime_root: Path, snapshot_root: Path) -> None:
+    for name in ("env", "output", "tasks"):
+        shutil.rmtree(runtime_root / name, ignore_errors=True)
+    (runtime_root / "tasks").mkdir(parents=True, exist_ok=True)
+    (runtime_root / "output").mkdir(parents=True, exist_ok=True)
+    shutil.copytree(ROOT / "env", runtime_root / "env", dirs_exist_ok=True, ignore=_ignore_transient_files)
+    restore_runtime(runtime_root, snapshot_root)
+
+
+def _stop_worker_server() -> None:
+    proc = _BENCHMARK_WORKER.get("proc")
+    if proc is not None and proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+    _BENCHMARK_WORKER["proc"] = None
+    worker_root = _BENCHMARK_WORKER.get("worker_root")
+    if worker_root is not None:
+        (worker_root / "server.pid").unlink(missing_ok=True)
+
+
+def _ensure_worker_server() -> str:
+    proc = _BENCHMARK_WORKER.get("proc")
+    if proc is not None and proc.poll() is None:
+        request = Request(f"{_BENCHMARK_WORKER['base_url']}/api/state/reload", data=b"{}", method="POST")
+        with urlopen(request, timeout=10) as resp:
+            resp.read()
+        return _BENCHMARK_WORKER["base_url"]
+    worker_root: Path = _BENCHMARK_WORKER["worker_root"]
+    proc, base_url = _start_goal_server(_BENCHMARK_WORKER["runtime_root"], worker_root / "server.log")
+    (worker_root / "server.pid").write_text(f"{proc.pid}\n", encoding="utf-8")
+    _BENCHMARK_WORKER.update(proc=proc, base_url=base_url)
+    return base_url
+
+
+def _init_benchmark_worker(
+    isolated_root: str,
+    snapshot_root: str,
+    split_root: str,
+    goal_output_root: str,
+    args: argparse.Namespace,
+) -> None:
+    worker_root = Path(isolated_root) / f"worker-{os.getpid()}"
+    runtime_root = worker_root / "runtime"
+    _prepare_goal_runtime(runtime_root, Path(snapshot_root))
+    client = None
+    if args.module_policy == "llm" or args.atomic_policy == "agent":
+        client = build_client()
+    _BENCHMARK_WORKER.update(
+        worker_root=worker_root,
+        runtime_root=runtime_root,
+        snapshot_root=Path(snapshot_root),
+        split_root=Path(split_root),
+        goal_output_root=Path(goal_output_root),
+        modules_doc=load_json(Path(args.modules)),
+        bindings_doc=load_json(Path(args.bindings)),
+        client=client,
+        args=args,
+        proc=None,
+    )
+    # Pool workers leave through multiprocessing's own exit path, which runs
+    # Finalize callbacks but not necessarily atexit handlers.
+    multiprocessing.util.Finalize(None, _stop_worker_server, exitpriority=10)
+
+
+def _run_goal_in_worker(goal_ref: dict[str, Any]) -> dict[str, Any]:
+    worker = _BENCHMARK_WORKER
+    runtime_root: Path = worker["runtime_root"]
+    _reset_worker_runtime(runtime_root, worker["snapshot_root"])
+    base_url = _ensure_worker_server()
+    env_updates = {
+        "WEBAGENT_RUNTIME_ROOT": str(runtime_root),
+        "WEBAGENT_SERVER_BASE_URL": base_url,
+        "WEBAGENT_SERVER_PORT": base_url.rsplit(":", 1)[-1],
+    }
+    with _temporary_process_env(env_updates), _pushd(runtime_root):
+        record = run_single_goal(
+            goal_ref=goal_ref,
+            split_root=worker["split_root"],
+            output_root=worker["goal_output_root"],
+            runtime_root=runtime_root,
+            snapshot_root=worker["snapshot_root"],
+            modules_doc=worker["modules_doc"],
+            bindings_doc=worker["bindings_doc"],
+            client=worker["client"],
+            args=worker["args"],
+        )
+    client = worker["client"]
+    return {
+        "record": record,
         "agent_backend": getattr(client, "backend_name", "none") if client else "none",
         "agent_model": getattr(client, "model", "") if client else "",
-        "total_goals": planned_total_goals if planned_total_goals else completed_goals,
-        "completed_goals": completed_goals,
-        "is_complete": is_complete,
-        "final_success_count": success_count,
-        "final_success_rate": (success_count / completed_goals) if completed_goals else 0.0,
-        "strict_path_success_count": strict_path_success_count,
-        "strict_path_success_rate": (strict_path_success_count / completed_goals) if completed_goals else 0.0,
-        "average_composite_score": (sum(item["composite_score"] for item in records) / completed_goals) if completed_goals else 0.0,
-        "success_type_counts": dict(sorted(success_type_counts.items())),
-        "per_theme": per_theme,
-        "per_prompt_difficulty": per_prompt_difficulty,
-        "records": records,
     }
-    return summary
+
+
+def _kill_orphaned_worker_servers(isolated_root: Path) -> None:
+    for pid_path in isolated_root.glob("worker-*/server.pid"):
+        try:
+            pid = int(pid_path.read_text(encoding="utf-8").strip())
+        except (OSError, ValueError):
+            continue
+        try:
+            os.kill(pid, 15)
+        except OSError:
+            pass
+        pid_path.unlink(missing_ok=True)
+
+
+def run_goals_with_workers(
+    goal_refs: list[dict[str, Any]],
+    *,
+    isolated_root: Path,
+    snapshot_root: Path,
+    split_root: Path,
+    goal_output_root: Path,
+    args: argparse.Namespace,
+    on_record: Any,
+    max_attempts: int = 2,
+) -> None:
+    """Run ``goal_refs`` on ``args.workers`` processes, calling ``on_record`` as goals finish.
+
+    A worker that dies (OOM, browser crash) breaks the pool; goals that were
+    in flight at that moment are retried on a fresh pool up to
+    ``max_attempts`` times, and goals that raise are reported and skipped so
+    a later ``--resume`` run can pick them up.
+    """
+    attempts: Counter[str] = Counter()
+    pending = list(goal_refs)
+    ctx = multiprocessing.get_context("spawn")
+    while pending:
+        retry: list[dict[str, Any]] = []
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(args.workers, len(pending)),
+                mp_context=ctx,
+                initializer=_init_benchmark_worker,
+                initargs=(str(isolated_root), str(snapshot_root), str(split_root), str(goal_output_root), args),
+            ) as pool:
+                futures = {pool.submit(_run_goal_in_worker, goal_ref): goal_ref for goal_ref in pending}
+                for future in as_completed(futures):
+                    goal_ref = futures[future]
+                    goal_id = goal_ref["goal_id"]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        attempts[goal_id] += 1
+                        if attempts[goal_id] < max_attempts:
+                            retry.append(goal_ref)
+                        else:
+                            print(f"[workflow-benchmark] giving up on {goal_id}: worker crashed", file=sys.stderr)
+                        continue
+                    except Exception as exc:
+                        print(f"[workflow-benchmark] goal {goal_id} failed: {exc}", file=sys.stderr)
+                        continue
+                    on_record(result)
+        finally:
+            _kill_orphaned_worker_servers(isolated_root)
+        order = {goal_ref["goal_id"]: index for index, goal_ref in enumerate(goal_refs)}
+        pending = sorted(retry, key=lambda item: order[item["goal_id"]])
 
 
 def main() -> None:
@@ -4057,8 +4200,11 @@ def main() -> None:
     output_root = Path(args.output_root).resolve()
     output_root.mkdir(parents=True, exist_ok=True)
 
+    # Shards may share one output root (e.g. on shared storage), so every
+    # per-process artifact carries the shard tag.
+    shard_tag = f"_shard{args.shard_index}of{args.num_shards}" if args.num_shards > 1 else ""
     runtime_root = Path(args.runtime_root).resolve()
-    snapshot_root = output_root / "_runtime_snapshot"
+    snapshot_root = output_root / f"_runtime_snapshot{shard_tag}"
     snapshot_runtime(runtime_root, snapshot_root)
 
     modules_doc = load_json(Path(args.modules))
@@ -4070,31 +4216,84 @@ def main() -> None:
         args.limit,
         args.prompt_difficulty,
     )
+    goal_refs = shard_goals(goal_refs, args.num_shards, args.shard_index)
 
+    goal_output_root = output_root / args.split
+    planned_total_goals = len(goal_refs)
     client = None
-    if args.module_policy == "llm" or args.atomic_policy == "agent":
+    if args.workers > 1:
+        # Workers build their own clients; the parent only needs the identity
+        # for the summary header.
+        client = SimpleNamespace(backend_name="none", model="")
+    elif args.module_policy == "llm" or args.atomic_policy == "agent":
         client = build_client()
 
-    records = []
-    goal_output_root = output_root / args.split
-    planned_total_goals = len(goal_refs)
+    records_by_goal: dict[str, dict[str, Any]] = {}
+    unjournaled_ids: set[str] = set()
+    if args.resume:
+        current_meta = run_meta(batch_root, args.split, args, client)
+        current_meta["num_shards"] = args.num_shards
+        try:
+            records_by_goal, unjournaled_ids = _load_existing_records(
+                output_root, goal_output_root, args.split, goal_refs, current_meta
+            )
+        except ValueError as exc:
+            raise SystemExit(f"[workflow-benchmark] {exc}") from None
+        if records_by_goal:
+            print(f"[workflow-benchmark] resume: skipping {len(records_by_goal)} completed goals", file=sys.stderr)
+    pending_refs = [goal_ref for goal_ref in goal_refs if goal_ref["goal_id"] not in records_by_goal]
+
+    journal = ResultsJournal(output_root / journal_name(args.split, args.num_shards, args.shard_index))
+    goal_ids = [ref["goal_id"] for ref in goal_refs]
+    journal_identity: dict[str, Any] = {}
+
+    def _journal_run_meta(fresh: bool = False) -> None:
+        meta = run_meta(batch_root, args.split, args, client)
+        identity = {"agent_backend": meta["agent_backend"], "agent_model": meta["agent_model"]}
+        if identity == journal_identity:
+            return
+        journal_identity.update(identity)
+        meta.update(num_shards=args.num_shards, shard_index=args.shard_index, goal_ids=goal_ids)
+        journal.append_run(meta, fresh=fresh)
+
+    # Without --resume this run starts over; its header hides the goals an
+    # earlier run left in the same journal.
+    _journal_run_meta(fresh=not args.resume)
+    for goal_id in goal_ids:
+        if goal_id in unjournaled_ids:
+            journal.append_record(records_by_goal[goal_id])
+    last_partial_summary: list[float] = []
+
+    def _ordered_records() -> list[dict[str, Any]]:
+        return [records_by_goal[ref["goal_id"]] for ref in goal_refs if ref["goal_id"] in records_by_goal]
 
     def _write_partial_summary() -> None:
+        # The journal already has the record; rebuilding the summary is
+        # O(completed goals), so only do it once per interval.
+        now = time.monotonic()
+        if last_partial_summary and now - last_partial_summary[0] < args.partial_summary_interval_sec:
+            return
+        last_partial_summary[:] = [now]
         partial_summary = build_summary(
             batch_root=batch_root,
             split=args.split,
             args=args,
             client=client,
-            records=records,
+            records=_ordered_records(),
             planned_total_goals=planned_total_goals,
             is_complete=False,
         )
-        dump_json(output_root / f"{args.split}_summary.partial.json", partial_summary)
-        render_markdown(output_root / f"{args.split}_summary.partial.md", partial_summary)
+        dump_json_atomic(output_root / f"{args.split}_summary{shard_tag}.partial.json", partial_summary)
+        render_markdown(output_root / f"{args.split}_summary{shard_tag}.partial.md", partial_summary)
+
+    def _finish_goal(record: dict[str, Any]) -> None:
+        records_by_goal[record["goal_id"]] = record
+        journal.append_record(record)
+        _write_partial_summary()
 
     if args.runtime_isolation == "shared":
-        for goal_ref in goal_refs:
-            records.append(
+        for goal_ref in pending_refs:
+            _finish_goal(
                 run_single_goal(
                     goal_ref=goal_ref,
                     split_root=split_root,
@@ -4107,11 +4306,35 @@ def main() -> None:
                     args=args,
                 )
             )
-            _write_partial_summary()
+    elif args.workers > 1:
+        isolated_root = output_root / f"_goal_runtimes{shard_tag}"
+        isolated_root.mkdir(parents=True, exist_ok=True)
+
+        def _on_worker_record(result: dict[str, Any]) -> None:
+            record = result["record"]
+            client.backend_name = result["agent_backend"]
+            client.model = result["agent_model"]
+            _journal_run_meta()
+            _finish_goal(record)
+            print(
+                f"[workflow-benchmark] {len(records_by_goal)}/{planned_total_goals} {record['goal_id']} "
+                f"success={record['success']}",
+                file=sys.stderr,
+            )
+
+        run_goals_with_workers(
+            pending_refs,
+            isolated_root=isolated_root,
+            snapshot_root=snapshot_root,
+            split_root=split_root,
+            goal_output_root=goal_output_root,
+            args=args,
+            on_record=_on_worker_record,
+        )
     else:
-        isolated_root = output_root / "_goal_runtimes"
+        isolated_root = output_root / f"_goal_runtimes{shard_tag}"
         isolated_root.mkdir(parents=True, exist_ok=True)
-        for goal_ref in goal_refs:
+        for goal_ref in pending_refs:
             goal_id = goal_ref["goal_id"]
             goal_runtime_root = isolated_root / goal_id / "runtime"
             goal_server_log = isolated_root / goal_id / "server.log"
@@ -4125,20 +4348,18 @@ def main() -> None:
                     "WEBAGENT_SERVER_PORT": goal_base_url.rsplit(":", 1)[-1],
                 }
                 with _temporary_process_env(env_updates), _pushd(goal_runtime_root):
-                    records.append(
-                        run_single_goal(
-                            goal_ref=goal_ref,
-                            split_root=split_root,
-                            output_root=goal_output_root,
-                            runtime_root=goal_runtime_root,
-                            snapshot_root=snapshot_root,
-                            modules_doc=modules_doc,
-                            bindings_doc=bindings_doc,
-                            client=client,
-                            args=args,
-                        )
+                    record = run_single_goal(
+                        goal_ref=goal_ref,
+                        split_root=split_root,
+                        output_root=goal_output_root,
+                        runtime_root=goal_runtime_root,
+                        snapshot_root=snapshot_root,
+                        modules_doc=modules_doc,
+                        bindings_doc=bindings_doc,
+                        client=client,
+                        args=args,
                     )
-                    _write_partial_summary()
+                _finish_goal(record)
             finally:
                 if proc is not None and proc.poll() is None:
                     proc.terminate()
@@ -4147,6 +4368,8 @@ def main() -> None:
                     except Exception:
                         proc.kill()
 
+    journal.close()
+    records = _ordered_records()
     summary = build_summary(
         batch_root=batch_root,
         split=args.split,
@@ -4154,11 +4377,11 @@ def main() -> None:
         client=client,
         records=records,
         planned_total_goals=planned_total_goals,
-        is_complete=True,
+        is_complete=len(records) == planned_total_goals,
     )
 
-    dump_json(output_root / f"{args.split}_summary.json", summary)
-    render_markdown(output_root / f"{args.split}_summary.md", summary)
+    dump_json_atomic(output_root / f"{args.split}_summary{shard_tag}.json", summary)
+    render_markdown(output_root / f"{args.split}_summary{shard_tag}.md", summary)
     print(json.dumps(summary, ensure_ascii=False, indent=2))
 
 
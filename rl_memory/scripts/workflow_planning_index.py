@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Precompiled symbolic planning index over a workflow modules document.
+
+``run_workflow_benchmark.py`` asks the same questions of the module library
+at every module decision: which predicates are needed to reach the targets,
+which modules are executable, and whether the targets stay reachable within
+the remaining budget.  ``PlanningIndex`` answers them on integer bitsets:
+
+- predicates are interned to bit positions, so a world state is an ``int``;
+- each module's requires/adds/removes are stored as masks;
+- ``producers`` maps a predicate to the mask of modules that add it, so the
+  backward expansion only touches modules that can help;
+- results of ``needed_mask`` and ``can_reach`` are memoized per
+  (state, targets, depth, ...) key.
+
+The semantics mirror the original set-based scans exactly, including the
+module ordering that breaks ties.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from typing import Any, Iterable, Iterator
+
+_MAX_MEMO_ENTRIES = 50_000
+_MAX_CACHED_INDEXES = 8
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def _iter_bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class CompiledModule:
+    __slots__ = ("position", "module_id", "module", "req_all", "req_any", "req_none", "adds", "removes")
+
+    def __init__(self, position: int, module: dict[str, Any], index: "PlanningIndex"):
+        requires = module.get("requires", {}) or {}
+        effects = module.get("effects", {}) or {}
+        self.position = position
+        self.module_id = module["module_id"]
+        self.module = module
+        self.req_all = index.mask(requires.get("all_of", []) or [])
+        self.req_any = index.mask(requires.get("any_of", []) or [])
+        self.req_none = index.mask(requires.get("none_of", []) or [])
+        self.adds = index.mask(effects.get("adds", []) or [])
+        self.removes = index.mask(effects.get("removes", []) or [])
+
+
+class PlanningIndex:
+    def __init__(self, modules_doc: dict[str, Any], excluded_module_ids: Iterable[str] = ()):
+        # Held so the id()-keyed cache in ``planning_index`` cannot be fooled
+        # by a recycled object id.
+        self.modules_doc = modules_doc
+        self._pred_ids: dict[str, int] = {}
+        self._pred_names: list[str] = []
+        excluded = set(excluded_module_ids)
+        self.modules: list[CompiledModule] = []
+        for module in modules_doc["modules"]:
+            if module.get("module_id") in excluded:
+                continue
+            self.modules.append(CompiledModule(len(self.modules), module, self))
+        self.all_modules = (1 << len(self.modules)) - 1
+        self._module_bits: dict[str, int] = {}
+        self._producers: dict[int, int] = {}
+        for compiled in self.modules:
+            bit = 1 << compiled.position
+            self._module_bits[compiled.module_id] = self._module_bits.get(compiled.module_id, 0) | bit
+            for pred in _iter_bits(compiled.adds):
+                self._producers[pred] = self._producers.get(pred, 0) | bit
+        self._needed_memo: dict[tuple[int, int, int, int], int] = {}
+        self._reach_memo: dict[tuple[int, int, int, int, int], bool] = {}
+
+    # -- predicate / module masks -------------------------------------------------
+
+    def mask(self, predicates: Iterable[str]) -> int:
+        """Bitset of ``predicates``; unknown predicates are interned on the fly."""
+        result = 0
+        for pred in predicates:
+            pred_id = self._pred_ids.get(pred)
+            if pred_id is None:
+                pred_id = len(self._pred_names)
+                self._pred_ids[pred] = pred_id
+                self._pred_names.append(pred)
+            result |= 1 << pred_id
+        return result
+
+    def names(self, mask: int) -> set[str]:
+        return {self._pred_names[pred_id] for pred_id in _iter_bits(mask)}
+
+    def module_mask(self, module_ids: Iterable[str]) -> int:
+        result = 0
+        for module_id in module_ids:
+            result |= self._module_bits.get(module_id, 0)
+        return result
+
+    def allowed_mask(self, allowed_module_ids: Iterable[str] | None) -> int:
+        # An empty allow-list means "no restriction", as in the set-based scans.
+        if not allowed_module_ids:
+            return self.all_modules
+        return self.module_mask(allowed_module_ids)
+
+    def iter_modules(self, module_mask: int) -> Iterator[CompiledModule]:
+        """Modules in ``module_mask``, in modules-document order."""
+        for position in _iter_bits(module_mask):
+            yield self.modules[position]
+
+    def producers_of(self, pred_mask: int) -> int:
+        result = 0
+        for pred_id in _iter_bits(pred_mask):
+            result |= self._producers.get(pred_id, 0)
+        return result
+
+    # -- planning primitives ------------------------------------------------------
+
+    @staticmethod
+    def executable(compiled: CompiledModule, state: int) -> bool:
+        if compiled.req_all & ~state:
+            return False
+        if compiled.req_any and not compiled.req_any & state:
+            return False
+        return not compiled.req_none & state
+
+    @staticmethod
+    def apply(compiled: CompiledModule, state: int) -> int:
+        return (state & ~compiled.removes) | compiled.adds
+
+    def needed_mask(self, state: int, remaining: int, depth: int, allowed: int) -> int:
+        """Targets plus the unmet preconditions of their producers, ``depth`` levels back."""
+        key = (state, remaining, depth, allowed)
+        cached = self._needed_memo.get(key)
+        if cached is not None:
+            return cached
+        needed = remaining
+        frontier = remaining
+        for _ in range(max(0, depth)):
+            new_preds = 0
+            for compiled in self.iter_modules(self.producers_of(frontier) & allowed):
+                new_preds |= compiled.req_all & ~state
+                if compiled.req_any and not compiled.req_any & state:
+                    new_preds |= compiled.req_any
+            new_preds &= ~needed
+            if not new_preds:
+                break
+            needed |= new_preds
+            frontier = new_preds
+        self._remember(self._needed_memo, key, needed)
+        return needed
+
+    def can_reach(self, state: int, remaining: int, depth: int, blocked: int, allowed: int) -> bool:
+        """Breadth-first check that ``remaining`` can be added within ``depth`` modules.
+
+        Each level expands at most the 16 best-ranked helpful modules, ranked by
+        (target hits, support hits, module id) like the original scan.
+        """
+        if not remaining or not remaining & ~state:
+            return True
+        if depth <= 0:
+            return False
+        key = (state, remaining, depth, blocked, allowed)
+        cached = self._reach_memo.get(key)
+        if cached is not None:
+            return cached
+
+        candidates = allowed & ~blocked
+        visited: set[tuple[int, int]] = set()
+        frontier: deque[tuple[int, int]] = deque([(state, depth)])
+        reachable = False
+        while frontier:
+            current, steps_left = frontier.popleft()
+            current_remaining = remaining & ~current
+            if not current_remaining:
+                reachable = True
+                break
+            if steps_left <= 0:
+                continue
+
+            needed = self.needed_mask(current, current_remaining, min(2, steps_left), allowed)
+            support = needed & ~current_remaining
+            ranked_next: list[tuple[int, int, str, int]] = []
+            # Only producers of needed predicates can have target or support hits.
+            for compiled in self.iter_modules(self.producers_of(needed) & candidates):
+                if not self.executable(compiled, current):
+                    continue
+                relevant_hits = _popcount(compiled.adds & current_remaining)
+                support_hits = _popcount(compiled.adds & support)
+                if not relevant_hits and not support_hits:
+                    continue
+                next_state = self.apply(compiled, current)
+                if next_state == current:
+                    continue
+                ranked_next.append((relevant_hits, support_hits, compiled.module_id, next_state))
+
+            ranked_next.sort(key=lambda item: (item[0], item[1], item[2]), reverse=True)
+            for _, _, _, next_state in ranked_next[:16]:
+                visit_key = (next_state, steps_left - 1)
+                if visit_key in visited:
+                    continue
+                visited.add(visit_key)
+                frontier.append(visit_key)
+
+        self._remember(self._reach_memo, key, reachable)
+        return reachable
+
+    @staticmethod
+    def _remember(memo: dict[Any, Any], key: Any, value: Any) -> None:
+        if len(memo) >= _MAX_MEMO_ENTRIES:
+            memo.clear()
+        memo[key] = value
+
+
+_INDEXES: "OrderedDict[int, PlanningIndex]" = OrderedDict()
+
+
+def planning_index(modules_doc: dict[str, Any], excluded_module_ids: Iterable[str] = ()) -> PlanningIndex:
+    """Return the (cached) index for ``modules_doc``.
+
+    Indexes are keyed by document identity: callers that patch a modules
+    document (e.g. goal-conditional requires) do so on a deep copy, which
+    gets its own index.
+    """
+    key = id(modules_doc)
+    index = _INDEXES.get(key)
+    if index is not None and index.modules_doc is modules_doc:
+        _INDEXES.move_to_end(key)
+        return index
+    index = PlanningIndex(modules_doc, excluded_module_ids)
+    _INDEXES[key] = index
+    while len(_INDEXES) > _MAX_CACHED_INDEXES:
+        _INDEXES.popitem(last=False)
+    return index
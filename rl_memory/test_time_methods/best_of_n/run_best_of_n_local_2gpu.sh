@@ -57,6 +57,10 @@ export AGENT_MAX_TOKENS="${AGENT_MAX_TOKENS:-96}"
 export AGENT_TEMPERATURE="${AGENT_TEMPERATURE:-0.0}"
 export WEBAGENT_SUPPRESS_ASSERTION_LOGS="${WEBAGENT_SUPPRESS_ASSERTION_LOGS:-1}"
 export AGENT_DECISION_METHOD="best_of_n"
+export WEBAGENT_BRANCH_POOL="${WEBAGENT_BRANCH_POOL:-1}"
+export WEBAGENT_BRANCH_POOL_SIZE="${WEBAGENT_BRANCH_POOL_SIZE:-1}"
+export WEBAGENT_BRANCH_CHECKPOINTS="${WEBAGENT_BRANCH_CHECKPOINTS:-1}"
+export WEBAGENT_BRANCH_WORKERS="${WEBAGENT_BRANCH_WORKERS:-1}"
 export AGENT_BEST_OF_N_NUM_SAMPLES="${AGENT_BEST_OF_N_NUM_SAMPLES:-4}"
 export AGENT_BEST_OF_N_CANDIDATE_POOL="${AGENT_BEST_OF_N_CANDIDATE_POOL:-8}"
 export AGENT_BEST_OF_N_MAX_SAMPLING_ROUNDS="${AGENT_BEST_OF_N_MAX_SAMPLING_ROUNDS:-2}"
@@ -1,17 +1,24 @@
 from __future__ import annotations
 
+import atexit
 import os
+import queue
 import re
 import shutil
 import socket
 import sqlite3
 import subprocess
 import tempfile
+import threading
 import time
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable, Iterator
 from urllib.parse import urlsplit
-from urllib.request import urlopen
+from urllib.request import Request, urlopen
+
+from runtime_paths import thread_runtime
 
 
 UNSUPPORTED_SELECTOR_TOKENS = (
@@ -744,22 +751,67 @@ def score_action_heuristics(
 
 
 class TaskRuntimeSnapshot:
-    def __init__(self, source_root: Path, db_snapshot: Path, state_bytes: bytes | None):
+    """Server state (DB + world state) at one point of an episode.
+
+    The task-start snapshot has ``history_len == 0``.  Decision checkpoints
+    taken later in the episode additionally record the page URL and the
+    browser storage state, so a branch can resume from that decision instead
+    of replaying every committed action; the newest one is attached to the
+    task-start snapshot via ``set_checkpoint``.
+    """
+
+    def __init__(
+        self,
+        source_root: Path,
+        db_snapshot: Path,
+        state_bytes: bytes | None,
+        url: str | None = None,
+        storage_state: dict[str, Any] | None = None,
+        history_len: int = 0,
+    ):
         self.source_root = source_root
         self.db_snapshot = db_snapshot
         self.state_bytes = state_bytes
+        self.url = url
+        self.storage_state = storage_state
+        self.history_len = int(history_len)
+        self.latest_checkpoint: TaskRuntimeSnapshot | None = None
+        self.checkpoint_stats = {"captured": 0, "resumed": 0, "fallback_replays": 0}
+        self._stats_lock = threading.Lock()
 
     @classmethod
-    def capture(cls) -> "TaskRuntimeSnapshot":
+    def capture(
+        cls,
+        url: str | None = None,
+        storage_state: dict[str, Any] | None = None,
+        history_len: int = 0,
+    ) -> "TaskRuntimeSnapshot":
         source_root = Path(os.environ.get("WEBAGENT_RUNTIME_ROOT") or REPO_ROOT).resolve()
-        tmp = tempfile.NamedTemporaryFile(prefix="task_start_db_", suffix=".sqlite3", delete=False)
+        prefix = "task_checkpoint_db_" if history_len else "task_start_db_"
+        tmp = tempfile.NamedTemporaryFile(prefix=prefix, suffix=".sqlite3", delete=False)
         tmp_path = Path(tmp.name)
         tmp.close()
         _sqlite_backup(source_root / "data.db", tmp_path)
 
         state_path = source_root / "env" / "state.json"
         state_bytes = state_path.read_bytes() if state_path.exists() else None
-        return cls(source_root=source_root, db_snapshot=tmp_path, state_bytes=state_bytes)
+        return cls(
+            source_root=source_root,
+            db_snapshot=tmp_path,
+            state_bytes=state_bytes,
+            url=url,
+            storage_state=storage_state,
+            history_len=history_len,
+        )
+
+    def set_checkpoint(self, checkpoint: "TaskRuntimeSnapshot | None") -> None:
+        """Replace the decision checkpoint branches should resume from."""
+        previous = self.latest_checkpoint
+        self.latest_checkpoint = checkpoint
+        if checkpoint is not None:
+            self.record_checkpoint_event("captured")
+        if previous is not None and previous is not checkpoint:
+            previous.close()
 
     def materialize(self, branch_root: Path) -> None:
         branch_root.mkdir(parents=True, exist_ok=True)
@@ -790,7 +842,13 @@ class TaskRuntimeSnapshot:
             if target.exists() and not link.exists():
                 link.symlink_to(target, target_is_directory=target.is_dir())
 
+    def record_checkpoint_event(self, name: str) -> None:
+        with self._stats_lock:
+            self.checkpoint_stats[name] = self.checkpoint_stats.get(name, 0) + 1
+
     def close(self) -> None:
+        if getattr(self, "latest_checkpoint", None) is not None:
+            self.set_checkpoint(None)
         try:
             if self.db_snapshot.exists():
                 self.db_snapshot.unlink()
@@ -859,6 +917,24 @@ class TemporaryBranchRuntime:
         log_fh.close()
         return cls(branch_root, port, proc, server_log_path)
 
+    def restore(self, snapshot: TaskRuntimeSnapshot) -> None:
+        """Reset the running server to ``snapshot`` without restarting it."""
+        # The server keeps serving during the restore; the SQLite backup API
+        # swaps pages under its lock, so the file never has to be recreated.
+        _sqlite_backup(snapshot.db_snapshot, self.root / "data.db")
+
+        state_path = self.root / "env" / "state.json"
+        if snapshot.state_bytes is None:
+            if state_path.exists():
+                state_path.unlink()
+        else:
+            tmp_path = state_path.with_name(f".state.{os.getpid()}.{self.port}.tmp")
+            tmp_path.write_bytes(snapshot.state_bytes)
+            os.replace(tmp_path, state_path)
+        request = Request(f"{self.base_url}/api/state/reload", data=b"{}", method="POST")
+        with urlopen(request, timeout=10) as resp:
+            resp.read()
+
     def activate_env(self) -> dict[str, str | None]:
         previous = {
             "WEBAGENT_RUNTIME_ROOT": os.environ.get("WEBAGENT_RUNTIME_ROOT"),
@@ -874,6 +950,10 @@ class TemporaryBranchRuntime:
         os.environ["WEBAGENT_SUPPRESS_ASSERTION_LOGS"] = "1"
         return previous
 
+    def activate_thread(self):
+        """Thread-local variant of ``activate_env`` for concurrent branches."""
+        return thread_runtime(self.root, self.port, self.base_url, quiet=True)
+
     @staticmethod
     def restore_env(previous: dict[str, str | None]) -> None:
         for key, value in previous.items():
@@ -893,3 +973,210 @@ class TemporaryBranchRuntime:
             except Exception:
                 pass
         shutil.rmtree(self.root, ignore_errors=True)
+
+
+class BranchRuntimeWorker:
+    """A long-lived branch server plus the thread that owns its browser.
+
+    Playwright's sync API binds browser objects to the thread that created
+    them, so every job touching ``browser_env`` runs on this worker's own
+    thread via ``call``.  ``browser_env`` is managed by the caller (created on
+    first use, then recycled with ``BrowserEnv.new_context``) and closed here
+    on shutdown.
+    """
+
+    def __init__(self, index: int, runtime: TemporaryBranchRuntime, source_root: Path):
+        self.index = index
+        self.runtime = runtime
+        self.source_root = source_root
+        self.browser_env: Any = None
+        self.leases = 0
+        self.resets = 0
+        self.reset_sec_total = 0.0
+        self.last_reset_sec = 0.0
+        self.needs_reset = False
+        self._jobs: queue.Queue[Any] = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"branch-worker-{index}", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            fn, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(self))
+            except BaseException as exc:  # noqa: BLE001
+                future.set_exception(exc)
+        if self.browser_env is not None:
+            try:
+                self.browser_env.close()
+            except Exception:
+                pass
+            self.browser_env = None
+
+    def submit(self, fn: Callable[["BranchRuntimeWorker"], Any]) -> Future:
+        future: Future = Future()
+        self._jobs.put((fn, future))
+        return future
+
+    def call(self, fn: Callable[["BranchRuntimeWorker"], Any]) -> Any:
+        return self.submit(fn).result()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive() and self.runtime.server_proc.poll() is None
+
+    def reset_to(self, snapshot: TaskRuntimeSnapshot) -> float:
+        started = time.perf_counter()
+        root = self.runtime.root
+        if snapshot.source_root != self.source_root:
+            src_env = snapshot.source_root / "env"
+            if src_env.exists():
+                shutil.copytree(src_env, root / "env", dirs_exist_ok=True)
+            self.source_root = snapshot.source_root
+
+        self.runtime.restore(snapshot)
+
+        elapsed = time.perf_counter() - started
+        self.resets += 1
+        self.reset_sec_total += elapsed
+        self.last_reset_sec = elapsed
+        self.needs_reset = False
+        return elapsed
+
+    def close(self) -> None:
+        self._jobs.put(None)
+        self._thread.join(timeout=30)
+        self.runtime.close()
+
+
+class BranchRuntimePool:
+    """Fixed-size pool of pre-warmed branch runtimes.
+
+    ``lease(snapshot)`` hands out a worker whose server has been reset to the
+    snapshot (DB restore + in-memory state swap) instead of paying a fresh
+    ``mkdtemp``/``copytree``/server start for every search node.  Workers are
+    spawned lazily up to ``size`` and replaced if their server dies.
+    """
+
+    def __init__(self, size: int = 1):
+        self.size = max(1, int(size))
+        self.spawned = 0
+        self.replaced = 0
+        self.spawn_sec_total = 0.0
+        self._workers: list[BranchRuntimeWorker] = []
+        self._idle: queue.Queue[BranchRuntimeWorker] = queue.Queue()
+        self._lock = threading.Lock()
+        self._spawning = 0
+        self._closed = False
+
+    def _spawn(self, snapshot: TaskRuntimeSnapshot) -> BranchRuntimeWorker:
+        started = time.perf_counter()
+        runtime = TemporaryBranchRuntime.from_snapshot(snapshot)
+        worker = BranchRuntimeWorker(self.spawned, runtime, snapshot.source_root)
+        with self._lock:
+            self.spawned += 1
+            self.spawn_sec_total += time.perf_counter() - started
+            self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: BranchRuntimeWorker) -> None:
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self.replaced += 1
+        try:
+            worker.close()
+        except Exception:
+            pass
+
+    def _acquire(self, snapshot: TaskRuntimeSnapshot) -> BranchRuntimeWorker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_spawn = len(self._workers) + self._spawning < self.size
+            if can_spawn:
+                self._spawning += 1
+        if not can_spawn:
+            return self._idle.get()
+        try:
+            return self._spawn(snapshot)
+        finally:
+            with self._lock:
+                self._spawning -= 1
+
+    @contextmanager
+    def lease(self, snapshot: TaskRuntimeSnapshot) -> Iterator[BranchRuntimeWorker]:
+        if self._closed:
+            raise RuntimeError("branch_runtime_pool_closed")
+        worker = self._acquire(snapshot)
+        try:
+            if not worker.is_alive():
+                self._retire(worker)
+                worker = self._spawn(snapshot)
+            elif worker.needs_reset:
+                worker.reset_to(snapshot)
+        except BaseException:
+            self._retire(worker)
+            raise
+        worker.leases += 1
+        worker.needs_reset = True
+        try:
+            yield worker
+        finally:
+            if self._closed or not worker.is_alive():
+                self._retire(worker)
+            else:
+                self._idle.put(worker)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            workers = list(self._workers)
+        leases = sum(worker.leases for worker in workers)
+        resets = sum(worker.resets for worker in workers)
+        reset_sec = sum(worker.reset_sec_total for worker in workers)
+        return {
+            "pool_size": self.size,
+            "workers_live": len(workers),
+            "workers_spawned": self.spawned,
+            "workers_replaced": self.replaced,
+            "leases": leases,
+            "reuses": resets,
+            "reset_ms_avg": round(1000.0 * reset_sec / resets, 2) if resets else 0.0,
+            "spawn_ms_avg": round(1000.0 * self.spawn_sec_total / self.spawned, 2) if self.spawned else 0.0,
+        }
+
+    def close(self) -> None:
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            try:
+                worker.close()
+            except Exception:
+                pass
+
+
+_SHARED_BRANCH_POOL: BranchRuntimePool | None = None
+_SHARED_BRANCH_POOL_LOCK = threading.Lock()
+
+
+def shared_branch_pool(size: int) -> BranchRuntimePool:
+    """Process-wide pool, kept alive across tasks and closed at exit."""
+    global _SHARED_BRANCH_POOL
+    with _SHARED_BRANCH_POOL_LOCK:
+        if _SHARED_BRANCH_POOL is None:
+            _SHARED_BRANCH_POOL = BranchRuntimePool(size)
+            atexit.register(_SHARED_BRANCH_POOL.close)
+        return _SHARED_BRANCH_POOL
+
+
+def shared_branch_pool_stats() -> dict[str, Any]:
+    pool = _SHARED_BRANCH_POOL
+    return pool.stats() if pool is not None else {}
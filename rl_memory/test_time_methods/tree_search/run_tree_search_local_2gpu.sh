@@ -54,6 +54,10 @@ export AGENT_MAX_TOKENS="${AGENT_MAX_TOKENS:-96}"
 export AGENT_TEMPERATURE="${AGENT_TEMPERATURE:-0.0}"
 export WEBAGENT_SUPPRESS_ASSERTION_LOGS="${WEBAGENT_SUPPRESS_ASSERTION_LOGS:-1}"
 export AGENT_DECISION_METHOD="tree_search"
+export WEBAGENT_BRANCH_POOL="${WEBAGENT_BRANCH_POOL:-1}"
+export WEBAGENT_BRANCH_POOL_SIZE="${WEBAGENT_BRANCH_POOL_SIZE:-1}"
+export WEBAGENT_BRANCH_CHECKPOINTS="${WEBAGENT_BRANCH_CHECKPOINTS:-1}"
+export WEBAGENT_BRANCH_WORKERS="${WEBAGENT_BRANCH_WORKERS:-1}"
 export AGENT_TREE_SEARCH_BRANCHING_FACTOR="${AGENT_TREE_SEARCH_BRANCHING_FACTOR:-3}"
 export AGENT_TREE_SEARCH_CANDIDATE_POOL="${AGENT_TREE_SEARCH_CANDIDATE_POOL:-12}"
 export AGENT_TREE_SEARCH_MAX_SAMPLING_ROUNDS="${AGENT_TREE_SEARCH_MAX_SAMPLING_ROUNDS:-4}"
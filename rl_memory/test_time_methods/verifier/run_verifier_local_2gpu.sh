@@ -57,6 +57,9 @@ export AGENT_MAX_TOKENS="${AGENT_MAX_TOKENS:-96}"
 export AGENT_TEMPERATURE="${AGENT_TEMPERATURE:-0.0}"
 export WEBAGENT_SUPPRESS_ASSERTION_LOGS="${WEBAGENT_SUPPRESS_ASSERTION_LOGS:-1}"
 export AGENT_DECISION_METHOD="verifier"
+export WEBAGENT_BRANCH_POOL="${WEBAGENT_BRANCH_POOL:-1}"
+export WEBAGENT_BRANCH_POOL_SIZE="${WEBAGENT_BRANCH_POOL_SIZE:-1}"
+export WEBAGENT_BRANCH_CHECKPOINTS="${WEBAGENT_BRANCH_CHECKPOINTS:-1}"
 export AGENT_VERIFIER_NUM_SAMPLES="${AGENT_VERIFIER_NUM_SAMPLES:-3}"
 export AGENT_VERIFIER_TEMPERATURE="${AGENT_VERIFIER_TEMPERATURE:-0.5}"
 export AGENT_VERIFIER_CANDIDATE_POOL="${AGENT_VERIFIER_CANDIDATE_POOL:-8}"
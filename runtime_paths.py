@@ -1,13 +1,51 @@
 from __future__ import annotations
 
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 
 
 REPO_ROOT = Path(__file__).resolve().parent
 
+_THREAD_RUNTIME = threading.local()
+
+
+@contextmanager
+def thread_runtime(root: Path | str, port: int, base_url: str, quiet: bool = True) -> Iterator[None]:
+    """Point this thread (only) at another runtime.
+
+    Branch evaluation runs several runtimes concurrently in one process, so
+    it cannot swap ``WEBAGENT_RUNTIME_ROOT`` and friends in ``os.environ``.
+    Overrides nest and are restored on exit.
+    """
+    previous = getattr(_THREAD_RUNTIME, "value", None)
+    _THREAD_RUNTIME.value = {
+        "root": Path(root).resolve(),
+        "port": int(port),
+        "base_url": str(base_url).rstrip("/"),
+        "quiet": bool(quiet),
+    }
+    try:
+        yield
+    finally:
+        _THREAD_RUNTIME.value = previous
+
+
+def _thread_override(name: str):
+    value = getattr(_THREAD_RUNTIME, "value", None)
+    return value.get(name) if value else None
+
+
+def thread_is_quiet() -> bool:
+    return bool(_thread_override("quiet"))
+
 
 def runtime_root() -> Path:
+    override = _thread_override("root")
+    if override is not None:
+        return override
     raw = os.environ.get("WEBAGENT_RUNTIME_ROOT")
     if raw:
         return Path(raw).resolve()
@@ -39,6 +77,9 @@ def database_dir() -> Path:
 
 
 def server_port() -> int:
+    override = _thread_override("port")
+    if override is not None:
+        return override
     raw = os.environ.get("WEBAGENT_SERVER_PORT", "8014").strip()
     try:
         return int(raw)
@@ -47,5 +88,8 @@ def server_port() -> int:
 
 
 def server_base_url() -> str:
+    override = _thread_override("base_url")
+    if override is not None:
+        return override
     return os.environ.get("WEBAGENT_SERVER_BASE_URL", f"http://localhost:{server_port()}").rstrip("/")
 
@@ -1,3 +1,5 @@
+import gzip
+import hashlib
 import http.server
 import socketserver
 import json
@@ -7,26 +9,37 @@ import sqlite3
 import random
 import time
 import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from task_handlers.a_housing import handle_a_housing
-from task_handlers.b_consumption import handle_b_consumption
-from task_handlers.c_support import handle_c_support
-from task_handlers.d_finance import handle_d_finance
-from task_handlers.e_travel import handle_e_travel
-from task_handlers.f_work import handle_f_work
-from task_handlers.g_health import handle_g_health
-from task_handlers.h_government import handle_h_government
-from task_handlers.i_repair import handle_i_repair
-from task_handlers.j_learning import handle_j_learning
-from task_handlers.k_social import handle_k_social
-from task_handlers.l_privacy import handle_l_privacy
-from task_handlers.m_crisis import handle_m_crisis
-from task_handlers.z_advanced import handle_z_advanced
+# Importing the handler modules registers their actions; subscribers run in this order.
+from task_handlers import (  # noqa: F401
+    a_housing,
+    b_consumption,
+    c_support,
+    d_finance,
+    e_travel,
+    f_work,
+    g_health,
+    h_government,
+    i_repair,
+    j_learning,
+    k_social,
+    l_privacy,
+    m_crisis,
+    z_advanced,
+)
+from task_handlers.registry import MUTATIONS
 from task_handlers.time_utils import advance_time, get_sim_time
-from task_handlers.world_triggers import process_time_triggers
+from task_handlers.world_triggers import SCHEDULER as TRIGGER_SCHEDULER, process_time_triggers
 from task_handlers.utils import deep_merge
 from runtime_paths import db_path, env_dir, sites_dir, server_port
+from world_state import WorldStateStore, flush_policy_from_env
+from memory_kv import ensure_memory_changelog
+from db_writer import SQLiteWriter
+from db_reader import SQLiteReader, ensure_table_versions
+from static_cache import StaticAssetCache, static_cache_control_from_env, static_cache_enabled_from_env, static_watch_interval_from_env
 
 ROOT = str(Path(__file__).resolve().parent)
 ENV_DIR = str(env_dir())
@@ -34,16 +47,7 @@ STATE_PATH = str(env_dir() / 'state.json')
 SITES_DIR = str(sites_dir())
 DB_PATH = str(db_path())
 
-def load_env():
-    if os.path.exists(STATE_PATH):
-        return json.load(open(STATE_PATH, 'r', encoding='utf-8'))
-    return reset_env()
-
-def save_env(env):
-    os.makedirs(ENV_DIR, exist_ok=True)
-    json.dump(env, open(STATE_PATH, 'w', encoding='utf-8'), ensure_ascii=False, indent=2)
-
-def reset_env():
+def build_initial_env():
     env = {}
     for fn in os.listdir(ENV_DIR):
         if fn.endswith('_initial.json'):
@@ -54,22 +58,40 @@ def reset_env():
     housing_data = [{"id": f"PROP-EXT-{i}", "title": f"Apartment {100+i}", "price": 1000 + (i * 150), "meta": f"BR | {40 + i*10}sqm"} for i in range(20)]
     if 'housing' not in env: env['housing'] = {}
     env['housing']['properties'] = housing_data
+    return env
+
+WORLD_STATE = WorldStateStore(
+    STATE_PATH,
+    build_initial_env,
+    flush_policy=flush_policy_from_env(),
+    # A reload swaps in new entity dicts; pending triggers of the old ones
+    # would otherwise stay queued until their deadlines.
+    on_swap=TRIGGER_SCHEDULER.reset,
+)
+
+def load_env():
+    """Resident world state; read-only, mutate through WORLD_STATE.transaction()."""
+    return WORLD_STATE.read()
+
+def save_env(env):
+    WORLD_STATE.replace(env)
+
+def reset_env():
+    env = build_initial_env()
     save_env(env)
     return env
 
+DB_READER = SQLiteReader(DB_PATH)
+
 def query_db(query, args=(), one=False):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(query, args)
-    rv = cur.fetchall()
-    conn.close()
+    rv = DB_READER.query(query, args)
     return (rv[0] if rv else None) if one else rv
 
+DB_WRITER = SQLiteWriter(DB_PATH)
+
 def execute_db(sql, args=[]):
-    with sqlite3.connect(DB_PATH, timeout=60) as conn:
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute(sql, args)
-        conn.commit()
+    """Write through the shared connection; queued inside DB_WRITER.unit_of_work()."""
+    DB_WRITER.execute(sql, args)
 
 def row_to_dict(row):
     return dict(row) if row else None
@@ -112,6 +134,280 @@ def merge_shop_order_map(order_map, env_orders):
     return order_map
 
 
+MAX_PAGE_LIMIT = 500
+ORDER_COLUMNS = "id, total, state, shipping_speed, shipping_address, created_at"
+
+def _marks(values):
+    return ",".join("?" * len(values))
+
+def fetch_order_page(conn, env_orders, after=None, limit=None, with_items=True):
+    """Shop orders merged with ``env_orders``, newest first, one keyset page at a time.
+
+    Orders sort by ``(date, id)`` descending and ``after`` is the id of the
+    last order of the previous page.  Only the page's orders and items are
+    read.  Returns ``(orders, next_after)``; ``next_after`` is None on the
+    last page.  Raises KeyError for an unknown ``after``.
+    """
+    env_orders = env_orders if isinstance(env_orders, dict) else {}
+    # The date each env order ends up with after merging; '' keeps the DB one.
+    env_dates = {}
+    for key, value in env_orders.items():
+        if key == "last" or not isinstance(value, dict) or not value.get("id"):
+            continue
+        date = value.get("date")
+        if date not in (None, "", []):
+            env_dates[value["id"]] = str(date)
+        else:
+            env_dates.setdefault(value["id"], "")
+    dated = [order_id for order_id, date in env_dates.items() if date]
+    undated = [order_id for order_id, date in env_dates.items() if not date]
+    in_db = set()
+    if undated:
+        in_db = {row[0] for row in conn.execute(f"SELECT id FROM orders WHERE id IN ({_marks(undated)})", undated)}
+    env_keys = [(env_dates[order_id], order_id) for order_id in dated]
+    env_keys += [("", order_id) for order_id in undated if order_id not in in_db]
+
+    cursor = None
+    if after is not None:
+        if env_dates.get(after) or (after in env_dates and after not in in_db):
+            cursor = (env_dates[after], after)
+        else:
+            row = conn.execute("SELECT COALESCE(created_at, '') FROM orders WHERE id = ?", (after,)).fetchone()
+            if row is None:
+                raise KeyError(after)
+            cursor = (str(row[0]), after)
+
+    # Orders whose date comes from the env are ranked by env_keys, not by the DB row.
+    # NULL and '' dates are the same key here and in the merge below
+    # (idx_orders_created_at_key indexes that expression).
+    sql = f"SELECT {ORDER_COLUMNS} FROM orders WHERE id NOT IN ({_marks(dated)})"
+    args = list(dated)
+    if cursor is not None:
+        sql += " AND (COALESCE(created_at, '') < ? OR (COALESCE(created_at, '') = ? AND id < ?))"
+        args += [cursor[0], cursor[0], cursor[1]]
+    sql += " ORDER BY COALESCE(created_at, '') DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        args.append(limit + 1)
+    db_rows = {row["id"]: row for row in conn.execute(sql, args)}
+
+    keys = [(str(row["created_at"] or ""), order_id) for order_id, row in db_rows.items()]
+    keys += [key for key in env_keys if cursor is None or key < cursor]
+    keys.sort(reverse=True)
+    next_after = None
+    if limit is not None and len(keys) > limit:
+        keys = keys[:limit]
+        next_after = keys[-1][1]
+    page_ids = [order_id for _, order_id in keys]
+
+    missing = [order_id for order_id in page_ids if order_id not in db_rows and env_dates.get(order_id)]
+    if missing:
+        for row in conn.execute(f"SELECT {ORDER_COLUMNS} FROM orders WHERE id IN ({_marks(missing)})", missing):
+            db_rows[row["id"]] = row
+    items = {}
+    if with_items and page_ids:
+        item_rows = conn.execute(
+            f"""
+            SELECT oi.order_id, oi.sku, oi.quantity, oi.price, p.name, p.category
+            FROM order_items oi
+            LEFT JOIN products p ON p.sku = oi.sku
+            WHERE oi.order_id IN ({_marks(page_ids)})
+            ORDER BY oi.order_id, oi.id
+            """,
+            page_ids,
+        )
+        for item in item_rows:
+            items.setdefault(item["order_id"], []).append({
+                "id": item["sku"],
+                "name": item["name"] or item["sku"],
+                "category": item["category"] or "default",
+                "quantity": item["quantity"],
+                "price": item["price"],
+            })
+
+    order_map = {}
+    for order_id in page_ids:
+        row = db_rows.get(order_id)
+        if row is None:
+            continue
+        order_dict = row_to_dict(row)
+        order_dict["date"] = order_dict.pop("created_at", "")
+        if with_items:
+            order_dict["items"] = items.get(order_id, [])
+        order_map[order_id] = order_dict
+    page_set = set(page_ids)
+    page_env = {key: value for key, value in env_orders.items() if isinstance(value, dict) and value.get("id") in page_set}
+    order_map = merge_shop_order_map(order_map, page_env)
+    return [order_map[order_id] for order_id in page_ids], next_after
+
+def fetch_product_page(conn, after=None, limit=None, fields=None):
+    """Products in id order from after ``after`` (an id); returns ``(products, next_after)``.
+
+    ``fields`` must be products columns; the caller validates them.
+    """
+    columns = "*" if not fields else ", ".join(["id"] + [f for f in fields if f != "id"])
+    sql = f"SELECT {columns} FROM products"
+    args = []
+    if after is not None:
+        sql += " WHERE id > ?"
+        args.append(after)
+    sql += " ORDER BY id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        args.append(limit + 1)
+    rows = conn.execute(sql, args).fetchall()
+    next_after = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1]["id"]
+    products = [row_to_dict(row) for row in rows]
+    if fields and "id" not in fields:
+        for product in products:
+            product.pop("id", None)
+    return products, next_after
+
+def parse_page_params(query):
+    """``(after, limit, fields)`` from a query string; raises ValueError on a bad limit."""
+    params = urllib.parse.parse_qs(query)
+    after = params.get('after', [None])[0] or None
+    limit = params.get('limit', [None])[0]
+    if limit is not None:
+        limit = max(1, min(int(limit), MAX_PAGE_LIMIT))
+    fields = [f.strip() for part in params.get('fields', []) for f in part.split(',') if f.strip()]
+    return after, limit, fields
+
+# World and table versions restart with the process; the salt keeps old ETags from matching.
+ETAG_SALT = os.urandom(4).hex()
+
+def api_etag(*parts):
+    key = "\0".join(str(part) for part in (ETAG_SALT,) + parts)
+    return '"' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:20] + '"'
+
+def gzip_min_bytes_from_env():
+    """Smallest JSON body sent gzipped to clients that accept it; 0 (default) disables gzip."""
+    raw = os.environ.get("WEBAGENT_API_GZIP_MIN_BYTES", "0").strip()
+    try:
+        return max(0, int(raw))
+    except Exception:
+        return 0
+
+API_GZIP_MIN_BYTES = gzip_min_bytes_from_env()
+
+
+class ResponseBodyCache:
+    """Recently served bodies by ETag, plus their gzip variants once requested."""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag, encoding='identity'):
+        with self._lock:
+            body = self._bodies.get((etag, encoding))
+            if body is not None:
+                self._bodies.move_to_end((etag, encoding))
+            return body
+
+    def put(self, etag, body, encoding='identity'):
+        with self._lock:
+            self._bodies[(etag, encoding)] = body
+            self._bodies.move_to_end((etag, encoding))
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+
+    def gzipped(self, etag, body):
+        compressed = self.get(etag, 'gzip')
+        if compressed is None:
+            compressed = gzip.compress(body, compresslevel=6)
+            self.put(etag, compressed, 'gzip')
+        return compressed
+
+RESPONSE_BODIES = ResponseBodyCache()
+
+def parse_env_paths(query):
+    params = urllib.parse.parse_qs(query)
+    return [p.strip() for part in params.get('paths', []) for p in part.split(',') if p.strip()]
+
+def project_env(env, paths):
+    """The subtrees of ``env`` at the dotted ``paths``, nested as in ``env``; missing paths are left out."""
+    out = {}
+    included = set()
+    for path in sorted(set(paths), key=lambda p: p.count('.')):
+        parts = path.split('.')
+        if any('.'.join(parts[:n]) in included for n in range(1, len(parts))):
+            continue
+        node = env
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                break
+            node = node[part]
+        else:
+            target = out
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = node
+            included.add(path)
+    return out
+
+
+DISTRACTOR_HTML = """
+        <div id="d-blocker" style="position:fixed;top:0;left:0;width:100%;height:100%;z-index:9999;background:rgba(255,255,255,0.9);display:none;align-items:center;justify-content:center;pointer-events:all;">
+          <div style="background:white;padding:40px;border-radius:12px;box-shadow:0 10px 30px rgba(0,0,0,0.2);text-align:center;max-width:400px;">
+            <h2 style="color:#1e293b;margin-top:0;">📣 Security Notice</h2>
+            <p style="color:#64748b;">Verify session to continue.</p>
+            <button onclick="document.getElementById('d-blocker').style.display='none';document.body.style.overflow='auto';" 
+                    style="background:#3b82f6;color:white;padding:12px 30px;border:none;border-radius:8px;cursor:pointer;font-weight:bold;">Confirm</button>
+          </div>
+        </div>
+        <script>
+        (function(){
+          const params = new URLSearchParams(window.location.search);
+          const level = (params.get('dlevel') || 'medium').toLowerCase();
+          const levelProb = { off: 0.0, low: 0.25, medium: 0.5, high: 0.8 };
+          const probability = Object.prototype.hasOwnProperty.call(levelProb, level) ? levelProb[level] : 0.5;
+          const seedRaw = params.get('dseed') || '';
+
+          function seeded01(input) {
+            let h = 2166136261 >>> 0;
+            for (let i = 0; i < input.length; i++) {
+              h ^= input.charCodeAt(i);
+              h = Math.imul(h, 16777619);
+            }
+            return (h >>> 0) / 4294967296;
+          }
+
+          const key = seedRaw ? (seedRaw + '|' + location.pathname + '|' + location.search) : '';
+          const roll = key ? seeded01(key) : Math.random();
+
+          setTimeout(() => {
+            const blocker = document.getElementById('d-blocker');
+            if (blocker && roll < probability) {
+              blocker.style.display = 'flex';
+              document.body.style.overflow = 'hidden';
+            }
+          }, 1000);
+        })();
+        </script>
+        """
+
+def inject_distractors(html):
+    return html.replace("</body>", DISTRACTOR_HTML + "</body>")
+
+def _clean_page(html):
+    return html
+
+# Pages are served from memory in both variants; see static_cache.py.
+STATIC_ASSETS = (
+    StaticAssetCache(SITES_DIR, {'clean': _clean_page, 'distractor': inject_distractors})
+    if static_cache_enabled_from_env() and os.path.isdir(SITES_DIR) else None
+)
+STATIC_CACHE_CONTROL = static_cache_control_from_env()
+
+def static_path_exists(path):
+    return STATIC_ASSETS.exists(path) if STATIC_ASSETS is not None else os.path.exists(path)
+
+
 class ReusableTCPServer(socketserver.ThreadingTCPServer):
     allow_reuse_address = True
     daemon_threads = True
@@ -125,6 +421,69 @@ class Handler(http.server.SimpleHTTPRequestHandler):
     def do_OPTIONS(self):
         self.send_response(200); self.send_cors_headers(); self.end_headers()
 
+    def etag_matches(self, etag):
+        """Whether the request's If-None-Match covers ``etag`` (in either encoding)."""
+        header = self.headers.get('If-None-Match')
+        if not etag or not header:
+            return False
+        tags = {re.sub(r'-(gzip|br)"$', '"', tag.strip().removeprefix('W/')) for tag in header.split(',')}
+        return '*' in tags or etag in tags
+
+    def send_not_modified(self, etag):
+        """Answer 304 and return True if the request's If-None-Match covers ``etag``."""
+        if not self.etag_matches(etag):
+            return False
+        self.send_response(304); self.send_header('ETag', etag); self.send_cors_headers(); self.end_headers()
+        return True
+
+    def accepts_encoding(self, encoding):
+        return any(
+            token.split(';')[0].strip() == encoding and 'q=0' not in token.replace(' ', '').split(';')[1:]
+            for token in self.headers.get('Accept-Encoding', '').split(',')
+        )
+
+    def page_variant(self):
+        clean = os.environ.get("BENCHMARK_CLEAN_MODE") == "true" or "clean=true" in self.path
+        return 'clean' if clean else 'distractor'
+
+    def cached_static_asset(self, full_path):
+        return STATIC_ASSETS.get(full_path, self.page_variant()) if STATIC_ASSETS is not None else None
+
+    def send_static(self, asset):
+        encoding = next((e for e in asset.encodings() if self.accepts_encoding(e)), None)
+        not_modified = self.etag_matches(asset.etag)
+        body = b'' if not_modified else asset.encoded(encoding)
+        self.send_response(304 if not_modified else 200)
+        if not not_modified:
+            self.send_header('Content-Type', asset.content_type); self.send_header('Content-Length', str(len(body)))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+        self.send_header('ETag', asset.etag[:-1] + f'-{encoding}"' if encoding else asset.etag)
+        self.send_header('Cache-Control', STATIC_CACHE_CONTROL)
+        if asset.encodings():
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_cors_headers(); self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_body(self, payload=None, etag=None, status=200, body=None):
+        if body is None:
+            body = json.dumps(payload).encode('utf-8')
+        gzipped = bool(API_GZIP_MIN_BYTES) and len(body) >= API_GZIP_MIN_BYTES and self.accepts_encoding('gzip')
+        if gzipped:
+            body = RESPONSE_BODIES.gzipped(etag, body) if etag else gzip.compress(body, compresslevel=6)
+        self.send_response(status); self.send_header('Content-Type','application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        if API_GZIP_MIN_BYTES:
+            self.send_header('Vary', 'Accept-Encoding')
+        if etag:
+            # Clients keep the body but revalidate it on every use.
+            self.send_header('ETag', etag[:-1] + '-gzip"' if gzipped else etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.send_cors_headers(); self.end_headers()
+        self.wfile.write(body)
+
     def normalized_api_path(self):
         parsed = urllib.parse.urlsplit(self.path)
         route_path = parsed.path
@@ -152,28 +511,68 @@ class Handler(http.server.SimpleHTTPRequestHandler):
             p = p[len('/static/'):]
         else: p = p.lstrip('/')
         full = os.path.join(base, p)
-        if not os.path.exists(full) and not full.endswith('.html'):
-            if os.path.exists(full + '.html'): full += '.html'
+        if not static_path_exists(full) and not full.endswith('.html'):
+            if static_path_exists(full + '.html'): full += '.html'
         return full
 
     def do_GET(self):
         api_path = self.normalized_api_path()
         full_path = self.translate_path(self.path)
         if api_path and api_path.startswith('/api/env'):
-            env = load_env()
-            try:
-                accounts = query_db("SELECT balance FROM accounts WHERE user_id = 1")
-                env['balance'] = sum(acc['balance'] for acc in accounts)
-            except: pass
+            query = urllib.parse.urlsplit(api_path).query
+            paths = parse_env_paths(query)
+            wants_balance = not paths or any(p.split('.')[0] == 'balance' for p in paths)
+            balance = None
+            accounts_tag = None
+            if wants_balance:
+                try:
+                    with DB_READER.snapshot() as conn:
+                        accounts_tag = DB_READER.version_tag(conn, ('accounts',))
+                        accounts = conn.execute("SELECT balance FROM accounts WHERE user_id = 1").fetchall()
+                        balance = sum(acc['balance'] for acc in accounts)
+                except Exception: pass
+            with WORLD_STATE.view() as env:
+                # Without account versions a cached balance could go stale, so no ETag then.
+                etag = api_etag('env', WORLD_STATE.version, accounts_tag, query) if accounts_tag or not wants_balance else None
+                not_modified = self.etag_matches(etag)
+                body = None if not_modified or not etag else RESPONSE_BODIES.get(etag)
+                if not not_modified and body is None:
+                    if balance is not None:
+                        env = dict(env); env['balance'] = balance
+                    body = json.dumps(project_env(env, paths) if paths else env).encode('utf-8')
+                    if etag:
+                        RESPONSE_BODIES.put(etag, body)
+            if not_modified:
+                self.send_not_modified(etag); return
+            self.send_json_body(etag=etag, body=body); return
+
+        if api_path and urllib.parse.urlsplit(api_path).path == '/api/debug/mutate_stats':
+            body = json.dumps({'success': True, 'actions': MUTATIONS.latency_stats()}).encode('utf-8')
             self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
-            self.wfile.write(json.dumps(env).encode('utf-8')); return
+            self.wfile.write(body); return
 
         if api_path and api_path.startswith('/api/products'):
             route_path = urllib.parse.urlsplit(api_path).path
             if route_path == '/api/products':
-                products = query_db("SELECT * FROM products")
-                self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
-                self.wfile.write(json.dumps({'success':True, 'products':[row_to_dict(p) for p in products]}).encode('utf-8')); return
+                query = urllib.parse.urlsplit(api_path).query
+                try:
+                    after, limit, fields = parse_page_params(query)
+                    after = int(after) if after is not None else None
+                except ValueError:
+                    self.send_json_body({'success': False, 'error': 'Invalid after/limit'}, status=400); return
+                with DB_READER.snapshot() as conn:
+                    columns = {row['name'] for row in conn.execute("PRAGMA table_info(products)")}
+                    unknown = [f for f in fields if f not in columns]
+                    if unknown:
+                        self.send_json_body({'success': False, 'error': f"Unknown fields: {', '.join(unknown)}"}, status=400); return
+                    tag = DB_READER.version_tag(conn, ('products',))
+                    etag = api_etag(tag, query) if tag else None
+                    if self.send_not_modified(etag): return
+                    products, next_after = fetch_product_page(conn, after=after, limit=limit, fields=fields)
+                payload = {'success': True, 'products': products}
+                if limit is not None:
+                    payload['next_after'] = next_after
+                self.send_json_body(payload, etag=etag); return
             if route_path.startswith('/api/products/'):
                 sku = urllib.parse.unquote(route_path.split('/api/products/', 1)[1])
                 product = query_db("SELECT * FROM products WHERE sku = ?", (sku,), one=True)
@@ -183,40 +582,32 @@ class Handler(http.server.SimpleHTTPRequestHandler):
                 self.wfile.write(json.dumps({'success': False, 'error': 'Product not found'}).encode('utf-8')); return
 
         if api_path and api_path.startswith('/api/orders'):
-            env = load_env()
-            orders = env.get('shop', {}).get('orders', {})
+            with WORLD_STATE.view() as env:
+                orders = dict(env.get('shop', {}).get('orders', {}))
+                world_version = WORLD_STATE.version
             parsed = urllib.parse.urlsplit(api_path)
             route_path = parsed.path
             if route_path == '/api/orders':
-                order_map = {}
-                db_orders = query_db("SELECT id, total, state, shipping_speed, shipping_address, created_at FROM orders ORDER BY created_at DESC")
-                for order in db_orders:
-                    order_dict = row_to_dict(order)
-                    item_rows = query_db(
-                        """
-                        SELECT oi.sku, oi.quantity, oi.price, p.name, p.category
-                        FROM order_items oi
-                        LEFT JOIN products p ON p.sku = oi.sku
-                        WHERE oi.order_id = ?
-                        """,
-                        (order_dict["id"],),
-                    )
-                    order_dict["date"] = order_dict.pop("created_at", "")
-                    order_dict["items"] = [
-                        {
-                            "id": item["sku"],
-                            "name": item["name"] or item["sku"],
-                            "category": item["category"] or "default",
-                            "quantity": item["quantity"],
-                            "price": item["price"],
-                        }
-                        for item in item_rows
-                    ]
-                    order_map[order_dict["id"]] = order_dict
-                order_map = merge_shop_order_map(order_map, orders)
-                order_list = sorted(order_map.values(), key=lambda o: str(o.get("date", "")), reverse=True)
-                self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
-                self.wfile.write(json.dumps({'success': True, 'orders': order_list}).encode('utf-8')); return
+                try:
+                    after, limit, fields = parse_page_params(parsed.query)
+                except ValueError:
+                    self.send_json_body({'success': False, 'error': 'Invalid limit'}, status=400); return
+                with DB_READER.snapshot() as conn:
+                    tag = DB_READER.version_tag(conn, ('orders', 'order_items', 'products'))
+                    etag = api_etag(tag, world_version, parsed.query) if tag else None
+                    if self.send_not_modified(etag): return
+                    try:
+                        order_list, next_after = fetch_order_page(
+                            conn, orders, after=after, limit=limit, with_items=not fields or 'items' in fields,
+                        )
+                    except KeyError:
+                        self.send_json_body({'success': False, 'error': f'Unknown order: {after}'}, status=400); return
+                if fields:
+                    order_list = [{f: order[f] for f in fields if f in order} for order in order_list]
+                payload = {'success': True, 'orders': order_list}
+                if limit is not None:
+                    payload['next_after'] = next_after
+                self.send_json_body(payload, etag=etag); return
             if route_path.startswith('/api/orders/'):
                 order_id = urllib.parse.unquote(route_path.split('/api/orders/', 1)[1])
                 order = orders.get(order_id)
@@ -231,8 +622,8 @@ class Handler(http.server.SimpleHTTPRequestHandler):
 
         if api_path and api_path.startswith('/api/cards'):
             cards = query_db("SELECT * FROM cards WHERE user_id = 1")
-            env = load_env()
-            env_cards = env.get("payments", {}).get("cards", {})
+            with WORLD_STATE.view() as env:
+                env_cards = dict(env.get("payments", {}).get("cards", {}))
             merged = [row_to_dict(c) for c in cards]
             existing_last4 = {str(c.get("last4")) for c in merged}
             for last4, payload in env_cards.items():
@@ -249,97 +640,64 @@ class Handler(http.server.SimpleHTTPRequestHandler):
             self.wfile.write(json.dumps({'success':True, 'cards':merged}).encode('utf-8')); return
 
         if api_path and api_path.startswith('/api/messages'):
-            env = load_env()
+            with WORLD_STATE.view() as env:
+                body = json.dumps({'success':True, 'messages':env.get('mobile',{}).get('messages',[])}).encode('utf-8')
             self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
-            self.wfile.write(json.dumps({'success':True, 'messages':env.get('mobile',{}).get('messages',[])}).encode('utf-8')); return
+            self.wfile.write(body); return
 
         if api_path and api_path.startswith('/api/bills'):
-            env = load_env()
-            bills = env.get('gov', {}).get('bills')
-            if not bills:
-                bills = [
-                    {
-                        "id": "BILL-EL-2025-12",
-                        "type": "electricity",
-                        "amount": 188.50,
-                        "state": "pending",
-                        "period_start": "2025-11-01",
-                        "period_end": "2025-11-30",
-                        "due_date": "2025-12-20",
-                    },
-                    {
-                        "id": "BILL-WA-2025-12",
-                        "type": "water",
-                        "amount": 72.30,
-                        "state": "pending",
-                        "period_start": "2025-11-01",
-                        "period_end": "2025-11-30",
-                        "due_date": "2025-12-22",
-                    },
-                    {
-                        "id": "BILL-GA-2025-11",
-                        "type": "gas",
-                        "amount": 95.00,
-                        "state": "paid",
-                        "period_start": "2025-10-01",
-                        "period_end": "2025-10-31",
-                        "due_date": "2025-11-20",
-                    },
-                ]
-                env.setdefault('gov', {})['bills'] = bills
-                save_env(env)
+            with WORLD_STATE.transaction() as txn:
+                env = txn.env
+                bills = env.get('gov', {}).get('bills')
+                if bills:
+                    txn.discard()
+                else:
+                    bills = [
+                        {
+                            "id": "BILL-EL-2025-12",
+                            "type": "electricity",
+                            "amount": 188.50,
+                            "state": "pending",
+                            "period_start": "2025-11-01",
+                            "period_end": "2025-11-30",
+                            "due_date": "2025-12-20",
+                        },
+                        {
+                            "id": "BILL-WA-2025-12",
+                            "type": "water",
+                            "amount": 72.30,
+                            "state": "pending",
+                            "period_start": "2025-11-01",
+                            "period_end": "2025-11-30",
+                            "due_date": "2025-12-22",
+                        },
+                        {
+                            "id": "BILL-GA-2025-11",
+                            "type": "gas",
+                            "amount": 95.00,
+                            "state": "paid",
+                            "period_start": "2025-10-01",
+                            "period_end": "2025-10-31",
+                            "due_date": "2025-11-20",
+                        },
+                    ]
+                    env.setdefault('gov', {})['bills'] = bills
+                body = json.dumps({'success':True, 'bills': bills}).encode('utf-8')
             self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
-            self.wfile.write(json.dumps({'success':True, 'bills': bills}).encode('utf-8')); return
+            self.wfile.write(body); return
 
+        asset = self.cached_static_asset(full_path)
+        if asset is not None:
+            self.send_static(asset); return
         if os.path.exists(full_path) and full_path.endswith('.html'):
             with open(full_path, 'r', encoding='utf-8') as f: content = f.read()
-            is_clean = (os.environ.get("BENCHMARK_CLEAN_MODE") == "true" or "clean=true" in self.path)
-            if not is_clean: content = self.inject_distractors(content)
+            if self.page_variant() == 'distractor': content = self.inject_distractors(content)
             self.send_response(200); self.send_header('Content-Type', 'text/html; charset=utf-8'); self.send_cors_headers(); self.end_headers()
             self.wfile.write(content.encode('utf-8')); return
         return super().do_GET()
 
     def inject_distractors(self, html):
-        distractor = """
-        <div id="d-blocker" style="position:fixed;top:0;left:0;width:100%;height:100%;z-index:9999;background:rgba(255,255,255,0.9);display:none;align-items:center;justify-content:center;pointer-events:all;">
-          <div style="background:white;padding:40px;border-radius:12px;box-shadow:0 10px 30px rgba(0,0,0,0.2);text-align:center;max-width:400px;">
-            <h2 style="color:#1e293b;margin-top:0;">📣 Security Notice</h2>
-            <p style="color:#64748b;">Verify session to continue.</p>
-            <button onclick="document.getElementById('d-blocker').style.display='none';document.body.style.overflow='auto';" 
-                    style="background:#3b82f6;color:white;padding:12px 30px;border:none;border-radius:8px;cursor:pointer;font-weight:bold;">Confirm</button>
-          </div>
-        </div>
-        <script>
-        (function(){
-          const params = new URLSearchParams(window.location.search);
-          const level = (params.get('dlevel') || 'medium').toLowerCase();
-          const levelProb = { off: 0.0, low: 0.25, medium: 0.5, high: 0.8 };
-          const probability = Object.prototype.hasOwnProperty.call(levelProb, level) ? levelProb[level] : 0.5;
-          const seedRaw = params.get('dseed') || '';
-
-          function seeded01(input) {
-            let h = 2166136261 >>> 0;
-            for (let i = 0; i < input.length; i++) {
-              h ^= input.charCodeAt(i);
-              h = Math.imul(h, 16777619);
-            }
-            return (h >>> 0) / 4294967296;
-          }
-
-          const key = seedRaw ? (seedRaw + '|' + location.pathname + '|' + location.search) : '';
-          const roll = key ? seeded01(key) : Math.random();
-
-          setTimeout(() => {
-            const blocker = document.getElementById('d-blocker');
-            if (blocker && roll < probability) {
-              blocker.style.display = 'flex';
-              document.body.style.overflow = 'hidden';
-            }
-          }, 1000);
-        })();
-        </script>
-        """
-        return html.replace("</body>", distractor + "</body>")
+        return inject_distractors(html)
 
     def do_POST(self):
         length = int(self.headers.get('Content-Length', 0))
@@ -351,16 +709,15 @@ class Handler(http.server.SimpleHTTPRequestHandler):
         api_path = self.normalized_api_path() or self.path
         route_path = urllib.parse.urlsplit(api_path).path
         if route_path == '/api/bills/pay':
-            env = load_env()
-            bill_id = data.get('bill_id')
-            bills = env.setdefault('gov', {}).setdefault('bills', [])
-            found = False
-            for bill in bills:
-                if bill.get('id') == bill_id:
-                    bill['state'] = 'paid'
-                    found = True
-                    break
-            save_env(env)
+            with WORLD_STATE.transaction() as txn:
+                bill_id = data.get('bill_id')
+                bills = txn.env.setdefault('gov', {}).setdefault('bills', [])
+                found = False
+                for bill in bills:
+                    if bill.get('id') == bill_id:
+                        bill['state'] = 'paid'
+                        found = True
+                        break
             self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
             self.wfile.write(json.dumps({'success': found}).encode('utf-8'))
             return
@@ -426,201 +783,213 @@ class Handler(http.server.SimpleHTTPRequestHandler):
             self.wfile.write(json.dumps({"success": True, "hotels": hotels}).encode('utf-8'))
             return
 
+        if route_path == '/api/state/flush':
+            flushed = WORLD_STATE.flush()
+            self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
+            self.wfile.write(json.dumps({"ok": True, "flushed": flushed, "state": WORLD_STATE.describe()}).encode('utf-8'))
+            return
+
+        if route_path == '/api/state/reload':
+            # Branch pools restore state.json in place and swap it in here
+            # instead of restarting the server; data.db may have been restored
+            # in place, so reopen the database connections as well.
+            WORLD_STATE.reload()
+            DB_WRITER.reopen()
+            DB_READER.reopen()
+            self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
+            self.wfile.write(json.dumps({"ok": True, "state": WORLD_STATE.describe()}).encode('utf-8'))
+            return
+
         if route_path == '/api/debug/time_travel':
-            env = load_env()
             days = int(data.get('days', 0) or 0)
             hours = int(data.get('hours', 0) or 0)
-            env = advance_time(env, days=days, hours=hours)
-            env = process_time_triggers(env, execute_db)
-            save_env(env)
-            self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
-            self.wfile.write(json.dumps({
+            with WORLD_STATE.transaction() as txn, DB_WRITER.unit_of_work() as uow:
+                env = advance_time(txn.env, days=days, hours=hours)
+                env = process_time_triggers(env, execute_db)
+                txn.env = env
+            resp = {
                 "ok": True,
                 "system_time": env.get("system_time"),
                 "applied": {"days": days, "hours": hours}
-            }).encode('utf-8'))
+            }
+            if uow.errors:
+                resp["db_errors"] = uow.errors
+            self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
+            self.wfile.write(json.dumps(resp).encode('utf-8'))
             return
 
         if route_path == '/api/mutate':
-            env = load_env()
-            task_id, action, payload = data.get('task_id',''), data.get('action',''), data.get('payload',{})
+            # All memory_kv/table writes of this action commit together when
+            # the unit of work exits (before the state transaction commits).
+            with WORLD_STATE.transaction() as txn, DB_WRITER.unit_of_work() as uow:
+                env = txn.env
+                task_id, action, payload = data.get('task_id',''), data.get('action',''), data.get('payload',{})
 
-            # Benchmark helper: allow direct state injection for flow setup.
-            if action == 'set_state':
-                if isinstance(payload, dict):
-                    ts = datetime.now().isoformat()
-                    source = task_id or "DEBUG"
+                # Benchmark helper: allow direct state injection for flow setup.
+                if action == 'set_state':
+                    started = time.perf_counter()
+                    if isinstance(payload, dict):
+                        ts = datetime.now().isoformat()
+                        source = task_id or "DEBUG"
 
-                    def _mem_set(key, value):
-                        try:
+                        def _mem_set(key, value):
                             execute_db(
                                 "INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
                                 [str(key), str(value), ts, source, 1.0],
                             )
-                        except Exception:
-                            pass
 
-                    env = deep_merge(env, payload)
+                        env = deep_merge(env, payload)
 
-                    if 'card_frozen' in payload:
-                        frozen = bool(payload.get('card_frozen'))
-                        last4 = str(
-                            payload.get('card_last4')
-                            or payload.get('last4')
-                            or '7777'
-                        )
-                        card_state = 'blocked' if frozen else 'active'
-                        env = deep_merge(env, {
-                            "payments": {"cards": {last4: {"state": card_state}}},
-                            "world_state": {"financial_context": {"liquidity": "frozen" if frozen else "active"}},
-                        })
-                        _mem_set("payment.cards[0].state", card_state)
-                        _mem_set(f"payments.cards.{last4}.state", card_state)
-                        try:
+                        if 'card_frozen' in payload:
+                            frozen = bool(payload.get('card_frozen'))
+                            last4 = str(
+                                payload.get('card_last4')
+                                or payload.get('last4')
+                                or '7777'
+                            )
+                            card_state = 'blocked' if frozen else 'active'
+                            env = deep_merge(env, {
+                                "payments": {"cards": {last4: {"state": card_state}}},
+                                "world_state": {"financial_context": {"liquidity": "frozen" if frozen else "active"}},
+                            })
+                            _mem_set("payment.cards[0].state", card_state)
+                            _mem_set(f"payments.cards.{last4}.state", card_state)
                             execute_db("UPDATE cards SET state = ? WHERE user_id = 1 AND last4 = ?", [card_state, last4])
-                        except Exception:
-                            pass
-
-                    if 'pending_order' in payload:
-                        pending = bool(payload.get('pending_order'))
-                        food_status = "pending" if pending else "delivered"
-                        shop_state = "confirmed" if pending else "delivered"
-                        env = deep_merge(env, {
-                            "food": {"order": {"last": {"status": food_status}}},
-                            "shop": {"orders": {"last": {"id": "CF-ORDER", "state": shop_state, "total": 29.99}}},
-                        })
-                        _mem_set("food.order.last.status", food_status)
-                        _mem_set("shop.orders.last.state", shop_state)
-                        _mem_set("pending_order", "true" if pending else "false")
-                        _mem_set("has_shop_delivered", "false" if pending else "true")
-
-                    if 'has_sub' in payload:
-                        enabled = bool(payload.get('has_sub'))
-                        sub_status = "active" if enabled else "inactive"
-                        subs = env.get("food", {}).get("subscriptions", {})
-                        if not isinstance(subs, dict):
-                            subs = {}
-                        for sid, item in list(subs.items()):
-                            if isinstance(item, dict):
-                                item["status"] = sub_status
-                                subs[sid] = item
-                        subs["last"] = {"id": "CF-SUB", "status": sub_status}
-                        env = deep_merge(env, {"food": {"subscriptions": subs}})
-                        legacy_subs = env.get("subscriptions", {})
-                        if isinstance(legacy_subs, dict):
-                            for sid, item in list(legacy_subs.items()):
+
+                        if 'pending_order' in payload:
+                            pending = bool(payload.get('pending_order'))
+                            food_status = "pending" if pending else "delivered"
+                            shop_state = "confirmed" if pending else "delivered"
+                            env = deep_merge(env, {
+                                "food": {"order": {"last": {"status": food_status}}},
+                                "shop": {"orders": {"last": {"id": "CF-ORDER", "state": shop_state, "total": 29.99}}},
+                            })
+                            _mem_set("food.order.last.status", food_status)
+                            _mem_set("shop.orders.last.state", shop_state)
+                            _mem_set("pending_order", "true" if pending else "false")
+                            _mem_set("has_shop_delivered", "false" if pending else "true")
+
+                        if 'has_sub' in payload:
+                            enabled = bool(payload.get('has_sub'))
+                            sub_status = "active" if enabled else "inactive"
+                            subs = env.get("food", {}).get("subscriptions", {})
+                            if not isinstance(subs, dict):
+                                subs = {}
+                            for sid, item in list(subs.items()):
                                 if isinstance(item, dict):
                                     item["status"] = sub_status
-                                    legacy_subs[sid] = item
-                            env = deep_merge(env, {"subscriptions": legacy_subs})
-                        _mem_set("food.subscriptions.last.status", sub_status)
-                        _mem_set("has_sub", "true" if enabled else "false")
-
-                    if 'has_shop_delivered' in payload:
-                        delivered = bool(payload.get('has_shop_delivered'))
-                        st = "delivered" if delivered else "confirmed"
-                        env = deep_merge(env, {"shop": {"orders": {"last": {"id": "CF-ORDER", "state": st, "total": 29.99}}}})
-                        _mem_set("shop.orders.last.state", st)
-                        _mem_set("has_shop_delivered", "true" if delivered else "false")
-
-                    if 'has_invest' in payload:
-                        enabled = bool(payload.get('has_invest'))
-                        inv_status = "active" if enabled else "inactive"
-                        accs = env.get("finance", {}).get("investment_accounts", {})
-                        if not isinstance(accs, dict):
-                            accs = {}
-                        for aid, item in list(accs.items()):
-                            if isinstance(item, dict):
-                                item["status"] = inv_status
-                                accs[aid] = item
-                        accs["last"] = {"id": "CF-INV", "status": inv_status}
-                        env = deep_merge(env, {"finance": {"investment_accounts": accs}})
-                        _mem_set("finance.investment_accounts.last.status", inv_status)
-                        _mem_set("has_invest", "true" if enabled else "false")
-
-                    if 'has_home' in payload:
-                        has_home = bool(payload.get('has_home'))
-                        env = deep_merge(env, {"has_home": has_home})
-                        _mem_set("has_home", "true" if has_home else "false")
-
-                    if 'has_bank' in payload:
-                        has_bank = bool(payload.get('has_bank'))
-                        env = deep_merge(env, {"has_bank": has_bank})
-                        _mem_set("has_bank", "true" if has_bank else "false")
-
-                    if 'has_mobile' in payload:
-                        has_mobile = bool(payload.get('has_mobile'))
-                        env = deep_merge(env, {"has_mobile": has_mobile})
-                        _mem_set("has_mobile", "true" if has_mobile else "false")
-
-                    if 'has_utility' in payload:
-                        has_utility = bool(payload.get('has_utility'))
-                        env = deep_merge(env, {"has_utility": has_utility})
-                        _mem_set("has_utility", "true" if has_utility else "false")
-
-                    if 'certified' in payload:
-                        cert = bool(payload.get('certified'))
-                        env = deep_merge(env, {"world_state": {"skills": {"certified": cert}}})
-                        _mem_set("world_state.skills.certified", "True" if cert else "False")
-
-                    if 'energy_cost' in payload:
-                        projected = "high" if str(payload.get('energy_cost')).strip().lower() == "high" else "low"
-                        env = deep_merge(env, {"world_state": {"energy_context": {"projected_cost": projected}}})
-                        _mem_set("energy_cost", projected)
-
-                    if 'is_sick' in payload:
-                        sick = bool(payload.get('is_sick'))
-                        env = deep_merge(env, {
-                            "world_state": {
-                                "health_context": {"current_status": "ill" if sick else "healthy"},
-                                "physical_context": {"status": "impaired" if sick else "normal", "energy_level": 20 if sick else 100},
-                            }
-                        })
-                        _mem_set("is_sick", "true" if sick else "false")
-
-                    if 'location' in payload:
-                        loc = str(payload.get('location') or '').strip().lower()
-                        tier = 'suburban' if loc == 'suburb' else 'city_center'
-                        env = deep_merge(env, {"world_state": {"location_context": {"tier": tier}}})
-                        _mem_set("location", loc or "city")
-
-                    if 'commute_checked' in payload:
-                        checked = bool(payload.get('commute_checked'))
-                        if checked:
-                            tier = env.get('world_state', {}).get('location_context', {}).get('tier', 'city_center')
-                            commute_cost = 120.0 if tier == 'suburban' else 35.0
-                            env = deep_merge(env, {"commute": {"last_search": {"cost": commute_cost}}})
-                            _mem_set("commute.last_search.cost", commute_cost)
-                        else:
-                            env = deep_merge(env, {"commute": {"search_results": {}, "last_search": {}}})
-                        _mem_set("commute_checked", "true" if checked else "false")
-
-                    if 'trip_booked' in payload:
-                        trip_booked = bool(payload.get('trip_booked'))
-                        env = deep_merge(env, {"trip_booked": trip_booked})
-                        _mem_set("trip_booked", "true" if trip_booked else "false")
-
-                save_env(env)
-                self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
-                self.wfile.write(json.dumps({"ok": True, "injected": True}).encode('utf-8'))
-                return
-            
-            # --- 核心路由重构：全处理器尝试 ---
-            handlers = [handle_a_housing, handle_b_consumption, handle_c_support, handle_d_finance, handle_e_travel, handle_f_work, handle_g_health, handle_h_government, handle_i_repair, handle_j_learning, handle_k_social, handle_l_privacy, handle_m_crisis, handle_z_advanced]
-            
-            final_extra = {}
-            action_found = False
-            for handler in handlers:
-                new_env, extra = handler(task_id, action, payload, env, execute_db)
-                if extra or new_env != env: # 处理器产生了变化
-                    env = new_env
-                    final_extra.update(extra)
-                    action_found = True
-                    # 如果处理器明确表示处理了该 action，可以提前退出，或者为了蝴蝶效应继续遍历
-            
-            save_env(env)
+                                    subs[sid] = item
+                            subs["last"] = {"id": "CF-SUB", "status": sub_status}
+                            env = deep_merge(env, {"food": {"subscriptions": subs}})
+                            legacy_subs = env.get("subscriptions", {})
+                            if isinstance(legacy_subs, dict):
+                                for sid, item in list(legacy_subs.items()):
+                                    if isinstance(item, dict):
+                                        item["status"] = sub_status
+                                        legacy_subs[sid] = item
+                                env = deep_merge(env, {"subscriptions": legacy_subs})
+                            _mem_set("food.subscriptions.last.status", sub_status)
+                            _mem_set("has_sub", "true" if enabled else "false")
+
+                        if 'has_shop_delivered' in payload:
+                            delivered = bool(payload.get('has_shop_delivered'))
+                            st = "delivered" if delivered else "confirmed"
+                            env = deep_merge(env, {"shop": {"orders": {"last": {"id": "CF-ORDER", "state": st, "total": 29.99}}}})
+                            _mem_set("shop.orders.last.state", st)
+                            _mem_set("has_shop_delivered", "true" if delivered else "false")
+
+                        if 'has_invest' in payload:
+                            enabled = bool(payload.get('has_invest'))
+                            inv_status = "active" if enabled else "inactive"
+                            accs = env.get("finance", {}).get("investment_accounts", {})
+                            if not isinstance(accs, dict):
+                                accs = {}
+                            for aid, item in list(accs.items()):
+                                if isinstance(item, dict):
+                                    item["status"] = inv_status
+                                    accs[aid] = item
+                            accs["last"] = {"id": "CF-INV", "status": inv_status}
+                            env = deep_merge(env, {"finance": {"investment_accounts": accs}})
+                            _mem_set("finance.investment_accounts.last.status", inv_status)
+                            _mem_set("has_invest", "true" if enabled else "false")
+
+                        if 'has_home' in payload:
+                            has_home = bool(payload.get('has_home'))
+                            env = deep_merge(env, {"has_home": has_home})
+                            _mem_set("has_home", "true" if has_home else "false")
+
+                        if 'has_bank' in payload:
+                            has_bank = bool(payload.get('has_bank'))
+                            env = deep_merge(env, {"has_bank": has_bank})
+                            _mem_set("has_bank", "true" if has_bank else "false")
+
+                        if 'has_mobile' in payload:
+                            has_mobile = bool(payload.get('has_mobile'))
+                            env = deep_merge(env, {"has_mobile": has_mobile})
+                            _mem_set("has_mobile", "true" if has_mobile else "false")
+
+                        if 'has_utility' in payload:
+                            has_utility = bool(payload.get('has_utility'))
+                            env = deep_merge(env, {"has_utility": has_utility})
+                            _mem_set("has_utility", "true" if has_utility else "false")
+
+                        if 'certified' in payload:
+                            cert = bool(payload.get('certified'))
+                            env = deep_merge(env, {"world_state": {"skills": {"certified": cert}}})
+                            _mem_set("world_state.skills.certified", "True" if cert else "False")
+
+                        if 'energy_cost' in payload:
+                            projected = "high" if str(payload.get('energy_cost')).strip().lower() == "high" else "low"
+                            env = deep_merge(env, {"world_state": {"energy_context": {"projected_cost": projected}}})
+                            _mem_set("energy_cost", projected)
+
+                        if 'is_sick' in payload:
+                            sick = bool(payload.get('is_sick'))
+                            env = deep_merge(env, {
+                                "world_state": {
+                                    "health_context": {"current_status": "ill" if sick else "healthy"},
+                                    "physical_context": {"status": "impaired" if sick else "normal", "energy_level": 20 if sick else 100},
+                                }
+                            })
+                            _mem_set("is_sick", "true" if sick else "false")
+
+                        if 'location' in payload:
+                            loc = str(payload.get('location') or '').strip().lower()
+                            tier = 'suburban' if loc == 'suburb' else 'city_center'
+                            env = deep_merge(env, {"world_state": {"location_context": {"tier": tier}}})
+                            _mem_set("location", loc or "city")
+
+                        if 'commute_checked' in payload:
+                            checked = bool(payload.get('commute_checked'))
+                            if checked:
+                                tier = env.get('world_state', {}).get('location_context', {}).get('tier', 'city_center')
+                                commute_cost = 120.0 if tier == 'suburban' else 35.0
+                                env = deep_merge(env, {"commute": {"last_search": {"cost": commute_cost}}})
+                                _mem_set("commute.last_search.cost", commute_cost)
+                            else:
+                                env = deep_merge(env, {"commute": {"search_results": {}, "last_search": {}}})
+                            _mem_set("commute_checked", "true" if checked else "false")
+
+                        if 'trip_booked' in payload:
+                            trip_booked = bool(payload.get('trip_booked'))
+                            env = deep_merge(env, {"trip_booked": trip_booked})
+                            _mem_set("trip_booked", "true" if trip_booked else "false")
+
+                    txn.env = env
+                    resp = {"ok": True, "injected": True}
+                    MUTATIONS.record('set_state', (time.perf_counter() - started) * 1000.0)
+                else:
+                    # Owners of the action, then its subscribers (cross-domain side effects).
+                    result = MUTATIONS.dispatch(task_id, action, payload, env, execute_db)
+                    if result.handled:
+                        txn.env = result.env
+                    else:
+                        txn.discard()
+                    resp = {"ok":True}; resp.update(result.extra)
+
+            if uow.errors:
+                resp["db_errors"] = uow.errors
             self.send_response(200); self.send_header('Content-Type','application/json'); self.send_cors_headers(); self.end_headers()
-            resp = {"ok":True}; resp.update(final_extra)
             self.wfile.write(json.dumps(resp).encode('utf-8'))
             return
 
@@ -628,7 +997,41 @@ class Handler(http.server.SimpleHTTPRequestHandler):
         self.wfile.write(json.dumps({'ok': False, 'error': f'Unknown endpoint: {route_path}'}).encode('utf-8'))
 
 if __name__ == '__main__':
+    import signal
     import sys
-    port = int(sys.argv[1]) if len(sys.argv) > 1 else server_port()
-    with ReusableTCPServer(("", port), Handler) as httpd:
-        print(f"Serving at port {port}"); httpd.serve_forever()
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    port = int(args[0]) if args else server_port()
+    core = os.environ.get("WEBAGENT_SERVER_CORE", "threading").strip().lower()
+    if '--async' in sys.argv[1:]:
+        core = 'asyncio'
+    # Runners stop servers with SIGTERM; turn it into a normal exit so
+    # deferred world-state writes are flushed.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Databases created before the memory_kv change feed existed get it here.
+    if os.path.exists(DB_PATH):
+        try:
+            with sqlite3.connect(DB_PATH, timeout=60) as conn:
+                ensure_memory_changelog(conn)
+        except sqlite3.Error as exc:
+            print(f"⚠️  memory_kv change feed not installed: {exc}")
+        try:
+            with sqlite3.connect(DB_PATH, timeout=60) as conn:
+                ensure_table_versions(conn)
+        except sqlite3.Error as exc:
+            print(f"⚠️  table versions not installed, API ETags disabled: {exc}")
+    if STATIC_ASSETS is not None:
+        STATIC_ASSETS.start_watcher(static_watch_interval_from_env())
+    try:
+        if core == 'asyncio':
+            from async_server import serve
+            serve(Handler, port)
+        else:
+            with ReusableTCPServer(("", port), Handler) as httpd:
+                print(f"Serving at port {port}"); httpd.serve_forever()
+    finally:
+        WORLD_STATE.close()
+        DB_WRITER.close()
+        DB_READER.close()
+        if STATIC_ASSETS is not None:
+            STATIC_ASSETS.close()
+
@@ -83,10 +83,13 @@ async function send(task_id, action, payload = {}) {
     }
 }
 
-async function loadEnv() {
+// `paths` (e.g. ['shop.orders.last', 'finance.budgets']) limits the response
+// to those subtrees, nested as in the full state; omit it for everything.
+async function loadEnv(paths) {
     const relRoot = getRelRoot();
+    const query = paths && paths.length ? '?paths=' + encodeURIComponent([].concat(paths).join(',')) : '';
     try {
-        const res = await fetch(relRoot + 'api/env');
+        const res = await fetch(relRoot + 'api/env' + query);
         return await res.json();
     } catch (e) {
         return {};
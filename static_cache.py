@@ -0,0 +1,177 @@
+"""In-memory copy of the static site tree served by server.py.
+
+``StaticAssetCache`` reads every file under ``sites/`` once.  HTML pages are
+kept in each variant the server can send (e.g. clean and with distractors),
+so requests neither touch the disk nor redo the string replacement.  Each
+body has a content ETag; gzip and (when the optional ``brotli`` package is
+installed) brotli encodings are built on first demand and kept.
+
+The snapshot is authoritative for paths under the root: files added or
+changed later are not seen unless ``refresh`` runs, which the watcher thread
+(``start_watcher``, for editing pages during development) does periodically.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Callable, Optional
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+
+
+def static_cache_enabled_from_env() -> bool:
+    return os.environ.get("WEBAGENT_STATIC_CACHE", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def static_watch_interval_from_env() -> float:
+    """Seconds between watcher scans; 0 (default) leaves the snapshot fixed."""
+    raw = os.environ.get("WEBAGENT_STATIC_WATCH_INTERVAL_SEC", "0").strip()
+    try:
+        return max(0.0, float(raw))
+    except Exception:
+        return 0.0
+
+
+def static_cache_control_from_env() -> str:
+    raw = os.environ.get("WEBAGENT_STATIC_MAX_AGE", "0").strip()
+    try:
+        max_age = max(0, int(raw))
+    except Exception:
+        max_age = 0
+    # With max-age 0, browsers keep the body but revalidate it with If-None-Match.
+    return f"public, max-age={max_age}" if max_age else "no-cache"
+
+
+class StaticAsset:
+    __slots__ = ("body", "content_type", "etag", "_encoded", "_lock")
+
+    def __init__(self, body: bytes, content_type: str):
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self._encoded: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encodings(self) -> tuple[str, ...]:
+        """Content codings worth offering for this body, preferred first."""
+        if len(self.body) < COMPRESS_MIN_BYTES:
+            return ()
+        return ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if not encoding:
+            return self.body
+        with self._lock:
+            body = self._encoded.get(encoding)
+            if body is None:
+                if encoding == "br":
+                    body = brotli.compress(self.body)
+                else:
+                    body = gzip.compress(self.body, compresslevel=9, mtime=0)
+                self._encoded[encoding] = body
+            return body
+
+
+class StaticAssetCache:
+    def __init__(self, root: str, html_variants: dict[str, Callable[[str], str]]):
+        self.root = os.path.normpath(root)
+        self.html_variants = html_variants
+        self._files: dict[str, dict[str, StaticAsset]] = {}
+        self._dirs: set[str] = set()
+        self._stamps: dict[str, tuple[int, int]] = {}
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats = {"loads": 0, "files": 0}
+        self.refresh()
+
+    def _load(self, path: str) -> dict[str, StaticAsset]:
+        with open(path, "rb") as fh:
+            raw = fh.read()
+        if not path.endswith(".html"):
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            return {"": StaticAsset(raw, content_type)}
+        text = raw.decode("utf-8")
+        variants: dict[str, StaticAsset] = {}
+        by_body: dict[bytes, StaticAsset] = {}
+        for name, transform in self.html_variants.items():
+            body = transform(text).encode("utf-8")
+            # Pages a transform leaves unchanged share one asset (and its encodings).
+            if body not in by_body:
+                by_body[body] = StaticAsset(body, "text/html; charset=utf-8")
+            variants[name] = by_body[body]
+        return variants
+
+    def refresh(self) -> int:
+        """Rescan the root and reload new or changed files; returns how many changed."""
+        stamps: dict[str, tuple[int, int]] = {}
+        dirs = {self.root}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirs.update(os.path.join(dirpath, d) for d in dirnames)
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                stamps[path] = (st.st_mtime_ns, st.st_size)
+        files = dict(self._files)
+        changed = 0
+        for path, stamp in stamps.items():
+            if self._stamps.get(path) == stamp and path in files:
+                continue
+            try:
+                files[path] = self._load(path)
+            except (OSError, UnicodeDecodeError):
+                files.pop(path, None)
+                continue
+            changed += 1
+        for path in set(files) - set(stamps):
+            del files[path]
+            changed += 1
+        # Readers see either the old or the new maps, never a partial update.
+        self._files, self._dirs, self._stamps = files, dirs, stamps
+        self.stats["loads"] += 1
+        self.stats["files"] = len(files)
+        return changed
+
+    def covers(self, path: str) -> bool:
+        path = os.path.normpath(path)
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def exists(self, path: str) -> bool:
+        """``os.path.exists`` answered from the snapshot for paths under the root."""
+        if not self.covers(path):
+            return os.path.exists(path)
+        path = os.path.normpath(path)
+        return path in self._files or path in self._dirs
+
+    def get(self, path: str, variant: str = "") -> Optional[StaticAsset]:
+        assets = self._files.get(os.path.normpath(path))
+        if not assets:
+            return None
+        return assets.get(variant) or assets.get("")
+
+    def start_watcher(self, interval: float) -> None:
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as exc:
+                    print(f"⚠️  static asset refresh failed: {exc}")
+
+        self._watcher = threading.Thread(target=loop, name="static-assets-watcher", daemon=True)
+        self._watcher.start()
+
+    def close(self) -> None:
+        self._stop.set()
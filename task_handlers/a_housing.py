@@ -1,7 +1,15 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 
+@MUTATIONS.handles(
+    'rent_property',
+    'open_account',
+    'manage_lease',
+    'verify_address',
+    'mobile_subscribe',
+)
 def handle_a_housing(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
@@ -1,7 +1,19 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 
+@MUTATIONS.handles(
+    'checkout',
+    'create_order',
+    'manage_subscription',
+    'book_housekeeping',
+    'order_food',
+    'order_food_with_promo',
+    'manage_coupon',
+    'submit_price_protect',
+    'list_second_hand_item',
+)
 def handle_b_consumption(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
@@ -1,8 +1,18 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 import json
 
+@MUTATIONS.handles(
+    'submit_ticket',
+    'submit_return_request',
+    'request_prorated_refund',
+    'cancel_subscription',
+    'submit_warranty_claim',
+    'submit_review',
+    'manage_blacklist',
+)
 def handle_c_support(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
@@ -1,4 +1,5 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 import os
@@ -10,6 +11,20 @@ def _should_log_debug() -> bool:
     value = os.environ.get("WEBAGENT_DEBUG_LOGS", "").strip().lower()
     return value in {"1", "true", "yes", "on"}
 
+@MUTATIONS.handles(
+    'check_balance',
+    'update_budget',
+    'adjust_budget',
+    'setup_autopay',
+    'manage_bill_source',
+    'deactivate_card',
+    'block_card',
+    'request_otp',
+    'rebind_confirm',
+    'upload_tax_document',
+    'manage_investment',
+    'manage_investment_account',
+)
 def handle_d_finance(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
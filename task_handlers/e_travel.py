@@ -1,4 +1,5 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 from .time_utils import get_sim_time
 import random
 from datetime import datetime
@@ -120,6 +121,17 @@ def _compute_hotel_nights(checkin, checkout, fallback=None):
         pass
     return 3
 
+@MUTATIONS.handles(
+    'apply_visa',
+    'search_commute_route',
+    'transport_topup',
+    'book_flight',
+    'book_hotel',
+    'book_airport_transfer',
+    'search_visa_requirements',
+    'submit_expense',
+    'rebook_ok',
+)
 def handle_e_travel(task_id, action, payload, env, execute_db_fn):
     # Use sim time instead of system time for consistency where appropriate
     # For now, most legacy E tasks use dt_module.datetime.now(). 
@@ -1,8 +1,17 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 import json
 
+@MUTATIONS.handles(
+    'manage_calendar_event',
+    'conference_register',
+    'submit_paper',
+    'pay_publication_fees',
+    'track_email_thread',
+    'archive_document',
+)
 def handle_f_work(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
@@ -1,7 +1,16 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 
+@MUTATIONS.handles(
+    'book_doctor',
+    'purchase_insurance',
+    'submit_claim',
+    'refill_rx',
+    'activate_health_plan',
+    'book_vaccine',
+)
 def handle_g_health(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
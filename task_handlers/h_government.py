@@ -1,7 +1,15 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 
+@MUTATIONS.handles(
+    'change_address',
+    'change_municipal_address',
+    'update_vehicle_address',
+    'book_permit',
+    'manage_parking_permit',
+)
 def handle_h_government(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
@@ -1,7 +1,17 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 
+@MUTATIONS.handles(
+    'submit_repair_request',
+    'cancel_repair_request',
+    'submit_appliance_repair',
+    'cancel_appliance_repair',
+    'setup_smart_bulb',
+    'submit_meter_reading',
+    'set_energy_plan',
+)
 def handle_i_repair(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
@@ -1,7 +1,17 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 
+@MUTATIONS.handles(
+    'enroll_course',
+    'buy_ebook',
+    'manage_library_service',
+    'submit_assignment',
+    'manage_tickets',
+    'issue_certificate',
+    'manage_gear_listing',
+)
 def handle_j_learning(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
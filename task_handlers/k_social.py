@@ -1,8 +1,10 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 import hashlib
 
+@MUTATIONS.handles('join_group', 'split_expenses', 'make_donation')
 def handle_k_social(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
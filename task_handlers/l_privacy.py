@@ -1,8 +1,10 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 import json
 
+@MUTATIONS.handles('manage_password', 'manage_data_request', 'rotate_keys', 'change_2fa_device')
 def handle_l_privacy(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
 
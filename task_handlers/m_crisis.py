@@ -1,4 +1,5 @@
 from .utils import deep_merge
+from .registry import MUTATIONS
 import os
 import random
 import datetime as dt_module
@@ -8,6 +9,9 @@ def _should_log_debug() -> bool:
     value = os.environ.get("WEBAGENT_DEBUG_LOGS", "").strip().lower()
     return value in {"1", "true", "yes", "on"}
 
+@MUTATIONS.handles('handle_supply_disruption', 'submit_illness_report', 'apply_urgent_loan')
+# M1 - a blocked card also freezes liquidity and merchant bindings (after d_finance blocks it).
+@MUTATIONS.subscribes('deactivate_card', 'block_card')
 def handle_m_crisis(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
     fallback_alternatives = {
@@ -0,0 +1,145 @@
+"""Action dispatch for ``/api/mutate``.
+
+Handler modules declare the actions they own with ``MUTATIONS.handles``;
+handlers that react to another domain's action (the "butterfly" effects,
+e.g. the crisis handler freezing liquidity when a card is blocked) register
+for it with ``MUTATIONS.subscribes``.  ``dispatch`` runs the owners of the
+action and then its subscribers, in registration order, threading ``env``
+through them, instead of offering every action to every handler.
+
+A handler's return value is its delta: the ``env`` it returns (a new dict
+from ``deep_merge``, or the same one mutated in place) replaces the
+current one and its extra fields are merged into the response.  Whether
+the world state changed is decided by whether any handler ran, not by
+comparing states.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from typing import Any, Callable, NamedTuple
+
+Handler = Callable[[str, str, dict, dict, Callable], "tuple[dict, dict]"]
+
+UNKNOWN_ACTION = "<unknown>"
+
+
+class MutationResult(NamedTuple):
+    env: dict[str, Any]
+    extra: dict[str, Any]
+    handlers: tuple[str, ...]
+
+    @property
+    def handled(self) -> bool:
+        return bool(self.handlers)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    BOUNDS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms: float) -> None:
+        self.buckets[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (``max_ms`` for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for idx, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return float(self.BOUNDS_MS[idx]) if idx < len(self.BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict[str, Any]:
+        labels = [f"<={bound}ms" for bound in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "buckets": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+
+class ActionRegistry:
+    def __init__(self):
+        self._owners: dict[str, list[Handler]] = {}
+        self._subscribers: dict[str, list[Handler]] = {}
+        self._routes: dict[str, tuple[Handler, ...]] = {}
+        self._latency: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, table: dict[str, list[Handler]], actions: tuple[str, ...]) -> Callable[[Handler], Handler]:
+        def decorator(handler: Handler) -> Handler:
+            for action in actions:
+                handlers = table.setdefault(action, [])
+                if handler not in handlers:
+                    handlers.append(handler)
+            self._routes.clear()
+            return handler
+
+        return decorator
+
+    def handles(self, *actions: str) -> Callable[[Handler], Handler]:
+        """Register the decorated handler as an owner of ``actions``."""
+        return self._register(self._owners, actions)
+
+    def subscribes(self, *actions: str) -> Callable[[Handler], Handler]:
+        """Run the decorated handler after the owners of ``actions``, for its side effects."""
+        return self._register(self._subscribers, actions)
+
+    def actions(self) -> set[str]:
+        return set(self._owners) | set(self._subscribers)
+
+    def handlers_for(self, action: str) -> tuple[Handler, ...]:
+        route = self._routes.get(action)
+        if route is None:
+            route = tuple(self._owners.get(action, ()))
+            route += tuple(h for h in self._subscribers.get(action, ()) if h not in route)
+            self._routes[action] = route
+        return route
+
+    def dispatch(self, task_id: str, action: str, payload: dict, env: dict, execute_db_fn: Callable) -> MutationResult:
+        started = time.perf_counter()
+        extra: dict[str, Any] = {}
+        names = []
+        for handler in self.handlers_for(action):
+            env, handler_extra = handler(task_id, action, payload, env, execute_db_fn)
+            if handler_extra:
+                extra.update(handler_extra)
+            names.append(handler.__name__)
+        self.record(action if names else UNKNOWN_ACTION, (time.perf_counter() - started) * 1000.0)
+        return MutationResult(env, extra, tuple(names))
+
+    def record(self, action: str, ms: float) -> None:
+        with self._lock:
+            histogram = self._latency.get(action)
+            if histogram is None:
+                histogram = self._latency[action] = LatencyHistogram()
+            histogram.record(ms)
+
+    def latency_stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {action: histogram.snapshot() for action, histogram in sorted(self._latency.items())}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._latency.clear()
+
+
+MUTATIONS = ActionRegistry()
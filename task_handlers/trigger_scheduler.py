@@ -0,0 +1,148 @@
+"""Deadline-ordered scheduler for simulated background processes.
+
+A ``TriggerRule`` names a collection in the world state (e.g.
+``shop.orders``), when one of its entities is waiting (``when``), the
+timestamp its clock starts from (``start``), how long it waits (``delay``)
+and what happens when it fires (``fire``).  ``TriggerScheduler`` keeps one
+heap of ``(due, ...)`` entries, so ``fire_due`` only pops triggers whose
+deadline passed instead of scanning and re-parsing every entity.
+
+Entities are discovered when they are created: handlers build new dicts
+through ``deep_merge`` (or add keys in place), so before firing the
+scheduler re-indexes only collections whose identity or size changed, and
+in those only entities whose dict was replaced.  A state reload replaces
+every collection and therefore re-indexes everything; call ``reset()``
+first so the previous state's entries do not linger in the heap until
+their deadlines pass (the server does this from ``WorldStateStore``'s
+``on_swap`` hook).  Entries are checked
+again when popped, so entities that were removed, replaced or moved out of
+the waiting state since they were indexed are skipped.  An entity that is
+edited *in place* back into a waiting state is not noticed; replace its dict
+(``deep_merge`` does) so it gets re-indexed.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+from datetime import datetime, timedelta
+from typing import Any, Callable, NamedTuple
+
+
+class TriggerRule(NamedTuple):
+    name: str
+    path: tuple[str, ...]
+    delay: timedelta
+    when: Callable[[dict], bool]
+    start: Callable[[dict], Any]
+    fire: Callable[[dict, str, dict, "TriggerContext"], None]
+
+
+class TriggerContext(NamedTuple):
+    """What ``fire`` callbacks get besides the entity: the clock and database writers."""
+
+    now: datetime
+    ts: str
+    mem_set: Callable[[str, Any], None]
+    execute_db: Callable[[str, Any], None]
+
+
+def _collection(env: dict, path: tuple[str, ...]) -> dict | None:
+    current: Any = env
+    for part in path:
+        if not isinstance(current, dict):
+            return None
+        current = current.get(part)
+    return current if isinstance(current, dict) else None
+
+
+class TriggerScheduler:
+    def __init__(self, rules: list[TriggerRule]):
+        self.rules = {rule.name: rule for rule in rules}
+        # Naive and timezone-aware deadlines cannot be compared with each
+        # other (or with a clock of the other kind), so they live apart.
+        self._heaps: dict[bool, list[tuple]] = {False: [], True: []}
+        self._seen: dict[str, tuple[Any, int, dict[str, dict]]] = {}
+        self._counter = itertools.count()
+        self.stats = {"indexed": 0, "fired": 0, "stale": 0}
+
+    def _due(self, rule: TriggerRule, entity: dict) -> datetime | None:
+        if not rule.when(entity):
+            return None
+        raw = rule.start(entity)
+        if not raw:
+            return None
+        try:
+            return datetime.fromisoformat(raw) + rule.delay
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+    def _push(self, due: datetime, rule: TriggerRule, entity_id: str, entity: dict) -> None:
+        heapq.heappush(self._heaps[due.tzinfo is not None], (due, next(self._counter), rule.name, entity_id, entity))
+
+    def sync(self, env: dict) -> None:
+        """Index entities created or replaced since the previous call."""
+        for rule in self.rules.values():
+            collection = _collection(env, rule.path)
+            if collection is None:
+                self._seen.pop(rule.name, None)
+                continue
+            previous = self._seen.get(rule.name)
+            if previous is not None and previous[0] is collection and previous[1] == len(collection):
+                continue
+            seen_entities = previous[2] if previous is not None else {}
+            current: dict[str, dict] = {}
+            for entity_id, entity in collection.items():
+                if entity_id == "last" or not isinstance(entity, dict):
+                    continue
+                current[entity_id] = entity
+                if seen_entities.get(entity_id) is entity:
+                    continue
+                due = self._due(rule, entity)
+                if due is not None:
+                    self._push(due, rule, entity_id, entity)
+                    self.stats["indexed"] += 1
+            self._seen[rule.name] = (collection, len(collection), current)
+
+    def fire_due(
+        self,
+        env: dict,
+        now: datetime,
+        mem_set: Callable[[str, Any], None],
+        execute_db: Callable[[str, Any], None],
+    ) -> list[tuple[str, str]]:
+        """Fire every trigger due at ``now``; returns ``(rule, entity_id)`` pairs in firing order."""
+        self.sync(env)
+        ctx = TriggerContext(now=now, ts=now.isoformat(), mem_set=mem_set, execute_db=execute_db)
+        heap = self._heaps[now.tzinfo is not None]
+        fired = []
+        while heap and heap[0][0] <= now:
+            _, _, rule_name, entity_id, entity = heapq.heappop(heap)
+            rule = self.rules[rule_name]
+            collection = _collection(env, rule.path)
+            if collection is None or collection.get(entity_id) is not entity:
+                self.stats["stale"] += 1
+                continue
+            # The entity may have been edited in place since it was indexed.
+            due = self._due(rule, entity)
+            if due is None:
+                self.stats["stale"] += 1
+                continue
+            if due > now:
+                self._push(due, rule, entity_id, entity)
+                continue
+            try:
+                rule.fire(env, entity_id, entity, ctx)
+            except Exception as exc:
+                print(f"ERROR: world trigger {rule_name} failed for {entity_id}: {exc}")
+                continue
+            self.stats["fired"] += 1
+            fired.append((rule_name, entity_id))
+        return fired
+
+    def reset(self) -> None:
+        """Forget every indexed entity, e.g. after the whole state was swapped."""
+        self._heaps = {False: [], True: []}
+        self._seen.clear()
+
+    def pending(self) -> int:
+        return sum(len(heap) for heap in self._heaps.values())
@@ -1,167 +1,150 @@
-from .utils import deep_merge
 from .time_utils import get_sim_time
-from datetime import datetime, timedelta
+from .trigger_scheduler import TriggerRule, TriggerScheduler
+from datetime import timedelta
 import os
 
-def process_time_triggers(env, execute_db_fn=None):
+MEMORY_UPSERT_SQL = "INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)"
+
+TRIGGER_DEBUG_LOG = "trigger_debug.log"
+
+
+def _should_log_trigger_debug() -> bool:
+    value = (
+        os.environ.get("WEBAGENT_DEBUG_TRIGGERS")
+        or os.environ.get("WEBAGENT_DEBUG_LOGS")
+        or ""
+    ).strip().lower()
+    return value in {"1", "true", "yes", "on"}
+
+
+def _last_pointer(env, path):
+    current = env
+    for part in path:
+        current = current.get(part, {}) if isinstance(current, dict) else {}
+    last = current.get('last') if isinstance(current, dict) else None
+    return last if isinstance(last, dict) else {}
+
+
+# --- Trigger 1: Visa Application Approval ---
+# Logic: If a visa application is 'pending' and submitted more than 3 days ago, approve it.
+def _approve_visa(env, app_id, app, ctx):
+    app['status'] = 'approved'
+    app['updated_at'] = ctx.ts
+    env['trip_booked'] = True
+    ctx.mem_set(f'gov.visa_applications.{app_id}.status', 'approved')
+    last = _last_pointer(env, ('gov', 'visa_applications'))
+    if last.get('id') == app_id:
+        last['status'] = 'approved'
+        ctx.mem_set('gov.visa_applications.last.status', 'approved')
+    ctx.mem_set('trip_booked', 'true')
+
+
+# --- Trigger 2: Order Delivery (Shop) ---
+# Logic: If order is 'confirmed' and > 2 days old, mark as 'delivered'.
+def _order_status_key(order):
+    return 'state' if 'state' in order else 'status'
+
+
+def _deliver_shop_order(env, oid, order, ctx):
+    status_key = _order_status_key(order)
+    order[status_key] = 'delivered'
+    env['pending_order'] = False
+    env['has_shop_delivered'] = True
+    ctx.mem_set(f'shop.orders.{oid}.{status_key}', 'delivered')
+    # Also update SQL table for UI consistency
+    ctx.execute_db("UPDATE orders SET state = ? WHERE id = ?", ['delivered', oid])
+    last = _last_pointer(env, ('shop', 'orders'))
+    if last.get('id') == oid:
+        last[status_key] = 'delivered'
+        ctx.mem_set(f'shop.orders.last.{status_key}', 'delivered')
+    ctx.mem_set('pending_order', 'false')
+    ctx.mem_set('has_shop_delivered', 'true')
+
+
+# --- Trigger 3: Investment Growth ---
+# Logic: If investment account active > 7 days, add 5% interest (simulated once).
+def _apply_interest(env, acc_id, acc, ctx):
+    new_bal = round(float(acc.get('balance', 0)) * 1.05, 2)
+    acc['balance'] = new_bal
+    acc['interest_applied'] = True # Flag to prevent double application
+    ctx.mem_set(f'finance.investment_accounts.{acc_id}.balance', str(new_bal))
+    last = _last_pointer(env, ('finance', 'investment_accounts'))
+    if last.get('id') == acc_id:
+        last['balance'] = str(new_bal)
+        ctx.mem_set('finance.investment_accounts.last.balance', str(new_bal))
+
+
+# --- Trigger 4: Food Order Delivery ---
+# Food arrives faster: one simulated hour after ordering.
+def _deliver_food_order(env, oid, order, ctx):
+    order['status'] = 'delivered'
+    ctx.mem_set('food.order.last.status', 'delivered')
+
+
+TRIGGER_RULES = [
+    TriggerRule(
+        name="visa_approval",
+        path=("gov", "visa_applications"),
+        delay=timedelta(days=3),
+        when=lambda app: app.get('status') == 'pending',
+        start=lambda app: app.get('submitted_at'),
+        fire=_approve_visa,
+    ),
+    TriggerRule(
+        name="shop_delivery",
+        path=("shop", "orders"),
+        delay=timedelta(days=2),
+        when=lambda order: order.get(_order_status_key(order)) == 'confirmed',
+        # Date field might be 'date' (B1) or 'ordered_at' (B4)
+        start=lambda order: order.get('date') or order.get('ordered_at'),
+        fire=_deliver_shop_order,
+    ),
+    TriggerRule(
+        name="investment_interest",
+        path=("finance", "investment_accounts"),
+        delay=timedelta(days=7),
+        when=lambda acc: acc.get('status') == 'active' and not acc.get('interest_applied'),
+        start=lambda acc: acc.get('opened_at'),
+        fire=_apply_interest,
+    ),
+    TriggerRule(
+        name="food_delivery",
+        path=("food", "orders"),
+        delay=timedelta(hours=1),
+        when=lambda order: order.get('status') == 'pending',
+        start=lambda order: order.get('ordered_at'),
+        fire=_deliver_food_order,
+    ),
+]
+
+# The server process keeps one schedule across time jumps.
+SCHEDULER = TriggerScheduler(TRIGGER_RULES)
+
+
+def process_time_triggers(env, execute_db_fn=None, scheduler=None):
     """
     Check environment state and update it based on time passage.
     This acts as a simulator for background processes (e.g., approval workflows, shipping).
+
+    Only triggers whose deadline passed are visited (see ``TriggerScheduler``).
+    Database writes go through ``execute_db_fn``; the server runs this inside
+    a unit of work, so they commit together and failures are reported there.
     """
+    scheduler = scheduler or SCHEDULER
     current_time = get_sim_time(env)
     ts = current_time.isoformat()
-    
-    # Debug logging
-    try:
-        with open("trigger_debug.log", "a") as f:
-            f.write(f"--- Trigger Check at {current_time} ---")
-            f.write(f"DEBUG_WORLD_TRIGGER: Initial env['shop']['orders']: {env.get('shop',{}).get('orders',{})}\n")
-    except: pass
-    
-    # --- Trigger 1: Visa Application Approval ---
-    # Logic: If a visa application is 'pending' and submitted more than 3 days ago, approve it.
-    if 'gov' in env and 'visa_applications' in env['gov']:
-        applications = env['gov']['visa_applications']
-        for app_id, app in applications.items():
-            if app_id == 'last': continue 
-            
-            if app.get('status') == 'pending':
-                submitted_at_str = app.get('submitted_at')
-                if submitted_at_str:
-                    try:
-                        submitted_at = datetime.fromisoformat(submitted_at_str)
-                        delta_days = (current_time - submitted_at).days
-                        
-                        if delta_days >= 3:
-                            app['status'] = 'approved'
-                            app['updated_at'] = ts
-                            env['trip_booked'] = True
-                            
-                            # Update Memory KV
-                            if execute_db_fn:
-                                try:
-                                    execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                               [f'gov.visa_applications.{app_id}.status', 'approved', ts, 'world_trigger', 1.0])
-                                except Exception as e:
-                                    pass
-
-                            # Update 'last' pointer if needed
-                            if env['gov']['visa_applications'].get('last', {}).get('id') == app_id:
-                                env['gov']['visa_applications']['last']['status'] = 'approved'
-                                if execute_db_fn:
-                                    try:
-                                        execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                                   ['gov.visa_applications.last.status', 'approved', ts, 'world_trigger', 1.0])
-                                    except: pass
-                            if execute_db_fn:
-                                try:
-                                    execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                               ['trip_booked', 'true', ts, 'world_trigger', 1.0])
-                                except Exception:
-                                    pass
-                    except Exception as e:
-                        pass
-
-    # --- Trigger 2: Order Delivery (Shop) ---
-    # Logic: If order is 'confirmed' and > 2 days old, mark as 'delivered'.
-    if 'shop' in env and 'orders' in env['shop']:
-        for oid, order in env['shop']['orders'].items():
-            if oid == 'last': continue
-            
-            # Determine status key
-            status_key = 'state' if 'state' in order else 'status'
-            current_status = order.get(status_key)
-            
-            if current_status == 'confirmed':
-                # Date field might be 'date' (B1) or 'ordered_at' (B4)
-                date_str = order.get('date') or order.get('ordered_at')
-                
-                if date_str:
-                    try:
-                        order_date = datetime.fromisoformat(date_str)
-                        if (current_time - order_date).days >= 2:
-                            order[status_key] = 'delivered'
-                            env['pending_order'] = False
-                            env['has_shop_delivered'] = True
-                            
-                            # Update Memory KV
-                            if execute_db_fn:
-                                try:
-                                    execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                               [f'shop.orders.{oid}.{status_key}', 'delivered', ts, 'world_trigger', 1.0])
-                                    # Also update SQL table for UI consistency
-                                    execute_db_fn("UPDATE orders SET state = ? WHERE id = ?", ['delivered', oid])
-                                except: pass
-                                
-                            # Update last pointer if matches
-                            if env['shop']['orders'].get('last', {}).get('id') == oid:
-                                env['shop']['orders']['last'][status_key] = 'delivered'
-                                if execute_db_fn:
-                                    try:
-                                        execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                                   [f'shop.orders.last.{status_key}', 'delivered', ts, 'world_trigger', 1.0])
-                                    except: pass
-                            if execute_db_fn:
-                                try:
-                                    execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                               ['pending_order', 'false', ts, 'world_trigger', 1.0])
-                                    execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                               ['has_shop_delivered', 'true', ts, 'world_trigger', 1.0])
-                                except Exception:
-                                    pass
-                    except: pass
-
-    # --- Trigger 3: Investment Growth ---
-    # Logic: If investment account active > 7 days, add 5% interest (simulated once).
-    if 'finance' in env and 'investment_accounts' in env['finance']:
-        for acc_id, acc in env['finance']['investment_accounts'].items():
-            if acc_id == 'last': continue
-            
-            if acc.get('status') == 'active' and not acc.get('interest_applied'):
-                opened_at_str = acc.get('opened_at')
-                if opened_at_str:
-                    try:
-                        opened_at = datetime.fromisoformat(opened_at_str)
-                        if (current_time - opened_at).days >= 7:
-                            # Apply 5% interest
-                            current_bal = float(acc.get('balance', 0))
-                            new_bal = round(current_bal * 1.05, 2)
-                            acc['balance'] = new_bal
-                            acc['interest_applied'] = True # Flag to prevent double application
-                            
-                            if execute_db_fn:
-                                try:
-                                    execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                               [f'finance.investment_accounts.{acc_id}.balance', str(new_bal), ts, 'world_trigger', 1.0])
-                                except: pass
-                                
-                            if env['finance']['investment_accounts'].get('last', {}).get('id') == acc_id:
-                                env['finance']['investment_accounts']['last']['balance'] = str(new_bal)
-                                if execute_db_fn:
-                                    try:
-                                        execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                                   ['finance.investment_accounts.last.balance', str(new_bal), ts, 'world_trigger', 1.0])
-                                    except: pass
-                    except: pass
-
-    # --- Trigger 4: Food Order Delivery ---
-    if 'food' in env and 'orders' in env['food']:
-        for oid, order in env['food']['orders'].items():
-            if oid == 'last': continue
-            if order.get('status') == 'pending':
-                ordered_at_str = order.get('ordered_at')
-                if ordered_at_str:
-                    try:
-                        ordered_at = datetime.fromisoformat(ordered_at_str)
-                        # Food arrives faster (e.g. 1 hour simulation jump)
-                        # If time has passed at least 1 hour
-                        if (current_time - ordered_at).total_seconds() >= 3600:
-                            order['status'] = 'delivered'
-                            if execute_db_fn:
-                                try:
-                                    execute_db_fn("INSERT OR REPLACE INTO memory_kv (key,value,ts,source,confidence) VALUES (?,?,?,?,?)",
-                                               ['food.order.last.status', 'delivered', ts, 'world_trigger', 1.0])
-                                except: pass
-                    except: pass
+
+    def _execute_db(sql, args):
+        if execute_db_fn:
+            execute_db_fn(sql, args)
+
+    def _mem_set(key, value):
+        _execute_db(MEMORY_UPSERT_SQL, [key, value, ts, 'world_trigger', 1.0])
+
+    fired = scheduler.fire_due(env, current_time, _mem_set, _execute_db)
+
+    if _should_log_trigger_debug():
+        with open(TRIGGER_DEBUG_LOG, "a") as f:
+            f.write(f"--- Trigger Check at {current_time}: fired {fired or 'nothing'}, {scheduler.pending()} pending ---\n")
 
     return env
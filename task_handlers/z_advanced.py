@@ -1,4 +1,5 @@
 from .utils import deep_merge, write_memory_entries
+from .registry import MUTATIONS
 import random
 import datetime as dt_module
 import json
@@ -29,6 +30,7 @@ def _resolve_order(order_id, env, seeded_orders):
         pass
     return None
 
+@MUTATIONS.handles('place_bid', 'request_reset_code', 'reset_password', 'send_chat_message')
 def handle_z_advanced(task_id, action, payload, env, execute_db_fn):
     ts = dt_module.datetime.now().isoformat()
     seeded_orders = {
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from agent.assertions_dsl import AssertionDSL, JsonStateEnvAPI, compile_assertion
+from memory_kv import MemoryKVCache, ensure_memory_changelog
+
+
+class _CountingPage:
+    url = "http://localhost:8014/shop.local/order/confirmation/O-10001"
+
+    def __init__(self):
+        self.queries = 0
+        page = self
+
+        class _Locator:
+            def __init__(self, selector):
+                self.selector = selector
+
+            def count(self):
+                page.queries += 1
+                return 1 if self.selector == "#order-id" else 0
+
+            def inner_text(self):
+                page.queries += 1
+                return "O-10001" if self.selector == "#order-id" else ""
+
+        self._locator = _Locator
+
+    def locator(self, selector):
+        return self._locator(selector)
+
+
+class _CountingStateEnv(JsonStateEnvAPI):
+    def __init__(self, path):
+        super().__init__(lambda: path)
+        self.loads = 0
+
+    def load_state(self):
+        self.loads += 1
+        return super().load_state()
+
+
+class _WatchedPage:
+    """Page whose DOM changes when ``mutate`` is called; wakes ``wait_for_function`` like the MutationObserver."""
+
+    url = "http://localhost:8014/shop.local/index.html"
+
+    class TimeoutError(Exception):
+        pass
+
+    def __init__(self):
+        self.version = 0
+        self.changed = threading.Condition()
+        page = self
+
+        class _Locator:
+            def __init__(self, selector):
+                self.selector = selector
+
+            def count(self):
+                return 1 if self.selector == "#done" and page.version else 0
+
+        self._locator = _Locator
+
+    def locator(self, selector):
+        return self._locator(selector)
+
+    def mutate(self):
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def evaluate(self, script, arg=None):
+        return self.version
+
+    def wait_for_function(self, script, arg=None, timeout=None):
+        with self.changed:
+            if not self.changed.wait_for(lambda: self.version != arg, timeout / 1000.0):
+                raise _WatchedPage.TimeoutError()
+
+
+class AssertionDSLTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.state_file = Path(self._tmp.name) / "state.json"
+        self.state_file.write_text(
+            json.dumps({"shop": {"orders": {"O-10001": {"state": "confirmed", "items": ["milk"]}}}}),
+            encoding="utf-8",
+        )
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_compiled_ast_is_cached_per_string(self):
+        expr = "ALL[exists('#order-id'), NOT[exists('#error')]]"
+        self.assertIs(compile_assertion(expr), compile_assertion(expr))
+        self.assertEqual(compile_assertion(expr).kind, "all")
+
+    def test_malformed_parts_only_fail_when_reached(self):
+        dsl = AssertionDSL(_CountingPage(), {}, lambda channel, path: None)
+        self.assertFalse(dsl.evaluate("ALL[exists('#missing'), bogus(1)]"))
+        self.assertTrue(dsl.evaluate("ANY[exists('#order-id'), bogus(1)]"))
+        with self.assertRaises(ValueError):
+            dsl.evaluate("ALL[exists('#order-id'), bogus(1)]")
+
+    def test_snapshot_parses_state_once_and_dedupes_page_queries(self):
+        assertions = [
+            "exists('#order-id')",
+            "count('#order-id') >= 1",
+            "text('#order-id') == 'O-10001'",
+            "text('#order-id') != ''",
+            "json('env', 'shop.orders.O-10001.state') == 'confirmed'",
+            "json('env', 'shop.orders.O-10001.items') includes 'milk'",
+            "json('env', 'shop.orders.O-404.state') != ''",
+        ]
+        expected = [True, True, True, True, True, True, False]
+
+        page, env_api = _CountingPage(), _CountingStateEnv(self.state_file)
+        self.assertEqual([AssertionDSL(page, {}, env_api).evaluate(a) for a in assertions], expected)
+        self.assertEqual((page.queries, env_api.loads), (4, 3))
+
+        page, env_api = _CountingPage(), _CountingStateEnv(self.state_file)
+        self.assertEqual(AssertionDSL(page, {}, env_api).evaluate_many(assertions), expected)
+        self.assertEqual((page.queries, env_api.loads), (2, 1))
+
+    def test_within_wakes_on_state_change_without_polling(self):
+        def confirm_later():
+            time.sleep(0.3)
+            state = json.loads(self.state_file.read_text(encoding="utf-8"))
+            state["shop"]["orders"]["O-10001"]["state"] = "shipped"
+            tmp = self.state_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(state), encoding="utf-8")
+            os.replace(tmp, self.state_file)
+
+        env_api = _CountingStateEnv(self.state_file)
+        dsl = AssertionDSL(_CountingPage(), {}, env_api, snapshot=True)
+        writer = threading.Thread(target=confirm_later)
+        started = time.time()
+        writer.start()
+        self.assertTrue(dsl.evaluate("WITHIN(10, json('env', 'shop.orders.O-10001.state') == 'shipped')"))
+        writer.join()
+        self.assertLess(time.time() - started, 2.0)
+        self.assertEqual(env_api.loads, 2)
+
+    def test_temporal_assertions_on_static_sources_settle_immediately(self):
+        dsl = AssertionDSL(_CountingPage(), {"flag": "off"}, lambda channel, path: None)
+        started = time.time()
+        self.assertFalse(dsl.evaluate("EVENTUALLY(mem('flag') == 'on')"))
+        self.assertTrue(dsl.evaluate("STABLE(30, mem('flag') == 'off')"))
+        self.assertLess(time.time() - started, 1.0)
+
+    def test_memory_written_before_a_page_change_is_merged(self):
+        db = Path(self._tmp.name) / "data.db"
+        with sqlite3.connect(db) as conn:
+            conn.executescript(
+                "CREATE TABLE memory_kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, ts DATETIME, source TEXT, confidence REAL);"
+                "INSERT INTO memory_kv (key, value) VALUES ('stale', '\"x\"');"
+            )
+            ensure_memory_changelog(conn)
+        source = MemoryKVCache(db)
+        memory = source.snapshot()
+        page = _WatchedPage()
+
+        def act_later():
+            time.sleep(0.3)
+            with sqlite3.connect(db) as conn:
+                conn.execute("INSERT INTO memory_kv (key, value) VALUES ('k', '\"v\"')")
+                conn.execute("DELETE FROM memory_kv WHERE key = 'stale'")
+            time.sleep(0.02)
+            page.mutate()
+
+        dsl = AssertionDSL(page, memory, lambda channel, path: None, snapshot=True, memory_source=source)
+        actor = threading.Thread(target=act_later)
+        started = time.time()
+        actor.start()
+        self.assertTrue(dsl.evaluate("WITHIN(3, ALL[exists('#done'), mem('k') == 'v'])"))
+        actor.join()
+        self.assertLess(time.time() - started, 2.0)
+        self.assertNotIn("stale", memory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import http.client
+import http.server
+import json
+import threading
+import unittest
+
+from async_server import AsyncServer, finish_response, parse_head
+
+
+class EchoHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def normalized_api_path(self):
+        return self.path
+
+    def do_GET(self):
+        self.send_response(200); self.send_header('Content-Type', 'application/json'); self.end_headers()
+        self.wfile.write(json.dumps({'path': self.path, 'thread': threading.current_thread().name}).encode('utf-8'))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200); self.end_headers()
+        self.wfile.write(json.dumps({'body': body.decode('utf-8'), 'thread': threading.current_thread().name}).encode('utf-8'))
+
+
+class AsyncServerTests(unittest.TestCase):
+    def test_finish_response_adds_length_and_keep_alive(self):
+        raw, keep_alive = finish_response(b"HTTP/1.0 200 OK\r\nContent-Type: text/plain\r\n\r\nhello", True)
+        self.assertTrue(keep_alive)
+        self.assertTrue(raw.startswith(b"HTTP/1.1 200 OK\r\n"))
+        self.assertIn(b"Content-Length: 5\r\n", raw)
+        self.assertTrue(raw.endswith(b"Connection: keep-alive\r\n\r\nhello"))
+
+        raw, keep_alive = finish_response(b"HTTP/1.0 404 Not Found\r\nConnection: close\r\nContent-Length: 2\r\n\r\nno", True)
+        self.assertFalse(keep_alive)
+        self.assertEqual(raw.count(b"Connection:"), 1)
+
+    def test_parse_head(self):
+        command, path, version, _, headers = parse_head(b"GET /api/env?paths=a HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+        self.assertEqual((command, path, version, headers["Host"]), ("GET", "/api/env?paths=a", "HTTP/1.1", "x"))
+        self.assertIsNone(parse_head(b"garbage\r\n\r\n"))
+
+    def test_requests_share_a_connection_and_posts_use_the_writer(self):
+        server = AsyncServer(EchoHandler, 0, host="127.0.0.1", readers=2)
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        srv = asyncio.run_coroutine_threadsafe(asyncio.start_server(server.handle_connection, "127.0.0.1", 0), loop).result(5)
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", srv.sockets[0].getsockname()[1], timeout=5)
+            conn.request("GET", "/a")
+            first = json.loads(conn.getresponse().read())
+            conn.request("POST", "/api/mutate", body="{}")
+            posted = json.loads(conn.getresponse().read())
+            conn.close()
+        finally:
+            # Let the connection coroutine see the close before the loop stops.
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), loop).result(5)
+            loop.call_soon_threadsafe(srv.close)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+            server.close()
+        self.assertEqual(first["path"], "/a")
+        self.assertTrue(first["thread"].startswith("reads"))
+        self.assertEqual(posted["body"], "{}")
+        self.assertTrue(posted["thread"].startswith("mutations"))
+        self.assertEqual(server.stats["connections"], 1)
+        self.assertEqual(server.stats["requests"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from db_writer import SQLiteWriter
+from task_handlers.world_triggers import MEMORY_UPSERT_SQL
+
+
+class SQLiteWriterTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self._tmp.name) / "data.db"
+        with sqlite3.connect(self.db) as conn:
+            conn.executescript(
+                "CREATE TABLE memory_kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, ts TEXT, source TEXT, confidence REAL);"
+                "CREATE TABLE orders (id TEXT PRIMARY KEY, state TEXT);"
+                "INSERT INTO orders VALUES ('O-1', 'confirmed');"
+            )
+        self.writer = SQLiteWriter(self.db)
+
+    def tearDown(self):
+        self.writer.close()
+        self._tmp.cleanup()
+
+    def _rows(self, sql):
+        with sqlite3.connect(self.db) as conn:
+            return conn.execute(sql).fetchall()
+
+    def test_unit_of_work_commits_once_with_batches(self):
+        with self.writer.unit_of_work() as uow:
+            for key in ("a", "b", "c"):
+                self.writer.execute(MEMORY_UPSERT_SQL, [key, "1", "ts", "test", 1.0])
+            self.writer.execute("UPDATE orders SET state = ? WHERE id = ?", ["delivered", "O-1"])
+            self.writer.execute(MEMORY_UPSERT_SQL, ["d", "1", "ts", "test", 1.0])
+            # Nothing is visible before the block exits.
+            self.assertEqual(self._rows("SELECT COUNT(*) FROM memory_kv"), [(0,)])
+        self.assertEqual(uow.errors, [])
+        self.assertEqual(self._rows("SELECT COUNT(*) FROM memory_kv"), [(4,)])
+        self.assertEqual(self._rows("SELECT state FROM orders"), [("delivered",)])
+        self.assertEqual(self.writer.stats["transactions"], 1)
+        self.assertEqual((self.writer.stats["statements"], self.writer.stats["batches"]), (5, 3))
+
+    def test_failed_batch_is_reported_and_the_rest_commits(self):
+        with self.writer.unit_of_work() as uow:
+            self.writer.execute(MEMORY_UPSERT_SQL, ["a", "1", "ts", "test", 1.0])
+            self.writer.execute("UPDATE cards SET state = ? WHERE last4 = ?", ["blocked", "7777"])
+            self.writer.execute("UPDATE orders SET state = ? WHERE id = ?", ["cancelled", "O-1"])
+        self.assertEqual(len(uow.errors), 1)
+        self.assertIn("no such table: cards", uow.errors[0]["error"])
+        self.assertEqual(self._rows("SELECT key FROM memory_kv"), [("a",)])
+        self.assertEqual(self._rows("SELECT state FROM orders"), [("cancelled",)])
+
+    def test_exception_discards_queued_writes(self):
+        with self.assertRaises(RuntimeError):
+            with self.writer.unit_of_work():
+                self.writer.execute(MEMORY_UPSERT_SQL, ["a", "1", "ts", "test", 1.0])
+                raise RuntimeError("handler failed")
+        self.assertEqual(self._rows("SELECT COUNT(*) FROM memory_kv"), [(0,)])
+
+    def test_execute_outside_unit_commits_and_raises(self):
+        self.writer.execute(MEMORY_UPSERT_SQL, ["a", "1", "ts", "test", 1.0])
+        self.assertEqual(self._rows("SELECT key FROM memory_kv"), [("a",)])
+        with self.assertRaises(sqlite3.OperationalError):
+            self.writer.execute("UPDATE cards SET state = 'x'")
+
+    def test_reopen_drops_the_connection(self):
+        self.writer.execute(MEMORY_UPSERT_SQL, ["a", "1", "ts", "test", 1.0])
+        self.writer.execute(MEMORY_UPSERT_SQL, ["b", "1", "ts", "test", 1.0])
+        self.assertEqual(self.writer.stats["connections_opened"], 1)
+        # A restore copied into the same file keeps the inode; reopen is how the writer learns of it.
+        self.writer.reopen()
+        self.writer.execute(MEMORY_UPSERT_SQL, ["c", "1", "ts", "test", 1.0])
+        self.assertEqual(self.writer.stats["connections_opened"], 2)
+        self.assertEqual(self._rows("SELECT COUNT(*) FROM memory_kv"), [(3,)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from rl_memory.memory_baselines.memorybank.embedding_server import EmbeddingServer
+from rl_memory.memory_baselines.memorybank.embeddings import CachedEmbedder, EmbeddingCache, SocketEmbedder
+
+
+class FakeBackend:
+    model_name = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def encode_many(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+class EmbeddingCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_lru_and_disk_cache_skip_the_model(self):
+        backend = FakeBackend()
+        embedder = CachedEmbedder(backend, disk=EmbeddingCache(self.root / "emb.sqlite"))
+        self.assertEqual(embedder.encode_many(["ab", "abc", "ab"]), [[2.0, 0.5], [3.0, 0.5], [2.0, 0.5]])
+        self.assertEqual(embedder.encode("abc"), [3.0, 0.5])
+        self.assertEqual(backend.calls, [["ab", "abc"]])
+
+        # A fresh process-level cache reads the vectors back from disk.
+        other = FakeBackend()
+        reloaded = CachedEmbedder(other, disk=EmbeddingCache(self.root / "emb.sqlite"))
+        self.assertEqual(reloaded.encode_many(["abc", "abcd"]), [[3.0, 0.5], [4.0, 0.5]])
+        self.assertEqual(other.calls, [["abcd"]])
+        self.assertEqual(reloaded.stats, {"hits": 0, "disk_hits": 1, "misses": 1})
+
+    def test_socket_server_serves_several_clients(self):
+        backend = FakeBackend()
+        server = EmbeddingServer(self.root / "embed.sock", lambda model_name: backend)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            first = SocketEmbedder(self.root / "embed.sock", "fake")
+            second = SocketEmbedder(self.root / "embed.sock", "fake")
+            self.assertEqual(first.encode_many(["a", "abc"]), [[1.0, 0.5], [3.0, 0.5]])
+            self.assertEqual(second.encode("abc"), [3.0, 0.5])
+            self.assertEqual(backend.calls, [["a", "abc"]])
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import gzip
+import unittest
+
+from server import ResponseBodyCache, parse_env_paths, project_env
+
+
+class EnvProjectionTests(unittest.TestCase):
+    def setUp(self):
+        self.env = {
+            "shop": {"orders": {"last": {"id": "O-1"}, "O-1": {"id": "O-1"}}, "cart": {"items": []}},
+            "finance": {"budgets": {"food": 200}},
+            "balance": 12.5,
+        }
+
+    def test_paths_keep_their_nesting(self):
+        projected = project_env(self.env, parse_env_paths("paths=shop.orders.last,finance.budgets,balance"))
+        self.assertEqual(
+            projected,
+            {"shop": {"orders": {"last": {"id": "O-1"}}}, "finance": {"budgets": {"food": 200}}, "balance": 12.5},
+        )
+
+    def test_missing_paths_are_omitted(self):
+        self.assertEqual(project_env(self.env, ["health.plan", "shop.orders.last.id.x"]), {})
+
+    def test_ancestor_path_wins_and_env_is_untouched(self):
+        projected = project_env(self.env, ["shop.orders.last", "shop"])
+        self.assertIs(projected["shop"], self.env["shop"])
+        self.assertEqual(set(self.env["shop"]["orders"]), {"last", "O-1"})
+
+    def test_body_cache_compresses_once(self):
+        cache = ResponseBodyCache(max_entries=2)
+        body = b'{"a": 1}' * 100
+        cache.put('"e1"', body)
+        first = cache.gzipped('"e1"', body)
+        self.assertIs(cache.gzipped('"e1"', body), first)
+        self.assertEqual(gzip.decompress(first), body)
+        cache.put('"e2"', body)
+        self.assertIsNone(cache.get('"e1"'))
+
+
+if __name__ == "__main__":
+    unittest.main()
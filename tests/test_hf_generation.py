@@ -0,0 +1,186 @@
+import importlib.util
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from agent.hf_generation import GenerationQueue, GenRequest, PrefixKVCache
+
+HAS_TORCH = all(importlib.util.find_spec(name) for name in ("torch", "transformers", "tokenizers", "requests"))
+
+
+class _FakeCache:
+    def __init__(self, length):
+        self.length = length
+
+    def crop(self, length):
+        self.length = length
+
+
+def _request(ids, max_new_tokens=8):
+    return GenRequest(ids=list(ids), num_samples=1, do_sample=False, temperature=0.0, max_new_tokens=max_new_tokens)
+
+
+class PrefixKVCacheTests(unittest.TestCase):
+    def test_lookup_reuses_longest_prefix_and_crops_a_copy(self):
+        cache = PrefixKVCache(max_entries=2, min_tokens=3)
+        cache.store([1, 2, 3, 4, 5, 6], _FakeCache(6))
+        cache.store([1, 2, 9, 9], _FakeCache(4))
+
+        reused, kv = cache.lookup([1, 2, 3, 4, 7, 8])
+        self.assertEqual((reused, kv.length), (4, 4))
+        # The stored entry is untouched; a prompt equal to it still leaves one token to feed.
+        reused, kv = cache.lookup([1, 2, 3, 4, 5, 6])
+        self.assertEqual((reused, kv.length), (5, 5))
+        self.assertEqual(cache.lookup([1, 2, 5, 5, 5]), (0, None))
+
+        # Extending an entry replaces it, and the least recently used entry is evicted.
+        cache.store([1, 2, 3, 4, 5, 6, 7], _FakeCache(7))
+        cache.store([8, 8, 8], _FakeCache(3))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.lookup([1, 2, 9, 9, 0]), (0, None))
+
+
+class GenerationQueueTests(unittest.TestCase):
+    def test_concurrent_submits_share_batches_by_decoding_settings(self):
+        release = threading.Event()
+        batches = []
+
+        def run_batch(requests):
+            release.wait(5)
+            batches.append([request.ids[0] for request in requests])
+            return [request.ids[0] * 10 for request in requests]
+
+        queue = GenerationQueue(run_batch, max_batch=4, wait_sec=0.05)
+        results = {}
+        requests = [_request([i], max_new_tokens=8 if i % 2 else 16) for i in range(1, 7)]
+
+        def submit(request):
+            results[request.ids[0]] = queue.submit(request)
+
+        threads = [threading.Thread(target=submit, args=(request,)) for request in requests]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, {i: i * 10 for i in range(1, 7)})
+        for batch in batches:
+            self.assertEqual(len({i % 2 for i in batch}), 1)
+        self.assertEqual(queue.stats["requests"], 6)
+        self.assertLess(queue.stats["batches"], 6)
+
+    def test_a_lone_request_does_not_wait_for_a_batch(self):
+        queue = GenerationQueue(lambda requests: [0 for _ in requests], max_batch=8, wait_sec=2.0)
+        started = time.monotonic()
+        queue.submit(_request([1]))
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_errors_reach_the_submitter(self):
+        def run_batch(requests):
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            GenerationQueue(run_batch).submit(_request([1]))
+
+
+@unittest.skipUnless(HAS_TORCH, "needs torch and transformers")
+class LocalHFGenerationTests(unittest.TestCase):
+    """Prefix reuse and batching must decode exactly what plain greedy ``generate`` does."""
+
+    WORDS = [f"w{i}" for i in range(60)]
+
+    @classmethod
+    def setUpClass(cls):
+        import torch
+        from tokenizers import Tokenizer, models, pre_tokenizers
+        from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+        cls._tmp = tempfile.TemporaryDirectory()
+        vocab = {"[PAD]": 0, "[EOS]": 1, "[UNK]": 2}
+        vocab.update({word: i + 3 for i, word in enumerate(cls.WORDS)})
+        backend = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+        backend.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+        tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, unk_token="[UNK]", pad_token="[PAD]", eos_token="[EOS]")
+        torch.manual_seed(0)
+        config = GPT2Config(
+            vocab_size=len(vocab), n_positions=256, n_embd=32, n_layer=2, n_head=2,
+            bos_token_id=1, eos_token_id=1, pad_token_id=0,
+        )
+        GPT2LMHeadModel(config).save_pretrained(cls._tmp.name)
+        tokenizer.save_pretrained(cls._tmp.name)
+        cls.torch = torch
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def _client(self, prefix_cache, max_batch):
+        from agent.llm_client import LocalHFClient
+
+        env = {
+            "AGENT_MODEL": self._tmp.name,
+            "AGENT_HF_DEVICE_MAP": "",
+            "AGENT_HF_DTYPE": "float32",
+            "AGENT_HF_TRUST_REMOTE_CODE": "false",
+            "AGENT_HF_USE_CHAT_TEMPLATE": "false",
+            "AGENT_DISABLE_THINKING": "false",
+            "AGENT_HF_PREFIX_CACHE": str(prefix_cache),
+            "AGENT_HF_PREFIX_MIN_TOKENS": "4",
+            "AGENT_HF_MAX_BATCH": str(max_batch),
+            "AGENT_LLM_CACHE": "",
+        }
+        with mock.patch.dict(os.environ, env):
+            return LocalHFClient()
+
+    def _prompt(self, length, seed):
+        return " ".join(self.WORDS[(seed + 7 * i) % len(self.WORDS)] for i in range(length))
+
+    def _plain(self, client, prompt, max_new_tokens=8):
+        torch = self.torch
+        ids = torch.tensor([client.tokenizer(prompt)["input_ids"]])
+        with torch.no_grad():
+            out = client.model_obj.generate(
+                input_ids=ids, attention_mask=torch.ones_like(ids), max_new_tokens=max_new_tokens, do_sample=False,
+                pad_token_id=client.tokenizer.pad_token_id, eos_token_id=client.tokenizer.eos_token_id,
+            )
+        return [client.tokenizer.decode(out[0, ids.shape[1]:], skip_special_tokens=True).strip()]
+
+    def test_prefix_reuse_matches_plain_generate(self):
+        client = self._client(prefix_cache=4, max_batch=1)
+        # An episode: every prompt extends the previous one.
+        base = self._prompt(24, 0)
+        prompts = [base + " " + self._prompt(step * 3, 5) for step in range(4)]
+        for prompt in prompts:
+            self.assertEqual(client._generate_texts(prompt, 1, 0.0, 8), self._plain(client, prompt))
+        generation = client.stats()["generation"]
+        self.assertGreater(generation["prefix_reused_tokens"], 0)
+        self.assertIsNotNone(client._prefix_cache)
+
+    def test_batched_requests_match_plain_generate(self):
+        client = self._client(prefix_cache=0, max_batch=4)
+        prompts = [self._prompt(length, seed) for seed, length in enumerate((6, 11, 17))]
+        # Left-padded rows of different lengths in one generate() call.
+        batched = client._run_generation_batch([
+            GenRequest(ids=list(client.tokenizer(prompt)["input_ids"]), num_samples=1, do_sample=False, temperature=0.0, max_new_tokens=8)
+            for prompt in prompts
+        ])
+        self.assertEqual(batched, [self._plain(client, prompt) for prompt in prompts])
+
+        results = {}
+        threads = [
+            threading.Thread(target=lambda p=prompt: results.__setitem__(p, client._generate_texts(p, 1, 0.0, 8)))
+            for prompt in prompts
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+        self.assertEqual(results, {prompt: self._plain(client, prompt) for prompt in prompts})
+
+
+if __name__ == "__main__":
+    unittest.main()
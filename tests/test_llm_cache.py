@@ -0,0 +1,97 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent.llm_cache import LLMCacheMiss, LLMResponseCache, cached_sample
+
+IDENTITY = {"backend": "test", "model": "m"}
+MESSAGES = [{"role": "user", "content": "GOAL: buy milk"}]
+
+
+class LLMResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "llm_cache.sqlite"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _sampler(self, outputs):
+        calls = []
+
+        def sample():
+            calls.append(1)
+            return list(outputs)
+
+        return sample, calls
+
+    def test_deterministic_calls_are_served_from_cache(self):
+        cache = LLMResponseCache(self.path)
+        sample, calls = self._sampler(["CLICK(#buy)"])
+        for _ in range(3):
+            self.assertEqual(cached_sample(cache, IDENTITY, MESSAGES, 1, 0.0, 80, sample), ["CLICK(#buy)"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats["hits"], 2)
+        # Any change to the key material is a different entry.
+        cached_sample(cache, IDENTITY, MESSAGES, 1, 0.0, 96, sample)
+        cached_sample(cache, dict(IDENTITY, model="other"), MESSAGES, 1, 0.0, 80, sample)
+        self.assertEqual(len(calls), 3)
+
+    def test_sampled_and_failed_calls_are_not_cached(self):
+        cache = LLMResponseCache(self.path)
+        sample, calls = self._sampler(["CLICK(#buy)"])
+        cached_sample(cache, IDENTITY, MESSAGES, 1, 0.7, 80, sample)
+        cached_sample(cache, IDENTITY, MESSAGES, 1, 0.7, 80, sample)
+        failing, _ = self._sampler(["ERROR(TimeoutOrLimit)"])
+        cached_sample(cache, IDENTITY, MESSAGES, 1, 0.0, 80, failing)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.stats["writes"], 0)
+
+    def test_replay_mode_raises_on_miss(self):
+        LLMResponseCache(self.path).put(LLMResponseCache.make_key(IDENTITY, MESSAGES, 0.0, 80, 1), ["DONE()"])
+        replay = LLMResponseCache(self.path, mode="replay")
+        sample, calls = self._sampler(["never"])
+        self.assertEqual(cached_sample(replay, IDENTITY, MESSAGES, 1, 0.0, 80, sample), ["DONE()"])
+        with self.assertRaises(LLMCacheMiss):
+            cached_sample(replay, IDENTITY, MESSAGES, 2, 0.0, 80, sample)
+        # Sampled calls are never stored, so replay cannot serve them either.
+        with self.assertRaises(LLMCacheMiss):
+            cached_sample(replay, IDENTITY, MESSAGES, 4, 0.8, 80, sample)
+        self.assertEqual(calls, [])
+
+    def test_eviction_drops_least_recently_used_entries(self):
+        cache = LLMResponseCache(self.path, max_bytes=2000)
+        for idx in range(20):
+            cache.put(f"key-{idx}", ["x" * 200])
+            cache.get("key-0")
+        self.assertGreater(cache.stats["evictions"], 0)
+        self.assertIsNotNone(cache.get("key-0"))
+        self.assertIsNone(cache.get("key-1"))
+
+    def test_running_total_matches_stored_sizes(self):
+        def table_sum():
+            with sqlite3.connect(self.path) as conn:
+                return conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        first = LLMResponseCache(self.path, max_bytes=1500)
+        second = LLMResponseCache(self.path, max_bytes=1500)
+        for idx in range(12):
+            (first if idx % 2 else second).put(f"key-{idx}", ["x" * (100 + idx * 10)])
+        first.put("key-3", ["short"])
+        self.assertGreater(first.stats["evictions"] + second.stats["evictions"], 0)
+        self.assertEqual(first.total_bytes(), table_sum())
+        self.assertEqual(second.total_bytes(), table_sum())
+        second.close()
+
+        # A file from before the running total is summed once on open.
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("DROP TABLE meta")
+        first.close()
+        reopened = LLMResponseCache(self.path, max_bytes=1500)
+        self.assertEqual(reopened.total_bytes(), table_sum())
+        reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from memory_kv import CHANGELOG_KEEP, MemoryKVCache, ensure_memory_changelog
+
+SCHEMA = """
+CREATE TABLE memory_kv (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL,
+  ts DATETIME DEFAULT CURRENT_TIMESTAMP,
+  source TEXT,
+  confidence REAL DEFAULT 1.0
+);
+"""
+
+
+class MemoryKVCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self._tmp.name) / "data.db"
+        with sqlite3.connect(self.db) as conn:
+            conn.executescript(SCHEMA)
+            ensure_memory_changelog(conn)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, sql, rows):
+        with sqlite3.connect(self.db) as conn:
+            conn.executemany(sql, rows)
+
+    def _upsert(self, **values):
+        self._write(
+            "INSERT OR REPLACE INTO memory_kv (key, value, source) VALUES (?, ?, 'test')",
+            list(values.items()),
+        )
+
+    def test_refresh_fetches_only_changed_rows(self):
+        self._upsert(**{f"k{i}": str(i) for i in range(50)})
+        cache = MemoryKVCache(self.db)
+        self.assertEqual(len(cache.snapshot()), 50)
+
+        self._upsert(k1='{"value": "one"}', new='"fresh"')
+        self._write("DELETE FROM memory_kv WHERE key = ?", [("k2",)])
+        self.assertEqual(cache.refresh(), {"k1": {"value": "one"}, "new": "fresh"})
+        snapshot = cache.snapshot()
+        self.assertNotIn("k2", snapshot)
+        self.assertEqual(snapshot["k3"], 3)
+        self.assertEqual(cache.stats["full_loads"], 1)
+        self.assertEqual(cache.stats["rows_fetched"], 52)
+
+    def test_rewritten_history_forces_full_load(self):
+        self._upsert(a="1")
+        cache = MemoryKVCache(self.db)
+        cache.snapshot()
+        self._upsert(b="2")
+        cache.refresh()
+        # Simulate a restore: history after the cached seq is replaced.
+        with sqlite3.connect(self.db) as conn:
+            conn.execute("DELETE FROM memory_kv WHERE key = 'b'")
+            conn.execute("DELETE FROM memory_kv_changes WHERE seq > 1")
+            conn.execute("UPDATE memory_kv SET value = '9' WHERE key = 'a'")
+        self.assertEqual(cache.snapshot(), {"a": 9})
+        self.assertEqual(cache.stats["full_loads"], 2)
+
+    def test_changelog_is_bounded_and_lagging_caches_reload(self):
+        self._upsert(a="1")
+        lagging = MemoryKVCache(self.db)
+        lagging.snapshot()
+        self._upsert(**{f"k{i}": str(i) for i in range(CHANGELOG_KEEP + 10)})
+        current = MemoryKVCache(self.db)
+        current.snapshot()
+        with sqlite3.connect(self.db) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM memory_kv_changes").fetchone(), (CHANGELOG_KEEP,))
+
+        self._upsert(b="2")
+        self.assertEqual(current.refresh(), {"b": 2})
+        self.assertEqual(current.stats["full_loads"], 1)
+        self.assertEqual(len(lagging.snapshot()), CHANGELOG_KEEP + 12)
+        self.assertEqual(lagging.stats["full_loads"], 2)
+
+    def test_ensure_trims_an_existing_log(self):
+        with sqlite3.connect(self.db) as conn:
+            conn.execute("DROP TRIGGER memory_kv_changes_prune")
+        self._upsert(**{f"k{i}": str(i) for i in range(CHANGELOG_KEEP + 10)})
+        with sqlite3.connect(self.db) as conn:
+            ensure_memory_changelog(conn)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM memory_kv_changes").fetchone(), (CHANGELOG_KEEP,))
+
+    def test_database_without_changelog_is_fully_loaded(self):
+        legacy = Path(self._tmp.name) / "legacy.db"
+        with sqlite3.connect(legacy) as conn:
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT INTO memory_kv (key, value) VALUES ('x', 'plain')")
+        cache = MemoryKVCache(legacy)
+        self.assertEqual(cache.snapshot(), {"x": "plain"})
+        self.assertEqual(cache.snapshot(), {"x": "plain"})
+        self.assertEqual(cache.stats["full_loads"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from rl_memory.memory_baselines.reflexion.reflexion_memory import ReflexionMemoryStore
+from rl_memory.memory_baselines.retrieval import Corpus, CorpusCache, tokenize, top_rows
+
+
+class SharedRetrievalTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "reflections.json"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_top_rows_breaks_ties_by_row_order(self):
+        self.assertEqual(top_rows({3: 0.5, 1: 0.5, 2: 0.9, 0: 0.1}, 3), [2, 1, 3])
+        self.assertEqual(tokenize("Open cart_page, then CLICK #pay"), ("open", "cart_page", "then", "click", "pay"))
+
+    def test_corpus_cache_rebuilds_only_when_the_file_changes(self):
+        built = []
+
+        def build(items):
+            built.append(len(items))
+            return Corpus(items, [item["text"] for item in items])
+
+        cache = CorpusCache()
+        self.path.write_text(json.dumps([{"text": "refund order", "task": "A1"}]), encoding="utf-8")
+        corpus = cache.get(self.path, build)
+        self.assertIs(cache.get(self.path, build), corpus)
+        self.assertEqual(corpus.rows("task", lambda item: [item["task"]], "A1"), {0})
+
+        self.path.write_text(json.dumps([{"text": "a"}, {"text": "b"}]), encoding="utf-8")
+        self.assertEqual(len(cache.get(self.path, build)), 2)
+        self.assertEqual(built, [1, 2])
+
+    def test_reflexion_retrieve_filters_by_task(self):
+        store = ReflexionMemoryStore(self.path)
+        store.append({"task_id": "A1-x", "reflection": "check the refund form"})
+        store.append({"task_id": "*", "reflection": "refund needs the order id"})
+        store.append({"task_id": "B2-y", "reflection": "refund the order first"})
+        results = store.retrieve("refund order", top_k=3, task_id="A1-x")
+        self.assertEqual([item["task_id"] for item in results], ["*", "A1-x"])
+        self.assertEqual(len(store.retrieve("refund order", top_k=3)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
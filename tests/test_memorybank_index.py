@@ -0,0 +1,83 @@
+import json
+import math
+import tempfile
+import unittest
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from rl_memory.memory_baselines.memorybank import store as memorybank_store
+from rl_memory.memory_baselines.memorybank.index import load_index
+from rl_memory.memory_baselines.retrieval import SparseIndex, file_signature
+
+
+def _item(memory_id, entry_type, goal, tags):
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "entry_type": entry_type,
+        "memory_id": memory_id,
+        "task_id": "B1-1",
+        "task_family": "B1",
+        "goal": goal,
+        "key": "",
+        "summary": goal,
+        "tags": tags,
+        "importance": 0.7,
+        "strength": 0.7,
+        "success": True,
+        "reinforcement_count": 1,
+        "access_count": 0,
+        "ts_created": now,
+        "ts_updated": now,
+    }
+
+
+class MemoryBankIndexTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "bank.json"
+        items = [
+            _item("m1", "fact", "track the shop order delivery", ["shop", "order"]),
+            _item("m2", "strategy", "book a hotel near the airport", ["hotel"]),
+            _item("m3", "episode", "refund a shop order", ["shop", "refund"]),
+        ]
+        self.path.write_text(json.dumps(items), encoding="utf-8")
+        self.store = memorybank_store.MemoryBankStore(self.path)
+        memorybank_store._BANKS.clear()
+
+    def tearDown(self):
+        memorybank_store._BANKS.clear()
+        self._tmp.cleanup()
+
+    def test_sparse_cosine_matches_counter_cosine(self):
+        rows = [["a", "b", "b"], ["c"], []]
+        index = SparseIndex.build(rows)
+        query = ["b", "c", "c"]
+        for row, tokens in enumerate(rows):
+            a, b = Counter(query), Counter(tokens)
+            den = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+            expected = sum(a[k] * b[k] for k in a) / den if den else 0.0
+            self.assertAlmostEqual(index.cosine(query).get(row, 0.0), expected)
+
+    def test_retrieve_logs_access_without_rewriting_the_bank(self):
+        before = self.path.read_bytes()
+        picked = self.store.retrieve("shop order B1-1", top_k=2)
+        self.assertEqual([item["memory_id"] for item in picked][0], "m1")
+        self.assertEqual(self.path.read_bytes(), before)
+        # The index was persisted for this version of the file.
+        self.assertIsNotNone(load_index(self.path, file_signature(self.path), "", 3))
+
+        counts = {item["memory_id"]: item["access_count"] for item in self.store.load()}
+        self.assertEqual(counts["m1"], 1)
+        self.store.retrieve("shop order B1-1", top_k=2)
+        self.assertEqual(memorybank_store._BANKS[str(self.path.resolve())].items[0]["access_count"], 2)
+
+        self.store.compact()
+        stored = {item["memory_id"]: item["access_count"] for item in json.loads(self.path.read_text())}
+        self.assertEqual(stored["m1"], 2)
+        # Folded counts are not applied twice.
+        self.assertEqual({item["memory_id"]: item["access_count"] for item in self.store.load()}, stored)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import re
+import unittest
+from pathlib import Path
+
+from task_handlers import (  # noqa: F401
+    a_housing,
+    b_consumption,
+    c_support,
+    d_finance,
+    e_travel,
+    f_work,
+    g_health,
+    h_government,
+    i_repair,
+    j_learning,
+    k_social,
+    l_privacy,
+    m_crisis,
+    z_advanced,
+)
+from task_handlers.registry import MUTATIONS, ActionRegistry, LatencyHistogram
+
+HANDLER_DIR = Path(__file__).resolve().parents[1] / "task_handlers"
+
+
+class MutationRegistryTests(unittest.TestCase):
+    def test_every_action_a_handler_checks_is_routed_to_it(self):
+        for path in sorted(HANDLER_DIR.glob("[a-z]_*.py")):
+            source = path.read_text(encoding="utf-8")
+            actions = set(re.findall(r"\baction\s*==\s*'([^']+)'", source))
+            for group in re.findall(r"\baction\s+in\s*\(([^)]*)\)", source):
+                actions.update(re.findall(r"'([^']+)'", group))
+            handler_name = f"handle_{path.stem}"
+            for action in actions:
+                routed = [handler.__name__ for handler in MUTATIONS.handlers_for(action)]
+                self.assertIn(handler_name, routed, f"{action} is not routed to {handler_name}")
+
+    def test_subscribers_run_after_owners_and_unknown_actions_touch_nothing(self):
+        self.assertEqual(
+            [handler.__name__ for handler in MUTATIONS.handlers_for("block_card")],
+            ["handle_d_finance", "handle_m_crisis"],
+        )
+        registry = ActionRegistry()
+        calls = []
+
+        @registry.subscribes("pay")
+        def audit(task_id, action, payload, env, execute_db_fn):
+            calls.append("audit")
+            return dict(env, audited=True), {}
+
+        @registry.handles("pay")
+        def pay(task_id, action, payload, env, execute_db_fn):
+            calls.append("pay")
+            return dict(env, paid=payload["amount"]), {"redirect": "/done"}
+
+        env = {"balance": 1}
+        result = registry.dispatch("T1", "pay", {"amount": 5}, env, None)
+        self.assertEqual(calls, ["pay", "audit"])
+        self.assertEqual(result.env, {"balance": 1, "paid": 5, "audited": True})
+        self.assertEqual(result.extra, {"redirect": "/done"})
+
+        missing = registry.dispatch("T1", "refund", {}, env, None)
+        self.assertFalse(missing.handled)
+        self.assertIs(missing.env, env)
+        self.assertEqual(set(registry.latency_stats()), {"pay", "<unknown>"})
+
+    def test_histogram_quantiles_use_bucket_bounds(self):
+        histogram = LatencyHistogram()
+        for ms in (0.2, 0.3, 3.0, 4.0, 1500.0):
+            histogram.record(ms)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["p50_ms"], 5.0)
+        self.assertEqual(snapshot["p95_ms"], 1500.0)
+        self.assertEqual(snapshot["buckets"], {"<=0.5ms": 2, "<=5ms": 2, ">1000ms": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from agent.observation import format_observation
+
+
+class ObservationFormatTests(unittest.TestCase):
+    def test_plain_mode_matches_the_original_truncation(self):
+        content = "<div>  " + "x" * 50 + "\n</div>"
+        text = format_observation("http://h/p", content, max_chars=20)
+        self.assertEqual(text, "URL: http://h/p\nCONTENT:\n<div> " + "x" * 14 + "...(truncated)")
+        self.assertEqual(format_observation("u", None), "URL: u\nCONTENT:\n")
+
+    def test_compact_mode_keeps_best_ranked_dropped_controls(self):
+        filler = "<p>" + "lorem " * 30 + "</p>"
+        link = '<a href="/x">More</a>'
+        field = '<input #email name="email">'
+        pay = '<button #pay>Pay</button>'
+        content = " ".join([filler, link, field, pay])
+        interactive = [[link, 1], [field, 5], [pay, 4]]
+        text = format_observation("u", content, max_chars=180, interactive=interactive)
+        body = text.split("CONTENT:\n", 1)[1]
+        head, kept = body.split("...(truncated) INTERACTIVE: ")
+        self.assertEqual(head, content[:120])
+        # Only two fit in the reserved third; they keep document order.
+        self.assertEqual(kept, field + " " + pay)
+        self.assertLessEqual(len(head) + len(kept), 180)
+
+
+if __name__ == "__main__":
+    unittest.main()
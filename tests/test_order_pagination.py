@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from db_reader import SQLiteReader, ensure_table_versions
+from server import fetch_order_page, fetch_product_page, merge_shop_order_map
+
+
+class OrderPaginationTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self._tmp.name) / "data.db"
+        with sqlite3.connect(self.db) as conn:
+            conn.executescript(
+                "CREATE TABLE products (id INTEGER PRIMARY KEY AUTOINCREMENT, sku TEXT UNIQUE, name TEXT, price REAL, category TEXT);"
+                "CREATE TABLE orders (id TEXT PRIMARY KEY, user_id INTEGER, total REAL, state TEXT, shipping_speed TEXT,"
+                " shipping_address TEXT, created_at DATETIME);"
+                "CREATE TABLE order_items (id INTEGER PRIMARY KEY AUTOINCREMENT, order_id TEXT, sku TEXT, quantity INTEGER, price REAL);"
+            )
+            for n in range(7):
+                conn.execute("INSERT INTO products(sku, name, price, category) VALUES (?, ?, ?, 'misc')", (f"SKU-{n}", f"Item {n}", n + 1.0))
+            # O-3 and O-4 share a timestamp, so the id breaks the tie.
+            dates = ["2026-01-01 10:00:00", "2026-01-03 10:00:00", "2026-01-02 10:00:00", "2026-01-04 10:00:00", "2026-01-04 10:00:00"]
+            for n, date in enumerate(dates):
+                conn.execute(
+                    "INSERT INTO orders VALUES (?, 1, ?, 'confirmed', 'standard', '', ?)", (f"O-{n}", 10.0 * n, date)
+                )
+                for k in range(n % 3 + 1):
+                    conn.execute("INSERT INTO order_items(order_id, sku, quantity, price) VALUES (?, ?, 1, 1.0)", (f"O-{n}", f"SKU-{k}"))
+            ensure_table_versions(conn)
+        self.env_orders = {
+            "O-1": {"id": "O-1", "state": "delivered"},
+            "O-2": {"id": "O-2", "state": "shipped", "date": "2026-02-01T00:00:00"},
+            "O-9": {"id": "O-9", "total": 5, "date": "2026-01-02T12:00:00", "items": [{"name": "Env item"}]},
+            "last": {"id": "O-9", "state": "confirmed"},
+        }
+        self.reader = SQLiteReader(self.db)
+
+    def tearDown(self):
+        self.reader.close()
+        self._tmp.cleanup()
+
+    def _reference_orders(self):
+        """The orders list as built before pagination: one items query per order, then merge and sort."""
+        with sqlite3.connect(self.db) as conn:
+            conn.row_factory = sqlite3.Row
+            order_map = {}
+            for row in conn.execute("SELECT id, total, state, shipping_speed, shipping_address, created_at FROM orders"):
+                order = dict(row)
+                order["date"] = order.pop("created_at", "")
+                order["items"] = [
+                    {"id": item["sku"], "name": item["name"] or item["sku"], "category": item["category"] or "default",
+                     "quantity": item["quantity"], "price": item["price"]}
+                    for item in conn.execute(
+                        "SELECT oi.sku, oi.quantity, oi.price, p.name, p.category FROM order_items oi"
+                        " LEFT JOIN products p ON p.sku = oi.sku WHERE oi.order_id = ?",
+                        (order["id"],),
+                    )
+                ]
+                order_map[order["id"]] = order
+        merged = merge_shop_order_map(order_map, self.env_orders)
+        return sorted(merged.values(), key=lambda o: (str(o.get("date", "")), o["id"]), reverse=True)
+
+    def test_pages_concatenate_to_the_full_merged_list(self):
+        expected = self._reference_orders()
+        with self.reader.snapshot() as conn:
+            everything, next_after = fetch_order_page(conn, self.env_orders)
+        self.assertEqual(everything, expected)
+        self.assertIsNone(next_after)
+
+        pages, after = [], None
+        while True:
+            with self.reader.snapshot() as conn:
+                page, after = fetch_order_page(conn, self.env_orders, after=after, limit=2)
+            pages.extend(page)
+            if after is None:
+                break
+        self.assertEqual(pages, expected)
+        self.assertEqual([o["id"] for o in expected][:3], ["O-2", "O-4", "O-3"])
+
+    def test_null_and_empty_dates_page_as_one_key(self):
+        with sqlite3.connect(self.db) as conn:
+            # SQL alone would rank the '' rows above the NULL ones with higher ids.
+            for order_id, date in (("O-5", ""), ("O-6", ""), ("O-7", None), ("O-8", None)):
+                conn.execute("INSERT INTO orders VALUES (?, 1, 1.0, 'confirmed', 'standard', '', ?)", (order_id, date))
+        with self.reader.snapshot() as conn:
+            unpaged, _ = fetch_order_page(conn, {})
+            paged, after = [], None
+            while True:
+                page, after = fetch_order_page(conn, {}, after=after, limit=1)
+                paged += page
+                if after is None:
+                    break
+        self.assertEqual([order["id"] for order in paged], [order["id"] for order in unpaged])
+        self.assertEqual([order["id"] for order in paged[-4:]], ["O-8", "O-7", "O-6", "O-5"])
+
+    def test_unknown_cursor_raises(self):
+        with self.reader.snapshot() as conn, self.assertRaises(KeyError):
+            fetch_order_page(conn, self.env_orders, after="O-404", limit=2)
+
+    def test_product_pages_and_projection(self):
+        with self.reader.snapshot() as conn:
+            first, after = fetch_product_page(conn, limit=4, fields=["sku"])
+            rest, last = fetch_product_page(conn, after=after, limit=4, fields=["sku"])
+        self.assertEqual([p["sku"] for p in first + rest], [f"SKU-{n}" for n in range(7)])
+        self.assertEqual(set(first[0]), {"sku"})
+        self.assertIsNone(last)
+
+    def test_version_tag_changes_with_writes_and_file_replacement(self):
+        tables = ("orders", "order_items", "products")
+        with self.reader.connection() as conn:
+            before = self.reader.version_tag(conn, tables)
+        with sqlite3.connect(self.db) as conn:
+            conn.execute("UPDATE orders SET state = 'delivered' WHERE id = 'O-0'")
+        with self.reader.connection() as conn:
+            after_write = self.reader.version_tag(conn, tables)
+            self.assertEqual(self.reader.version_tag(conn, tables), after_write)
+        self.assertNotEqual(before, after_write)
+
+        replacement = Path(self._tmp.name) / "restored.db"
+        with sqlite3.connect(self.db) as src, sqlite3.connect(replacement) as dst:
+            src.backup(dst)
+        os.replace(replacement, self.db)
+        with self.reader.connection() as conn:
+            replaced = self.reader.version_tag(conn, tables)
+        self.assertNotEqual(replaced, after_write)
+
+        # An in-place restore keeps the inode and may roll the counters back.
+        self.reader.reopen()
+        with self.reader.connection() as conn:
+            self.assertNotEqual(self.reader.version_tag(conn, tables), replaced)
+        self.assertEqual(self.reader.stats["connections_opened"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
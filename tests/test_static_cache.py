@@ -0,0 +1,60 @@
+import gzip
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from static_cache import StaticAssetCache
+
+
+def _mark(html):
+    return html.replace("</body>", "<i>x</i></body>")
+
+
+class StaticAssetCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        (self.root / "shop.local").mkdir()
+        (self.root / "shop.local" / "index.html").write_text("<body>" + "a" * 2000 + "</body>", encoding="utf-8")
+        (self.root / "app.js").write_text("console.log(1);", encoding="utf-8")
+        self.cache = StaticAssetCache(str(self.root), {"clean": lambda html: html, "distractor": _mark})
+
+    def tearDown(self):
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def test_variants_and_encodings(self):
+        page = str(self.root / "shop.local" / "index.html")
+        clean = self.cache.get(page, "clean")
+        marked = self.cache.get(page, "distractor")
+        self.assertTrue(marked.body.endswith(b"<i>x</i></body>"))
+        self.assertNotEqual(clean.etag, marked.etag)
+        self.assertEqual(clean.content_type, "text/html; charset=utf-8")
+        self.assertEqual(gzip.decompress(clean.encoded("gzip")), clean.body)
+        self.assertIs(clean.encoded("gzip"), clean.encoded("gzip"))
+
+        script = self.cache.get(str(self.root / "app.js"), "distractor")
+        self.assertEqual(script.body, b"console.log(1);")
+        self.assertEqual(script.encodings(), ())
+
+    def test_exists_answers_from_the_snapshot(self):
+        self.assertTrue(self.cache.exists(str(self.root / "shop.local")))
+        self.assertTrue(self.cache.exists(str(self.root / "shop.local" / "index.html")))
+        self.assertFalse(self.cache.exists(str(self.root / "shop.local" / "index")))
+        (self.root / "late.html").write_text("<body></body>", encoding="utf-8")
+        self.assertFalse(self.cache.exists(str(self.root / "late.html")))
+
+    def test_refresh_picks_up_changes_and_deletions(self):
+        page = self.root / "shop.local" / "index.html"
+        before = self.cache.get(str(page), "clean").etag
+        page.write_text("<body>changed</body>", encoding="utf-8")
+        os.utime(page, ns=(0, 10**9))
+        (self.root / "app.js").unlink()
+        self.assertEqual(self.cache.refresh(), 2)
+        self.assertNotEqual(self.cache.get(str(page), "clean").etag, before)
+        self.assertIsNone(self.cache.get(str(self.root / "app.js")))
+
+
+if __name__ == "__main__":
+    unittest.main()
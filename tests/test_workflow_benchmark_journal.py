@@ -0,0 +1,226 @@
+import json
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from rl_memory.scripts.merge_workflow_benchmark_results import (
+    ResultsJournal,
+    find_journals,
+    iter_journal,
+    journal_name,
+    load_journals,
+    load_resumable_records,
+    merge_journals,
+    resume_conflicts,
+    shard_goals,
+)
+
+try:
+    from rl_memory.scripts import run_workflow_benchmark as bench
+except ImportError:  # needs the full agent stack (requests, playwright, ...)
+    bench = None
+
+META = {
+    "batch_root": "/batches/b1",
+    "split": "dev",
+    "module_policy": "llm",
+    "atomic_policy": "agent",
+    "prompt_mode": "active",
+    "runtime_isolation": "per_goal",
+    "num_shards": 1,
+    "agent_backend": "openai_compatible",
+    "agent_model": "model-a",
+}
+
+
+def _record(goal_id, success=True):
+    return {
+        "goal_id": goal_id,
+        "theme": "shopping",
+        "success": success,
+        "success_type": "exact" if success else "failed",
+        "composite_score": 1.0 if success else 0.0,
+    }
+
+
+class ResultsJournalTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_append_writes_one_entry_per_line(self):
+        path = self.root / journal_name("dev")
+        journal = ResultsJournal(path)
+        journal.append_run(META)
+        journal.append_record(_record("G-1"))
+        journal.close()
+        self.assertEqual([entry["kind"] for entry in iter_journal(path)], ["run", "goal"])
+        records, metas = load_journals([path])
+        self.assertEqual(records, {"G-1": _record("G-1")})
+        self.assertEqual(metas, {str(path): META})
+
+    def test_torn_tail_is_skipped_and_terminated_on_reopen(self):
+        path = self.root / journal_name("dev")
+        journal = ResultsJournal(path)
+        journal.append_run(META)
+        journal.append_record(_record("G-1"))
+        journal.close()
+        with path.open("a", encoding="utf-8") as fh:
+            fh.write('{"kind":"goal","goal_id":"G-2","rec')
+        self.assertEqual(sorted(load_journals([path])[0]), ["G-1"])
+
+        journal = ResultsJournal(path)
+        journal.append_record(_record("G-3"))
+        journal.close()
+        self.assertEqual(sorted(load_journals([path])[0]), ["G-1", "G-3"])
+
+    def test_fresh_run_header_drops_earlier_goals(self):
+        path = self.root / journal_name("dev")
+        journal = ResultsJournal(path)
+        journal.append_run(META, fresh=True)
+        journal.append_record(_record("G-1"))
+        journal.append_record(_record("G-2", success=False))
+        journal.close()
+        journal = ResultsJournal(path)
+        journal.append_run(META, fresh=True)
+        journal.append_record(_record("G-2"))
+        journal.append_run({**META, "agent_model": "model-b"})
+        journal.append_record(_record("G-3"))
+        journal.close()
+        records, _ = load_journals([path])
+        self.assertEqual(sorted(records), ["G-2", "G-3"])
+        self.assertTrue(records["G-2"]["success"])
+
+    def test_shards_partition_the_goals(self):
+        goal_refs = [{"goal_id": f"G-{n}"} for n in range(7)]
+        shards = [shard_goals(goal_refs, 3, index) for index in range(3)]
+        self.assertEqual([len(shard) for shard in shards], [3, 2, 2])
+        self.assertEqual(sorted(ref["goal_id"] for shard in shards for ref in shard), sorted(ref["goal_id"] for ref in goal_refs))
+        self.assertEqual(shard_goals(goal_refs, 1, 0), goal_refs)
+
+    def test_merge_across_shards_reports_planned_order(self):
+        goal_ids = [f"G-{n}" for n in range(5)]
+        for index in range(2):
+            shard_dir = self.root / f"shard{index}"
+            journal = ResultsJournal(shard_dir / journal_name("dev", 2, index))
+            shard_ids = [ref["goal_id"] for ref in shard_goals([{"goal_id": g} for g in goal_ids], 2, index)]
+            journal.append_run({**META, "num_shards": 2, "shard_index": index, "goal_ids": shard_ids}, fresh=True)
+            for goal_id in reversed(shard_ids):
+                if goal_id != "G-4":
+                    journal.append_record(_record(goal_id, success=goal_id != "G-1"))
+            journal.close()
+
+        summary = merge_journals(find_journals([self.root], "dev"))
+        self.assertEqual([record["goal_id"] for record in summary["records"]], ["G-0", "G-1", "G-2", "G-3"])
+        self.assertEqual((summary["total_goals"], summary["completed_goals"]), (5, 4))
+        self.assertFalse(summary["is_complete"])
+        self.assertEqual(summary["final_success_count"], 3)
+        self.assertEqual(len(summary["journals"]), 2)
+
+
+class ResumeJournalTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _journal(self, meta, goal_ids, name=None):
+        journal = ResultsJournal(self.root / (name or journal_name("dev")))
+        journal.append_run(meta)
+        for goal_id in goal_ids:
+            journal.append_record(_record(goal_id))
+        journal.close()
+
+    def test_matching_configuration_resumes(self):
+        self._journal(META, ["G-1", "G-2"])
+        records = load_resumable_records(find_journals([self.root], "dev"), dict(META))
+        self.assertEqual(sorted(records), ["G-1", "G-2"])
+
+    def test_different_policy_or_model_refuses(self):
+        self._journal(META, ["G-1"])
+        for key, value in (("module_policy", "oracle"), ("agent_model", "model-b"), ("num_shards", 2)):
+            with self.subTest(key=key), self.assertRaisesRegex(ValueError, key):
+                load_resumable_records(find_journals([self.root], "dev"), {**META, key: value})
+
+    def test_unknown_agent_identity_is_not_compared(self):
+        # A --workers parent journals backend "none" until a worker reports back.
+        placeholder = {**META, "agent_backend": "none", "agent_model": ""}
+        self.assertEqual(resume_conflicts(placeholder, META), [])
+        self.assertEqual(resume_conflicts(META, placeholder), [])
+        legacy = {key: value for key, value in META.items() if key != "num_shards"}
+        self.assertEqual(resume_conflicts(legacy, {**META, "num_shards": 4}), [])
+        self.assertEqual(resume_conflicts(placeholder, {**placeholder, "split": "test"}), ["split"])
+
+
+@unittest.skipUnless(bench is not None, "run_workflow_benchmark needs the agent stack")
+class BenchmarkResumeAndWorkerTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_resume_uses_journal_then_goal_summaries(self):
+        journal = ResultsJournal(self.root / journal_name("dev"))
+        journal.append_run(META)
+        journal.append_record(_record("G-1"))
+        journal.close()
+        summary = self.root / "dev" / "G-2" / "workflow_run_summary.json"
+        summary.parent.mkdir(parents=True)
+        summary.write_text(json.dumps(_record("G-2", success=False)), encoding="utf-8")
+        goal_refs = [{"goal_id": goal_id} for goal_id in ("G-1", "G-2", "G-3")]
+
+        records, unjournaled = bench._load_existing_records(self.root, self.root / "dev", "dev", goal_refs, META)
+        self.assertEqual(sorted(records), ["G-1", "G-2"])
+        self.assertEqual(unjournaled, {"G-2"})
+        with self.assertRaises(ValueError):
+            bench._load_existing_records(self.root, self.root / "dev", "dev", goal_refs, {**META, "split": "test"})
+
+    def test_workers_skip_failing_goals_and_retry_after_a_crash(self):
+        calls = []
+
+        class _ThreadPool(ThreadPoolExecutor):
+            def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+                super().__init__(max_workers=max_workers)
+
+        def _run(goal_ref):
+            goal_id = goal_ref["goal_id"]
+            calls.append(goal_id)
+            if goal_id == "G-bad":
+                raise RuntimeError("assertion crashed")
+            if goal_id == "G-crash" and calls.count(goal_id) == 1:
+                raise BrokenProcessPool("worker died")
+            return {"record": _record(goal_id), "agent_backend": "none", "agent_model": ""}
+
+        finished = []
+        goal_refs = [{"goal_id": goal_id} for goal_id in ("G-1", "G-bad", "G-crash", "G-2")]
+        with mock.patch.object(bench, "ProcessPoolExecutor", _ThreadPool), mock.patch.object(
+            bench, "_run_goal_in_worker", _run
+        ), mock.patch.object(bench, "_kill_orphaned_worker_servers") as kill:
+            bench.run_goals_with_workers(
+                goal_refs,
+                isolated_root=self.root,
+                snapshot_root=self.root,
+                split_root=self.root,
+                goal_output_root=self.root,
+                args=SimpleNamespace(workers=2),
+                on_record=lambda result: finished.append(result["record"]["goal_id"]),
+            )
+        self.assertEqual(sorted(finished), ["G-1", "G-2", "G-crash"])
+        self.assertEqual(calls.count("G-crash"), 2)
+        self.assertEqual(calls.count("G-bad"), 1)
+        self.assertEqual(kill.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import json
+import random
+import unittest
+from pathlib import Path
+
+from rl_memory.scripts.workflow_planning_index import PlanningIndex
+
+MODULE_LIBRARY = Path(__file__).resolve().parents[1] / "tasks" / "workflow_module_library.json"
+
+
+def _preconditions_satisfied(requires, state):
+    all_of = set(requires.get("all_of", []))
+    any_of = set(requires.get("any_of", []))
+    none_of = set(requires.get("none_of", []))
+    return all_of <= state and (not any_of or bool(any_of & state)) and not (none_of & state)
+
+
+def _apply_effects(state, module):
+    return (set(state) - set(module.get("effects", {}).get("removes", []))) | set(module.get("effects", {}).get("adds", []))
+
+
+def _reference_needed(modules_doc, state, remaining_targets, depth, allowed_module_ids=None):
+    needed = set(remaining_targets)
+    frontier = set(remaining_targets)
+    for _ in range(max(0, depth)):
+        new_preds = set()
+        for module in modules_doc["modules"]:
+            if allowed_module_ids and module["module_id"] not in allowed_module_ids:
+                continue
+            adds = set(module.get("effects", {}).get("adds", []))
+            if not adds & frontier:
+                continue
+            requires = module.get("requires", {})
+            new_preds |= set(requires.get("all_of", [])) - state
+            any_of = set(requires.get("any_of", []))
+            if any_of and not (any_of & state):
+                new_preds |= any_of
+        new_preds -= needed
+        if not new_preds:
+            break
+        needed |= new_preds
+        frontier = new_preds
+    return needed
+
+
+def _reference_can_reach(modules_doc, state, remaining_targets, depth, blocked_modules, allowed_module_ids=None):
+    if not remaining_targets or remaining_targets <= state:
+        return True
+    if depth <= 0:
+        return False
+    visited = set()
+    frontier = [(set(state), depth)]
+    while frontier:
+        current_state, steps_left = frontier.pop(0)
+        if remaining_targets <= current_state:
+            return True
+        if steps_left <= 0:
+            continue
+        current_remaining = remaining_targets - current_state
+        needed = _reference_needed(modules_doc, current_state, current_remaining, min(2, steps_left), allowed_module_ids)
+        ranked_next = []
+        for module in modules_doc["modules"]:
+            module_id = module["module_id"]
+            if allowed_module_ids and module_id not in allowed_module_ids:
+                continue
+            if module_id in blocked_modules or not _preconditions_satisfied(module.get("requires", {}), current_state):
+                continue
+            adds = set(module.get("effects", {}).get("adds", []))
+            relevant_hits = adds & current_remaining
+            support_hits = adds & (needed - current_remaining)
+            if not relevant_hits and not support_hits:
+                continue
+            next_state = _apply_effects(current_state, module)
+            if next_state == current_state:
+                continue
+            ranked_next.append((len(relevant_hits), len(support_hits), module_id, next_state))
+        ranked_next.sort(key=lambda item: (item[0], item[1], item[2]), reverse=True)
+        for _, _, _, next_state in ranked_next[:16]:
+            key = (frozenset(next_state), steps_left - 1)
+            if key in visited:
+                continue
+            visited.add(key)
+            frontier.append((next_state, steps_left - 1))
+    return False
+
+
+class PlanningIndexEquivalenceTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.modules_doc = json.loads(MODULE_LIBRARY.read_text(encoding="utf-8"))
+        cls.index = PlanningIndex(cls.modules_doc)
+        predicates = set()
+        for module in cls.modules_doc["modules"]:
+            for key in ("all_of", "any_of", "none_of"):
+                predicates.update(module.get("requires", {}).get(key, []) or [])
+            predicates.update(module.get("effects", {}).get("adds", []) or [])
+        cls.predicates = sorted(predicates)
+        cls.module_ids = [module["module_id"] for module in cls.modules_doc["modules"]]
+
+    def _random_cases(self, count):
+        rng = random.Random(7)
+        for _ in range(count):
+            state = set(rng.sample(self.predicates, rng.randint(0, 12)))
+            targets = set(rng.sample(self.predicates, rng.randint(1, 4)))
+            allowed = set(rng.sample(self.module_ids, rng.randint(5, 40))) if rng.random() < 0.5 else None
+            blocked = set(rng.sample(self.module_ids, rng.randint(0, 5)))
+            yield state, targets - state, allowed, blocked, rng.randint(0, 4)
+
+    def test_needed_predicates_match_reference(self):
+        index = self.index
+        for state, targets, allowed, _, depth in self._random_cases(200):
+            expected = _reference_needed(self.modules_doc, state, targets, depth, allowed)
+            actual = index.names(index.needed_mask(index.mask(state), index.mask(targets), depth, index.allowed_mask(allowed)))
+            self.assertEqual(actual, expected)
+
+    def test_reachability_matches_reference(self):
+        index = self.index
+        for state, targets, allowed, blocked, depth in self._random_cases(120):
+            expected = _reference_can_reach(self.modules_doc, state, targets, depth, blocked, allowed)
+            actual = index.can_reach(
+                index.mask(state),
+                index.mask(targets),
+                depth,
+                index.module_mask(blocked),
+                index.allowed_mask(allowed),
+            )
+            self.assertEqual(actual, expected, (sorted(state), sorted(targets), depth))
+
+    def test_unknown_predicates_are_interned(self):
+        index = PlanningIndex({"modules": []})
+        mask = index.mask({"never_produced"})
+        self.assertEqual(index.names(mask), {"never_produced"})
+        self.assertFalse(index.can_reach(0, mask, 3, 0, index.allowed_mask(None)))
+
+
+if __name__ == "__main__":
+    unittest.main()
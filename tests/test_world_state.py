@@ -0,0 +1,78 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from world_state import WorldStateStore, flush_policy_from_env
+
+
+class WorldStateStoreTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.state_path = Path(self._tmp.name) / "env" / "state.json"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _store(self, policy="sync"):
+        return WorldStateStore(self.state_path, lambda: {"seed": True}, flush_policy=policy)
+
+    def test_missing_file_is_initialized_and_written(self):
+        store = self._store()
+        self.assertEqual(store.read(), {"seed": True})
+        self.assertEqual(json.loads(self.state_path.read_text(encoding="utf-8")), {"seed": True})
+
+    def test_sync_policy_writes_through(self):
+        store = self._store()
+        with store.transaction() as txn:
+            txn.env["shop"] = {"orders": {"O-1": {"state": "confirmed"}}}
+        on_disk = json.loads(self.state_path.read_text(encoding="utf-8"))
+        self.assertEqual(on_disk["shop"]["orders"]["O-1"]["state"], "confirmed")
+        self.assertFalse(store.dirty)
+
+    def test_manual_policy_defers_until_flush(self):
+        store = self._store(policy="manual")
+        store.read()
+        with store.transaction() as txn:
+            txn.env = dict(txn.env, counter=1)
+        self.assertNotIn("counter", json.loads(self.state_path.read_text(encoding="utf-8")))
+        self.assertTrue(store.dirty)
+        self.assertTrue(store.flush())
+        self.assertEqual(json.loads(self.state_path.read_text(encoding="utf-8"))["counter"], 1)
+        self.assertFalse(store.flush())
+
+    def test_server_policy_rejects_deferred_flushing(self):
+        with mock.patch.dict("os.environ", {"WEBAGENT_STATE_FLUSH": "interval"}):
+            with self.assertRaises(ValueError):
+                flush_policy_from_env()
+        with mock.patch.dict("os.environ", {"WEBAGENT_STATE_FLUSH": ""}):
+            self.assertEqual(flush_policy_from_env(), "sync")
+
+    def test_external_rewrite_is_picked_up(self):
+        store = self._store()
+        store.read()
+        self.state_path.write_text(json.dumps({"restored": 1}, indent=2), encoding="utf-8")
+        self.assertEqual(store.read(), {"restored": 1})
+        self.assertEqual(store.stats["external_reloads"], 1)
+
+    def test_failed_transaction_rolls_back_to_flushed_state(self):
+        store = self._store()
+        store.read()
+        with self.assertRaises(RuntimeError):
+            with store.transaction() as txn:
+                txn.env["partial"] = True
+                raise RuntimeError("handler failed")
+        self.assertNotIn("partial", store.read())
+
+    def test_discarded_transaction_does_not_bump_version(self):
+        store = self._store()
+        store.read()
+        version = store.version
+        with store.transaction() as txn:
+            txn.discard()
+        self.assertEqual(store.version, version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from task_handlers.time_utils import advance_time
+from task_handlers.trigger_scheduler import TriggerScheduler
+from task_handlers.utils import deep_merge
+from task_handlers.world_triggers import MEMORY_UPSERT_SQL, TRIGGER_RULES, process_time_triggers
+from world_state import WorldStateStore
+
+
+class WorldTriggerTests(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = TriggerScheduler(TRIGGER_RULES)
+        self.writes = []
+        self.env = {
+            "system_time": "2025-01-01T00:00:00",
+            "shop": {"orders": {
+                "O-1": {"state": "confirmed", "date": "2025-01-01T00:00:00"},
+                "O-2": {"state": "confirmed", "date": "2025-01-05T00:00:00"},
+                "O-3": {"state": "delivered", "date": "2024-12-01T00:00:00"},
+                "last": {"id": "O-1", "state": "confirmed"},
+            }},
+        }
+
+    def _jump(self, **delta):
+        self.env = advance_time(self.env, **delta)
+        return process_time_triggers(self.env, lambda sql, args: self.writes.append((sql, args)), scheduler=self.scheduler)
+
+    def _memory(self):
+        return {args[0]: args[1] for sql, args in self.writes if sql == MEMORY_UPSERT_SQL}
+
+    def test_only_due_triggers_fire(self):
+        self._jump(days=1)
+        self.assertEqual(self.writes, [])
+
+        env = self._jump(days=1)
+        orders = env["shop"]["orders"]
+        self.assertEqual((orders["O-1"]["state"], orders["O-2"]["state"]), ("delivered", "confirmed"))
+        self.assertEqual(orders["last"]["state"], "delivered")
+        self.assertEqual(self._memory()["shop.orders.last.state"], "delivered")
+        self.assertIn(("UPDATE orders SET state = ? WHERE id = ?", ["delivered", "O-1"]), self.writes)
+        self.assertEqual(self.scheduler.stats["fired"], 1)
+
+    def test_entities_added_later_are_scheduled_and_cancellations_skipped(self):
+        self._jump(hours=1)
+        self.env = deep_merge(self.env, {
+            "food": {"orders": {"F-1": {"status": "pending", "ordered_at": "2025-01-01T01:00:00"}}},
+            "gov": {"visa_applications": {"V-1": {"status": "pending", "submitted_at": "2025-01-01T00:00:00"}}},
+        })
+        self.env["shop"]["orders"]["O-2"]["state"] = "cancelled"
+
+        env = self._jump(days=10)
+        self.assertEqual(env["food"]["orders"]["F-1"]["status"], "delivered")
+        self.assertEqual(env["gov"]["visa_applications"]["V-1"]["status"], "approved")
+        self.assertEqual(env["shop"]["orders"]["O-2"]["state"], "cancelled")
+        self.assertTrue(env["trip_booked"])
+        self.assertEqual(self.scheduler.stats["fired"], 3)
+        self.assertEqual(self.scheduler.pending(), 0)
+
+    def test_state_reloads_reset_the_schedule(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = Path(tmp) / "state.json"
+            state_path.write_text(json.dumps(self.env), encoding="utf-8")
+            store = WorldStateStore(state_path, dict, on_swap=self.scheduler.reset)
+            for _ in range(5):
+                # Branch pools reload the same snapshot before every branch.
+                process_time_triggers(store.reload(), scheduler=self.scheduler)
+                self.assertEqual(self.scheduler.pending(), 2)
+            env = advance_time(store.read(), days=2)
+            process_time_triggers(env, scheduler=self.scheduler)
+            self.assertEqual(env["shop"]["orders"]["O-1"]["state"], "delivered")
+            self.assertEqual((self.scheduler.stats["fired"], self.scheduler.stats["stale"]), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+
+FLUSH_POLICIES = ("sync", "interval", "manual")
+
+
+def flush_policy_from_env() -> str:
+    """The server's policy; only ``sync`` is accepted.
+
+    Runners, snapshot capture and assertion readers read ``state.json``
+    directly, and branch restores swap it in place, so a server that defers
+    writes would serve them stale state (or overwrite a restore).  The
+    deferred policies remain for in-process stores nothing else reads.
+    """
+    raw = os.environ.get("WEBAGENT_STATE_FLUSH", "sync").strip().lower() or "sync"
+    if raw != "sync":
+        raise ValueError(
+            f"WEBAGENT_STATE_FLUSH={raw!r} is not supported by the server: state.json readers "
+            "do not flush through it. Use 'sync'."
+        )
+    return raw
+
+
+def _file_signature(path: Path) -> tuple[int, int, int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class StateTransaction:
+    """Mutable handle passed to callers of ``WorldStateStore.transaction``.
+
+    Handlers either mutate ``env`` in place or return a new dict; both are
+    picked up on commit.  Call ``discard()`` for read-mostly transactions
+    that turned out not to change anything.
+    """
+
+    def __init__(self, env: dict[str, Any]):
+        self.env = env
+        self.changed = True
+
+    def discard(self) -> None:
+        self.changed = False
+
+
+class WorldStateStore:
+    """Resident, lock-protected copy of ``env/state.json``.
+
+    The server keeps one instance per process.  Reads return the resident
+    dict without touching disk (beyond a ``stat`` used to detect runners
+    that rewrite ``state.json`` behind the server's back), and mutations are
+    serialised through ``transaction()``.  Persistence follows the flush
+    policy:
+
+    - ``sync``: write-through at the end of every mutating request (default,
+      keeps runners that read the file directly consistent);
+    - ``interval``: a background thread flushes dirty state every
+      ``flush_interval`` seconds;
+    - ``manual``: only ``flush()`` and process exit write to disk.
+
+    The server always uses ``sync`` (see ``flush_policy_from_env``).
+
+    Flushes are atomic (temp file + ``os.replace``) so concurrent readers
+    never observe a half-written file.
+
+    ``on_swap`` is called (under the lock) whenever the resident dict is
+    swapped wholesale, by a (re)load from disk or ``replace()``, so caches
+    keyed on its objects can start over.
+    """
+
+    def __init__(
+        self,
+        state_path: Path | str,
+        initial_factory: Callable[[], dict[str, Any]],
+        flush_policy: str = "sync",
+        flush_interval: float = 1.0,
+        on_swap: Callable[[], None] | None = None,
+    ):
+        self.state_path = Path(state_path)
+        self.initial_factory = initial_factory
+        self.on_swap = on_swap
+        self.flush_policy = flush_policy if flush_policy in FLUSH_POLICIES else "sync"
+        self.flush_interval = float(flush_interval)
+        self.version = 0
+        self.stats = {
+            "loads": 0,
+            "external_reloads": 0,
+            "flushes": 0,
+            "flush_sec_total": 0.0,
+            "commits": 0,
+        }
+        self._lock = threading.RLock()
+        self._env: dict[str, Any] | None = None
+        self._signature: tuple[int, int, int] | None = None
+        self._dirty = False
+        self._flusher: threading.Thread | None = None
+        self._stop = threading.Event()
+        if self.flush_policy != "sync":
+            atexit.register(self.close)
+        if self.flush_policy == "interval":
+            self._flusher = threading.Thread(target=self._flush_loop, name="world-state-flush", daemon=True)
+            self._flusher.start()
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def _load_locked(self) -> dict[str, Any]:
+        signature = _file_signature(self.state_path)
+        if signature is None:
+            env = self.initial_factory()
+            self._env = env
+            self._dirty = True
+            self._flush_locked()
+        else:
+            with self.state_path.open("r", encoding="utf-8") as fh:
+                self._env = json.load(fh)
+            self._signature = signature
+            self._dirty = False
+        self.version += 1
+        self.stats["loads"] += 1
+        if self.on_swap is not None:
+            self.on_swap()
+        return self._env
+
+    def _current_locked(self) -> dict[str, Any]:
+        if self._env is None:
+            return self._load_locked()
+        signature = _file_signature(self.state_path)
+        if signature != self._signature:
+            # Something other than this store rewrote (or removed) the file,
+            # e.g. a runner restoring a snapshot between episodes.  The file
+            # is the source of truth for such resets.
+            self.stats["external_reloads"] += 1
+            return self._load_locked()
+        return self._env
+
+    def read(self) -> dict[str, Any]:
+        """Return the resident state.  Callers must treat it as read-only."""
+        with self._lock:
+            return self._current_locked()
+
+    @contextmanager
+    def view(self) -> Iterator[dict[str, Any]]:
+        """Hold the lock while reading, e.g. to serialise a consistent copy."""
+        with self._lock:
+            yield self._current_locked()
+
+    @contextmanager
+    def transaction(self) -> Iterator[StateTransaction]:
+        with self._lock:
+            had_unflushed = self._dirty
+            txn = StateTransaction(self._current_locked())
+            try:
+                yield txn
+            except BaseException:
+                # Handlers mutate in place; after a failure the resident dict
+                # may be half-updated.  Fall back to the last flushed copy when
+                # there is nothing unsaved to lose.
+                if not had_unflushed:
+                    self._env = None
+                raise
+            if txn.changed:
+                self._commit_locked(txn.env)
+
+    def replace(self, env: dict[str, Any]) -> None:
+        with self._lock:
+            self._current_locked()
+            self._commit_locked(env)
+            if self.on_swap is not None:
+                self.on_swap()
+
+    def _commit_locked(self, env: dict[str, Any]) -> None:
+        self._env = env
+        self._dirty = True
+        self.version += 1
+        self.stats["commits"] += 1
+        if self.flush_policy == "sync":
+            self._flush_locked()
+
+    def _flush_locked(self) -> bool:
+        if not self._dirty or self._env is None:
+            return False
+        started = time.perf_counter()
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=".state.", suffix=".json.tmp", dir=str(self.state_path.parent))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(self._env, fh, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_name, self.state_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        self._signature = _file_signature(self.state_path)
+        self._dirty = False
+        self.stats["flushes"] += 1
+        self.stats["flush_sec_total"] += time.perf_counter() - started
+        return True
+
+    def flush(self) -> bool:
+        with self._lock:
+            return self._flush_locked()
+
+    def reload(self) -> dict[str, Any]:
+        with self._lock:
+            self._env = None
+            return self._load_locked()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as exc:
+                print(f"ERROR: world state flush failed: {exc}")
+
+    def close(self) -> None:
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception as exc:
+            print(f"ERROR: world state flush on close failed: {exc}")
+
+    def describe(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.state_path),
+                "policy": self.flush_policy,
+                "version": self.version,
+                "dirty": self._dirty,
+                **self.stats,
+            }